@@ -6,12 +6,13 @@ Run with: `python backend/app.py` from project root.
 """
 
 from factory import create_app, DefaultConfig
-from seed_trips import init_scheduler
+from seed_trips import start_scheduler
 
 app = create_app(DefaultConfig)
 
-# Initialize the automated trip generation scheduler
-init_scheduler(app)
+# Initialize the automated trip generation scheduler (SCHEDULER_MODE, see
+# seed_trips.start_scheduler); by default it starts after the first request
+start_scheduler(app)
 
 if __name__ == "__main__":
     #app.run(debug=True)
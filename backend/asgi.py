@@ -0,0 +1,176 @@
+"""ASGI entrypoint: async versions of the hot public reads, Flask for the rest.
+
+The trip search, trip detail and seat map endpoints run on the event loop
+with `utils.async_database`, so one worker keeps many requests in flight
+while MySQL works; handlers with independent queries can ``asyncio.gather``
+them. Response bodies are the ones the Flask views send. Every other path,
+and searches the async path does not cover (``city``/``destination_city``,
+``?render=db``), is passed to the Flask app from `factory.create_app`
+through a WSGI adapter.
+
+Needs the optional ``starlette``, ``a2wsgi``, ``aiomysql`` and an ASGI
+server. Run with (from backend/):
+
+    uvicorn asgi:app --host 0.0.0.0 --port 9000 --workers 4
+
+With several workers, set ``SCHEDULER_MODE=off`` and run the jobs as their
+own process (``python seed_trips.py --serve``) so they run once.
+"""
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Mount, Route, request_response
+
+from factory import DefaultConfig, create_app
+from routes.schedule import _trip_detail_json, _trip_search_conditions, _trip_search_encoder
+from routes.trips import _seat_summary, seat_map
+from seed_trips import start_scheduler
+from utils import async_database, queries
+from utils.database import replica_configured
+from utils.replicas import account_from_authorization, replica_monitor, sticky_accounts
+from utils.serialization import dumps_bytes
+
+if not async_database.available():
+    raise RuntimeError("asgi.py needs aiomysql (pip install aiomysql)")
+
+flask_app = create_app(DefaultConfig)
+start_scheduler(flask_app)
+config = flask_app.config
+
+
+def json_response(body, status: int = 200, route: str = None) -> Response:
+    body = dumps_bytes(body, bool(config.get("JSON_SORT_KEYS"))) + b"\n"
+    response = Response(body, status_code=status, media_type="application/json")
+    if route is not None:
+        response.headers["X-DB-Route"] = route
+    return response
+
+
+def _replica_usable(authorization: str) -> bool:
+    if not replica_monitor().usable():
+        return False
+    with flask_app.app_context():
+        account_id = account_from_authorization(authorization)
+    return account_id is None or not sticky_accounts.sticky(account_id)
+
+
+async def db_target(request: Request) -> str:
+    """Same decision as `utils.replicas.read_only`, without blocking the loop on lag checks."""
+    if not replica_configured() or request.cookies.get(config["REPLICA_STICKY_COOKIE"]):
+        return "primary"
+    usable = await asyncio.to_thread(_replica_usable, request.headers.get("authorization", ""))
+    return "replica" if usable else "primary"
+
+
+def served_by_flask(request: Request) -> bool:
+    """Searches that need the station index or MySQL-rendered JSON stay on the Flask view."""
+    args = request.query_params
+    if args.get("city") or args.get("destination_city"):
+        return True
+    render = args.get("render")
+    if render in ("db", "python"):
+        return render == "db"
+    return bool(config.get("SQL_RENDERED_LISTINGS"))
+
+
+async def list_trips(request: Request) -> Response:
+    conditions, params, error = _trip_search_conditions(request.query_params)
+    if error:
+        return json_response({"error": error}, 400)
+    target = await db_target(request)
+    try:
+        rows = await async_database.fetchall(
+            queries.TRIP_SEARCH.format(filters=conditions), params, target=target
+        )
+    except Exception as exc:
+        return json_response({"error": str(exc)}, 500, target)
+    return json_response({"data": _trip_search_encoder(rows)}, route=target)
+
+
+async def get_trip_detail(request: Request) -> Response:
+    trip_id = request.path_params["trip_id"]
+    target = await db_target(request)
+    try:
+        row = await async_database.fetchone(queries.TRIP_DETAIL, (trip_id,), target=target)
+    except Exception as exc:
+        return json_response({"error": str(exc)}, 500, target)
+    if not row:
+        return json_response({"error": "Trip not found"}, 404, target)
+    return json_response({"data": _trip_detail_json(row)}, route=target)
+
+
+async def get_trip_seats(request: Request) -> Response:
+    trip_id = request.path_params["trip_id"]
+    target = await db_target(request)
+    try:
+        seats = seat_map(await async_database.fetchall(queries.TRIP_SEAT_MAP, (trip_id,), target=target))
+    except Exception as exc:
+        return json_response({"error": str(exc)}, 500, target)
+    if seats is None:
+        return json_response({"error": "Trip not found"}, 404, target)
+    return json_response(
+        _seat_summary(trip_id, seats.capacity or 0, seats.available, seats.booked_seats), route=target
+    )
+
+
+async def get_booked_seats(request: Request) -> Response:
+    trip_id = request.path_params["trip_id"]
+    target = await db_target(request)
+    try:
+        seats = seat_map(await async_database.fetchall(queries.TRIP_SEAT_MAP, (trip_id,), target=target))
+    except Exception as exc:
+        return json_response({"error": str(exc)}, 500, target)
+    if seats is None:
+        return json_response({"error": "Trip not found"}, 404, target)
+    return json_response({"trip_id": trip_id, "booked_seats": seats.booked_seats}, route=target)
+
+
+wsgi = WSGIMiddleware(flask_app)
+
+
+class AsyncEndpoint:
+    """ASGI app for ``handler``; requests matching ``fallback`` go to Flask instead."""
+
+    def __init__(self, handler, fallback=None) -> None:
+        app = request_response(handler)
+        if config["COMPRESS_ENABLED"]:
+            app = GZipMiddleware(app, minimum_size=config["COMPRESS_MIN_SIZE"])
+        self.app = app
+        self.fallback = fallback
+
+    async def __call__(self, scope, receive, send) -> None:
+        if self.fallback is not None and self.fallback(Request(scope)):
+            await wsgi(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+
+@asynccontextmanager
+async def lifespan(_app):
+    yield
+    await async_database.close_pools()
+
+
+app = Starlette(
+    routes=[
+        Route("/api/schedule/trips", AsyncEndpoint(list_trips, served_by_flask), methods=["GET"]),
+        Route("/api/schedule/trips/{trip_id:int}", AsyncEndpoint(get_trip_detail), methods=["GET"]),
+        Route("/api/trips/{trip_id:int}/seats", AsyncEndpoint(get_trip_seats), methods=["GET"]),
+        Route("/api/trips/{trip_id:int}/booked-seats", AsyncEndpoint(get_booked_seats), methods=["GET"]),
+        Mount("/", app=wsgi),
+    ],
+    lifespan=lifespan,
+)
+# Flask-CORS only covers the mounted app; same policy for the async routes
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+
+
+__all__ = ["app", "flask_app"]
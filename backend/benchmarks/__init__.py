@@ -0,0 +1 @@
+"""Benchmark and load-testing scripts. Run from `backend/` with `python -m benchmarks.<name>`."""
@@ -0,0 +1,164 @@
+"""Benchmark the async read path (asgi.py) against the sync Flask workers.
+
+Drives the same read mix at two running servers and reports requests per
+second, per core and latency percentiles for each. The mix, per iteration:
+
+- ``GET /api/schedule/trips`` for a random station and day ahead,
+- ``GET /api/schedule/trips/<id>``,
+- ``GET /api/trips/<id>/seats`` (three independent queries, run concurrently
+  by the async handler).
+
+Give both servers the same cores so the per-core figure is comparable, e.g.
+two cores each (from backend/, database seeded with `benchmarks.datagen`):
+
+    taskset -c 0,1 gunicorn -w 2 --threads 8 -b 127.0.0.1:9101 app:app
+    taskset -c 2,3 uvicorn asgi:app --workers 2 --port 9102
+    python -m benchmarks.bench_asgi --sync-url http://127.0.0.1:9101 \\
+        --async-url http://127.0.0.1:9102 --cores 2 --users 64 --duration 30
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+from urllib.parse import urlencode, urlsplit
+
+from benchmarks.loadtest import percentile
+
+ENDPOINTS = ("trips", "trip_detail", "seats")
+
+
+class Client(threading.Thread):
+    def __init__(self, index: int, base_url: str, stations: List[str], args: argparse.Namespace,
+                 deadline: float) -> None:
+        super().__init__(name=f"client-{index}", daemon=True)
+        url = urlsplit(base_url)
+        self.host, self.port = url.hostname, url.port or 80
+        self.stations = stations
+        self.args = args
+        self.deadline = deadline
+        self.rng = random.Random(args.seed * 1000 + index)
+        self.latencies: Dict[str, List[float]] = {name: [] for name in ENDPOINTS}
+        self.errors = 0
+        self.conn: Optional[http.client.HTTPConnection] = None
+
+    def get(self, name: str, path: str):
+        started = time.perf_counter()
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.args.timeout)
+            self.conn.request("GET", path)
+            response = self.conn.getresponse()
+            raw = response.read()
+        except (OSError, http.client.HTTPException):
+            self.errors += 1
+            if self.conn is not None:
+                self.conn.close()
+            self.conn = None
+            return None
+        if response.status != 200:
+            self.errors += 1
+            return None
+        self.latencies[name].append((time.perf_counter() - started) * 1000)
+        return json.loads(raw)
+
+    def run(self) -> None:
+        rng = self.rng
+        while time.perf_counter() < self.deadline:
+            day = date.today() + timedelta(days=rng.randint(0, self.args.days_ahead))
+            query = urlencode({"station_id": rng.choice(self.stations), "date": day.isoformat()})
+            found = self.get("trips", f"/api/schedule/trips?{query}")
+            trips = (found or {}).get("data") or []
+            if not trips:
+                continue
+            trip_id = rng.choice(trips)["trip_id"]
+            self.get("trip_detail", f"/api/schedule/trips/{trip_id}")
+            self.get("seats", f"/api/trips/{trip_id}/seats")
+        if self.conn is not None:
+            self.conn.close()
+
+
+def fetch_stations(base_url: str) -> List[str]:
+    url = urlsplit(base_url)
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+    try:
+        conn.request("GET", "/api/schedule/stations")
+        body = json.loads(conn.getresponse().read())
+    finally:
+        conn.close()
+    return [station["station_id"] for station in body.get("data") or []]
+
+
+def measure(base_url: str, stations: List[str], args: argparse.Namespace) -> dict:
+    # Warm pools, prepared statements and the station index first
+    warmup = Client(-1, base_url, stations, args, time.perf_counter() + args.warmup)
+    warmup.run()
+
+    started = time.perf_counter()
+    clients = [Client(i, base_url, stations, args, started + args.duration) for i in range(args.users)]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - started
+
+    endpoints = {}
+    total = 0
+    for name in ENDPOINTS:
+        latencies = [ms for client in clients for ms in client.latencies[name]]
+        total += len(latencies)
+        endpoints[name] = {
+            "requests": len(latencies),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+        }
+    throughput = total / elapsed
+    return {
+        "throughput": round(throughput, 1),
+        "per_core": round(throughput / args.cores, 1),
+        "errors": sum(client.errors for client in clients),
+        "endpoints": endpoints,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sync-url", default="http://127.0.0.1:9101", help="Flask workers (app.py)")
+    parser.add_argument("--async-url", default="http://127.0.0.1:9102", help="ASGI workers (asgi.py)")
+    parser.add_argument("--cores", type=int, default=1, help="cores given to each server")
+    parser.add_argument("--users", type=int, default=64, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=30, help="seconds per server")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds of single-client warm-up")
+    parser.add_argument("--days-ahead", type=int, default=14)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    stations = fetch_stations(args.sync_url)
+    if not stations:
+        parser.error("no stations returned; seed the database first (benchmarks.datagen)")
+
+    results = {}
+    for label, url in (("sync", args.sync_url), ("async", args.async_url)):
+        results[label] = measure(url, stations, args)
+
+    print(f"{args.users} clients, {args.duration:.0f} s per server, {args.cores} core(s) each")
+    print(f"{'server':<7} {'req/s':>9} {'req/s/core':>11} {'errors':>7}  "
+          + "  ".join(f"{name} p50/p95" for name in ENDPOINTS))
+    for label, result in results.items():
+        latencies = "  ".join(
+            f"{e['p50_ms']:>6}/{e['p95_ms']:<6}".ljust(len(name) + 8) for name, e in result["endpoints"].items()
+        )
+        print(f"{label:<7} {result['throughput']:>9} {result['per_core']:>11} {result['errors']:>7}  {latencies}")
+    if results["sync"]["per_core"]:
+        print(f"async / sync per core: {results['async']['per_core'] / results['sync']['per_core']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
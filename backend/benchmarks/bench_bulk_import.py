@@ -0,0 +1,100 @@
+"""Throughput of the bulk import pipeline on a generated file.
+
+Writes ``--rows`` synthetic buses (unique plates) or stations (unique names,
+operator ``--operator``) as CSV or NDJSON to a temporary file, then times:
+
+- ``parse``: `iter_records` + field cleaning only (no database),
+- ``import``: the full pipeline (skip with ``--parse-only``); pass
+  ``--dry-run`` to validate against the database without inserting.
+
+Usage (from backend/):
+    python -m benchmarks.bench_bulk_import --rows 100000 --parse-only
+    python -m benchmarks.bench_bulk_import --rows 100000 --kind stations --operator OP001 --dry-run
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import tempfile
+import time
+
+from services.bulk_import import SPECS, import_stream, iter_records
+from utils.serialization import dumps_bytes
+
+
+def make_records(kind: str, rows: int, operator: str):
+    tag = int(time.time())
+    for i in range(rows):
+        if kind == "buses":
+            yield {
+                "plate_number": f"BENCH-{tag}-{i:07d}",
+                "bus_active_flag": "Active",
+                "capacity": 20 + i % 40,
+                "vehicle_type": ("Sleeper", "Seater", "Limousine")[i % 3],
+            }
+        else:
+            yield {
+                "city": f"Bench City {i % 500}",
+                "active_flag": "Active",
+                "station_name": f"Bench Station {tag}-{i}",
+                "latitude": 10 + (i % 1000) / 1000,
+                "longtitude": 106 + (i % 1000) / 1000,
+                "province": f"Bench Province {i % 60}",
+                "address_station": f"{i} Bench Street",
+                "operator_id": operator,
+            }
+
+
+def write_file(path: str, fmt: str, records) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        if fmt == "csv":
+            first = next(records)
+            writer = csv.DictWriter(handle, fieldnames=list(first))
+            writer.writeheader()
+            writer.writerow(first)
+            writer.writerows(records)
+        else:
+            for record in records:
+                handle.write(dumps_bytes(record).decode() + "\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--kind", choices=("buses", "stations"), default="buses")
+    parser.add_argument("--format", choices=("csv", "ndjson"), default="csv")
+    parser.add_argument("--operator", default="OP001", help="operator_id for stations")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--parse-only", action="store_true")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=f".{args.format}")
+    os.close(fd)
+    try:
+        write_file(path, args.format, make_records(args.kind, args.rows, args.operator))
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"{args.rows} {args.kind} as {args.format}: {size_mb:.1f} MB")
+
+        clean = SPECS[args.kind].clean
+        started = time.perf_counter()
+        with open(path, "rb") as stream:
+            count = sum(1 for _, record, _ in iter_records(stream, args.format) if clean(record))
+        elapsed = time.perf_counter() - started
+        print(f"parse:  {count} rows in {elapsed * 1000:.0f} ms ({count / elapsed:,.0f} rows/s)")
+
+        if not args.parse_only:
+            with open(path, "rb") as stream:
+                report = import_stream(args.kind, stream, args.format,
+                                       batch_size=args.batch_size, dry_run=args.dry_run)
+            summary = report.to_json()
+            print(f"import: {summary['inserted']} inserted, {summary['rejected']} rejected in "
+                  f"{summary['elapsed_ms']:.0f} ms ({summary['rows_per_second']:,} rows/s)"
+                  f"{' [dry run]' if args.dry_run else ''}")
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
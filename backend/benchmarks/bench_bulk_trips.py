@@ -0,0 +1,88 @@
+"""Scheduling N trips one call at a time vs. with the bulk path.
+
+Needs a database with at least one active bus and one route. Generates
+``--trips`` rows spread over the active buses (15 minutes apart per bus so they
+never conflict), then times:
+
+- ``per-row``: one ``CALL sp_schedule_trip`` per trip (what ``POST /api/trips``
+  does, minus its Python-side existence checks), capped at ``--per-row-limit``
+  trips and extrapolated,
+- ``bulk``: `services.trip_scheduling.schedule_trips` (set-based validation plus
+  chunked multi-row inserts).
+
+Both run in a transaction that is rolled back, so nothing is kept.
+
+Usage (from backend/): python -m benchmarks.bench_bulk_trips --trips 10000
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from services.trip_scheduling import schedule_trips
+from utils.database import db_connection, load_env
+
+
+def make_rows(bus_ids: list, route_ids: list, count: int, start: datetime) -> list:
+    rows = []
+    for i in range(count):
+        slot, bus = divmod(i, len(bus_ids))
+        rows.append({
+            # Far apart enough that no two trips of a bus overlap
+            "service_date": start + timedelta(days=slot),
+            "bus_id": bus_ids[bus],
+            "route_id": route_ids[i % len(route_ids)],
+        })
+    return rows
+
+
+def main() -> None:
+    load_env()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trips", type=int, default=10000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--per-row-limit", type=int, default=500)
+    args = parser.parse_args()
+
+    conn = db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT bus_id FROM bus WHERE bus_active_flag = 'Active'")
+        bus_ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT route_id FROM routetrip")
+        route_ids = [row[0] for row in cursor.fetchall()]
+        if not bus_ids or not route_ids:
+            raise SystemExit("need at least one active bus and one route")
+        rows = make_rows(bus_ids, route_ids, args.trips, datetime(2099, 1, 1, 7, 0))
+
+        per_row = rows[:args.per_row_limit]
+        conn.start_transaction()
+        started = time.perf_counter()
+        for row in per_row:
+            cursor.execute(
+                "CALL sp_schedule_trip(%s, %s, %s, @trip_id)",
+                (row["service_date"], row["bus_id"], row["route_id"]),
+            )
+        per_row_s = time.perf_counter() - started
+        conn.rollback()
+        estimate = per_row_s / len(per_row) * len(rows)
+        print(f"per-row: {len(per_row)} trips in {per_row_s * 1000:.0f} ms "
+              f"(~{estimate:.1f} s for {len(rows)})")
+
+        conn.start_transaction()
+        started = time.perf_counter()
+        result = schedule_trips(cursor, rows, chunk_size=args.chunk_size)
+        bulk_s = time.perf_counter() - started
+        conn.rollback()
+        print(f"bulk:    {len(result.created)} trips in {bulk_s * 1000:.0f} ms "
+              f"{result.timings_ms} ({estimate / bulk_s:.0f}x)")
+        if result.rejected:
+            print(f"         {len(result.rejected)} rejected, e.g. {result.rejected[0].to_json()}")
+    finally:
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Bytes-on-wire and CPU cost of response compression by payload size.
+
+Encodes `trips.get_trips`-shaped payloads of increasing size (synthetic rows
+from `bench_serialization.make_rows`) and, for every encoder available in
+`utils.compression` at both the per-request and the cached level, reports the
+compressed size, ratio and median compression time per response. A streamed
+variant (one chunk per 500 rows, flushed per chunk) shows the cost of keeping
+`json_rows_response` bodies incremental.
+
+Usage (from backend/): python -m benchmarks.bench_compression --sizes 10,100,1000,10000
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+
+from benchmarks.bench_serialization import make_rows
+from routes.trips import _trip_list_encoder
+from utils.compression import DEFAULT_CACHE_LEVELS, DEFAULT_LEVELS, ENCODERS
+from utils.serialization import dumps_bytes
+
+STREAM_CHUNK_ROWS = 500
+
+
+def _median_ms(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def _stream_chunks(rows: list) -> list:
+    encoded = [dumps_bytes(row) for row in _trip_list_encoder(rows)]
+    chunks = [b'{"data":[']
+    for start in range(0, len(encoded), STREAM_CHUNK_ROWS):
+        prefix = b"," if start else b""
+        chunks.append(prefix + b",".join(encoded[start:start + STREAM_CHUNK_ROWS]))
+    chunks.append(b"]}")
+    return chunks
+
+
+def run(sizes: list, repeat: int) -> list:
+    results = []
+    for count in sizes:
+        rows = make_rows(count)
+        body = dumps_bytes({"data": _trip_list_encoder(rows)})
+        chunks = _stream_chunks(rows)
+        for encoding, (compress, compress_stream) in ENCODERS.items():
+            for label, level in (("request", DEFAULT_LEVELS[encoding]), ("cached", DEFAULT_CACHE_LEVELS[encoding])):
+                compressed = compress(body, level)
+                results.append({
+                    "rows": count,
+                    "raw_bytes": len(body),
+                    "encoding": f"{encoding}:{level} ({label})",
+                    "bytes": len(compressed),
+                    "ms": _median_ms(lambda: compress(body, level), repeat),
+                })
+            level = DEFAULT_LEVELS[encoding]
+            streamed = b"".join(compress_stream(iter(chunks), level))
+            results.append({
+                "rows": count,
+                "raw_bytes": len(body),
+                "encoding": f"{encoding}:{level} (stream)",
+                "bytes": len(streamed),
+                "ms": _median_ms(lambda: b"".join(compress_stream(iter(chunks), level)), repeat),
+            })
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,100,1000,10000", help="comma-separated row counts")
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    print(f"encoders={','.join(ENCODERS)} repeat={args.repeat}")
+    print(f"{'rows':>7} {'raw':>10} {'encoding':<22} {'bytes':>10} {'ratio':>7} {'ms':>9} {'MB/s':>8}")
+    for result in run(sizes, args.repeat):
+        ratio = result["raw_bytes"] / result["bytes"]
+        throughput = result["raw_bytes"] / 1e6 / (result["ms"] / 1000) if result["ms"] else float("inf")
+        print(f"{result['rows']:>7} {result['raw_bytes']:>10} {result['encoding']:<22} "
+              f"{result['bytes']:>10} {ratio:>7.1f} {result['ms']:>9.3f} {throughput:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Export throughput per format and compression.
+
+By default feeds ``--rows`` synthetic ticket rows through the writers of
+`services.export` (no database), in chunks of ``--chunk-size``, for every
+format/compression the installed packages support. ``--memory`` also reports
+the tracemalloc peak, which should track the chunk size and not the row count.
+With ``--db`` it exports the real ``--dataset`` for ``--from``..``--to``
+instead (read + write).
+
+Usage (from backend/):
+    python -m benchmarks.bench_export --rows 1000000
+    python -m benchmarks.bench_export --db --dataset tickets --from 2026-01-01 --to 2026-03-31
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+from services import export
+
+
+def synthetic_tickets(rows: int, chunk_size: int):
+    start = datetime(2026, 1, 1, 7)
+    for first in range(0, rows, chunk_size):
+        yield [
+            (i, i // 3, i // 40, i % 5000, i % 200, ("Issued", "Used", "Refunded")[i % 3],
+             f"A{i % 40}", 100000 + i, 150000 + (i % 7) * 10000, ("VIP", "Standard")[i % 2],
+             "VND", start + timedelta(hours=i // 400), i % 300, f"OP{i % 20:03d}")
+            for i in range(first, min(first + chunk_size, rows))
+        ]
+
+
+def variants():
+    for fmt, compressions in export.COMPRESSIONS.items():
+        for compression in compressions:
+            try:
+                export.resolve("tickets", fmt, compression)
+            except export.ExportError:
+                continue
+            yield fmt, compression
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--memory", action="store_true", help="report tracemalloc peak (slower)")
+    parser.add_argument("--db", action="store_true", help="export real rows from the database")
+    parser.add_argument("--dataset", choices=sorted(export.DATASETS), default="tickets")
+    parser.add_argument("--from", dest="start", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--to", dest="end", type=date.fromisoformat, default=date.today() + timedelta(days=30))
+    args = parser.parse_args()
+
+    skipped = [f"{fmt}/{c}" for fmt, cs in export.COMPRESSIONS.items() for c in cs
+               if (fmt, c) not in set(variants())]
+    print(f"{'format':<8} {'compression':<12} {'rows':>9} {'MB':>8} {'ms':>8} {'rows/s':>11}"
+          + (f" {'peak MB':>8}" if args.memory else ""))
+    directory = tempfile.mkdtemp()
+    for fmt, compression in variants():
+        path = os.path.join(directory, f"bench.{export.file_extension(fmt, compression)}")
+        if args.memory:
+            tracemalloc.start()
+        if args.db:
+            stats = export.export_to_file(args.dataset, fmt, path, args.start, args.end,
+                                          compression=compression, chunk_size=args.chunk_size)
+        else:
+            stats = export.write_chunks(path, "tickets", fmt, synthetic_tickets(args.rows, args.chunk_size),
+                                        compression)
+        peak = ""
+        if args.memory:
+            peak = f" {tracemalloc.get_traced_memory()[1] / 1e6:>8.1f}"
+            tracemalloc.stop()
+        os.remove(path)
+        print(f"{fmt:<8} {compression:<12} {stats['rows']:>9} {stats['bytes'] / 1e6:>8.1f} "
+              f"{stats['elapsed_ms']:>8.0f} {stats['rows_per_second'] or 0:>11,}{peak}")
+    os.rmdir(directory)
+    if skipped:
+        print("not available here:", ", ".join(skipped))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Query latency of the journey planner on a synthetic timetable.
+
+Builds a network of ``--stations`` stations and ``--routes`` random
+station-to-station routes with ``--departures`` trips per route per day over
+two days, loads it with `JourneyPlanner.load_rows` (no database involved) and
+times random origin/destination searches.
+
+Usage (from backend/): python -m benchmarks.bench_journey_planner --routes 400 --departures 8
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from services.journey_planner import JourneyPlanner
+
+
+def make_timetable(stations: int, routes: int, departures: int, seed: int = 11) -> list:
+    rng = random.Random(seed)
+    day = datetime(2026, 1, 15)
+    rows = []
+    trip_id = 0
+    for route_id in range(1, routes + 1):
+        origin, destination = rng.sample(range(1, stations + 1), 2)
+        duration = timedelta(minutes=rng.randint(90, 12 * 60))
+        for day_offset in range(2):
+            for _ in range(departures):
+                trip_id += 1
+                departure = day + timedelta(days=day_offset, minutes=rng.randrange(0, 24 * 60, 15))
+                rows.append((departure, departure + duration, origin, destination, trip_id, route_id))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stations", type=int, default=60)
+    parser.add_argument("--routes", type=int, default=400)
+    parser.add_argument("--departures", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--max-legs", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = make_timetable(args.stations, args.routes, args.departures)
+    planner = JourneyPlanner()
+    started = time.perf_counter()
+    planner.load_rows(rows)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    rng = random.Random(3)
+    timings = []
+    found = 0
+    for _ in range(args.queries):
+        origin, destination = rng.sample(range(1, args.stations + 1), 2)
+        depart_after = datetime(2026, 1, 15, rng.randrange(0, 20))
+        started = time.perf_counter()
+        journeys = planner.search(origin, destination, depart_after, max_legs=args.max_legs)
+        timings.append((time.perf_counter() - started) * 1000)
+        found += bool(journeys)
+
+    timings.sort()
+    print(f"connections={len(rows)} stations={args.stations} build={build_ms:.1f} ms")
+    print(f"queries={args.queries} with_results={found} "
+          f"median={statistics.median(timings):.2f} ms p95={timings[int(len(timings) * 0.95) - 1]:.2f} ms "
+          f"max={timings[-1]:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Load-factor rollups over a year of synthetic trip snapshots.
+
+Builds an `OccupancyCube` from ``--routes`` routes with ``--departures``
+trips per day for one year (no database), then times a few dashboard
+group-bys with the pure-Python and (when installed) NumPy engines and checks
+that both return the same groups.
+
+Usage (from backend/):
+    python -m benchmarks.bench_occupancy --routes 500 --departures 3
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from services import occupancy
+from services.occupancy import OccupancyCube
+
+QUERIES = (
+    ("route", {}),
+    ("hour,vehicle_type", {}),
+    ("weekday,month", {}),
+    ("route,weekday", {"vehicle_type": "Sleeper"}),
+    ("operator,month,hour", {}),
+)
+
+
+def build(cube: OccupancyCube, year: int, routes: int, departures: int, seed: int) -> int:
+    rng = random.Random(seed)
+    hours = sorted(rng.sample(range(5, 23), departures))
+    vehicles = [("Sleeper", 40), ("Seater", 45), ("Limousine", 22)]
+    route_info = [(route_id, f"OP{route_id % 25:03d}", vehicles[route_id % 3]) for route_id in range(1, routes + 1)]
+    rows = 0
+    month = date(year, 1, 1)
+    while month.year == year:
+        next_month = (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+        batch = []
+        day = month
+        while day < next_month:
+            weekend = day.isoweekday() >= 5
+            for route_id, operator_id, (vehicle_type, capacity) in route_info:
+                for hour in hours:
+                    demand = 0.55 + (0.25 if weekend else 0) + (0.1 if 17 <= hour <= 20 else 0)
+                    sold = min(capacity, int(capacity * demand * rng.uniform(0.6, 1.2)))
+                    batch.append((route_id, operator_id, datetime(day.year, day.month, day.day, hour),
+                                  vehicle_type, capacity, sold))
+            day += timedelta(days=1)
+        cube.build(month, batch)
+        rows += len(batch)
+        month = next_month
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--routes", type=int, default=500)
+    parser.add_argument("--departures", type=int, default=3, help="trips per route per day")
+    parser.add_argument("--year", type=int, default=2025)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    # Infinite TTL: rollups use the built months and never query the database
+    cube = OccupancyCube(ttl=float("inf"))
+    started = time.perf_counter()
+    rows = build(cube, args.year, args.routes, args.departures, args.seed)
+    print(f"{rows} snapshots in {(time.perf_counter() - started) * 1000:.0f} ms to encode")
+
+    engines = ["python"] + (["numpy"] if occupancy.numpy_module() is not None else [])
+    start, end = date(args.year, 1, 1), date(args.year, 12, 31)
+    print(f"{'group_by':<22} {'filters':<24} {'groups':>7} " + " ".join(f"{e + ' ms':>10}" for e in engines))
+    for group_by, filters in QUERIES:
+        timings, results = [], []
+        for engine in engines:
+            best = float("inf")
+            for _ in range(args.repeat):
+                began = time.perf_counter()
+                result = cube.rollup(start, end, group_by.split(","), filters, limit=10 ** 6, engine=engine)
+                best = min(best, time.perf_counter() - began)
+            timings.append(best * 1000)
+            results.append(result)
+        if len(results) == 2 and results[0]["data"] != results[1]["data"]:
+            raise SystemExit(f"engines disagree on {group_by}")
+        print(f"{group_by:<22} {str(filters):<24} {len(results[0]['data']):>7} "
+              + " ".join(f"{ms:>10.1f}" for ms in timings))
+    if occupancy.numpy_module() is None:
+        print("numpy not installed: vectorized engine skipped")
+
+
+if __name__ == "__main__":
+    main()
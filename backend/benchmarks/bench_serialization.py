@@ -0,0 +1,136 @@
+"""Benchmark list-endpoint serialization on large payloads.
+
+Compares, on synthetic rows shaped like `trips.get_trips` cursor output:
+
+- legacy: per-row dict building with strftime + Flask's stdlib JSON provider
+- encoder: precompiled `RowEncoder` + stdlib JSON
+- encoder+fast: precompiled `RowEncoder` + `dumps_bytes` (orjson when installed)
+
+Usage (from backend/): python -m benchmarks.bench_serialization --rows 50000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import time
+from datetime import date, datetime, timedelta
+
+from routes.trips import _format_duration_label, _trip_list_encoder
+from utils.serialization import dumps_bytes, orjson
+
+
+def make_rows(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    base = datetime(2026, 1, 1, 7, 0, 0)
+    rows = []
+    for trip_id in range(1, count + 1):
+        service_date = base + timedelta(hours=rng.randint(0, 24 * 90))
+        duration = timedelta(minutes=rng.choice([90, 240, 330, 480, 600]))
+        rows.append({
+            "trip_id": trip_id,
+            "service_date": service_date,
+            "arrival_datetime": service_date + duration,
+            "trip_status": "Scheduled",
+            "bus_id": rng.randint(1, 400),
+            "route_id": rng.randint(1, 150),
+            "bus_plate": f"51B-{rng.randint(10000, 99999)}",
+            "bus_type": rng.choice(["Sleeper", "Seater", "Limousine"]),
+            "bus_capacity": 40,
+            "distance": rng.randint(50, 1700),
+            "default_duration_time": duration,
+            "operator_id": f"OP{rng.randint(1, 20):03d}",
+            "operator_name": "Phương Trang",
+            "departure_city": "Hồ Chí Minh",
+            "departure_station": "Bến xe Miền Đông",
+            "arrival_city": "Đà Lạt",
+            "arrival_station": "Bến xe Liên tỉnh Đà Lạt",
+            "available_seats": rng.randint(0, 40),
+        })
+    return rows
+
+
+def _legacy_datetime(raw_value):
+    if raw_value is None:
+        return None
+    if isinstance(raw_value, datetime):
+        return raw_value.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(raw_value, date):
+        return datetime.combine(raw_value, datetime.min.time()).strftime("%Y-%m-%d %H:%M:%S")
+    return str(raw_value)
+
+
+def legacy_format(trips: list) -> list:
+    """The per-row loop `trips.get_trips` used before RowEncoder."""
+    formatted_trips = []
+    for trip in trips:
+        formatted_trip = {
+            "trip_id": trip["trip_id"],
+            "service_date": _legacy_datetime(trip["service_date"]),
+            "arrival_datetime": _legacy_datetime(trip["arrival_datetime"]),
+            "trip_status": trip["trip_status"],
+            "bus_id": trip["bus_id"],
+            "route_id": trip["route_id"],
+            "bus_plate": trip["bus_plate"],
+            "bus_type": trip["bus_type"],
+            "bus_capacity": trip["bus_capacity"],
+            "distance": float(trip["distance"]) if trip["distance"] else None,
+            "operator_id": trip["operator_id"],
+            "operator_name": trip["operator_name"],
+            "departure_city": trip["departure_city"],
+            "departure_station": trip["departure_station"],
+            "arrival_city": trip["arrival_city"],
+            "arrival_station": trip["arrival_station"],
+            "available_seats": trip["available_seats"] if trip["available_seats"] is not None else 0,
+            "route_name": f"{trip['departure_city']} -> {trip['arrival_city']}",
+        }
+        formatted_trip["duration"] = _format_duration_label(trip.get("default_duration_time"))
+        formatted_trips.append(formatted_trip)
+    return formatted_trips
+
+
+def _stdlib_dumps(obj) -> bytes:
+    # Same settings as Flask's DefaultJSONProvider in non-debug mode
+    return json.dumps(obj, ensure_ascii=True, sort_keys=True, separators=(",", ":")).encode()
+
+
+CASES = {
+    "legacy": lambda rows: _stdlib_dumps({"data": legacy_format(rows)}),
+    "encoder": lambda rows: _stdlib_dumps({"data": _trip_list_encoder(rows)}),
+    "encoder+fast": lambda rows: dumps_bytes({"data": _trip_list_encoder(rows)}),
+}
+
+
+def run(rows: list, repeat: int) -> dict:
+    results = {}
+    for name, case in CASES.items():
+        timings = []
+        size = 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            size = len(case(rows))
+            timings.append(time.perf_counter() - started)
+        results[name] = {"median_ms": statistics.median(timings) * 1000, "bytes": size}
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    assert legacy_format(rows[:100]) == _trip_list_encoder(rows[:100]), "encoder output drifted"
+
+    print(f"rows={args.rows} repeat={args.repeat} backend={'orjson' if orjson else 'json'}")
+    results = run(rows, args.repeat)
+    baseline = results["legacy"]["median_ms"]
+    for name, result in results.items():
+        print(f"{name:>14}: {result['median_ms']:9.1f} ms  {result['bytes'] / 1e6:6.2f} MB  "
+              f"x{baseline / result['median_ms']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""Compare gunicorn serving profiles (gunicorn.conf.py) on the public search endpoints.
+
+For each profile the benchmark starts ``gunicorn app:app`` on a free port,
+waits for ``/readyz``, warms up, then runs ``--users`` keep-alive clients
+for ``--duration`` seconds over:
+
+- ``GET /api/schedule/stations/search?q=<prefix>``,
+- ``GET /api/schedule/trips?station_id=..&date=..``,
+- ``GET /api/schedule/journeys?station_id=..&destination_id=..&date=..``,
+
+and reports throughput, p50/p95/p99 latency and errors per profile. Needs
+gunicorn (and gevent for that profile) and a seeded database
+(`benchmarks.datagen`).
+
+Usage (from backend/):
+    python -m benchmarks.bench_serving --users 64 --duration 30
+    python -m benchmarks.bench_serving --profiles gthread --workers 2 --cpus 0,1
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from benchmarks.loadtest import percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENDPOINTS = ("station_search", "trips", "journeys")
+
+
+class Client(threading.Thread):
+    def __init__(self, index: int, port: int, stations: List[dict], args: argparse.Namespace,
+                 deadline: float) -> None:
+        super().__init__(name=f"client-{index}", daemon=True)
+        self.port = port
+        self.stations = stations
+        self.args = args
+        self.deadline = deadline
+        self.rng = random.Random(args.seed * 1000 + index)
+        self.latencies: Dict[str, List[float]] = {name: [] for name in ENDPOINTS}
+        self.errors = 0
+        self.conn: Optional[http.client.HTTPConnection] = None
+
+    def get(self, name: str, path: str) -> None:
+        started = time.perf_counter()
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=self.args.timeout)
+            self.conn.request("GET", path)
+            response = self.conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            self.errors += 1
+            if self.conn is not None:
+                self.conn.close()
+            self.conn = None
+            return
+        if response.status != 200:
+            self.errors += 1
+            return
+        self.latencies[name].append((time.perf_counter() - started) * 1000)
+
+    def run(self) -> None:
+        rng = self.rng
+        while time.perf_counter() < self.deadline:
+            origin, destination = rng.sample(self.stations, 2)
+            day = (date.today() + timedelta(days=rng.randint(0, self.args.days_ahead))).isoformat()
+            prefix = (origin["city"] or "a")[: rng.randint(2, 4)]
+            self.get("station_search", f"/api/schedule/stations/search?q={prefix}")
+            self.get("trips", f"/api/schedule/trips?station_id={origin['station_id']}&date={day}")
+            self.get(
+                "journeys",
+                f"/api/schedule/journeys?station_id={origin['station_id']}"
+                f"&destination_id={destination['station_id']}&date={day}",
+            )
+        if self.conn is not None:
+            self.conn.close()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _get_json(port: int, path: str, timeout: float = 5) -> Optional[dict]:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        conn.request("GET", path)
+        response = conn.getresponse()
+        body = response.read()
+        return json.loads(body) if response.status == 200 else None
+    except (OSError, http.client.HTTPException, ValueError):
+        return None
+    finally:
+        conn.close()
+
+
+def start_server(profile: str, port: int, args: argparse.Namespace) -> subprocess.Popen:
+    env = dict(os.environ, GUNICORN_PROFILE=profile, GUNICORN_BIND=f"127.0.0.1:{port}", GUNICORN_ACCESS_LOG="")
+    if args.workers:
+        env["WEB_CONCURRENCY"] = str(args.workers)
+    command = [sys.executable, "-m", "gunicorn", "app:app"]
+    if args.cpus:
+        if not shutil.which("taskset"):
+            raise SystemExit("--cpus needs taskset")
+        command = ["taskset", "-c", args.cpus] + command
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, start_new_session=True)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"gunicorn ({profile}) exited with {process.returncode}")
+        if _get_json(port, "/readyz") is not None:
+            return process
+        time.sleep(0.2)
+    stop_server(process)
+    raise SystemExit(f"gunicorn ({profile}) did not become ready within 30 s")
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    os.killpg(process.pid, signal.SIGTERM)
+    try:
+        process.wait(timeout=35)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+
+def measure(port: int, stations: List[dict], args: argparse.Namespace) -> dict:
+    Client(-1, port, stations, args, time.perf_counter() + args.warmup).run()
+
+    started = time.perf_counter()
+    clients = [Client(i, port, stations, args, started + args.duration) for i in range(args.users)]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = [ms for client in clients for name in ENDPOINTS for ms in client.latencies[name]]
+    endpoints = {}
+    for name in ENDPOINTS:
+        samples = [ms for client in clients for ms in client.latencies[name]]
+        endpoints[name] = {"requests": len(samples), "p95_ms": round(percentile(samples, 95), 2)}
+    return {
+        "throughput": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "errors": sum(client.errors for client in clients),
+        "endpoints": endpoints,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", default="gthread,gevent", help="comma separated GUNICORN_PROFILE values")
+    parser.add_argument("--workers", type=int, help="WEB_CONCURRENCY (default: the config's CPU-based value)")
+    parser.add_argument("--cpus", help="pin the server with taskset, e.g. 0,1")
+    parser.add_argument("--users", type=int, default=64, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=30, help="seconds per profile")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds of single-client warm-up")
+    parser.add_argument("--days-ahead", type=int, default=14)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    results = {}
+    for profile in args.profiles.split(","):
+        port = _free_port()
+        process = start_server(profile, port, args)
+        try:
+            stations = (_get_json(port, "/api/schedule/stations", timeout=30) or {}).get("data") or []
+            if len(stations) < 2:
+                raise SystemExit("need at least two stations; seed the database first (benchmarks.datagen)")
+            results[profile] = measure(port, stations, args)
+        finally:
+            stop_server(process)
+
+    print(f"{args.users} clients, {args.duration:.0f} s per profile")
+    print(f"{'profile':<9} {'req/s':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>7}  p95 per endpoint")
+    for profile, r in results.items():
+        per_endpoint = " ".join(f"{name}={e['p95_ms']}" for name, e in r["endpoints"].items())
+        print(f"{profile:<9} {r['throughput']:>9} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} "
+              f"{r['errors']:>7}  {per_endpoint}")
+
+
+if __name__ == "__main__":
+    main()
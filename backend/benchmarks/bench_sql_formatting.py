@@ -0,0 +1,90 @@
+"""Compare Python-side and MySQL-side formatting of the trip listings.
+
+Drives the real endpoints through the Flask test client against the database
+configured in ``.env``, once with ``?render=python`` (cursor rows formatted by
+`RowEncoder` and serialized by the app JSON provider) and once with
+``?render=db`` (one ``JSON_OBJECT`` per row, streamed untouched), and checks
+that both paths return the same documents.
+
+Usage (from backend/):
+    python -m benchmarks.bench_sql_formatting --date 2026-01-15
+    python -m benchmarks.bench_sql_formatting --endpoint schedule --station 1 --date 2026-01-15
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time
+
+from factory import create_app
+
+RENDER_MODES = ("python", "db")
+
+
+def _url(args, render: str) -> str:
+    if args.endpoint == "schedule":
+        url = f"/api/schedule/trips?station_id={args.station}&date={args.date}"
+        if args.destination:
+            url += f"&destination_id={args.destination}"
+    else:
+        url = "/api/trips?status=all"
+        if args.date:
+            url += f"&date={args.date}"
+    return f"{url}&render={render}"
+
+
+def run(client, args) -> dict:
+    results = {}
+    for render in RENDER_MODES:
+        url = _url(args, render)
+        client.get(url)  # warm up connection setup and server caches
+        timings = []
+        body = b""
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            response = client.get(url)
+            body = response.get_data()
+            timings.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise SystemExit(f"{url} -> {response.status_code}: {body[:200]!r}")
+        results[render] = {
+            "median_ms": statistics.median(timings) * 1000,
+            "p95_ms": sorted(timings)[int(len(timings) * 0.95) - 1] * 1000 if len(timings) > 1 else timings[0] * 1000,
+            "bytes": len(body),
+            "document": json.loads(body),
+        }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--endpoint", choices=("trips", "schedule"), default="trips")
+    parser.add_argument("--date", help="service date filter, YYYY-MM-DD")
+    parser.add_argument("--station", type=int, default=1, help="departure station (schedule only)")
+    parser.add_argument("--destination", type=int, help="arrival station (schedule only)")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    if args.endpoint == "schedule" and not args.date:
+        parser.error("--date is required for --endpoint schedule")
+
+    app = create_app()
+    app.config["SQL_RENDERED_LISTINGS"] = False
+    results = run(app.test_client(), args)
+
+    python_doc = results["python"].pop("document")
+    db_doc = results["db"].pop("document")
+    if python_doc != db_doc:
+        mismatched = sum(1 for a, b in zip(python_doc["data"], db_doc["data"]) if a != b)
+        print(f"WARNING: outputs differ ({len(python_doc['data'])} vs {len(db_doc['data'])} rows, "
+              f"{mismatched} mismatched)")
+
+    print(f"endpoint={args.endpoint} rows={len(python_doc['data'])} repeat={args.repeat}")
+    baseline = results["python"]["median_ms"]
+    for render, result in results.items():
+        print(f"{render:>8}: median {result['median_ms']:8.1f} ms  p95 {result['p95_ms']:8.1f} ms  "
+              f"{result['bytes'] / 1e3:9.1f} kB  x{baseline / result['median_ms']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
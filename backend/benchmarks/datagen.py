@@ -0,0 +1,427 @@
+"""Synthetic VietBus data for benchmarks and load tests.
+
+Fills an empty database (or one emptied with ``--reset``) with operators,
+stations, routes, fares, buses, accounts, trips and tickets. The same
+``--seed`` and scale options always produce the same rows:
+
+- stations are spread over real cities, routes join stations of two
+  different cities and get a distance and duration from their coordinates,
+- every route has a VIP/Standard/Economy fare and ``--departures`` trips a
+  day from ``--past-days`` ago to ``--future-days`` ahead, each on its own bus,
+- accounts come with their person and passenger rows and all share one
+  bcrypt hash of the password printed at the end (hashed once, so millions of
+  accounts cost nothing extra),
+- ``--tickets`` tickets are spread over the trips (never above capacity,
+  unique seats per trip), grouped into bookings of one to four seats. Past
+  trips hold Used/Refunded tickets, future trips Issued ones.
+
+Rows are streamed with explicit ids to tab-separated files of ``--file-rows``
+rows and bulk loaded with ``LOAD DATA LOCAL INFILE`` (the server needs
+``local_infile=ON``; otherwise, or with ``--method insert``, multi-row INSERTs
+of ``--chunk-size`` rows are used). Unique and foreign key checks are disabled
+for the session and every step reports its rows/s. The read
+models start empty; rebuild them afterwards with ``python -m
+services.fare_calendar`` and ``python -m services.revenue``.
+
+Usage (from backend/):
+    python -m benchmarks.datagen --reset --tickets 1000000
+    python -m benchmarks.datagen --reset --routes 1500 --accounts 1000000 --tickets 10000000
+    python -m benchmarks.datagen --schema --tickets 100000   # local DB only: recreate it first
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import random
+import subprocess
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import Iterable, Iterator, List, Sequence
+
+import bcrypt
+import mysql.connector
+
+from utils.database import db_connection, load_env
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "database", "schema.sql")
+
+# (city, province, latitude, longitude)
+CITIES = (
+    ("Hà Nội", "Hà Nội", 21.0278, 105.8342),
+    ("Hồ Chí Minh", "Hồ Chí Minh", 10.8231, 106.6297),
+    ("Đà Nẵng", "Đà Nẵng", 16.0544, 108.2022),
+    ("Hải Phòng", "Hải Phòng", 20.8449, 106.6881),
+    ("Cần Thơ", "Cần Thơ", 10.0452, 105.7469),
+    ("Đà Lạt", "Lâm Đồng", 11.9404, 108.4583),
+    ("Nha Trang", "Khánh Hòa", 12.2388, 109.1967),
+    ("Huế", "Thừa Thiên Huế", 16.4637, 107.5909),
+    ("Vũng Tàu", "Bà Rịa - Vũng Tàu", 10.4114, 107.1362),
+    ("Quy Nhơn", "Bình Định", 13.7830, 109.2197),
+    ("Buôn Ma Thuột", "Đắk Lắk", 12.6667, 108.0500),
+    ("Vinh", "Nghệ An", 18.6796, 105.6813),
+    ("Thanh Hóa", "Thanh Hóa", 19.8067, 105.7852),
+    ("Nam Định", "Nam Định", 20.4388, 106.1621),
+    ("Hạ Long", "Quảng Ninh", 20.9517, 107.0806),
+    ("Lào Cai", "Lào Cai", 22.4809, 103.9755),
+    ("Sa Pa", "Lào Cai", 22.3364, 103.8438),
+    ("Điện Biên Phủ", "Điện Biên", 21.3860, 103.0230),
+    ("Phan Thiết", "Bình Thuận", 10.9289, 108.1021),
+    ("Rạch Giá", "Kiên Giang", 10.0125, 105.0809),
+    ("Cà Mau", "Cà Mau", 9.1769, 105.1524),
+    ("Long Xuyên", "An Giang", 10.3864, 105.4352),
+    ("Mỹ Tho", "Tiền Giang", 10.3600, 106.3600),
+    ("Pleiku", "Gia Lai", 13.9833, 108.0000),
+    ("Kon Tum", "Kon Tum", 14.3497, 108.0005),
+    ("Quảng Ngãi", "Quảng Ngãi", 15.1214, 108.8044),
+    ("Tuy Hòa", "Phú Yên", 13.0955, 109.3209),
+    ("Đồng Hới", "Quảng Bình", 17.4689, 106.6222),
+    ("Hà Giang", "Hà Giang", 22.8233, 104.9836),
+    ("Cao Bằng", "Cao Bằng", 22.6657, 106.2570),
+)
+VEHICLES = (("Sleeper", 40), ("Seater", 45), ("Limousine", 22))
+SEAT_CLASSES = (("VIP", 1.4), ("Standard", 1.0), ("Economy", 0.8))
+FAMILY_NAMES = ("Nguyễn", "Trần", "Lê", "Phạm", "Hoàng", "Huỳnh", "Phan", "Vũ", "Võ", "Đặng", "Bùi", "Đỗ")
+MIDDLE_NAMES = ("Văn", "Thị", "Minh", "Ngọc", "Thanh", "Đức", "Hữu", "Thu", "Quốc", "Gia")
+GIVEN_NAMES = ("An", "Bình", "Châu", "Dũng", "Hà", "Hải", "Hạnh", "Hùng", "Lan", "Linh", "Long", "Mai",
+               "Nam", "Phong", "Quân", "Sơn", "Tâm", "Thảo", "Trang", "Tuấn", "Vy", "Yến")
+PASSWORD = "loadtest123"
+BCRYPT_ALPHABET = "./ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+
+# Server or client refused LOAD DATA LOCAL INFILE (local_infile disabled)
+LOCAL_INFILE_REFUSED = (1148, 2068, 3948)
+
+TABLES = ("ticket", "booking", "fare", "trip", "routetrip", "bus", "haspoint", "pickupdropoff",
+          "station", "staff", "passenger", "person", "account", "operator", "timetable_materialization",
+          "timetable_exception", "timetable_template", "daily_route_summary", "revenue_daily_fact",
+          "trip_occupancy_snapshot")
+
+
+def _distance_km(origin: tuple, destination: tuple) -> int:
+    """Road distance between two station rows (latitude/longitude at index 4/5)."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (origin[4], origin[5], destination[4], destination[5]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    # Road distance is roughly 1.3x the great-circle distance
+    return max(20, int(6371 * 2 * math.asin(math.sqrt(h)) * 1.3))
+
+
+def _chunks(rows: Iterable[tuple], size: int) -> Iterator[List[tuple]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Generator:
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.today = args.today or date.today()
+        self.counts = {}
+        self.method = args.method
+        self.batch_rows = args.file_rows if args.method == "load" else args.chunk_size * 4
+
+    # -- writing -----------------------------------------------------------
+
+    def insert(self, cursor, table: str, columns: Sequence[str], rows: Iterable[tuple]) -> int:
+        total = 0
+        for chunk in _chunks(rows, self.batch_rows):
+            if self.method == "load":
+                try:
+                    self._load(cursor, table, columns, chunk)
+                except mysql.connector.Error as exc:
+                    if exc.errno not in LOCAL_INFILE_REFUSED:
+                        raise
+                    print(f"  LOAD DATA LOCAL INFILE refused ({exc.msg}); using multi-row INSERTs")
+                    self.method, self.batch_rows = "insert", self.args.chunk_size * 4
+            if self.method == "insert":
+                self._insert(cursor, table, columns, chunk)
+            total += len(chunk)
+        self.counts[table] = self.counts.get(table, 0) + total
+        return total
+
+    def _insert(self, cursor, table: str, columns: Sequence[str], rows: List[tuple]) -> None:
+        row_sql = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        head = f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+        for chunk in _chunks(rows, self.args.chunk_size):
+            cursor.execute(head + ", ".join([row_sql] * len(chunk)), [v for row in chunk for v in row])
+
+    def _load(self, cursor, table: str, columns: Sequence[str], rows: List[tuple]) -> None:
+        """Write ``rows`` to a tab-separated file and LOAD DATA it (values never contain tabs or newlines)."""
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", suffix=".tsv", delete=False) as handle:
+            for row in rows:
+                handle.write("\t".join("\\N" if value is None else str(value) for value in row))
+                handle.write("\n")
+        try:
+            cursor.execute(
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} CHARACTER SET utf8mb4 "
+                f"FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' ({', '.join(columns)})",
+                (handle.name,),
+            )
+        finally:
+            os.unlink(handle.name)
+
+    # -- entities ----------------------------------------------------------
+
+    def operators(self, cursor) -> List[str]:
+        rows = [
+            ("", f"Cong ty Van Tai Tong Hop {i}", f"LoadTest Bus {i}", f"ops{i}@loadtest.vietbus", 50000000 + i)
+            for i in range(1, self.args.operators + 1)
+        ]
+        # trg_operator_before_insert assigns OP001, OP002, ...
+        self.insert(cursor, "operator", ("operator_id", "legal_name", "brand_name", "brand_email", "tax_id"), rows)
+        cursor.execute("SELECT operator_id FROM operator ORDER BY tax_id")
+        return [row[0] for row in cursor.fetchall()]
+
+    def stations(self, cursor, operators: List[str]) -> List[tuple]:
+        rng = self.rng
+        stations = []
+        for station_id in range(1, self.args.stations + 1):
+            city, province, lat, lon = CITIES[(station_id - 1) % len(CITIES)]
+            number = (station_id - 1) // len(CITIES) + 1
+            stations.append((
+                station_id, city, "Active", f"Bến xe {city} {number}",
+                round(lat + rng.uniform(-0.05, 0.05), 6), round(lon + rng.uniform(-0.05, 0.05), 6),
+                province, f"{rng.randint(1, 999)} Quốc lộ {rng.randint(1, 60)}, {city}",
+                operators[station_id % len(operators)],
+            ))
+        self.insert(cursor, "station", ("station_id", "city", "active_flag", "station_name", "latitude",
+                                        "longtitude", "province", "address_station", "operator_id"), stations)
+        return stations
+
+    def routes(self, cursor, stations: List[tuple], operators: List[str]) -> List[tuple]:
+        rng = self.rng
+        routes = []
+        for route_id in range(1, self.args.routes + 1):
+            origin = rng.choice(stations)
+            destination = rng.choice(stations)
+            while destination[1] == origin[1]:
+                destination = rng.choice(stations)
+            distance = _distance_km(origin, destination)
+            minutes = max(60, int(distance / 50 * 60) // 15 * 15)
+            duration = f"{minutes // 60:02d}:{minutes % 60:02d}:00"
+            routes.append((route_id, duration, distance, origin[0], destination[0],
+                           operators[route_id % len(operators)]))
+        self.insert(cursor, "routetrip", ("route_id", "default_duration_time", "distance", "station_id",
+                                          "arrival_station", "operator_id"), routes)
+        return routes
+
+    def fares(self, cursor, routes: List[tuple]) -> dict:
+        valid_from = self.today - timedelta(days=365)
+        valid_to = self.today + timedelta(days=365)
+        fares, by_route = [], {}
+        fare_id = 0
+        for route_id, _, distance, *_ in routes:
+            base = max(80000, int(distance * 900 / 1000) * 1000)
+            for seat_class, factor in SEAT_CLASSES:
+                fare_id += 1
+                price = int(base * factor / 1000) * 1000
+                fares.append((fare_id, "VND", 0, valid_from, valid_to, 0, route_id, 0, base, price, seat_class))
+                by_route.setdefault(route_id, []).append((fare_id, price))
+        self.insert(cursor, "fare", ("fare_id", "currency", "discount", "valid_from", "valid_to", "taxes",
+                                     "route_id", "surcharges", "base_fare", "seat_price", "seat_class"), fares)
+        return by_route
+
+    def buses(self, cursor) -> List[int]:
+        count = self.args.routes * self.args.departures
+        capacities = []
+        rows = []
+        for bus_id in range(1, count + 1):
+            vehicle_type, capacity = VEHICLES[bus_id % len(VEHICLES)]
+            capacities.append(capacity)
+            rows.append((bus_id, f"{50 + bus_id % 49}B-{bus_id:06d}", "Active", capacity, vehicle_type))
+        self.insert(cursor, "bus", ("bus_id", "plate_number", "bus_active_flag", "capacity", "vehicle_type"), rows)
+        return capacities
+
+    def accounts(self, cursor) -> None:
+        """Passenger accounts with their person and passenger rows (ids 1..--accounts)."""
+        rng = self.rng
+        created = self.today - timedelta(days=400)
+        # bcrypt is deliberately slow: hash once (with a seeded salt) and share the hash
+        salt = "".join(rng.choice(BCRYPT_ALPHABET) for _ in range(21)) + rng.choice(".Oeu")
+        password = bcrypt.hashpw(PASSWORD.encode("utf-8"),
+                                 f"$2b${self.args.bcrypt_rounds:02d}${salt}".encode("ascii")).decode("utf-8")
+        ids = range(1, self.args.accounts + 1)
+        self.insert(cursor, "account", ("account_id", "email", "phone", "stat", "create_at", "acc_password"), (
+            (account_id, f"user{account_id}@loadtest.vietbus", 900000000 + account_id, "Active",
+             created + timedelta(days=account_id % 365), password)
+            for account_id in ids
+        ))
+        self.insert(cursor, "person", ("person_id", "person_name", "date_of_birth", "gov_id_num", "account_id"), (
+            (account_id, f"{rng.choice(FAMILY_NAMES)} {rng.choice(MIDDLE_NAMES)} {rng.choice(GIVEN_NAMES)}",
+             date(1950, 1, 1) + timedelta(days=rng.randrange(20000)), 100000000 + account_id, account_id)
+            for account_id in ids
+        ))
+        self.insert(cursor, "passenger", ("passenger_id", "person_id"), ((i, i) for i in ids))
+
+    def trips(self, cursor, routes: List[tuple], capacities: List[int]) -> List[tuple]:
+        """Insert trips; returns (trip_id, route_id, service_date, capacity, operator_id)."""
+        args, rng = self.args, self.rng
+        first = self.today - timedelta(days=args.past_days)
+        days = args.past_days + args.future_days + 1
+        # Spread departures over the day, staggered per route
+        hours = [5 + (18 * k) // args.departures for k in range(args.departures)]
+        trips = []
+        trip_id = 0
+        for offset in range(days):
+            day = first + timedelta(days=offset)
+            for index, (route_id, *_rest, operator_id) in enumerate(routes):
+                for k, hour in enumerate(hours):
+                    trip_id += 1
+                    bus_id = index * args.departures + k + 1
+                    minute = (route_id * 15) % 60
+                    departure = datetime(day.year, day.month, day.day, hour, minute)
+                    trips.append((trip_id, route_id, departure, capacities[bus_id - 1], operator_id, bus_id))
+        now = datetime.combine(self.today, datetime.min.time())
+        rows = (
+            (trip_id, "Arrived" if departure < now else "Scheduled", departure, bus_id, route_id)
+            for trip_id, route_id, departure, _, _, bus_id in trips
+        )
+        # arrival_datetime is set by trg_trip_before_insert_set_arrival
+        self.insert(cursor, "trip", ("trip_id", "trip_status", "service_date", "bus_id", "route_id"), rows)
+        rng.shuffle(trips)
+        return trips
+
+    def tickets(self, cursor, trips: List[tuple], fares: dict) -> None:
+        args, rng = self.args, self.rng
+        total_capacity = sum(trip[3] for trip in trips)
+        # Aim slightly high so random rounding still reaches --tickets before the last trip
+        load = min(1.0, 1.05 * args.tickets / total_capacity) if total_capacity else 0
+        now = datetime.combine(self.today, datetime.min.time())
+        remaining = args.tickets
+        bookings, tickets = [], []
+        booking_id = ticket_id = 0
+
+        def flush():
+            self.insert(cursor, "booking", ("booking_id", "currency", "total_amount", "account_id",
+                                            "operator_id", "booking_status"), bookings)
+            self.insert(cursor, "ticket", ("ticket_id", "trip_id", "account_id", "booking_id", "fare_id",
+                                           "ticket_status", "seat_price", "seat_code"), tickets)
+            bookings.clear()
+            tickets.clear()
+
+        for trip_id, route_id, departure, capacity, operator_id, _ in trips:
+            if remaining <= 0:
+                break
+            # Randomised rounding keeps small per-trip expectations unbiased
+            sold = min(capacity, remaining, int(capacity * load * rng.uniform(0.7, 1.3) + rng.random()))
+            remaining -= sold
+            seats = rng.sample(range(1, capacity + 1), sold)
+            past = departure < now
+            while seats:
+                size = min(len(seats), rng.choice((1, 1, 2, 2, 3, 4)))
+                group, seats = seats[:size], seats[size:]
+                booking_id += 1
+                account_id = rng.randint(1, args.accounts)
+                fare_id, price = rng.choice(fares[route_id])
+                refunded = past and rng.random() < 0.03
+                status = "Refunded" if refunded else ("Used" if past else "Issued")
+                for seat in group:
+                    ticket_id += 1
+                    tickets.append((ticket_id, trip_id, account_id, booking_id, fare_id, status, price, str(seat)))
+                bookings.append((booking_id, "VND", 0 if refunded else price * len(group), account_id, operator_id,
+                                 "Cancelled" if refunded else ("Completed" if past else "Active")))
+            if len(tickets) >= self.batch_rows:
+                flush()
+        flush()
+        if remaining > 0:
+            print(f"  capacity reached: {args.tickets - remaining} tickets generated")
+
+    # -- driver ------------------------------------------------------------
+
+    def run(self) -> dict:
+        args = self.args
+        conn = db_connection(allow_local_infile=True) if self.method == "load" else db_connection()
+        cursor = conn.cursor()
+        timings = {}
+        try:
+            cursor.execute("SET SESSION unique_checks = 0")
+            cursor.execute("SET SESSION foreign_key_checks = 0")
+            if args.reset:
+                for table in TABLES:
+                    cursor.execute(f"TRUNCATE TABLE {table}")
+            else:
+                cursor.execute("SELECT COUNT(*) FROM operator")
+                if cursor.fetchone()[0]:
+                    raise SystemExit("database is not empty; pass --reset to truncate the generated tables")
+
+            def step(name, func, *func_args):
+                rows_before = sum(self.counts.values())
+                started = time.perf_counter()
+                result = func(cursor, *func_args)
+                conn.commit()
+                elapsed = time.perf_counter() - started
+                rows = sum(self.counts.values()) - rows_before
+                timings[name] = round(elapsed, 2)
+                print(f"  {name:<10} {rows:>10} rows {elapsed:>8.2f} s {rows / elapsed if elapsed else 0:>10.0f} rows/s")
+                return result
+
+            operators = step("operators", self.operators)
+            stations = step("stations", self.stations, operators)
+            routes = step("routes", self.routes, stations, operators)
+            fares = step("fares", self.fares, routes)
+            capacities = step("buses", self.buses)
+            step("accounts", self.accounts)
+            trips = step("trips", self.trips, routes, capacities)
+            step("tickets", self.tickets, trips, fares)
+        finally:
+            cursor.execute("SET SESSION unique_checks = 1")
+            cursor.execute("SET SESSION foreign_key_checks = 1")
+            cursor.close()
+            conn.close()
+        return {"counts": self.counts, "seconds": timings}
+
+
+def load_schema() -> None:
+    """Recreate the database from database/schema.sql with the mysql client (local hosts only)."""
+    host = os.getenv("DB_HOST") or "localhost"
+    if host not in ("localhost", "127.0.0.1"):
+        raise SystemExit(f"--schema drops the database; refusing on non-local DB_HOST {host!r}")
+    command = ["mysql", "-h", host, "-P", str(os.getenv("DB_PORT") or 3306), "-u", os.getenv("DB_USER") or "root"]
+    env = dict(os.environ, MYSQL_PWD=os.getenv("DB_PASSWORD") or "")
+    with open(SCHEMA_PATH, "rb") as schema:
+        subprocess.run(command, stdin=schema, env=env, check=True)
+
+
+def main() -> None:
+    load_env()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--operators", type=int, default=10)
+    parser.add_argument("--stations", type=int, default=120)
+    parser.add_argument("--routes", type=int, default=400)
+    parser.add_argument("--departures", type=int, default=4, help="trips per route per day")
+    parser.add_argument("--past-days", type=int, default=90)
+    parser.add_argument("--future-days", type=int, default=30)
+    parser.add_argument("--accounts", type=int, default=50000)
+    parser.add_argument("--tickets", type=int, default=1000000)
+    parser.add_argument("--method", choices=("load", "insert"), default="load",
+                        help="LOAD DATA LOCAL INFILE (falls back to INSERT when refused) or multi-row INSERTs")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="rows per INSERT")
+    parser.add_argument("--file-rows", type=int, default=200000, help="rows per LOAD DATA file")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12, help="cost of the shared password hash")
+    parser.add_argument("--today", type=date.fromisoformat, help="anchor date (default: today)")
+    parser.add_argument("--reset", action="store_true", help="truncate the generated tables first")
+    parser.add_argument("--schema", action="store_true", help="recreate the local database from schema.sql first")
+    args = parser.parse_args()
+    if args.stations < 2 or args.routes < 1 or args.operators < 1 or args.accounts < 1:
+        parser.error("need at least 2 stations, 1 route, 1 operator and 1 account")
+
+    if args.schema:
+        load_schema()
+    started = time.perf_counter()
+    summary = Generator(args).run()
+    elapsed = time.perf_counter() - started
+    print(", ".join(f"{count} {table}" for table, count in summary["counts"].items()))
+    total = sum(summary["counts"].values())
+    print(f"{total} rows in {elapsed:.1f} s ({total / elapsed:.0f} rows/s, seed {args.seed}, "
+          f"password {PASSWORD!r})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Start-up cost of the app: ``python -X importtime`` of `factory.create_app`.
+
+Each run starts a fresh interpreter that imports the factory and builds the
+app (no database access happens there), with ``-X importtime`` on. The
+report lists the total import time, the ``create_app()`` time and the
+slowest modules by cumulative time, each the fastest of ``--repeat`` runs
+(one discarded run first fills the bytecode and file caches).
+
+Meant for CI as well: the run exits with status 1 when
+
+- a module listed in ``--forbid`` is imported at start-up (by default the
+  ones deferred to first use: numpy, apscheduler),
+- the total exceeds ``--budget-ms``,
+- ``--compare`` is given and the total grew more than ``--threshold``
+  percent over that earlier report.
+
+The report is saved as JSON under ``--output``.
+
+Usage (from backend/):
+    python -m benchmarks.importtime
+    python -m benchmarks.importtime --top 40 --entry app
+    python -m benchmarks.importtime --budget-ms 400 --compare benchmarks/results/importtime-baseline.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime
+from typing import Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+DEFAULT_FORBID = ("numpy", "apscheduler")
+
+# What one run imports and times; prints the create_app() milliseconds
+ENTRIES = {
+    "factory": "from factory import create_app; create_app()",
+    # app.py also hands the scheduler to SCHEDULER_MODE (deferred: nothing starts)
+    "app": "import app",
+}
+PROGRAM = """
+import time
+started = time.perf_counter()
+{statement}
+print((time.perf_counter() - started) * 1000)
+"""
+
+
+def run_once(entry: str) -> dict:
+    """One interpreter: ``{module: (self_us, cumulative_us, depth)}``, import total and wall time."""
+    env = dict(os.environ, SCHEDULER_MODE="deferred", PYTHONPATH=BACKEND_DIR)
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROGRAM.format(statement=ENTRIES[entry])],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise SystemExit(f"start-up failed:\n{completed.stderr[-2000:]}")
+    modules = {}
+    total_us = 0
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+        total_us += int(self_us)
+    return {"modules": modules, "import_ms": total_us / 1000, "wall_ms": float(completed.stdout.split()[-1])}
+
+
+def measure(args: argparse.Namespace) -> dict:
+    run_once(args.entry)
+    runs = [run_once(args.entry) for _ in range(args.repeat)]
+    fastest: Dict[str, List[int]] = {}
+    for run in runs:
+        for name, (self_us, cumulative_us, depth) in run["modules"].items():
+            best = fastest.setdefault(name, [self_us, cumulative_us, depth])
+            best[0] = min(best[0], self_us)
+            best[1] = min(best[1], cumulative_us)
+    slowest = sorted(fastest.items(), key=lambda item: item[1][1], reverse=True)
+    return {
+        "checked_at": datetime.now().isoformat(timespec="seconds"),
+        "entry": args.entry,
+        "python": sys.version.split()[0],
+        "repeat": args.repeat,
+        "import_ms": round(min(run["import_ms"] for run in runs), 1),
+        "wall_ms": round(min(run["wall_ms"] for run in runs), 1),
+        "modules_imported": len(fastest),
+        "forbidden": sorted(
+            name for name in fastest if any(name == f or name.startswith(f + ".") for f in args.forbid)
+        ),
+        "slowest": [
+            {"module": name, "self_ms": round(s / 1000, 1), "cumulative_ms": round(c / 1000, 1), "depth": depth}
+            for name, (s, c, depth) in slowest[: args.top]
+        ],
+    }
+
+
+def check(report: dict, args: argparse.Namespace) -> List[str]:
+    failures = [f"forbidden module imported at start-up: {name}" for name in report["forbidden"]]
+    if args.budget_ms and report["import_ms"] > args.budget_ms:
+        failures.append(f"imports take {report['import_ms']} ms, budget {args.budget_ms} ms")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            before = json.load(handle)["import_ms"]
+        if report["import_ms"] > before * (1 + args.threshold / 100):
+            failures.append(f"imports {before} -> {report['import_ms']} ms (more than {args.threshold:g}%)")
+    return failures
+
+
+def print_report(report: dict) -> None:
+    print(f"entry {report['entry']}: {report['modules_imported']} modules, "
+          f"imports {report['import_ms']} ms (interpreter start-up included), "
+          f"entry statement {report['wall_ms']} ms (fastest of {report['repeat']})")
+    print(f"{'cumulative':>10} {'self':>8}  module")
+    for row in report["slowest"]:
+        print(f"{row['cumulative_ms']:>10} {row['self_ms']:>8}  {'  ' * row['depth']}{row['module']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entry", choices=sorted(ENTRIES), default="factory", help="what a run imports")
+    parser.add_argument("--repeat", type=int, default=5, help="runs; each module keeps its fastest time")
+    parser.add_argument("--top", type=int, default=25, help="slowest modules to list")
+    parser.add_argument("--forbid", nargs="*", default=list(DEFAULT_FORBID), metavar="MODULE",
+                        help="modules that must not be imported at start-up")
+    parser.add_argument("--budget-ms", type=float, help="fail when imports take longer")
+    parser.add_argument("--output", default=RESULTS_DIR, help="directory for the JSON report")
+    parser.add_argument("--compare", metavar="BASELINE", help="earlier JSON report to compare with")
+    parser.add_argument("--threshold", type=float, default=20, help="allowed growth in percent")
+    args = parser.parse_args()
+
+    report = measure(args)
+    print_report(report)
+
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, f"importtime-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"saved {path}")
+
+    failures = check(report, args)
+    for line in failures:
+        print(f"FAIL {line}")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
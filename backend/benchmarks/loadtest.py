@@ -0,0 +1,298 @@
+"""Load test of the public booking funnel against a running server.
+
+Each virtual user loops over the funnel a customer goes through:
+
+1. ``GET /api/schedule/stations`` (with ``If-None-Match`` after the first
+   call, like a browser cache),
+2. ``GET /api/schedule/trips`` for a random station and day ahead,
+3. ``GET /api/schedule/trips/<id>`` for one of the trips found,
+4. ``GET /api/trips/<id>/seats``,
+5. ``POST /api/bookings/create`` for one or two free seats, on
+   ``--book-ratio`` of the iterations.
+
+The report lists throughput, p50/p95/p99 latency and status codes per
+endpoint, plus the SQL statements and time per request when the server runs
+with ``QUERY_AUDIT=1`` (``X-Query-Count`` / ``X-Query-Time-Ms``). Results are
+saved as JSON under ``--output`` and ``--compare`` checks them against an
+earlier run: a p95 or throughput regression above ``--threshold`` percent
+exits with status 1.
+
+Seed the database first with `benchmarks.datagen` (its accounts are
+1..``--accounts``), then start the server and run:
+
+Usage (from backend/):
+    python -m benchmarks.datagen --reset --tickets 1000000
+    QUERY_AUDIT=1 python app.py
+    python -m benchmarks.loadtest --users 20 --duration 60
+    python -m benchmarks.loadtest --users 20 --duration 60 --compare benchmarks/results/baseline.json
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from urllib.parse import urlencode, urlsplit
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+ENDPOINTS = ("stations", "trips", "trip_detail", "seats", "booking")
+
+
+class Endpoint:
+    """Samples of one funnel step."""
+
+    def __init__(self) -> None:
+        self.latencies: List[float] = []
+        self.queries: List[int] = []
+        self.query_ms: List[float] = []
+        self.statuses: Counter = Counter()
+        self.errors = 0
+
+    def merge(self, other: "Endpoint") -> None:
+        self.latencies += other.latencies
+        self.queries += other.queries
+        self.query_ms += other.query_ms
+        self.statuses.update(other.statuses)
+        self.errors += other.errors
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values`` (0 when empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, index: int, args: argparse.Namespace, deadline: float) -> None:
+        super().__init__(name=f"vu-{index}", daemon=True)
+        self.args = args
+        self.deadline = deadline
+        self.rng = random.Random(args.seed * 1000 + index)
+        self.stats: Dict[str, Endpoint] = {name: Endpoint() for name in ENDPOINTS}
+        self.iterations = 0
+        url = urlsplit(args.base_url)
+        self.host, self.port = url.hostname, url.port or 80
+        self.prefix = url.path.rstrip("/")
+        self.conn: Optional[http.client.HTTPConnection] = None
+        self.stations_etag: Optional[str] = None
+        self.stations: List[dict] = []
+
+    def request(self, name: str, method: str, path: str, body=None, headers=None):
+        """Send one request; returns (status, parsed JSON or None)."""
+        headers = dict(headers or {})
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        stat = self.stats[name]
+        started = time.perf_counter()
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.args.timeout)
+            self.conn.request(method, self.prefix + path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+            raw = response.read()
+        except (OSError, http.client.HTTPException):
+            stat.errors += 1
+            if self.conn is not None:
+                self.conn.close()
+            self.conn = None
+            return None, None
+        stat.latencies.append((time.perf_counter() - started) * 1000)
+        stat.statuses[response.status] += 1
+        if response.getheader("X-Query-Count") is not None:
+            stat.queries.append(int(response.getheader("X-Query-Count")))
+            stat.query_ms.append(float(response.getheader("X-Query-Time-Ms") or 0))
+        if name == "stations" and response.getheader("ETag"):
+            self.stations_etag = response.getheader("ETag")
+        try:
+            return response.status, json.loads(raw) if raw else None
+        except ValueError:
+            return response.status, None
+
+    def iteration(self) -> None:
+        args, rng = self.args, self.rng
+        headers = {"If-None-Match": self.stations_etag} if self.stations_etag else None
+        status, data = self.request("stations", "GET", "/api/schedule/stations", headers=headers)
+        if status == 200 and data:
+            self.stations = data.get("data") or []
+        if not self.stations:
+            return
+
+        day = date.today() + timedelta(days=rng.randint(0, args.days_ahead))
+        query = urlencode({"station_id": rng.choice(self.stations)["station_id"], "date": day.isoformat()})
+        status, data = self.request("trips", "GET", f"/api/schedule/trips?{query}")
+        trips = (data or {}).get("data") or [] if status == 200 else []
+        if not trips:
+            return
+
+        trip_id = rng.choice(trips)["trip_id"]
+        status, data = self.request("trip_detail", "GET", f"/api/schedule/trips/{trip_id}")
+        detail = (data or {}).get("data") if status == 200 else None
+        if not detail:
+            return
+
+        status, seats = self.request("seats", "GET", f"/api/trips/{trip_id}/seats")
+        if status != 200 or not seats or rng.random() >= args.book_ratio:
+            return
+        booked = set(seats.get("booked_seats") or [])
+        free = [str(seat) for seat in range(1, (seats.get("total_capacity") or 0) + 1) if str(seat) not in booked]
+        if not free:
+            return
+        self.request("booking", "POST", "/api/bookings/create", body={
+            "currency": "VND",
+            "account_id": rng.randint(1, args.accounts),
+            "operator_id": detail.get("operator_id"),
+            "trip_id": trip_id,
+            "fare_id": detail.get("fare_id"),
+            "seat_list": rng.sample(free, min(len(free), rng.choice((1, 1, 2)))),
+        })
+
+    def run(self) -> None:
+        while time.perf_counter() < self.deadline:
+            self.iteration()
+            self.iterations += 1
+            if self.args.think_ms:
+                time.sleep(self.rng.uniform(0.5, 1.5) * self.args.think_ms / 1000)
+        if self.conn is not None:
+            self.conn.close()
+
+
+def run(args: argparse.Namespace) -> dict:
+    """Run the virtual users for ``args.duration`` seconds and build the report."""
+    started = time.perf_counter()
+    deadline = started + args.duration
+    users = []
+    for index in range(args.users):
+        user = VirtualUser(index, args, deadline)
+        users.append(user)
+        user.start()
+        if args.ramp_up:
+            time.sleep(args.ramp_up / args.users)
+    for user in users:
+        user.join()
+    elapsed = time.perf_counter() - started
+
+    totals = {name: Endpoint() for name in ENDPOINTS}
+    for user in users:
+        for name, stat in user.stats.items():
+            totals[name].merge(stat)
+
+    endpoints = {}
+    for name, stat in totals.items():
+        endpoints[name] = {
+            "requests": len(stat.latencies),
+            "errors": stat.errors,
+            "throughput": round(len(stat.latencies) / elapsed, 2),
+            "p50_ms": round(percentile(stat.latencies, 50), 2),
+            "p95_ms": round(percentile(stat.latencies, 95), 2),
+            "p99_ms": round(percentile(stat.latencies, 99), 2),
+            "max_ms": round(max(stat.latencies, default=0), 2),
+            "statuses": {str(code): count for code, count in sorted(stat.statuses.items())},
+            "queries_per_request": round(sum(stat.queries) / len(stat.queries), 2) if stat.queries else None,
+            "query_ms_per_request": round(sum(stat.query_ms) / len(stat.query_ms), 2) if stat.query_ms else None,
+        }
+    return {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "config": {key: getattr(args, key) for key in
+                   ("base_url", "users", "duration", "ramp_up", "think_ms", "book_ratio", "days_ahead", "seed")},
+        "elapsed_s": round(elapsed, 2),
+        "iterations": sum(user.iterations for user in users),
+        "throughput": round(sum(e["requests"] for e in endpoints.values()) / elapsed, 2),
+        "endpoints": endpoints,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(__file__)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> List[str]:
+    """Regressions of ``report`` against ``baseline`` (p95 up or throughput down by > threshold %)."""
+    regressions = []
+    for name, current in report["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if not before or not before["requests"] or not current["requests"]:
+            continue
+        if before["p95_ms"] and current["p95_ms"] > before["p95_ms"] * (1 + threshold / 100):
+            regressions.append(f"{name}: p95 {before['p95_ms']} -> {current['p95_ms']} ms")
+        if current["throughput"] < before["throughput"] * (1 - threshold / 100):
+            regressions.append(f"{name}: throughput {before['throughput']} -> {current['throughput']} req/s")
+    return regressions
+
+
+def print_report(report: dict, baseline: Optional[dict] = None) -> None:
+    print(f"{report['iterations']} funnel iterations, {report['throughput']} req/s over {report['elapsed_s']} s")
+    print(f"{'endpoint':<12} {'req':>7} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'queries':>8} "
+          f"{'sql ms':>8}  statuses")
+    for name, e in report["endpoints"].items():
+        queries = "-" if e["queries_per_request"] is None else e["queries_per_request"]
+        query_ms = "-" if e["query_ms_per_request"] is None else e["query_ms_per_request"]
+        statuses = " ".join(f"{code}:{count}" for code, count in e["statuses"].items())
+        if e["errors"]:
+            statuses += f" errors:{e['errors']}"
+        print(f"{name:<12} {e['requests']:>7} {e['throughput']:>8} {e['p50_ms']:>8} {e['p95_ms']:>8} "
+              f"{e['p99_ms']:>8} {queries:>8} {query_ms:>8}  {statuses}")
+        before = (baseline or {}).get("endpoints", {}).get(name)
+        if before and before["requests"]:
+            print(f"{'  baseline':<12} {before['requests']:>7} {before['throughput']:>8} {before['p50_ms']:>8} "
+                  f"{before['p95_ms']:>8} {before['p99_ms']:>8}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:9000")
+    parser.add_argument("--users", type=int, default=10, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--ramp-up", type=float, default=0, help="seconds to start all users")
+    parser.add_argument("--think-ms", type=float, default=0, help="mean pause between iterations")
+    parser.add_argument("--book-ratio", type=float, default=0.2, help="share of iterations that book")
+    parser.add_argument("--days-ahead", type=int, default=14, help="search dates from today to today + N")
+    parser.add_argument("--accounts", type=int, default=50000, help="book as account 1..N (see benchmarks.datagen)")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=RESULTS_DIR, help="directory for the JSON report")
+    parser.add_argument("--compare", metavar="BASELINE", help="earlier JSON report to compare with")
+    parser.add_argument("--threshold", type=float, default=10, help="allowed regression in percent")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+
+    report = run(args)
+    print_report(report, baseline)
+
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, f"loadtest-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"saved {path}")
+
+    if baseline is not None:
+        regressions = compare(report, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            raise SystemExit(1)
+        print(f"no regression above {args.threshold}% against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
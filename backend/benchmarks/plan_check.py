@@ -0,0 +1,307 @@
+"""Query-plan checks for the SQL behind the hot endpoints.
+
+Each case in `CASES` calls an endpoint through the Flask test client inside
+`utils.query_audit.audit_queries`, so the statements come straight from the
+handlers (interpolated as sent, or the prepared text with its parameters).
+Every distinct SELECT is then run through ``EXPLAIN FORMAT=JSON`` and checked:
+
+- no full scan (``access_type: ALL``) over more than ``--max-scan-rows`` rows,
+- no table access examining more than ``--max-rows`` rows per scan,
+- no filesort or temporary table fed by more than ``--max-sort-rows`` rows.
+
+A case can allow a check it fails by design (``allow``), e.g. the full
+station list. The report lists the optimizer cost, worst access and
+violations per endpoint. It is saved as JSON under ``--output``, and
+``--compare`` flags endpoints whose cost grew more than ``--threshold``
+percent. Any violation or regression exits with status 1.
+
+Run it against a local database seeded with `benchmarks.datagen`, since plans
+on a near-empty schema say nothing.
+
+Usage (from backend/):
+    python -m benchmarks.datagen --reset --tickets 1000000
+    python -m benchmarks.plan_check
+    python -m benchmarks.plan_check --only schedule.list_trips --verbose
+    python -m benchmarks.plan_check --compare benchmarks/results/plans-baseline.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Dict, FrozenSet, Iterator, List, Optional
+
+from factory import create_app
+from utils.database import db_connection
+from utils.jwt_helper import generate_token
+from utils.query_audit import audit_queries, statement_shape
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+@dataclass(frozen=True)
+class Case:
+    """One endpoint call; ``path`` and ``body`` values are formatted with the sample ids."""
+
+    name: str
+    path: str
+    method: str = "GET"
+    body: Optional[dict] = None
+    admin: bool = False
+    # Checks this endpoint fails by design: "scan", "rows", "sort"
+    allow: FrozenSet[str] = field(default_factory=frozenset)
+
+
+CASES = (
+    Case("schedule.list_stations", "/api/schedule/stations", allow=frozenset({"scan", "sort"})),
+    Case("schedule.list_trips", "/api/schedule/trips?station_id={station_id}&date={date}"),
+    Case("schedule.list_trips[destination]",
+         "/api/schedule/trips?station_id={station_id}&destination_id={destination_id}&date={date}"),
+    Case("schedule.get_trip_detail", "/api/schedule/trips/{trip_id}"),
+    Case("schedule.fare_calendar",
+         "/api/schedule/calendar?station_id={station_id}&destination_id={destination_id}&from={date}&days=30"),
+    Case("trips.get_trips", "/api/trips?date={date}"),
+    Case("trips.get_trip_seats", "/api/trips/{trip_id}/seats"),
+    Case("trips.get_booked_seats", "/api/trips/{trip_id}/booked-seats"),
+    Case("routes.get_routes", "/api/routes", allow=frozenset({"scan", "sort"})),
+    Case("profile.get_user_profile", "/api/profile/{account_id}"),
+    Case("profile.get_user_tickets", "/api/profile/{account_id}/tickets"),
+    Case("ticket.lookup_ticket", "/api/tickets/lookup", method="POST",
+         body={"serial_number": "{serial_number}", "phone": "{phone}"}),
+    Case("booking.get_booking_details", "/api/bookings/{booking_id}"),
+    Case("admin.get_tickets[trip]", "/api/admin/tickets?trip_id={trip_id}", admin=True),
+    Case("admin.get_tickets[account]", "/api/admin/tickets?account_id={account_id}", admin=True),
+    Case("admin.get_trip_seats", "/api/admin/trips/{trip_id}/seats", admin=True),
+    Case("admin.get_cus_acc_info", "/api/admin/passengers/{passenger_id}/account-info", admin=True),
+)
+
+
+def sample_ids(today: date) -> Dict[str, object]:
+    """Ids around the first booked trip from ``today`` (or the latest booked one) for the case templates."""
+    conn = db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            """
+            SELECT t.trip_id FROM trip t
+            WHERE t.service_date >= %s AND EXISTS (SELECT 1 FROM ticket tk WHERE tk.trip_id = t.trip_id)
+            ORDER BY t.service_date
+            LIMIT 1
+            """,
+            (today,),
+        )
+        row = cursor.fetchone()
+        if row is None:
+            cursor.execute("SELECT MAX(trip_id) AS trip_id FROM ticket")
+            row = cursor.fetchone()
+        if row is None or row["trip_id"] is None:
+            raise SystemExit("no tickets found; seed the database with benchmarks.datagen first")
+        cursor.execute(
+            """
+            SELECT tk.trip_id, tk.booking_id, tk.serial_number, tk.account_id, a.phone,
+                   t.service_date, r.station_id, r.arrival_station AS destination_id,
+                   ps.passenger_id
+            FROM ticket tk
+            JOIN trip t ON t.trip_id = tk.trip_id
+            JOIN routetrip r ON r.route_id = t.route_id
+            JOIN account a ON a.account_id = tk.account_id
+            LEFT JOIN person p ON p.account_id = tk.account_id
+            LEFT JOIN passenger ps ON ps.person_id = p.person_id
+            WHERE tk.trip_id = %s
+            LIMIT 1
+            """,
+            (row["trip_id"],),
+        )
+        ids = cursor.fetchone()
+    finally:
+        cursor.close()
+        conn.close()
+    ids["date"] = ids.pop("service_date").date().isoformat()
+    ids["passenger_id"] = ids["passenger_id"] or 1
+    return ids
+
+
+def _fill(value, ids: dict):
+    if isinstance(value, str):
+        return value.format(**ids)
+    if isinstance(value, dict):
+        return {key: _fill(item, ids) for key, item in value.items()}
+    return value
+
+
+def capture(app, case: Case, ids: dict, token: str) -> tuple:
+    """Call ``case`` and return (status, [statements])."""
+    headers = {"Authorization": f"Bearer {token}"} if case.admin else {}
+    client = app.test_client()
+    with audit_queries(case.name) as log:
+        response = client.open(_fill(case.path, ids), method=case.method, json=_fill(case.body, ids),
+                               headers=headers)
+        response.get_data()  # streamed responses run their cursor here
+    return response.status_code, [(sql, params) for sql, _, params in log.statements]
+
+
+# -- plan inspection ---------------------------------------------------------
+
+def _walk(node) -> Iterator[dict]:
+    if isinstance(node, dict):
+        yield node
+        for value in node.values():
+            yield from _walk(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _walk(value)
+
+
+def _rows_below(node) -> int:
+    return max((int(n["table"].get("rows_produced_per_join") or 0)
+                for n in _walk(node) if isinstance(n.get("table"), dict)), default=0)
+
+
+def inspect_plan(plan: dict) -> dict:
+    """Summarize an EXPLAIN FORMAT=JSON document: cost, table accesses and sorts."""
+    tables, sorts = [], []
+    for node in _walk(plan):
+        table = node.get("table")
+        if isinstance(table, dict) and "table_name" in table:
+            tables.append({
+                "table": table["table_name"],
+                "access_type": table.get("access_type"),
+                "key": table.get("key"),
+                "rows": int(table.get("rows_examined_per_scan") or 0),
+            })
+        for flag, kind in (("using_filesort", "filesort"), ("using_temporary_table", "temporary")):
+            if node.get(flag):
+                sorts.append({"kind": kind, "rows": _rows_below(node)})
+    cost = float(plan.get("query_block", {}).get("cost_info", {}).get("query_cost") or 0)
+    return {"cost": cost, "tables": tables, "sorts": sorts}
+
+
+def violations(summary: dict, allow: FrozenSet[str], limits: argparse.Namespace) -> List[str]:
+    found = []
+    for access in summary["tables"]:
+        if access["access_type"] == "ALL" and access["rows"] > limits.max_scan_rows and "scan" not in allow:
+            found.append(f"full scan of {access['table']} ({access['rows']} rows)")
+        elif access["rows"] > limits.max_rows and "rows" not in allow:
+            found.append(f"{access['table']} examines {access['rows']} rows per scan "
+                         f"({access['access_type']} on {access['key']})")
+    for sort in summary["sorts"]:
+        if sort["rows"] > limits.max_sort_rows and "sort" not in allow:
+            found.append(f"{sort['kind']} over {sort['rows']} rows")
+    return found
+
+
+def explain(cursor, sql: str, params: Optional[tuple] = None) -> Optional[dict]:
+    if not sql.lstrip().lower().startswith(("select", "with")):
+        return None
+    cursor.execute("EXPLAIN FORMAT=JSON " + sql, params)
+    return json.loads(cursor.fetchone()[0])
+
+
+def run(args: argparse.Namespace) -> dict:
+    app = create_app()
+    with app.app_context():
+        token = generate_token({"role": "ADMIN", "account_id": 0}, expires_in=600)
+    ids = sample_ids(date.today())
+    conn = db_connection()
+    cursor = conn.cursor()
+    endpoints = {}
+    try:
+        for case in CASES:
+            if args.only and case.name not in args.only:
+                continue
+            status, statements = capture(app, case, ids, token)
+            seen, checked = set(), []
+            for sql, params in statements:
+                shape = statement_shape(sql)
+                if shape in seen:
+                    continue
+                seen.add(shape)
+                plan = explain(cursor, sql, params)
+                if plan is None:
+                    continue
+                summary = inspect_plan(plan)
+                summary["violations"] = violations(summary, case.allow, args)
+                summary["sql"] = " ".join(sql.split())
+                if params is not None:
+                    summary["params"] = [str(value) for value in params]
+                checked.append(summary)
+            endpoints[case.name] = {
+                "status": status,
+                "queries": len(statements),
+                "cost": round(sum(s["cost"] for s in checked), 2),
+                "max_rows": max((t["rows"] for s in checked for t in s["tables"]), default=0),
+                "violations": ([f"HTTP {status}"] if status >= 400 else [])
+                + [v for s in checked for v in s["violations"]],
+                "statements": checked,
+            }
+    finally:
+        cursor.close()
+        conn.close()
+    return {
+        "checked_at": datetime.now().isoformat(timespec="seconds"),
+        "ids": ids,
+        "limits": {key: getattr(args, key) for key in ("max_scan_rows", "max_rows", "max_sort_rows")},
+        "endpoints": endpoints,
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> List[str]:
+    """Endpoints whose total plan cost grew more than ``threshold`` percent."""
+    regressions = []
+    for name, current in report["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if before and before["cost"] and current["cost"] > before["cost"] * (1 + threshold / 100):
+            regressions.append(f"{name}: cost {before['cost']} -> {current['cost']}")
+    return regressions
+
+
+def print_report(report: dict, verbose: bool = False) -> None:
+    print(f"{'endpoint':<36} {'status':>6} {'queries':>7} {'cost':>10} {'max rows':>9}  result")
+    for name, e in report["endpoints"].items():
+        result = "ok" if not e["violations"] else f"{len(e['violations'])} violation(s)"
+        print(f"{name:<36} {e['status']:>6} {e['queries']:>7} {e['cost']:>10} {e['max_rows']:>9}  {result}")
+        for violation in e["violations"]:
+            print(f"    ! {violation}")
+        if verbose:
+            for statement in e["statements"]:
+                accesses = ", ".join(f"{t['table']}:{t['access_type']}({t['rows']})" for t in statement["tables"])
+                print(f"    {statement['cost']:>10}  {accesses}")
+                print(f"                {statement['sql'][:160]}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+", metavar="CASE", help=f"case names ({len(CASES)} by default)")
+    parser.add_argument("--max-scan-rows", type=int, default=1000, help="largest table allowed to be fully scanned")
+    parser.add_argument("--max-rows", type=int, default=10000, help="rows examined per scan of any table")
+    parser.add_argument("--max-sort-rows", type=int, default=1000, help="rows feeding a filesort/temporary table")
+    parser.add_argument("--verbose", action="store_true", help="print every statement with its accesses")
+    parser.add_argument("--output", default=RESULTS_DIR, help="directory for the JSON report")
+    parser.add_argument("--compare", metavar="BASELINE", help="earlier JSON report to compare costs with")
+    parser.add_argument("--threshold", type=float, default=25, help="allowed cost growth in percent")
+    args = parser.parse_args()
+
+    report = run(args)
+    print_report(report, args.verbose)
+
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, f"plans-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2, default=str)
+    print(f"saved {path}")
+
+    failed = sum(len(e["violations"]) for e in report["endpoints"].values())
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            regressions = compare(report, json.load(handle), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        failed += len(regressions)
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,19 +4,23 @@ Provides the create_app function that builds and configures the Flask app.
 """
 from __future__ import annotations
 
+import importlib
 import os
+import tempfile
 from flask import Flask, jsonify
 from flask_cors import CORS
-from routes.admin import admin_bp
-from routes.auth import auth_bp
-from routes.ticket import ticket_bp
-from routes.schedule import schedule_bp
-from routes.routes import routes_bp
-from routes.trips import trips_bp
-from routes.booking import booking_bp
-from routes.profile import profile_bp
 
-from utils.database import db_connection
+from utils.health import init_health
+from utils.query_audit import init_query_audit
+from utils.profiling import init_profiling
+from utils.compression import init_compression
+from utils.database import load_env
+from utils.serialization import init_json_provider
+from utils.replicas import init_replica_routing
+from utils.warmup import init_warmup
+
+# DefaultConfig reads the environment when this module is imported
+load_env()
 
 class DefaultConfig:
     JSON_SORT_KEYS = False
@@ -25,18 +29,109 @@ class DefaultConfig:
     JWT_SECRET = os.getenv("JWT_SECRET", "change-me")
     JWT_ALGORITHM = "HS256"
     JWT_EXPIRES_IN_SECONDS = int(os.getenv("JWT_EXPIRES_IN_SECONDS", 60 * 60 * 24))
+    # Query auditor (debug/tests): counts statements per request, flags N+1 shapes
+    QUERY_AUDIT = os.getenv("QUERY_AUDIT", "0") == "1"
+    QUERY_AUDIT_STRICT = os.getenv("QUERY_AUDIT_STRICT", "0") == "1"
+    QUERY_AUDIT_REPEAT_THRESHOLD = int(os.getenv("QUERY_AUDIT_REPEAT_THRESHOLD", 3))
+    # Max statements per endpoint; exceeding logs a warning (or raises when strict)
+    QUERY_BUDGETS = {
+        "schedule.list_stations": 1,
+        "schedule.list_trips": 1,
+        "schedule.get_trip_detail": 1,
+        "trips.get_trips": 1,
+        "trips.get_trip_seats": 1,
+        "routes.get_routes": 1,
+        "profile.get_user_tickets": 1,
+        "ticket.lookup_ticket": 1,
+        "booking.get_booking_details": 2,
+        "admin.get_cus_acc_info": 4,
+        "admin.get_staff_acc_info": 4,
+    }
+    # Live profiling surface (admin only); X-Profile header must match the token
+    PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+    PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+    PROFILING_MAX_CAPTURES = int(os.getenv("PROFILING_MAX_CAPTURES", 20))
+    # Let MySQL format trip listings as JSON (per request: ?render=db|python)
+    SQL_RENDERED_LISTINGS = os.getenv("SQL_RENDERED_LISTINGS", "0") == "1"
+    # Conditional GET on reference data (utils/versioning.py)
+    TABLE_VERSION_TTL = float(os.getenv("TABLE_VERSION_TTL", 2.0))
+    REFERENCE_CACHE_MAX_AGE = int(os.getenv("REFERENCE_CACHE_MAX_AGE", 60))
+    REFERENCE_CACHE_SWR = int(os.getenv("REFERENCE_CACHE_SWR", 300))
+    # Change when a deploy alters the shape of cached responses
+    ETAG_SALT = os.getenv("ETAG_SALT", "")
+    # Response compression (utils/compression.py); br/zstd need brotli/zstandard
+    COMPRESS_ENABLED = os.getenv("COMPRESS_ENABLED", "1") == "1"
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", 1024))
+    COMPRESS_CACHE_ENTRIES = int(os.getenv("COMPRESS_CACHE_ENTRIES", 128))
+    # Journey planner (services/journey_planner.py)
+    JOURNEY_MAX_LEGS = int(os.getenv("JOURNEY_MAX_LEGS", 3))
+    JOURNEY_MIN_CONNECTION_MINUTES = int(os.getenv("JOURNEY_MIN_CONNECTION_MINUTES", 30))
+    JOURNEY_HORIZON_HOURS = int(os.getenv("JOURNEY_HORIZON_HOURS", 36))
+    JOURNEY_TIMETABLE_TTL = float(os.getenv("JOURNEY_TIMETABLE_TTL", 300))
+    # Longest date range one /api/schedule/calendar request may cover
+    CALENDAR_MAX_DAYS = int(os.getenv("CALENDAR_MAX_DAYS", 62))
+    # Bulk trip scheduling (services/trip_scheduling.py)
+    BULK_TRIPS_MAX_ROWS = int(os.getenv("BULK_TRIPS_MAX_ROWS", 20000))
+    BULK_TRIPS_CHUNK_SIZE = int(os.getenv("BULK_TRIPS_CHUNK_SIZE", 1000))
+    # CSV/NDJSON imports (services/bulk_import.py)
+    IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 1000))
+    IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", 1000))
+    # Ticket/booking/trip exports (services/export.py); files are kept per host
+    EXPORT_DIR = os.getenv("EXPORT_DIR", os.path.join(tempfile.gettempdir(), "vietbus-exports"))
+    EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 10000))
+    EXPORT_MAX_DAYS = int(os.getenv("EXPORT_MAX_DAYS", 366))
+    EXPORT_RETENTION_HOURS = float(os.getenv("EXPORT_RETENTION_HOURS", 24))
+    # Most rows one /api/admin/revenue rollup returns (the rest is flagged truncated)
+    REVENUE_MAX_ROWS = int(os.getenv("REVENUE_MAX_ROWS", 10000))
+    # Load-factor dashboards (services/occupancy.py)
+    OCCUPANCY_CACHE_TTL = float(os.getenv("OCCUPANCY_CACHE_TTL", 60))
+    OCCUPANCY_MAX_DAYS = int(os.getenv("OCCUPANCY_MAX_DAYS", 1100))
+    OCCUPANCY_MAX_ROWS = int(os.getenv("OCCUPANCY_MAX_ROWS", 10000))
+    # Read replica routing (utils/replicas.py); DB_REPLICA_* connection settings
+    # live in utils/database.py. Writers stay on the primary for this long.
+    REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", 10))
+    REPLICA_STICKY_COOKIE = os.getenv("REPLICA_STICKY_COOKIE", "vb_primary")
+    # Warm-up (utils/warmup.py): /readyz answers 503 until pool connections
+    # are open and the reference caches are loaded
+    WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1") == "1"
+    WARMUP_POOL_CONNECTIONS = int(os.getenv("WARMUP_POOL_CONNECTIONS", 4))
+    WARMUP_PLANNER_DAYS = int(os.getenv("WARMUP_PLANNER_DAYS", 2))
+    # /livez and /readyz (utils/health.py), answered from a background probe
+    HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", 5))
+    HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", 2))
+    HEALTH_PROBE_MAX_AGE = float(os.getenv("HEALTH_PROBE_MAX_AGE", 30))
+    HEALTH_POOL_SATURATION = float(os.getenv("HEALTH_POOL_SATURATION", 0.9))
     # Add future config defaults here (e.g., DB pool sizes, feature flags)
 
-# if create a new route, add here like below
+# if create a new route, add here like below: "module:blueprint", url prefix and
+# the config flag that turns it on (None: always). Modules are imported when
+# registered, so importing this file stays cheap and switched-off blueprints
+# are never imported.
+BLUEPRINTS = [
+    ("routes.admin:admin_bp", "/api/admin", None),
+    ("routes.timetable:timetable_bp", "/api/admin/timetable", None),
+    ("routes.imports:import_bp", "/api/admin/import", None),
+    ("routes.exports:export_bp", "/api/admin/exports", None),
+    ("routes.revenue:revenue_bp", "/api/admin/revenue", None),
+    ("routes.occupancy:occupancy_bp", "/api/admin/occupancy", None),
+    ("routes.auth:auth_bp", "/api", None),
+    ("routes.ticket:ticket_bp", "/api/tickets", None),
+    ("routes.schedule:schedule_bp", "/api/schedule", None),
+    ("routes.routes:routes_bp", "/api/routes", None),
+    ("routes.trips:trips_bp", "/api/trips", None),
+    ("routes.booking:booking_bp", "/api/bookings", None),
+    ("routes.profile:profile_bp", "/api/profile", None),
+    ("routes.profiling:profiling_bp", "/api/admin/profiling", "PROFILING_ENABLED"),
+]
+
+
 def register_blueprints(app: Flask) -> None:
-    app.register_blueprint(admin_bp, url_prefix="/api/admin")
-    app.register_blueprint(auth_bp, url_prefix="/api")
-    app.register_blueprint(ticket_bp, url_prefix="/api/tickets")
-    app.register_blueprint(schedule_bp, url_prefix="/api/schedule")
-    app.register_blueprint(routes_bp, url_prefix="/api/routes")
-    app.register_blueprint(trips_bp, url_prefix="/api/trips")
-    app.register_blueprint(booking_bp, url_prefix="/api/bookings")
-    app.register_blueprint(profile_bp, url_prefix="/api/profile")
+    for target, url_prefix, flag in BLUEPRINTS:
+        if flag and not app.config.get(flag):
+            continue
+        module_name, attribute = target.split(":")
+        blueprint = getattr(importlib.import_module(module_name), attribute)
+        app.register_blueprint(blueprint, url_prefix=url_prefix)
 
 def register_error_handlers(app: Flask) -> None:
     @app.errorhandler(404)
@@ -53,24 +148,18 @@ def create_app(config_object: object | None = None) -> Flask:
     CORS(app, resources={r"/*": {"origins": "*"}})  
     # Load config: provided object or fallback DefaultConfig
     app.config.from_object(config_object or DefaultConfig)
+    init_json_provider(app)
 
     register_blueprints(app)
     register_error_handlers(app)
+    init_query_audit(app)
+    init_profiling(app)
+    init_compression(app)
+    init_replica_routing(app)
+    init_warmup(app)
 
-    @app.route("/health", methods=["GET"])
-    def health():
-        try:
-            # create a lightweight query to check database connectivity
-            cnx = db_connection()
-            cursor = cnx.cursor()
-            cursor.execute("SELECT 1")
-            cursor.fetchone()
-            cursor.close()
-            cnx.close()
-            return jsonify({"status": "ok", "db": "connected"})
-        except Exception as e:
-            return jsonify({"status": "error", "message": str(e)}), 500
+    init_health(app)
 
     return app
 
-__all__ = ["create_app", "DefaultConfig"]
+__all__ = ["create_app", "DefaultConfig", "BLUEPRINTS"]
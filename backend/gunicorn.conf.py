@@ -0,0 +1,128 @@
+"""Gunicorn settings for serving app.py in production.
+
+Run from backend/ (gunicorn picks this file up by itself):
+
+    gunicorn app:app
+    GUNICORN_PROFILE=gevent gunicorn app:app
+
+Profiles (``GUNICORN_PROFILE``):
+
+- ``gthread`` (default): one process per core for CPU work (JSON encoding,
+  row mapping) and ``GUNICORN_THREADS`` threads each to overlap MySQL waits.
+  Threads default to ``DB_POOL_SIZE``, so no thread waits for a connection.
+- ``gevent``: one process per core with up to ``GUNICORN_WORKER_CONNECTIONS``
+  greenlets each. The standard library is monkey-patched here, before the
+  app is imported, and mysql-connector is switched to its pure-Python
+  protocol (``DB_USE_PURE``) because the C extension would block the hub.
+  DB concurrency is still capped by ``DB_POOL_SIZE`` per process.
+
+``WEB_CONCURRENCY`` overrides the process count. Keep ``workers *
+DB_POOL_SIZE`` (plus the same for replicas) below MySQL's
+``max_connections``.
+
+The app is preloaded in the master, so workers share its imported code
+copy-on-write. Nothing in the master may hold threads or pool connections:
+workers forked later (``max_requests`` recycling) would inherit them
+half-copied. The APScheduler jobs (seed_trips.py) therefore never run under
+gunicorn (``SCHEDULER_MODE`` defaults to ``off`` here); run them as a
+process of their own with ``python seed_trips.py --serve`` (the
+``scheduler`` service in docker-compose.yml). Each worker warms up its pool and caches
+(utils/warmup.py) and starts its health probe (utils/health.py) after it
+has loaded the app; until the warm-up is done its ``/readyz`` answers 503.
+``kill -HUP <master>`` replaces workers gracefully but keeps the preloaded
+code. To deploy new code without dropping requests, send ``USR2`` (start a
+new master next to the old one), then ``WINCH`` and ``QUIT`` to the old
+master. ``GUNICORN_RELOAD=1`` (development) restarts on file changes
+instead; it turns preloading off and defaults to a single worker.
+"""
+import multiprocessing
+import os
+
+from dotenv import load_dotenv
+
+# Settings below come from backend/.env too (the app is imported later)
+load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"))
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _cpu_count():
+    try:
+        # CPUs this container/process may actually run on
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover - not on Linux
+        return multiprocessing.cpu_count()
+
+
+profile = os.getenv("GUNICORN_PROFILE", "gthread")
+if profile not in ("gthread", "gevent"):
+    raise RuntimeError(f"GUNICORN_PROFILE must be gthread or gevent, not {profile!r}")
+
+cores = _cpu_count()
+reload = os.getenv("GUNICORN_RELOAD", "0") == "1"
+# The jobs run in their own process (python seed_trips.py --serve)
+os.environ.setdefault("SCHEDULER_MODE", "off")
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '9000')}")
+workers = _env_int("WEB_CONCURRENCY", 1 if reload else cores)
+preload_app = not reload
+
+if profile == "gevent":
+    from gevent import monkey
+
+    monkey.patch_all()
+    os.environ.setdefault("DB_USE_PURE", "1")
+    worker_class = "gevent"
+    worker_connections = _env_int("GUNICORN_WORKER_CONNECTIONS", 200)
+else:
+    worker_class = "gthread"
+    threads = _env_int("GUNICORN_THREADS", _env_int("DB_POOL_SIZE", 10) or 4)
+
+# Idle client connections stay open this long between requests. Behind a
+# load balancer, set it above the balancer's idle timeout (e.g. 75 for 60).
+keepalive = _env_int("GUNICORN_KEEPALIVE", 5)
+# Kill a worker stuck on one request this long (exports stream in chunks)
+timeout = _env_int("GUNICORN_TIMEOUT", 60)
+# Time in-flight requests get to finish on HUP/TERM before workers are killed
+graceful_timeout = _env_int("GUNICORN_GRACEFUL_TIMEOUT", 30)
+# Recycle workers now and then so slow leaks cannot build up; jitter keeps
+# them from restarting together
+max_requests = _env_int("GUNICORN_MAX_REQUESTS", 10000)
+max_requests_jitter = max_requests // 10
+backlog = _env_int("GUNICORN_BACKLOG", 2048)
+
+# Heartbeat files on tmpfs; a slow overlay disk in Docker can stall workers
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-") or None
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+# Trust X-Forwarded-* from this proxy address list (comma separated)
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+
+def when_ready(server):
+    concurrency = f"{threads} threads" if worker_class == "gthread" else f"{worker_connections} connections"
+    server.log.info(
+        "profile=%s workers=%s (%s each) cores=%s preload=%s",
+        profile, workers, concurrency, cores, preload_app,
+    )
+    if os.environ["SCHEDULER_MODE"] != "off":
+        server.log.warning(
+            "SCHEDULER_MODE=%s: the jobs start in the preloaded master or in every worker; "
+            "set it to off and run python seed_trips.py --serve",
+            os.environ["SCHEDULER_MODE"],
+        )
+
+
+def post_worker_init(worker):
+    from flask import Flask
+    from utils.health import start_probe
+    from utils.warmup import start_warmup
+
+    # Other entrypoints (asgi.py) start both with their first Flask request
+    if isinstance(worker.wsgi, Flask):
+        start_warmup(worker.wsgi)
+        start_probe(worker.wsgi)
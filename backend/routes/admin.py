@@ -1,9 +1,15 @@
 from flask import Blueprint, request, jsonify, current_app
 from datetime import datetime, date
 import re
-from utils.database import db_connection
+from utils import queries
+from utils.database import db_connection, get_pool, get_replica_pool, replica_configured
 import datetime
 from utils.jwt_helper import token_required
+from utils.replicas import replica_monitor
+from utils.versioning import bump_table_versions, conditional_get
+from services import events
+from services.trip_scheduling import BulkScheduleError, expand_recurrence, schedule_trips
+from routes.trips import seat_map
 
 
 admin_bp = Blueprint("admin", __name__)
@@ -31,6 +37,7 @@ def is_valid_email(email: str) -> bool:
 
 
 @admin_bp.route("/stations", methods=["GET"])
+@conditional_get("station", private=True)
 def get_stations():
     conn = db_connection()
     cursor = conn.cursor(dictionary=True)
@@ -80,13 +87,13 @@ def post_stations():
     conn = db_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute("SELECT 1 FROM operator WHERE operator_id=%s", (operator_id,))
-        if cursor.fetchone() is None:
+        if queries.fetchone(conn, queries.OPERATOR_EXISTS, (operator_id,)) is None:
             return jsonify({"error": "operator_not_found", "field": "operator_id"}), 404
         cursor.execute(
             "insert into station(city,active_flag,station_name,latitude,longtitude,province,address_station,operator_id) values (%s,%s, %s, %s, %s,%s,%s,%s)",
             (city, active_flag, station_name, latitude, longtitude, province, address_station, operator_id),
         )
+        bump_table_versions(cursor, "station")
         conn.commit()
 
         return jsonify({
@@ -145,15 +152,12 @@ def update_station(station_id):
     cursor = conn.cursor()
     try:
         # Check station tồn tại
-        cursor.execute("SELECT 1 FROM station WHERE station_id=%s", (station_id,))
-        if cursor.fetchone() is None:
+        if queries.fetchone(conn, queries.STATION_EXISTS, (station_id,)) is None:
             return jsonify({"error": "station_not_found"}), 404
 
         # Check operator_id tồn tại
         if "operator_id" in update_fields:
-            cursor.execute("SELECT 1 FROM operator WHERE operator_id=%s",
-                           (update_fields["operator_id"],))
-            if cursor.fetchone() is None:
+            if queries.fetchone(conn, queries.OPERATOR_EXISTS, (update_fields["operator_id"],)) is None:
                 return jsonify({"error": "operator_not_found"}), 404
 
         # Build câu UPDATE động
@@ -164,6 +168,7 @@ def update_station(station_id):
             f"UPDATE station SET {set_clause} WHERE station_id=%s",
             values
         )
+        bump_table_versions(cursor, "station")
         conn.commit()
 
         return jsonify({
@@ -186,12 +191,13 @@ def del_stations(station_id):
     cursor = conn.cursor()
     try:
         # Kiểm tra station có tồn tại
-        cursor.execute("SELECT 1 FROM station where station_id = %s ",(station_id,))
-        if cursor.fetchone() is None:
+        if queries.fetchone(conn, queries.STATION_EXISTS, (station_id,)) is None:
             return jsonify({"error":"Station is not exist"}), 404
         
         cursor.execute("DELETE FROM station WHERE (station_id = %s);",(station_id,))
+        bump_table_versions(cursor, "station", "routetrip", "fare")
         conn.commit()
+        events.publish(events.TRIPS_CHANGED, dates=None)
         return jsonify({
             "status":"deleted complete"
         }), 200
@@ -239,6 +245,7 @@ def add_operator():
             "INSERT INTO operator(legal_name,brand_name,brand_email,tax_id) VALUES (%s, %s, %s, %s)",
             (legal_name, brand_name, brand_email, tax_id)
         )
+        bump_table_versions(cursor, "operator")
         conn.commit()
         operator_id = cursor.lastrowid
         return jsonify({
@@ -273,26 +280,18 @@ def get_customers():
 @admin_bp.route("/passengers/<int:passenger_id>/account-info", methods=["GET"])
 def get_cus_acc_info(passenger_id):
     conn = db_connection()
-    cursor = conn.cursor(dictionary=True)
     try:
-        cursor.execute("SELECT 1 FROM passenger where passenger_id = %s",(passenger_id,))
-        if cursor.fetchone() is None:
-            return jsonify({"error":"Passenger_not_found"}),404
-        cursor.execute("SELECT person_id from passenger where passenger_id = %s", (passenger_id,))
-        row = cursor.fetchone()
+        row = queries.fetchone(conn, queries.PASSENGER_PERSON, (passenger_id,))
         if row is None:
-            return jsonify({"error":"person_link_missing"}),404
+            return jsonify({"error":"Passenger_not_found"}),404
         target_person_id = row["person_id"]
         
-        cursor.execute("Select account_id from person where person_id = %s",(target_person_id,))
-        row = cursor.fetchone()
+        row = queries.fetchone(conn, queries.PERSON_ACCOUNT, (target_person_id,))
         target_acc_id = row["account_id"]
         
-        cursor.execute("select email, phone ,stat, create_at from account where account_id = %s",(target_acc_id,))
-        result = cursor.fetchone()
+        result = queries.fetchone(conn, queries.ACCOUNT_INFO, (target_acc_id,))
         return jsonify(result),200
     finally:
-        cursor.close()
         conn.close()
 
 @admin_bp.route("/passengers/<int:passenger_id>/account-status", methods=["PATCH"])
@@ -308,25 +307,18 @@ def update_passenger_account_status(passenger_id):
         }), 400
 
     conn = db_connection()
-    cursor = conn.cursor()
     try:
-        cursor.execute("SELECT 1 FROM passenger WHERE passenger_id = %s", (passenger_id,))
-        if cursor.fetchone() is None:
-            return jsonify({"error": "passenger_not_found"}), 404
-
-        cursor.execute("SELECT person_id FROM passenger WHERE passenger_id = %s", (passenger_id,))
-        row = cursor.fetchone()
+        row = queries.fetchone(conn, queries.PASSENGER_PERSON, (passenger_id,))
         if row is None:
-            return jsonify({"error": "person_link_missing"}), 404
-        person_id = row[0]
+            return jsonify({"error": "passenger_not_found"}), 404
+        person_id = row["person_id"]
 
-        cursor.execute("SELECT account_id FROM person WHERE person_id = %s", (person_id,))
-        row = cursor.fetchone()
+        row = queries.fetchone(conn, queries.PERSON_ACCOUNT, (person_id,))
         if row is None:
             return jsonify({"error": "account_link_missing"}), 404
-        account_id = row[0]
+        account_id = row["account_id"]
 
-        cursor.execute("UPDATE account SET stat = %s WHERE account_id = %s", (new_status, account_id))
+        queries.execute(conn, queries.UPDATE_ACCOUNT_STATUS, (new_status, account_id))
         conn.commit()
         return jsonify({
             "status": "updated",
@@ -337,7 +329,6 @@ def update_passenger_account_status(passenger_id):
         conn.rollback()
         return jsonify({"error": "db_error", "message": str(exc)}), 500
     finally:
-        cursor.close()
         conn.close()
 
 @admin_bp.route("/staffs", methods=["GET"])
@@ -354,26 +345,18 @@ def get_staffs():
 @admin_bp.route("/staffs/<int:staff_id>/account-info", methods=["GET"])
 def get_staff_acc_info(staff_id):
     conn = db_connection()
-    cursor = conn.cursor(dictionary=True)
     try:
-        cursor.execute("SELECT 1 FROM staff where staff_id = %s",(staff_id,))
-        if cursor.fetchone() is None:
-            return jsonify({"error":"Staff_not_found"}),404
-        cursor.execute("SELECT person_id from staff where staff_id = %s", (staff_id,))
-        row = cursor.fetchone()
+        row = queries.fetchone(conn, queries.STAFF_PERSON, (staff_id,))
         if row is None:
-            return jsonify({"error":"person_link_missing"}),404
+            return jsonify({"error":"Staff_not_found"}),404
         target_person_id = row["person_id"]
         
-        cursor.execute("Select account_id from person where person_id = %s",(target_person_id,))
-        row = cursor.fetchone()
+        row = queries.fetchone(conn, queries.PERSON_ACCOUNT, (target_person_id,))
         target_acc_id = row["account_id"]
         
-        cursor.execute("select email, phone ,stat, create_at from account where account_id = %s",(target_acc_id,))
-        result = cursor.fetchone()
+        result = queries.fetchone(conn, queries.ACCOUNT_INFO, (target_acc_id,))
         return jsonify(result),200
     finally:
-        cursor.close()
         conn.close()
 
 @admin_bp.route("/staffs/<int:staff_id>/account-status", methods=["PATCH"])
@@ -384,25 +367,18 @@ def update_staff_account_status(staff_id):
 
 
     conn = db_connection()
-    cursor = conn.cursor(dictionary=True)
     try:
-        cursor.execute("SELECT 1 FROM staff WHERE staff_id = %s", (staff_id,))
-        if cursor.fetchone() is None:
-            return jsonify({"error": "staff_not_found"}), 404
-
-        cursor.execute("SELECT person_id FROM staff WHERE staff_id = %s", (staff_id,))
-        row = cursor.fetchone()
+        row = queries.fetchone(conn, queries.STAFF_PERSON, (staff_id,))
         if row is None:
-            return jsonify({"error": "person_link_missing"}), 404
+            return jsonify({"error": "staff_not_found"}), 404
         person_id = row["person_id"]
 
-        cursor.execute("SELECT account_id FROM person WHERE person_id = %s", (person_id,))
-        row = cursor.fetchone()
+        row = queries.fetchone(conn, queries.PERSON_ACCOUNT, (person_id,))
         if row is None:
             return jsonify({"error": "account_link_missing"}), 404
         account_id = row["account_id"]
 
-        cursor.execute("UPDATE account SET stat = %s WHERE account_id = %s", (new_status, account_id))
+        queries.execute(conn, queries.UPDATE_ACCOUNT_STATUS, (new_status, account_id))
         conn.commit()
         return jsonify({
             "status": "updated",
@@ -413,7 +389,6 @@ def update_staff_account_status(staff_id):
         conn.rollback()
         return jsonify({"error": "db_error", "message": str(exc)}), 500
     finally:
-        cursor.close()
         conn.close()
 
 @admin_bp.route("/operators/<string:operator_id>", methods=["DELETE"])
@@ -422,12 +397,13 @@ def del_operators(operator_id):
     cursor = conn.cursor()
     try:
         # Kiểm tra station có tồn tại
-        cursor.execute("SELECT 1 FROM operator where operator_id = %s ",(operator_id,))
-        if cursor.fetchone() is None:
+        if queries.fetchone(conn, queries.OPERATOR_EXISTS, (operator_id,)) is None:
             return jsonify({"error":"Station is not exist"}), 404
         
         cursor.execute("DELETE FROM operator WHERE (operator_id = %s);",(operator_id,))
+        bump_table_versions(cursor, "operator", "station", "routetrip", "fare")
         conn.commit()
+        events.publish(events.TRIPS_CHANGED, dates=None)
         return jsonify({
             "status":"deleted complete"
         }), 200
@@ -473,6 +449,7 @@ def add_trips():
             (service_date,bus_id,route_id)
         )
         conn.commit()
+        events.publish(events.TRIPS_CHANGED, dates=events.service_dates(service_date))
         return jsonify({
             "status": "created",
             "New Trip": {
@@ -488,6 +465,69 @@ def add_trips():
         cursor.close()
         conn.close()    
 
+@admin_bp.route("/trips/bulk", methods=["POST"])
+def add_trips_bulk():
+    """Schedule many trips (or a recurrence rule) in one transaction.
+
+    Body: ``{"trips": [{service_date, bus_id, route_id}, ...]}`` or
+    ``{"recurrence": {...}}``, plus optional ``atomic`` (default true) and
+    ``dry_run``. Responds with one outcome per row.
+    """
+    data = request.get_json(silent=True) or {}
+    max_rows = current_app.config["BULK_TRIPS_MAX_ROWS"]
+    atomic = bool(data.get("atomic", True))
+    dry_run = bool(data.get("dry_run", False))
+    try:
+        if data.get("recurrence") is not None:
+            if not isinstance(data["recurrence"], dict):
+                raise BulkScheduleError("recurrence must be an object")
+            rows = expand_recurrence(data["recurrence"], max_rows)
+        else:
+            rows = data.get("trips")
+            if not isinstance(rows, list) or not rows:
+                raise BulkScheduleError("trips must be a non-empty array (or send recurrence)")
+            if len(rows) > max_rows:
+                raise BulkScheduleError(f"at most {max_rows} trips per request")
+    except BulkScheduleError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    conn = db_connection()
+    cursor = conn.cursor()
+    try:
+        conn.start_transaction()
+        result = schedule_trips(
+            cursor,
+            rows,
+            atomic=atomic,
+            dry_run=dry_run,
+            chunk_size=current_app.config["BULK_TRIPS_CHUNK_SIZE"],
+        )
+        if result.created:
+            conn.commit()
+            events.publish(
+                events.TRIPS_CHANGED,
+                dates=result.service_dates(),
+                trip_ids=[outcome.trip_id for outcome in result.created],
+            )
+        else:
+            conn.rollback()
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+    body = {
+        "summary": result.summary(),
+        "timings_ms": result.timings_ms,
+        "results": [outcome.to_json() for outcome in result.outcomes],
+    }
+    if atomic and result.rejected:
+        body["error"] = "validation_failed"
+        return jsonify(body), 400
+    return jsonify(body), 201 if result.created else 200
+
 @admin_bp.route("/trips/<int:trip_id>", methods=["PATCH"])
 def patch_trip(trip_id):
     data = request.get_json() or {}
@@ -527,8 +567,9 @@ def patch_trip(trip_id):
     cursor = conn.cursor(dictionary=True)
     try:
         # Check trip tồn tại
-        cursor.execute("SELECT trip_id FROM trip WHERE trip_id = %s", (trip_id,))
-        if not cursor.fetchone():
+        cursor.execute("SELECT trip_id, service_date FROM trip WHERE trip_id = %s", (trip_id,))
+        existing = cursor.fetchone()
+        if not existing:
             return jsonify({"error": "trip_not_found"}), 404
 
         # Build câu UPDATE linh hoạt
@@ -542,6 +583,11 @@ def patch_trip(trip_id):
         sql = f"UPDATE trip SET {', '.join(set_clauses)} WHERE trip_id = %s"
         cursor.execute(sql, tuple(values))
         conn.commit()
+        events.publish(
+            events.TRIPS_CHANGED,
+            dates=events.service_dates(existing["service_date"], updates.get("service_date")),
+            trip_ids=[trip_id],
+        )
 
         # Trigger BEFORE UPDATE sẽ tự tính lại arrival_datetime nếu service_date đổi
 
@@ -569,12 +615,14 @@ def del_trip(trip_id):
 
     try:
         # Check xem trip co ton tai
-        cursor.execute("SELECT 1 from trip where (trip_id = %s)", (trip_id,))
-        if cursor.fetchone() is None:
+        cursor.execute("SELECT service_date from trip where (trip_id = %s)", (trip_id,))
+        existing = cursor.fetchone()
+        if existing is None:
             return jsonify({"error":"Trip_not_found"}), 404
         
         cursor.execute("DELETE FROM trip WHERE (trip_id = %s)", (trip_id,))
         conn.commit()
+        events.publish(events.TRIPS_CHANGED, dates=events.service_dates(existing["service_date"]), trip_ids=[trip_id])
         return jsonify({"status":"Trip deletetd succesfully"}),200
     except Exception as exc:
         conn.rollback()
@@ -589,35 +637,21 @@ def del_trip(trip_id):
 @admin_bp.route("/trips/<int:trip_id>/seats", methods=["GET"])
 def get_trip_seats(trip_id):
     conn = db_connection()
-    cursor = conn.cursor(dictionary=True)
     try:
-        # 1. Lấy capacity của bus cho trip này
-        cursor.execute("""
-            SELECT b.capacity
-            FROM trip t
-            JOIN bus b ON t.bus_id = b.bus_id
-            WHERE t.trip_id = %s
-        """, (trip_id,))
-        row = cursor.fetchone()
+        # 1-2. Capacity của bus và danh sách ghế đã được dùng (Issued / Used) trong một query
+        seats = seat_map(queries.fetchall(conn, queries.TRIP_SEAT_MAP, (trip_id,)))
 
-        if not row:
+        # Trip chưa gán bus: không có sơ đồ ghế
+        if seats is None or seats.capacity is None:
             return jsonify({"error": "trip_not_found"}), 404
 
-        capacity = row["capacity"]
-
-        # 2. Lấy danh sách ghế đã được dùng (Issued / Used)
-        cursor.execute("""
-            SELECT seat_code
-            FROM ticket
-            WHERE trip_id = %s
-              AND ticket_status IN ('Issued', 'Used')
-        """, (trip_id,))
-        taken_seats = [r["seat_code"] for r in cursor.fetchall()]  # giờ là string
+        capacity, taken_seats = seats.capacity, seats.booked_seats  # seat_code giờ là string
 
         # 3. Tính danh sách ghế còn trống
         # Giả định seat_code là "1","2",...,"capacity"
         all_seats = [str(i) for i in range(1, capacity + 1)]
-        available_seats = [s for s in all_seats if s not in taken_seats]
+        taken = set(taken_seats)
+        available_seats = [s for s in all_seats if s not in taken]
 
         return jsonify({
             "trip_id": trip_id,
@@ -629,7 +663,6 @@ def get_trip_seats(trip_id):
         print("Error in get_trip_seats:", e)
         return jsonify({"error": "internal_server_error", "details": str(e)}), 500
     finally:
-        cursor.close()
         conn.close()
 
 @admin_bp.route("/routes", methods=["GET"])
@@ -684,6 +717,7 @@ def create_route():
             VALUES (%s, %s, %s, %s,%s)
         """
         cursor.execute(sql, (time_str, distance, station_id, operator_id,arrival_station))
+        bump_table_versions(cursor, "routetrip")
         conn.commit()
 
         new_id = cursor.lastrowid
@@ -730,24 +764,23 @@ def update_route(route_id):
     cursor = conn.cursor(dictionary=True)
     try:
         # Check route tồn tại
-        cursor.execute("SELECT 1 FROM routetrip WHERE route_id = %s", (route_id,))
-        if cursor.fetchone() is None:
+        if queries.fetchone(conn, queries.ROUTE_EXISTS, (route_id,)) is None:
             return jsonify({"error": "route_not_found"}), 404
 
         # (Tuỳ chọn) Kiểm tra khoá ngoại nếu có gửi kèm
         if "station_id" in updates:
-            cursor.execute("SELECT 1 FROM station WHERE station_id = %s", (updates["station_id"],))
-            if cursor.fetchone() is None:
+            if queries.fetchone(conn, queries.STATION_EXISTS, (updates["station_id"],)) is None:
                 return jsonify({"error": "station_not_found"}), 404
         if "operator_id" in updates:
-            cursor.execute("SELECT 1 FROM operator WHERE operator_id = %s", (updates["operator_id"],))
-            if cursor.fetchone() is None:
+            if queries.fetchone(conn, queries.OPERATOR_EXISTS, (updates["operator_id"],)) is None:
                 return jsonify({"error": "operator_not_found"}), 404
 
         set_clause = ", ".join(f"{k} = %s" for k in updates.keys())
         values = list(updates.values()) + [route_id]
         cursor.execute(f"UPDATE routetrip SET {set_clause} WHERE route_id = %s", values)
+        bump_table_versions(cursor, "routetrip")
         conn.commit()
+        events.publish(events.TRIPS_CHANGED, dates=None)
 
         # Trả về bản ghi đã cập nhật
         cursor.execute("SELECT * FROM routetrip WHERE route_id = %s", (route_id,))
@@ -777,12 +810,13 @@ def del_route(route_id):
 
     try:
         # Check xem route co ton tai
-        cursor.execute("SELECT 1 from routetrip where (route_id = %s)", (route_id,))
-        if cursor.fetchone() is None:
+        if queries.fetchone(conn, queries.ROUTE_EXISTS, (route_id,)) is None:
             return jsonify({"error":"Route_not_found"}), 404
         
         cursor.execute("DELETE FROM routetrip WHERE (route_id = %s)", (route_id,))
+        bump_table_versions(cursor, "routetrip", "fare")
         conn.commit()
+        events.publish(events.TRIPS_CHANGED, dates=None)
         return jsonify({"status":"route deletetd succesfully"}),200
     except Exception as exc:
         conn.rollback()
@@ -824,18 +858,11 @@ def create_booking_with_multiple_tickets():
     seat_codes = [str(s) for s in seat_codes]
 
     conn = db_connection()
-    cursor = conn.cursor(dictionary=True)
     try:
         conn.start_transaction()
 
         # 2. Lấy thông tin trip + bus
-        cursor.execute("""
-            SELECT t.trip_id, t.route_id, b.capacity
-            FROM trip t
-            JOIN bus b ON t.bus_id = b.bus_id
-            WHERE t.trip_id = %s
-        """, (trip_id,))
-        trip_row = cursor.fetchone()
+        trip_row = queries.fetchone(conn, queries.TRIP_CAPACITY, (trip_id,))
         if not trip_row:
             return jsonify({"error": "trip_not_found"}), 404
 
@@ -843,12 +870,7 @@ def create_booking_with_multiple_tickets():
         capacity = trip_row["capacity"]
 
         # 3. Lấy thông tin fare
-        cursor.execute("""
-            SELECT route_id, seat_price
-            FROM fare
-            WHERE fare_id = %s
-        """, (fare_id,))
-        fare_row = cursor.fetchone()
+        fare_row = queries.fetchone(conn, queries.FARE_PRICE, (fare_id,))
         if not fare_row:
             return jsonify({"error": "fare_not_found"}), 404
 
@@ -878,15 +900,8 @@ def create_booking_with_multiple_tickets():
             }), 400
 
         # 4. Kiểm tra trùng ghế với ticket đang Issued/Used
-        format_strings = ",".join(["%s"] * len(seat_codes))
-        cursor.execute(f"""
-            SELECT seat_code
-            FROM ticket
-            WHERE trip_id = %s
-              AND seat_code IN ({format_strings})
-              AND ticket_status IN ('Issued', 'Used')
-        """, (trip_id, *seat_codes))
-        taken_rows = cursor.fetchall()
+        taken_seats = queries.TAKEN_SEATS.format(seats=queries.placeholders(len(seat_codes)))
+        taken_rows = queries.fetchall(conn, taken_seats, (trip_id, *seat_codes))
         if taken_rows:
             taken = [r["seat_code"] for r in taken_rows]
             return jsonify({
@@ -895,28 +910,12 @@ def create_booking_with_multiple_tickets():
             }), 400
 
         # 5. Tạo booking (total_amount tạm = 0, sẽ cập nhật sau)
-        cursor.execute("""
-            INSERT INTO booking (currency, total_amount, account_id, operator_id)
-            VALUES (%s, 0, %s, %s)
-        """, (currency, account_id, operator_id))
-        booking_id = cursor.lastrowid
+        booking_id = queries.insert(conn, queries.INSERT_BOOKING, (currency, account_id, operator_id))
 
         # 6. Tạo tickets
         ticket_ids = []
         for s in seat_codes:
-            cursor.execute("""
-                INSERT INTO ticket (
-                    trip_id,
-                    account_id,
-                    booking_id,
-                    fare_id,
-                    qr_code_link,
-                    ticket_status,
-                    seat_price,
-                    seat_code
-                )
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
+            ticket_ids.append(queries.insert(conn, queries.INSERT_TICKET, (
                 trip_id,
                 account_id,
                 booking_id,
@@ -925,17 +924,13 @@ def create_booking_with_multiple_tickets():
                 "Issued",
                 seat_price,
                 s                  # seat_code là VARCHAR
-            ))
-            ticket_ids.append(cursor.lastrowid)
+            )))
 
         # 7. Cập nhật total_amount sử dụng fn_calculate_booking_total
-        cursor.execute("""
-            UPDATE booking
-            SET total_amount = fn_calculate_booking_total(%s)
-            WHERE booking_id = %s
-        """, (booking_id, booking_id))
+        queries.execute(conn, queries.UPDATE_BOOKING_TOTAL, (booking_id, booking_id))
 
         conn.commit()
+        events.publish(events.BOOKINGS_CHANGED, trip_ids=[trip_id])
 
         return jsonify({
             "booking_id": booking_id,
@@ -949,7 +944,6 @@ def create_booking_with_multiple_tickets():
         print("Error in create_booking_with_multiple_tickets:", e)
         return jsonify({"error": "internal_server_error", "details": str(e)}), 500
     finally:
-        cursor.close()
         conn.close()
 
 @admin_bp.route("/bookings/<int:booking_id>", methods=["PATCH"])
@@ -981,7 +975,14 @@ def patch_booking(booking_id):
 
         sql = f"UPDATE booking SET {', '.join(set_clauses)} WHERE booking_id = %s"
         cursor.execute(sql, tuple(values))
+        trip_ids = []
+        if "booking_status" in updates:
+            # Cancelling or completing a booking changes what its tickets count for
+            cursor.execute("SELECT DISTINCT trip_id FROM ticket WHERE booking_id = %s", (booking_id,))
+            trip_ids = [row["trip_id"] for row in cursor.fetchall()]
         conn.commit()
+        if trip_ids:
+            events.publish(events.BOOKINGS_CHANGED, trip_ids=trip_ids)
 
         return jsonify({"booking_id": booking_id, "updated_fields": list(updates.keys())}), 200
 
@@ -999,12 +1000,15 @@ def del_booking(booking_id):
 
     try:
         # Check xem route co ton tai
-        cursor.execute("SELECT 1 from booking where (booking_id = %s)", (booking_id,))
-        if cursor.fetchone() is None:
+        if queries.fetchone(conn, queries.BOOKING_EXISTS, (booking_id,)) is None:
             return jsonify({"error":"Booking_not_found"}), 404
+
+        cursor.execute("SELECT DISTINCT trip_id FROM ticket WHERE booking_id = %s", (booking_id,))
+        trip_ids = [row["trip_id"] for row in cursor.fetchall()]
         
         cursor.execute("DELETE FROM booking WHERE (booking_id = %s)", (booking_id,))
         conn.commit()
+        events.publish(events.BOOKINGS_CHANGED, trip_ids=trip_ids)
         return jsonify({"status":"booking deletetd succesfully"}),200
     except Exception as exc:
         conn.rollback()
@@ -1046,6 +1050,7 @@ def create_bus():
 
     try:
         cursor.execute("INSERT INTO bus(plate_number,bus_active_flag,capacity,vehicle_type,operator_id) VALUES(%s,%s,%s,%s,%s)",(plate_number,bus_active_flag,capacity,vehicle_type,operator_id))
+        bump_table_versions(cursor, "bus")
         conn.commit()
         return jsonify({
             "Status":"Inserted new bus",
@@ -1091,13 +1096,13 @@ def update_bus(bus_id):
     cursor = conn.cursor()
     try:
         # Ensure bus exists
-        cursor.execute("SELECT 1 FROM bus WHERE bus_id = %s", (bus_id,))
-        if cursor.fetchone() is None:
+        if queries.fetchone(conn, queries.BUS_EXISTS, (bus_id,)) is None:
             return jsonify({"error": "bus_not_found"}), 404
         
         set_clause = ", ".join(f"{k}=%s" for k in updates.keys())
         values = list(updates.values()) + [bus_id]
         cursor.execute(f"UPDATE bus SET {set_clause} WHERE bus_id = %s", values)
+        bump_table_versions(cursor, "bus")
         conn.commit()
 
         return jsonify({
@@ -1117,11 +1122,11 @@ def delete_bus(bus_id):
     conn = db_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute("SELECT 1 FROM bus WHERE bus_id = %s", (bus_id,))
-        if cursor.fetchone() is None:
+        if queries.fetchone(conn, queries.BUS_EXISTS, (bus_id,)) is None:
             return jsonify({"error": "bus_not_found"}), 404
 
         cursor.execute("DELETE FROM bus WHERE bus_id = %s", (bus_id,))
+        bump_table_versions(cursor, "bus")
         conn.commit()
         return jsonify({"status": "deleted", "bus_id": bus_id}), 200
     except Exception as exc:
@@ -1132,6 +1137,7 @@ def delete_bus(bus_id):
         conn.close()
 
 @admin_bp.route("/fares", methods=["GET"])
+@conditional_get("fare", private=True)
 def get_fares():
     route_id = request.args.get("route_id", type=int)
 
@@ -1165,15 +1171,8 @@ def get_fares():
 @admin_bp.route("/fares/<int:fare_id>", methods=["GET"])
 def get_fare_detail(fare_id):
     conn = db_connection()
-    cursor = conn.cursor(dictionary=True)
     try:
-        cursor.execute("""
-            SELECT fare_id, currency, discount, valid_from, valid_to,
-                   taxes, route_id, surcharges, base_fare, seat_price, seat_class
-            FROM fare
-            WHERE fare_id = %s
-        """, (fare_id,))
-        fare = cursor.fetchone()
+        fare = queries.fetchone(conn, queries.FARE_DETAIL, (fare_id,))
         if not fare:
             return jsonify({"error": "fare_not_found"}), 404
         return jsonify(fare), 200
@@ -1181,7 +1180,6 @@ def get_fare_detail(fare_id):
         print("Error in get_fare_detail:", e)
         return jsonify({"error": "internal_server_error", "details": str(e)}), 500
     finally:
-        cursor.close()
         conn.close()
 @admin_bp.route("/fares", methods=["POST"])
 def create_fare():
@@ -1233,8 +1231,7 @@ def create_fare():
     cursor = conn.cursor(dictionary=True)
     try:
         # Kiểm tra route tồn tại
-        cursor.execute("SELECT 1 FROM routetrip WHERE route_id = %s", (route_id_int,))
-        if cursor.fetchone() is None:
+        if queries.fetchone(conn, queries.ROUTE_EXISTS, (route_id_int,)) is None:
             return jsonify({"error": "route_not_found"}), 404
 
         # Thực hiện insert
@@ -1258,6 +1255,7 @@ def create_fare():
                 seat_class,
             ),
         )
+        bump_table_versions(cursor, "fare")
         conn.commit()
 
         fare_id = cursor.lastrowid
@@ -1336,19 +1334,18 @@ def patch_fare(fare_id):
     cursor = conn.cursor(dictionary=True)
     try:
         # Ensure fare exists
-        cursor.execute("SELECT 1 FROM fare WHERE fare_id = %s", (fare_id,))
-        if cursor.fetchone() is None:
+        if queries.fetchone(conn, queries.FARE_EXISTS, (fare_id,)) is None:
             return jsonify({"error": "fare_not_found"}), 404
 
         # If updating route_id, ensure referenced route exists
         if "route_id" in updates:
-            cursor.execute("SELECT 1 FROM routetrip WHERE route_id = %s", (updates["route_id"],))
-            if cursor.fetchone() is None:
+            if queries.fetchone(conn, queries.ROUTE_EXISTS, (updates["route_id"],)) is None:
                 return jsonify({"error": "route_not_found"}), 404
 
         set_clause = ", ".join(f"{k} = %s" for k in updates.keys())
         values = list(updates.values()) + [fare_id]
         cursor.execute(f"UPDATE fare SET {set_clause} WHERE fare_id = %s", values)
+        bump_table_versions(cursor, "fare")
         conn.commit()
 
         cursor.execute(
@@ -1434,29 +1431,8 @@ def get_tickets():
 @admin_bp.route("/tickets/<int:ticket_id>", methods=["GET"])
 def get_ticket_detail(ticket_id):
     conn = db_connection()
-    cursor = conn.cursor(dictionary=True)
     try:
-        cursor.execute("""
-            SELECT
-                tk.ticket_id,
-                tk.trip_id,
-                tk.account_id,
-                tk.booking_id,
-                tk.fare_id,
-                tk.qr_code_link,
-                tk.ticket_status,
-                tk.seat_price,
-                tk.seat_code,
-                tk.serial_number,
-                t.service_date,
-                t.arrival_datetime,
-                t.route_id,
-                t.bus_id
-            FROM ticket tk
-            JOIN trip t ON tk.trip_id = t.trip_id
-            WHERE tk.ticket_id = %s
-        """, (ticket_id,))
-        ticket = cursor.fetchone()
+        ticket = queries.fetchone(conn, queries.TICKET_DETAIL, (ticket_id,))
         if not ticket:
             return jsonify({"error": "ticket_not_found"}), 404
 
@@ -1466,7 +1442,6 @@ def get_ticket_detail(ticket_id):
         print("Error in get_ticket_detail:", e)
         return jsonify({"error": "internal_server_error", "details": str(e)}), 500
     finally:
-        cursor.close()
         conn.close()
 @admin_bp.route("/tickets/<int:ticket_id>/refund", methods=["POST"])
 def refund_ticket(ticket_id):
@@ -1502,6 +1477,11 @@ def refund_ticket(ticket_id):
             # Thực ra nếu ticket không tồn tại, SP đã báo lỗi rồi.
             return jsonify({"error": "ticket_not_found"}), 404
 
+        # Pooled connections roll back what is left open on release
+        conn.commit()
+        # Refund totals and free seats of the trip's summaries
+        events.publish(events.BOOKINGS_CHANGED, trip_ids=[ticket["trip_id"]])
+
         return jsonify({
             "message": "ticket_refunded",
             "ticket": ticket
@@ -1530,8 +1510,9 @@ def patch_ticket(ticket_id):
     cursor = conn.cursor()
     try:
         # Check ticket exists
-        cursor.execute("SELECT 1 FROM ticket WHERE ticket_id = %s", (ticket_id,))
-        if cursor.fetchone() is None:
+        cursor.execute("SELECT trip_id FROM ticket WHERE ticket_id = %s", (ticket_id,))
+        ticket = cursor.fetchone()
+        if ticket is None:
             return jsonify({"error": "ticket_not_found"}), 404
 
         # Update status
@@ -1540,6 +1521,7 @@ def patch_ticket(ticket_id):
             (new_status, ticket_id)
         )
         conn.commit()
+        events.publish(events.BOOKINGS_CHANGED, trip_ids=[ticket[0]])
 
         return jsonify({
             "status": "updated",
@@ -1589,8 +1571,7 @@ def add_ticket_to_booking(booking_id):
         account_id = booking["account_id"]
 
         # Check trip exists
-        cursor.execute("SELECT 1 FROM trip WHERE trip_id=%s", (trip_id,))
-        if cursor.fetchone() is None:
+        if queries.fetchone(conn, queries.TRIP_EXISTS, (trip_id,)) is None:
             return jsonify({"error": "trip_not_found"}), 404
 
         # Check fare exists + get seat_price
@@ -1615,6 +1596,7 @@ def add_ticket_to_booking(booking_id):
             created_ids.append(cursor.lastrowid)
 
         conn.commit()
+        events.publish(events.BOOKINGS_CHANGED, trip_ids=[trip_id])
 
         return jsonify({
             "status": "created",
@@ -1633,4 +1615,25 @@ def add_ticket_to_booking(booking_id):
         cursor.close()
         conn.close()
 
+@admin_bp.route("/queries", methods=["GET"])
+def get_query_stats():
+    """Per-statement timings from utils.queries plus connection pool and replica counters."""
+    pool = get_pool()
+    replica = None
+    if replica_configured():
+        replica_pool = get_replica_pool()
+        replica = replica_monitor().status()
+        replica["pool"] = replica_pool.stats() if replica_pool is not None else None
+    return jsonify({
+        "data": queries.stats(),
+        "pool": pool.stats() if pool is not None else None,
+        "replica": replica,
+    }), 200
+
+
+@admin_bp.route("/queries", methods=["DELETE"])
+def reset_query_stats():
+    queries.reset_stats()
+    return jsonify({"status": "reset"}), 200
+
 __all__ = ["admin_bp"]
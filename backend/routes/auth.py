@@ -1,4 +1,5 @@
 from flask import Blueprint, request, jsonify
+from utils import queries
 from utils.database import db_connection
 import datetime
 from utils.jwt_helper import generate_token
@@ -75,16 +76,10 @@ def login():
     role = data.get("role", "passenger").lower()
 
     conn = None
-    cursor = None
     try:
         conn = db_connection()
-        cursor = conn.cursor(dictionary=True)
 
-        cursor.execute(
-            "SELECT * FROM account WHERE email = %s",
-            (email,)
-        )
-        account = cursor.fetchone()
+        account = queries.fetchone(conn, queries.ACCOUNT_BY_EMAIL, (email,))
 
         if not account or not password:
             return jsonify({"success": False, "message": "Incorrect email or password!"}), 401
@@ -109,30 +104,12 @@ def login():
         # Check role mapping
         user_info = None
         if role == 'passenger':
-            cursor.execute("""
-                SELECT ps.passenger_id as id, p.person_name as name
-                FROM passenger ps
-                JOIN person p ON ps.person_id = p.person_id
-                WHERE p.account_id = %s
-            """, (account_id,))
-            user_info = cursor.fetchone()
+            user_info = queries.fetchone(conn, queries.LOGIN_PASSENGER, (account_id,))
         elif role == 'staff':
-            cursor.execute("""
-                SELECT s.staff_id as id, p.person_name as name, s.operator_id
-                FROM staff s
-                JOIN person p ON s.person_id = p.person_id
-                WHERE p.account_id = %s
-            """, (account_id,))
-            user_info = cursor.fetchone()
+            user_info = queries.fetchone(conn, queries.LOGIN_STAFF, (account_id,))
             # Thêm operator_id vào để dùng trong manage trips & routes
         elif role == 'admin':
-            cursor.execute("""
-                SELECT s.staff_id as id, p.person_name as name
-                FROM staff s
-                JOIN person p ON s.person_id = p.person_id
-                WHERE p.account_id = %s
-            """, (account_id,))
-            user_info = cursor.fetchone()
+            user_info = queries.fetchone(conn, queries.LOGIN_ADMIN, (account_id,))
 
         if not user_info:
             return jsonify({"success": False, "message": f"This account is not authorized as a {role.upper()}!"}), 403
@@ -164,5 +141,4 @@ def login():
         print(f"Login Error: {e}")
         return jsonify({"success": False, "message": "System Error"}), 500
     finally:
-        if cursor: cursor.close()
         if conn: conn.close()
@@ -1,7 +1,10 @@
 """Booking routes for creating bookings and tickets"""
 
 from flask import Blueprint, request, jsonify
+from utils import queries
 from utils.database import db_connection
+from utils.parallel import parallel_reads
+from services import events
 import json
 
 booking_bp = Blueprint('booking', __name__, url_prefix='/api/bookings')
@@ -73,39 +76,17 @@ def create_booking_with_tickets():
         booking_id = result[0] if result else None
         
         conn.commit()
+        events.publish(events.BOOKINGS_CHANGED, trip_ids=[trip_id])
         
         if booking_id:
             # Fetch booking details
-            cursor.execute("""
-                SELECT 
-                    b.booking_id,
-                    b.currency,
-                    b.total_amount,
-                    b.booking_status,
-                    b.account_id,
-                    b.operator_id,
-                    COUNT(t.ticket_id) as ticket_count
-                FROM booking b
-                LEFT JOIN ticket t ON b.booking_id = t.booking_id
-                WHERE b.booking_id = %s
-                GROUP BY b.booking_id
-            """, (booking_id,))
-            
-            booking_row = cursor.fetchone()
+            booking_row = queries.fetchone(conn, queries.BOOKING_SUMMARY, (booking_id,))
             
             if booking_row:
                 response = {
                     'success': True,
                     'message': 'Booking created successfully',
-                    'data': {
-                        'booking_id': booking_row[0],
-                        'currency': booking_row[1],
-                        'total_amount': booking_row[2],
-                        'booking_status': booking_row[3],
-                        'account_id': booking_row[4],
-                        'operator_id': booking_row[5],
-                        'ticket_count': booking_row[6]
-                    }
+                    'data': booking_row
                 }
                 return jsonify(response), 201
         
@@ -153,24 +134,11 @@ def get_booking_details(booking_id):
     Lấy thông tin chi tiết của một booking
     """
     try:
-        conn = db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        # Get booking info with tickets
-        cursor.execute("""
-            SELECT 
-                b.booking_id,
-                b.currency,
-                b.total_amount,
-                b.booking_status,
-                b.account_id,
-                b.operator_id,
-                b.admin_note
-            FROM booking b
-            WHERE b.booking_id = %s
-        """, (booking_id,))
-        
-        booking = cursor.fetchone()
+        # Booking info and its tickets are independent reads: run them together
+        booking, tickets = parallel_reads(
+            (queries.fetchone, queries.BOOKING_DETAIL, (booking_id,)),
+            (queries.fetchall, queries.BOOKING_TICKETS, (booking_id,)),
+        )
         
         if not booking:
             return jsonify({
@@ -178,23 +146,6 @@ def get_booking_details(booking_id):
                 'message': 'Booking not found'
             }), 404
         
-        # Get tickets for this booking
-        cursor.execute("""
-            SELECT 
-                t.ticket_id,
-                t.serial_number,
-                t.seat_code,
-                t.seat_price,
-                t.ticket_status,
-                t.qr_code_link,
-                t.trip_id,
-                t.fare_id
-            FROM ticket t
-            WHERE t.booking_id = %s
-        """, (booking_id,))
-        
-        tickets = cursor.fetchall()
-        
         response = {
             'success': True,
             'data': {
@@ -212,6 +163,3 @@ def get_booking_details(booking_id):
             'message': 'Lỗi server khi lấy thông tin booking',
             'error': str(e)
         }), 500
-    finally:
-        cursor.close()
-        conn.close()
@@ -0,0 +1,97 @@
+"""Admin export jobs: CSV/Parquet/Arrow files of tickets, bookings and trips (see services.export)."""
+
+from datetime import date
+
+from flask import Blueprint, current_app, jsonify, request, send_file
+
+from services import export
+from utils.jwt_helper import token_required
+
+export_bp = Blueprint("exports", __name__)
+
+
+@export_bp.before_request
+def require_admin_auth():
+    if request.method == "OPTIONS":
+        return None
+    check = token_required({"ADMIN"})
+    return check(lambda: None)()
+
+
+def _directory():
+    return current_app.config["EXPORT_DIR"]
+
+
+def _purge():
+    export.purge_jobs(_directory(), current_app.config["EXPORT_RETENTION_HOURS"] * 3600)
+
+
+@export_bp.route("", methods=["POST"])
+def create_export():
+    """Queue an export. Body: dataset, format, from, to (inclusive), compression."""
+    data = request.get_json(silent=True) or {}
+    try:
+        start = date.fromisoformat(str(data.get("from")))
+        end = date.fromisoformat(str(data.get("to")))
+    except ValueError:
+        return jsonify({"error": "from/to must follow YYYY-MM-DD"}), 400
+    max_days = current_app.config["EXPORT_MAX_DAYS"]
+    if not 0 <= (end - start).days < max_days:
+        return jsonify({"error": f"to must be on or after from and span at most {max_days} days"}), 400
+
+    _purge()
+    try:
+        job = export.start_job(
+            _directory(),
+            data.get("dataset"),
+            data.get("format", "csv"),
+            start,
+            end,
+            compression=data.get("compression"),
+            chunk_size=current_app.config["EXPORT_CHUNK_SIZE"],
+        )
+    except export.ExportError as exc:
+        return jsonify({"error": "invalid_export", "message": str(exc)}), 400
+    response = jsonify({"status": "accepted", "job": job})
+    response.headers["Location"] = f"{request.base_url.rstrip('/')}/{job['job_id']}"
+    return response, 202
+
+
+@export_bp.route("", methods=["GET"])
+def list_exports():
+    _purge()
+    return jsonify({"data": export.list_jobs(_directory())}), 200
+
+
+@export_bp.route("/<job_id>", methods=["GET"])
+def get_export(job_id):
+    job = export.get_job(_directory(), job_id)
+    if job is None:
+        return jsonify({"error": "export_not_found"}), 404
+    return jsonify(job), 200
+
+
+@export_bp.route("/<job_id>/download", methods=["GET"])
+def download_export(job_id):
+    job = export.get_job(_directory(), job_id)
+    if job is None:
+        return jsonify({"error": "export_not_found"}), 404
+    if job["status"] != export.DONE:
+        return jsonify({"error": "export_not_ready", "status": job["status"]}), 409
+    compressed = job["format"] == "csv" and job["compression"] != "none"
+    return send_file(
+        export.job_file(_directory(), job),
+        mimetype="application/octet-stream" if compressed else export.MIMETYPES[job["format"]],
+        as_attachment=True,
+        download_name=job["filename"],
+    )
+
+
+@export_bp.route("/<job_id>", methods=["DELETE"])
+def delete_export(job_id):
+    if not export.delete_job(_directory(), job_id):
+        return jsonify({"error": "export_not_found"}), 404
+    return jsonify({"status": "deleted", "job_id": job_id}), 200
+
+
+__all__ = ["export_bp"]
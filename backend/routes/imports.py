@@ -0,0 +1,65 @@
+"""Admin bulk import endpoints (CSV/NDJSON upload, see services.bulk_import)."""
+
+from flask import Blueprint, current_app, jsonify, request
+
+from services.bulk_import import FORMATS, SPECS, detect_format, import_stream
+from utils.jwt_helper import token_required
+
+import_bp = Blueprint("imports", __name__)
+
+
+@import_bp.before_request
+def require_admin_auth():
+    if request.method == "OPTIONS":
+        return None
+    check = token_required({"ADMIN"})
+    return check(lambda: None)()
+
+
+def _flag(name):
+    return request.args.get(name, "0").lower() in ("1", "true", "yes")
+
+
+@import_bp.route("/<kind>", methods=["POST"])
+def import_file(kind):
+    """Import stations/buses/routes/fares from an uploaded file or the raw body.
+
+    Send the file as multipart ``file`` or as the request body with a CSV or
+    NDJSON content type. Query: ``format``, ``atomic``, ``dry_run``,
+    ``batch_size``.
+    """
+    if kind not in SPECS:
+        return jsonify({"error": "unknown_kind", "allowed": sorted(SPECS)}), 404
+
+    upload = request.files.get("file")
+    if upload is not None:
+        stream = upload.stream
+        fmt = request.args.get("format") or detect_format(upload.filename, upload.mimetype)
+    else:
+        stream = request.stream
+        fmt = request.args.get("format") or detect_format(content_type=request.mimetype)
+    if fmt not in FORMATS:
+        return jsonify({"error": "unknown_format", "allowed": list(FORMATS)}), 400
+
+    batch_size = request.args.get("batch_size", default=current_app.config["IMPORT_BATCH_SIZE"], type=int)
+    if not 1 <= batch_size <= 5000:
+        return jsonify({"error": "batch_size must be between 1 and 5000"}), 400
+
+    try:
+        report = import_stream(
+            kind,
+            stream,
+            fmt,
+            batch_size=batch_size,
+            atomic=_flag("atomic"),
+            dry_run=_flag("dry_run"),
+            max_errors=current_app.config["IMPORT_MAX_ERRORS"],
+        )
+    except Exception as exc:
+        return jsonify({"error": "db_error", "message": str(exc)}), 500
+
+    status = 400 if report.atomic and report.rejected else 200
+    return jsonify(report.to_json()), status
+
+
+__all__ = ["import_bp"]
@@ -0,0 +1,78 @@
+"""Admin load-factor dashboards over trip_occupancy_snapshot (see services.occupancy)."""
+
+from datetime import date, timedelta
+
+from flask import Blueprint, current_app, jsonify, request
+
+from services import occupancy
+from services.occupancy import occupancy_cube
+from utils.jwt_helper import token_required
+
+occupancy_bp = Blueprint("occupancy", __name__)
+
+# Query parameter -> (dimension, parser)
+FILTERS = {
+    "route_id": ("route", int),
+    "operator_id": ("operator", str),
+    "vehicle_type": ("vehicle_type", str),
+    "hour": ("hour", int),
+    "weekday": ("weekday", int),
+}
+
+
+@occupancy_bp.before_request
+def require_admin_auth():
+    if request.method == "OPTIONS":
+        return None
+    check = token_required({"ADMIN"})
+    return check(lambda: None)()
+
+
+@occupancy_bp.route("", methods=["GET"])
+def occupancy_rollup():
+    """Trips, seats sold, capacity and load factor per group.
+
+    Query: ``from``, ``to`` (inclusive, default the last 90 days), ``group_by``
+    (comma-separated: route, operator, vehicle_type, hour, weekday, month,
+    date), filters ``route_id``, ``operator_id``, ``vehicle_type``, ``hour``,
+    ``weekday`` (ISO, 1 = Monday).
+    """
+    try:
+        end = date.fromisoformat(request.args["to"]) if request.args.get("to") else date.today()
+        start = date.fromisoformat(request.args["from"]) if request.args.get("from") else end - timedelta(days=89)
+    except ValueError:
+        return jsonify({"error": "from/to must follow YYYY-MM-DD"}), 400
+    max_days = current_app.config["OCCUPANCY_MAX_DAYS"]
+    if not 0 <= (end - start).days < max_days:
+        return jsonify({"error": f"to must be on or after from and span at most {max_days} days"}), 400
+
+    group_by = [name.strip() for name in request.args.get("group_by", "route").split(",") if name.strip()]
+    filters = {}
+    for param, (dimension, parse) in FILTERS.items():
+        if request.args.get(param):
+            try:
+                filters[dimension] = parse(request.args[param])
+            except ValueError:
+                return jsonify({"error": f"{param} must be a number"}), 400
+    try:
+        result = occupancy_cube.rollup(start, end, group_by, filters,
+                                       limit=current_app.config["OCCUPANCY_MAX_ROWS"])
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    except Exception as exc:
+        return jsonify({"error": "db_error", "message": str(exc)}), 500
+    return jsonify({"from": start.isoformat(), "to": end.isoformat(), "group_by": group_by, **result}), 200
+
+
+@occupancy_bp.route("/snapshots", methods=["POST"])
+def take_occupancy_snapshots():
+    """Snapshot departed trips now instead of waiting for the scheduler."""
+    try:
+        inserted = occupancy.take_snapshots()
+    except Exception as exc:
+        return jsonify({"error": "db_error", "message": str(exc)}), 500
+    occupancy_cube.invalidate()
+    return jsonify({"status": "ok", "snapshots": inserted}), 200
+
+
+__all__ = ["occupancy_bp"]
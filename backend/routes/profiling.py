@@ -0,0 +1,110 @@
+"""Admin-only profiling endpoints (registered only when PROFILING_ENABLED)."""
+
+from flask import Blueprint, Response, jsonify, request
+
+from utils.jwt_helper import token_required
+from utils.profiling import (
+    ProfilerBusy,
+    SamplingProfiler,
+    diff_memory_snapshots,
+    get_capture,
+    list_captures,
+    list_memory_snapshots,
+    stop_memory_tracing,
+    take_memory_snapshot,
+)
+
+profiling_bp = Blueprint("profiling", __name__)
+
+MAX_SAMPLE_SECONDS = 60
+
+
+@profiling_bp.before_request
+def require_admin_auth():
+    if request.method == "OPTIONS":
+        return None
+    check = token_required({"ADMIN"})
+    return check(lambda: None)()
+
+
+@profiling_bp.route("/sample", methods=["GET"])
+def sample_requests():
+    """Sample live request threads for ?seconds=N and return collapsed stacks."""
+    seconds = request.args.get("seconds", default=10, type=float)
+    interval_ms = request.args.get("interval_ms", default=5, type=float)
+    output = request.args.get("format", "collapsed")
+
+    if not 0 < seconds <= MAX_SAMPLE_SECONDS:
+        return jsonify({"error": "invalid_seconds", "max": MAX_SAMPLE_SECONDS}), 400
+    if not 1 <= interval_ms <= 1000:
+        return jsonify({"error": "invalid_interval_ms", "min": 1, "max": 1000}), 400
+
+    try:
+        profiler = SamplingProfiler(interval=interval_ms / 1000).run(seconds)
+    except ProfilerBusy:
+        return jsonify({"error": "profiler_busy"}), 409
+
+    if output == "json":
+        summary = profiler.summary()
+        summary["stacks"] = {endpoint: dict(stacks) for endpoint, stacks in profiler.stacks.items()}
+        return jsonify(summary), 200
+    return Response(profiler.collapsed(), mimetype="text/plain")
+
+
+@profiling_bp.route("/requests", methods=["GET"])
+def get_request_profiles():
+    """List recent single-request cProfile captures (X-Profile header)."""
+    return jsonify({"data": list_captures()}), 200
+
+
+@profiling_bp.route("/requests/<int:capture_id>", methods=["GET"])
+def get_request_profile(capture_id):
+    capture = get_capture(capture_id)
+    if capture is None:
+        return jsonify({"error": "capture_not_found"}), 404
+    if request.args.get("format") == "pstats":
+        # Loadable with pstats.Stats(path) / snakeviz
+        return Response(
+            capture["pstats"],
+            mimetype="application/octet-stream",
+            headers={"Content-Disposition": f"attachment; filename=request-{capture_id}.prof"},
+        )
+    return Response(capture["report"], mimetype="text/plain")
+
+
+@profiling_bp.route("/memory/snapshots", methods=["GET"])
+def get_memory_snapshots():
+    return jsonify({"data": list_memory_snapshots()}), 200
+
+
+@profiling_bp.route("/memory/snapshots", methods=["POST"])
+def create_memory_snapshot():
+    """Take a tracemalloc snapshot (starts tracing on first use)."""
+    frames = request.args.get("frames", default=25, type=int)
+    return jsonify(take_memory_snapshot(frames)), 201
+
+
+@profiling_bp.route("/memory/diff", methods=["GET"])
+def get_memory_diff():
+    from_id = request.args.get("from", type=int)
+    to_id = request.args.get("to", type=int)
+    limit = request.args.get("limit", default=25, type=int)
+    key = request.args.get("key", "lineno")
+    if from_id is None or to_id is None:
+        return jsonify({"error": "from_and_to_required"}), 400
+    if key not in ("lineno", "filename", "traceback"):
+        return jsonify({"error": "invalid_key", "allowed": ["filename", "lineno", "traceback"]}), 400
+    diff = diff_memory_snapshots(from_id, to_id, limit=limit, key=key)
+    if diff is None:
+        return jsonify({"error": "snapshot_not_found"}), 404
+    return jsonify({"from": from_id, "to": to_id, "data": diff}), 200
+
+
+@profiling_bp.route("/memory", methods=["DELETE"])
+def stop_memory():
+    """Stop tracemalloc and drop stored snapshots."""
+    stop_memory_tracing()
+    return jsonify({"status": "stopped"}), 200
+
+
+__all__ = ["profiling_bp"]
@@ -0,0 +1,90 @@
+"""Admin revenue analytics over revenue_daily_fact (see services.revenue)."""
+
+from datetime import date, timedelta
+
+from flask import Blueprint, current_app, jsonify, request
+
+from services import revenue
+from utils.jwt_helper import token_required
+
+revenue_bp = Blueprint("revenue", __name__)
+
+
+@revenue_bp.before_request
+def require_admin_auth():
+    if request.method == "OPTIONS":
+        return None
+    check = token_required({"ADMIN"})
+    return check(lambda: None)()
+
+
+def _date_range(source):
+    """(start, end, error) from from/to, defaulting to the last 30 days."""
+    try:
+        end = date.fromisoformat(source["to"]) if source.get("to") else date.today()
+        start = date.fromisoformat(source["from"]) if source.get("from") else end - timedelta(days=29)
+    except (TypeError, ValueError):
+        return None, None, "from/to must follow YYYY-MM-DD"
+    if start > end:
+        return None, None, "from must not be after to"
+    return start, end, None
+
+
+@revenue_bp.route("", methods=["GET"])
+def revenue_rollup():
+    """Tickets, gross and refunds for a date range.
+
+    Query: ``from``, ``to`` (inclusive), ``group_by`` (comma-separated:
+    operator, route, date, month, year, seat_class; empty for totals only),
+    filters ``operator_id``, ``route_id``, ``seat_class``.
+    """
+    start, end, error = _date_range(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+    group_by = [name.strip() for name in request.args.get("group_by", "operator").split(",") if name.strip()]
+    try:
+        result = revenue.rollup(
+            start,
+            end,
+            group_by,
+            operator_id=request.args.get("operator_id"),
+            route_id=request.args.get("route_id", type=int),
+            seat_class=request.args.get("seat_class"),
+            limit=current_app.config["REVENUE_MAX_ROWS"],
+        )
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    except Exception as exc:
+        return jsonify({"error": "db_error", "message": str(exc)}), 500
+    return jsonify({"from": start.isoformat(), "to": end.isoformat(), "group_by": group_by, **result}), 200
+
+
+@revenue_bp.route("/operators/<operator_id>", methods=["GET"])
+def operator_revenue(operator_id):
+    """Per-route revenue of one operator (what sp_get_operator_revenue returns)."""
+    start, end, error = _date_range(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+    try:
+        result = revenue.rollup(start, end, ["route"], operator_id=operator_id,
+                                limit=current_app.config["REVENUE_MAX_ROWS"])
+    except Exception as exc:
+        return jsonify({"error": "db_error", "message": str(exc)}), 500
+    return jsonify({"operator_id": operator_id, "from": start.isoformat(), "to": end.isoformat(), **result}), 200
+
+
+@revenue_bp.route("/refresh", methods=["POST"])
+def refresh_revenue():
+    """Rebuild the facts of a date range (closed days only with include_closed)."""
+    data = request.get_json(silent=True) or {}
+    start, end, error = _date_range(data)
+    if error:
+        return jsonify({"error": error}), 400
+    try:
+        months = revenue.backfill(start, end, include_closed=bool(data.get("include_closed")))
+    except Exception as exc:
+        return jsonify({"error": "db_error", "message": str(exc)}), 500
+    return jsonify({"status": "ok", "from": start.isoformat(), "to": end.isoformat(), "months": months}), 200
+
+
+__all__ = ["revenue_bp"]
@@ -2,7 +2,11 @@ from datetime import time as dt_time, timedelta
 
 from flask import Blueprint, request, jsonify
 
+from utils import queries
 from utils.database import db_connection
+from utils.replicas import read_only
+from utils.versioning import bump_table_versions, conditional_get
+from services import events
 
 routes_bp = Blueprint("routes", __name__)
 
@@ -28,37 +32,13 @@ def _format_duration_value(duration_value):
 
 
 @routes_bp.route("", methods=["GET"])
+@read_only
+@conditional_get("routetrip", "station", "operator", "fare", daily=True)
 def get_routes():
     """Get all routes with station and operator information"""
     conn = db_connection()
-    cursor = conn.cursor(dictionary=True)
     try:
-        query = """
-            SELECT 
-                rt.route_id,
-                rt.distance,
-                rt.default_duration_time,
-                rt.operator_id,
-                o.brand_name AS operator_name,
-                ds.station_id AS departure_station_id,
-                ds.city AS departure_city,
-                ds.station_name AS departure_station,
-                das.station_id AS arrival_station_id,
-                das.city AS arrival_city,
-                das.station_name AS arrival_station,
-                COALESCE(MIN(f.seat_price), 0) AS price
-            FROM routetrip rt
-            INNER JOIN operator o ON rt.operator_id = o.operator_id
-            INNER JOIN station ds ON rt.station_id = ds.station_id
-            INNER JOIN station das ON rt.arrival_station = das.station_id
-            LEFT JOIN fare f ON rt.route_id = f.route_id AND f.valid_to >= CURDATE()
-            GROUP BY rt.route_id, rt.distance, rt.default_duration_time, rt.operator_id,
-                     o.brand_name, ds.station_id, ds.city, ds.station_name,
-                     das.station_id, das.city, das.station_name
-            ORDER BY rt.route_id DESC
-        """
-        cursor.execute(query)
-        routes = cursor.fetchall()
+        routes = queries.fetchall(conn, queries.ROUTE_LIST)
         
         # Format duration time for each route, regardless of driver return type
         for route in routes:
@@ -70,7 +50,6 @@ def get_routes():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
-        cursor.close()
         conn.close()
 
 
@@ -117,39 +96,28 @@ def create_route():
     cursor = conn.cursor()
     try:
         # Check if stations exist
-        cursor.execute(
-            "SELECT station_id FROM station WHERE station_id IN (%s, %s)",
-            (departure_station_id, arrival_station_id),
-        )
-        stations = cursor.fetchall()
+        stations = queries.fetchall(conn, queries.ROUTE_STATIONS, (departure_station_id, arrival_station_id))
         if len(stations) != 2:
             return jsonify({"error": "One or both stations do not exist"}), 404
         
         # Check if operator exists
-        cursor.execute("SELECT operator_id FROM operator WHERE operator_id = %s", (operator_id,))
-        if cursor.fetchone() is None:
+        if queries.fetchone(conn, queries.OPERATOR_EXISTS, (operator_id,)) is None:
             return jsonify({"error": "Operator does not exist"}), 404
         
         # Check if route already exists
-        cursor.execute(
-            """
-            SELECT route_id FROM routetrip 
-            WHERE station_id = %s AND arrival_station = %s AND operator_id = %s
-        """,
-            (departure_station_id, arrival_station_id, operator_id),
+        existing_route = queries.fetchone(
+            conn, queries.ROUTE_DUPLICATE, (departure_station_id, arrival_station_id, operator_id)
         )
-        existing_route = cursor.fetchone()
         
         if existing_route:
             return jsonify({"error": "Route already exists for this operator"}), 409
         
         # Insert new route
-        insert_query = """
-            INSERT INTO routetrip (station_id, arrival_station, distance, default_duration_time, operator_id)
-            VALUES (%s, %s, %s, %s, %s)
-        """
-        cursor.execute(insert_query, (departure_station_id, arrival_station_id, distance, default_duration_time, operator_id))
-        route_id = cursor.lastrowid
+        route_id = queries.insert(
+            conn,
+            queries.INSERT_ROUTE,
+            (departure_station_id, arrival_station_id, distance, default_duration_time, operator_id),
+        )
         
         # Create fare entry if price is provided
         if price is not None:
@@ -157,15 +125,11 @@ def create_route():
             valid_from = date.today()
             valid_to = valid_from + timedelta(days=365)  # Valid for 1 year
             
-            fare_query = """
-                INSERT INTO fare (currency, discount, valid_from, valid_to, taxes, route_id, 
-                                  surcharges, base_fare, seat_price, seat_class)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            cursor.execute(fare_query, (
+            queries.insert(conn, queries.INSERT_FARE, (
                 'VND', 0, valid_from, valid_to, 0, route_id, 0, price, price, 'Standard'
             ))
         
+        bump_table_versions(cursor, "routetrip", "fare")
         conn.commit()
         return jsonify({"message": "Route created successfully", "route_id": route_id}), 201
         
@@ -192,8 +156,7 @@ def update_route(route_id):
     cursor = conn.cursor()
     try:
         # Check if route exists
-        cursor.execute("SELECT route_id FROM routetrip WHERE route_id = %s", (route_id,))
-        if cursor.fetchone() is None:
+        if queries.fetchone(conn, queries.ROUTE_EXISTS, (route_id,)) is None:
             return jsonify({"error": "Route not found"}), 404
         
         # Validate distance if provided
@@ -244,32 +207,23 @@ def update_route(route_id):
         # Update fare entries if price is provided
         if price is not None:
             # Update all fare entries for this route
-            fare_update_query = """
-                UPDATE fare 
-                SET seat_price = %s, base_fare = %s
-                WHERE route_id = %s
-            """
-            cursor.execute(fare_update_query, (price, price, route_id))
+            queries.execute(conn, queries.UPDATE_ROUTE_PRICE, (price, price, route_id))
             
             # If no fare entries exist, create one
-            cursor.execute("SELECT COUNT(*) FROM fare WHERE route_id = %s", (route_id,))
-            fare_count = cursor.fetchone()[0]
+            fare_count = queries.fetchone(conn, queries.ROUTE_FARE_COUNT, (route_id,))["fare_count"]
             
             if fare_count == 0:
                 from datetime import date, timedelta
                 valid_from = date.today()
                 valid_to = valid_from + timedelta(days=365)
                 
-                fare_insert_query = """
-                    INSERT INTO fare (currency, discount, valid_from, valid_to, taxes, route_id,
-                                      surcharges, base_fare, seat_price, seat_class)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """
-                cursor.execute(fare_insert_query, (
+                queries.insert(conn, queries.INSERT_FARE, (
                     'VND', 0, valid_from, valid_to, 0, route_id, 0, price, price, 'Standard'
                 ))
         
+        bump_table_versions(cursor, "routetrip", "fare")
         conn.commit()
+        events.publish(events.TRIPS_CHANGED, dates=None)
         return jsonify({"message": "Route updated successfully"}), 200
         
     except Exception as e:
@@ -287,14 +241,12 @@ def delete_route(route_id):
     cursor = conn.cursor()
     try:
         # Check if route exists
-        cursor.execute("SELECT route_id FROM routetrip WHERE route_id = %s", (route_id,))
-        if cursor.fetchone() is None:
+        if queries.fetchone(conn, queries.ROUTE_EXISTS, (route_id,)) is None:
             return jsonify({"error": "Route not found"}), 404
         
         # Check if there are any trips using this route
-        cursor.execute("SELECT COUNT(*) as trip_count FROM trip WHERE route_id = %s", (route_id,))
-        result = cursor.fetchone()
-        trip_count = result[0] if result else 0
+        result = queries.fetchone(conn, queries.ROUTE_TRIP_COUNT, (route_id,))
+        trip_count = result["trip_count"] if result else 0
         
         if trip_count > 0:
             return jsonify({
@@ -303,8 +255,10 @@ def delete_route(route_id):
             }), 409
         
         # Delete the route
-        cursor.execute("DELETE FROM routetrip WHERE route_id = %s", (route_id,))
+        queries.execute(conn, queries.DELETE_ROUTE, (route_id,))
+        bump_table_versions(cursor, "routetrip", "fare")
         conn.commit()
+        events.publish(events.TRIPS_CHANGED, dates=None)
         
         return jsonify({"message": "Route deleted successfully"}), 200
         
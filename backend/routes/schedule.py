@@ -1,16 +1,27 @@
-from datetime import datetime, timedelta
-from flask import Blueprint, jsonify, request
+from datetime import date, datetime, timedelta
+from flask import Blueprint, current_app, jsonify, request
+from utils import queries
 from utils.database import db_connection
+from utils.parallel import parallel_reads
+from utils.replicas import read_only
+from utils.serialization import (
+    SQL_CLOCK_FORMAT,
+    RowEncoder,
+    clock_hhmm,
+    datetime_text,
+    db_rendering_requested,
+    id_text,
+    json_rows_response,
+    or_zero,
+)
+from utils.versioning import conditional_get
+from services import events, fare_calendar
+from services.journey_planner import planner
+from services.station_search import station_index
 
 schedule_bp = Blueprint("schedule", __name__)
 
 
-def _format_time(value):
-    if isinstance(value, datetime):
-        return value.strftime("%H:%M")
-    return ""
-
-
 def _format_duration(value):
     if isinstance(value, timedelta):
         total_minutes = int(value.total_seconds() // 60)
@@ -26,20 +37,36 @@ def _format_duration(value):
     return ""
 
 
+def _route_name(row):
+    if row["arrival_city"]:
+        return f"{row['departure_city']} -> {row['arrival_city']}"
+    return row["departure_city"]
+
+
+_trip_search_encoder = RowEncoder({
+    "trip_id": "trip_id",
+    "station_id": ("departure_station_id", str),
+    "station_name": "departure_name",
+    "route_name": _route_name,
+    "time_start": ("service_date", clock_hhmm),
+    "time_end": ("arrival_datetime", clock_hhmm),
+    "duration": ("default_duration_time", _format_duration),
+    "vehicle_type": "vehicle_type",
+    "brand_name": "brand_name",
+    "price": "seat_price",
+    "available_seats": ("available_seats", or_zero),
+    "arrival_station_id": ("arrival_station_id", id_text),
+    "arrival_city": "arrival_city",
+}, name="schedule.list_trips")
+
+
 @schedule_bp.route("/stations", methods=["GET"])
+@read_only
+@conditional_get("station")
 def list_stations():
     conn = db_connection()
-    cursor = conn.cursor(dictionary=True)
     try:
-        cursor.execute(
-            """
-            SELECT station_id, city, station_name
-            FROM station
-            WHERE active_flag = 'Active'
-            ORDER BY city, station_name
-            """
-        )
-        rows = cursor.fetchall()
+        rows = queries.fetchall(conn, queries.ACTIVE_STATIONS)
         stations = [
             {
                 "station_id": str(row["station_id"]),
@@ -52,235 +79,293 @@ def list_stations():
     except Exception as exc:
         return jsonify({"error": str(exc)}), 500
     finally:
-        cursor.close()
         conn.close()
 
 
-@schedule_bp.route("/trips", methods=["GET"])
-def list_trips():
-    station_id = request.args.get("station_id")
-    travel_date = request.args.get("date")
-    destination_id = request.args.get("destination_id")
-
-    if not station_id or not travel_date:
-        return jsonify({"error": "station_id and date are required"}), 400
+@schedule_bp.route("/stations/search", methods=["GET"])
+def search_stations():
+    """Autocomplete over station city, name and province (diacritic-insensitive)."""
+    text = request.args.get("q", "")
+    limit = request.args.get("limit", default=10, type=int)
+    if not 1 <= limit <= 25:
+        return jsonify({"error": "limit must be between 1 and 25"}), 400
 
     try:
-        station_id_value = int(station_id)
-    except ValueError:
-        return jsonify({"error": "station_id must be numeric"}), 400
+        station_index.ensure_fresh()
+    except Exception as exc:
+        return jsonify({"error": str(exc)}), 500
+    stations = [
+        {**match, "station_id": str(match["station_id"])}
+        for match in station_index.search(text, limit=limit)
+    ]
+    cities = [
+        {"city": city["city"], "station_ids": [str(sid) for sid in city["station_ids"]]}
+        for city in station_index.cities(text)
+    ]
+    return jsonify({"data": stations, "cities": cities}), 200
 
-    destination_id_value = None
-    if destination_id:
+
+def _station_filter(column, station_id, city, name):
+    """SQL condition for ``station_id`` or every station of ``city``.
+
+    Returns ``(sql, params, error)``; an unknown city matches nothing.
+    """
+    if station_id:
         try:
-            destination_id_value = int(destination_id)
+            return f" AND {column} = %s", [int(station_id)], None
         except ValueError:
-            return jsonify({"error": "destination_id must be numeric"}), 400
+            return None, None, f"{name} must be numeric"
+    station_index.ensure_fresh()
+    station_ids = station_index.city_station_ids(city)
+    if not station_ids:
+        return " AND FALSE", [], None
+    placeholders = ", ".join(["%s"] * len(station_ids))
+    return f" AND {column} IN ({placeholders})", station_ids, None
+
+
+def _trip_search_conditions(args):
+    """Validate trip search arguments; returns ``(conditions, params, error)``."""
+    station_id = args.get("station_id")
+    city = args.get("city")
+    travel_date = args.get("date")
+    destination_id = args.get("destination_id")
+    destination_city = args.get("destination_city")
+
+    if not (station_id or city) or not travel_date:
+        return None, None, "station_id (or city) and date are required"
 
     try:
         datetime.strptime(travel_date, "%Y-%m-%d")
     except ValueError:
-        return jsonify({"error": "date must follow YYYY-MM-DD"}), 400
+        return None, None, "date must follow YYYY-MM-DD"
+
+    conditions = ""
+    params = [travel_date]
+    filters = [("dep.station_id", station_id, city, "station_id")]
+    if destination_id or destination_city:
+        filters.append(("arr.station_id", destination_id, destination_city, "destination_id"))
+    for column, value, city_name, name in filters:
+        condition, values, error = _station_filter(column, value, city_name, name)
+        if error:
+            return None, None, error
+        conditions += condition
+        params.extend(values)
+    return conditions, params, None
+
+
+@schedule_bp.route("/trips", methods=["GET"])
+@read_only
+def list_trips():
+    try:
+        conditions, params, error = _trip_search_conditions(request.args)
+    except Exception as exc:
+        return jsonify({"error": str(exc)}), 500
+    if error:
+        return jsonify({"error": error}), 400
+
+    if db_rendering_requested():
+        return _list_trips_rendered(conditions, params)
 
     conn = db_connection()
-    cursor = conn.cursor(dictionary=True)
     try:
-        query = """
-            SELECT
-                t.trip_id,
-                t.service_date,
-                t.arrival_datetime,
-                rt.route_id,
-                rt.default_duration_time,
-                dep.station_id AS departure_station_id,
-                dep.station_name AS departure_name,
-                dep.city AS departure_city,
-                arr.station_name AS arrival_name,
-                arr.city AS arrival_city,
-                arr.station_id AS arrival_station_id,
-                b.vehicle_type,
-                op.brand_name,
-                COALESCE((
-                    SELECT seat_price
-                    FROM fare f
-                    WHERE f.route_id = rt.route_id
-                    ORDER BY f.valid_from DESC
-                    LIMIT 1
-                ), 0) AS seat_price,
-                fn_get_available_seats(t.trip_id) AS available_seats
-            FROM trip t
-            JOIN routetrip rt ON t.route_id = rt.route_id
-            JOIN station dep ON rt.station_id = dep.station_id
-            LEFT JOIN station arr ON rt.arrival_station = arr.station_id
-            JOIN bus b ON t.bus_id = b.bus_id
-            JOIN operator op ON rt.operator_id = op.operator_id
-            WHERE dep.station_id = %s
-              AND DATE(t.service_date) = %s
-              AND t.trip_status = 'Scheduled'
-        """
-
-        params = [station_id_value, travel_date]
-        if destination_id_value is not None:
-            query += " AND arr.station_id = %s"
-            params.append(destination_id_value)
-
-        query += "\n            ORDER BY t.service_date ASC"
-
-        cursor.execute(query, tuple(params))
-        rows = cursor.fetchall()
-
-        trips = []
-        for row in rows:
-            route_name = row["departure_city"]
-            if row["arrival_city"]:
-                route_name = f"{route_name} -> {row['arrival_city']}"
-            available = row["available_seats"]
-            trip_payload = {
-                "trip_id": row["trip_id"],
-                "station_id": str(row["departure_station_id"]),
-                "station_name": row["departure_name"],
-                "route_name": route_name,
-                "time_start": _format_time(row["service_date"]),
-                "time_end": _format_time(row["arrival_datetime"]),
-                "duration": _format_duration(row["default_duration_time"]),
-                "vehicle_type": row["vehicle_type"],
-                "brand_name": row["brand_name"],
-                "price": row["seat_price"],
-                "available_seats": available if available is not None else 0,
-                "arrival_station_id": str(row["arrival_station_id"]) if row["arrival_station_id"] is not None else None,
-                "arrival_city": row["arrival_city"],
-            }
-            trips.append(trip_payload)
+        rows = queries.fetchall(conn, queries.TRIP_SEARCH.format(filters=conditions), params)
 
-        return jsonify({"data": trips}), 200
+        return jsonify({"data": _trip_search_encoder(rows)}), 200
     except Exception as exc:
         return jsonify({"error": str(exc)}), 500
     finally:
+        conn.close()
+
+
+def _list_trips_rendered(conditions, params):
+    """Trip search with every row formatted by MySQL, streamed without decoding."""
+    conn = db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            queries.TRIP_SEARCH_JSON.format(filters=conditions).sql,
+            tuple([SQL_CLOCK_FORMAT, SQL_CLOCK_FORMAT] + params),
+        )
+    except Exception as exc:
         cursor.close()
         conn.close()
+        return jsonify({"error": str(exc)}), 500
+    return json_rows_response(conn, cursor)
+
+
+def _journey_station(station_id):
+    station = planner.stations.get(station_id) or {}
+    return str(station_id), station.get("station_name"), station.get("city")
+
+
+def _journey_json(journey):
+    legs = []
+    for leg in journey.legs:
+        station_id, station_name, city = _journey_station(leg.from_station_id)
+        arrival_id, arrival_name, arrival_city = _journey_station(leg.to_station_id)
+        legs.append({
+            "trip_id": leg.trip_id,
+            "route_id": leg.route_id,
+            "station_id": station_id,
+            "station_name": station_name,
+            "departure_city": city,
+            "arrival_station_id": arrival_id,
+            "arrival_station_name": arrival_name,
+            "arrival_city": arrival_city,
+            "departure_time": datetime_text(leg.departure),
+            "arrival_time": datetime_text(leg.arrival),
+            "time_start": clock_hhmm(leg.departure),
+            "time_end": clock_hhmm(leg.arrival),
+        })
+    return {
+        "transfers": journey.transfers,
+        "departure_time": datetime_text(journey.departure),
+        "arrival_time": datetime_text(journey.arrival),
+        "duration": _format_duration(journey.arrival - journey.departure),
+        "legs": legs,
+    }
+
+
+@schedule_bp.route("/journeys", methods=["GET"])
+def search_journeys():
+    """Direct and connecting journeys between two stations leaving on a date."""
+    station_id = request.args.get("station_id", type=int)
+    destination_id = request.args.get("destination_id", type=int)
+    travel_date = request.args.get("date")
+    depart_time = request.args.get("time", "00:00")
+    config = current_app.config
+    max_legs = request.args.get("max_legs", default=config["JOURNEY_MAX_LEGS"], type=int)
+    limit = request.args.get("limit", default=5, type=int)
+
+    if station_id is None or destination_id is None or not travel_date:
+        return jsonify({"error": "station_id, destination_id and date are required"}), 400
+    try:
+        depart_after = datetime.strptime(f"{travel_date} {depart_time}", "%Y-%m-%d %H:%M")
+    except ValueError:
+        return jsonify({"error": "date must follow YYYY-MM-DD and time HH:MM"}), 400
+    if not 1 <= max_legs <= 4:
+        return jsonify({"error": "max_legs must be between 1 and 4"}), 400
+    if not 1 <= limit <= 10:
+        return jsonify({"error": "limit must be between 1 and 10"}), 400
+
+    try:
+        journeys = planner.search(
+            station_id,
+            destination_id,
+            depart_after,
+            max_legs=max_legs,
+            min_connection=config["JOURNEY_MIN_CONNECTION_MINUTES"],
+            horizon_hours=config["JOURNEY_HORIZON_HOURS"],
+            limit=limit,
+        )
+    except Exception as exc:
+        return jsonify({"error": str(exc)}), 500
+    return jsonify({"data": [_journey_json(journey) for journey in journeys]}), 200
+
+
+@schedule_bp.route("/calendar", methods=["GET"])
+def fare_calendar_range():
+    """Per-day minimum price, trip count and free seats for a station pair."""
+    station_id = request.args.get("station_id", type=int)
+    destination_id = request.args.get("destination_id", type=int)
+    if station_id is None or destination_id is None:
+        return jsonify({"error": "station_id and destination_id are required"}), 400
+
+    max_days = current_app.config["CALENDAR_MAX_DAYS"]
+    try:
+        start = date.fromisoformat(request.args.get("from") or date.today().isoformat())
+        if request.args.get("to"):
+            end = date.fromisoformat(request.args["to"])
+        else:
+            end = start + timedelta(days=request.args.get("days", default=30, type=int) - 1)
+    except ValueError:
+        return jsonify({"error": "from/to must follow YYYY-MM-DD"}), 400
+    if end < start:
+        return jsonify({"error": "the range must end on or after its start"}), 400
+    if (end - start).days + 1 > max_days:
+        return jsonify({"error": f"the range cannot exceed {max_days} days"}), 400
+
+    try:
+        days = fare_calendar.calendar(station_id, destination_id, start, end)
+    except Exception as exc:
+        return jsonify({"error": str(exc)}), 500
+    return jsonify({"data": days}), 200
+
+
+def _trip_detail_json(row):
+    """Trip detail document for a `queries.TRIP_DETAIL` row (also served by asgi.py)."""
+    # Format dữ liệu trả về
+    route_name = row["departure_city"]
+    if row["arrival_city"]:
+        route_name = f"{route_name} -> {row['arrival_city']}"
+    
+    available = row["available_seats"]
+    
+    return {
+        "trip_id": row["trip_id"],
+        "trip_status": row["trip_status"],
+        
+        # Thông tin tuyến đường
+        "route_id": row["route_id"],
+        "route_name": route_name,
+        "distance": row["distance"],
+        "duration": _format_duration(row["default_duration_time"]),
+        
+        # Điểm đi
+        "station_id": str(row["departure_station_id"]),
+        "station_name": row["departure_name"],
+        "city": row["departure_city"],
+        "departure_address": row["departure_address"],
+        
+        # Điểm đến
+        "arrival_station_id": str(row["arrival_station_id"]) if row["arrival_station_id"] else None,
+        "arrival_station_name": row["arrival_name"],
+        "arrival_city": row["arrival_city"],
+        "arrival_address": row["arrival_address"],
+        
+        # Thời gian
+        "service_date": row["service_date"].isoformat() if row["service_date"] else None,
+        "time_start": clock_hhmm(row["service_date"]),
+        "arrival_datetime": row["arrival_datetime"].isoformat() if row["arrival_datetime"] else None,
+        "time_end": clock_hhmm(row["arrival_datetime"]),
+        
+        # Thông tin xe
+        "bus_id": row["bus_id"],
+        "plate_number": row["plate_number"],
+        "vehicle_type": row["vehicle_type"],
+        "capacity": row["capacity"],
+        
+        # Nhà xe
+        "operator_id": row["operator_id"],
+        "brand_name": row["brand_name"],
+        "legal_name": row["legal_name"],
+        
+        # Giá vé và ghế
+        "fare_id": row["fare_id"],
+        "price": row["seat_price"],
+        "available_seats": available if available is not None else 0,
+    }
 
 
 @schedule_bp.route("/trips/<int:trip_id>", methods=["GET"])
+@read_only
 def get_trip_detail(trip_id):
     """
     Lấy chi tiết đầy đủ của một chuyến xe theo trip_id
     Bao gồm: thông tin tuyến đường, xe, giá vé, số ghế trống, biển số xe, ngày giờ khởi hành/đến
     """
     conn = db_connection()
-    cursor = conn.cursor(dictionary=True)
     try:
-        query = """
-            SELECT
-                t.trip_id,
-                t.service_date,
-                t.arrival_datetime,
-                t.trip_status,
-                rt.route_id,
-                rt.default_duration_time,
-                rt.distance,
-                dep.station_id AS departure_station_id,
-                dep.station_name AS departure_name,
-                dep.city AS departure_city,
-                dep.address_station AS departure_address,
-                arr.station_id AS arrival_station_id,
-                arr.station_name AS arrival_name,
-                arr.city AS arrival_city,
-                arr.address_station AS arrival_address,
-                b.bus_id,
-                b.plate_number,
-                b.capacity,
-                b.vehicle_type,
-                op.operator_id,
-                op.brand_name,
-                op.legal_name,
-                COALESCE((
-                    SELECT seat_price
-                    FROM fare f
-                    WHERE f.route_id = rt.route_id
-                    ORDER BY f.valid_from DESC
-                    LIMIT 1
-                ), 0) AS seat_price,
-                (
-                    SELECT fare_id
-                    FROM fare f2
-                    WHERE f2.route_id = rt.route_id
-                    ORDER BY f2.valid_from DESC
-                    LIMIT 1
-                ) AS fare_id,
-                fn_get_available_seats(t.trip_id) AS available_seats
-            FROM trip t
-            JOIN routetrip rt ON t.route_id = rt.route_id
-            JOIN station dep ON rt.station_id = dep.station_id
-            LEFT JOIN station arr ON rt.arrival_station = arr.station_id
-            JOIN bus b ON t.bus_id = b.bus_id
-            JOIN operator op ON rt.operator_id = op.operator_id
-            WHERE t.trip_id = %s
-        """
-        
-        cursor.execute(query, (trip_id,))
-        row = cursor.fetchone()
+        row = queries.fetchone(conn, queries.TRIP_DETAIL, (trip_id,))
         
         if not row:
             return jsonify({"error": "Trip not found"}), 404
         
-        # Format dữ liệu trả về
-        route_name = row["departure_city"]
-        if row["arrival_city"]:
-            route_name = f"{route_name} -> {row['arrival_city']}"
-        
-        available = row["available_seats"]
-        
-        trip_detail = {
-            "trip_id": row["trip_id"],
-            "trip_status": row["trip_status"],
-            
-            # Thông tin tuyến đường
-            "route_id": row["route_id"],
-            "route_name": route_name,
-            "distance": row["distance"],
-            "duration": _format_duration(row["default_duration_time"]),
-            
-            # Điểm đi
-            "station_id": str(row["departure_station_id"]),
-            "station_name": row["departure_name"],
-            "city": row["departure_city"],
-            "departure_address": row["departure_address"],
-            
-            # Điểm đến
-            "arrival_station_id": str(row["arrival_station_id"]) if row["arrival_station_id"] else None,
-            "arrival_station_name": row["arrival_name"],
-            "arrival_city": row["arrival_city"],
-            "arrival_address": row["arrival_address"],
-            
-            # Thời gian
-            "service_date": row["service_date"].isoformat() if row["service_date"] else None,
-            "time_start": _format_time(row["service_date"]),
-            "arrival_datetime": row["arrival_datetime"].isoformat() if row["arrival_datetime"] else None,
-            "time_end": _format_time(row["arrival_datetime"]),
-            
-            # Thông tin xe
-            "bus_id": row["bus_id"],
-            "plate_number": row["plate_number"],
-            "vehicle_type": row["vehicle_type"],
-            "capacity": row["capacity"],
-            
-            # Nhà xe
-            "operator_id": row["operator_id"],
-            "brand_name": row["brand_name"],
-            "legal_name": row["legal_name"],
-            
-            # Giá vé và ghế
-            "fare_id": row["fare_id"],
-            "price": row["seat_price"],
-            "available_seats": available if available is not None else 0,
-        }
-        
-        return jsonify({"data": trip_detail}), 200
+        return jsonify({"data": _trip_detail_json(row)}), 200
         
     except Exception as exc:
         return jsonify({"error": str(exc)}), 500
     finally:
-        cursor.close()
         conn.close()
 
 
@@ -305,100 +390,72 @@ def create_booking_with_multiple_tickets():
     # Đảm bảo mọi phần tử là string
     seat_codes = [str(s) for s in seat_codes]
 
+    # 2-4. Trip + bus, fare và ghế đã có ticket Issued/Used: ba lần đọc độc lập,
+    # chạy song song trước khi mở transaction
+    taken_seats = queries.TAKEN_SEATS.format(seats=queries.placeholders(len(seat_codes)))
+    try:
+        trip_row, fare_row, taken_rows = parallel_reads(
+            (queries.fetchone, queries.TRIP_CAPACITY, (trip_id,)),
+            (queries.fetchone, queries.FARE_PRICE, (fare_id,)),
+            (queries.fetchall, taken_seats, (trip_id, *seat_codes)),
+        )
+    except Exception as e:
+        print("Error in create_booking_with_multiple_tickets:", e)
+        return jsonify({"error": "internal_server_error", "details": str(e)}), 500
+
+    if not trip_row:
+        return jsonify({"error": "trip_not_found"}), 404
+
+    route_id = trip_row["route_id"]
+    capacity = trip_row["capacity"]
+
+    if not fare_row:
+        return jsonify({"error": "fare_not_found"}), 404
+
+    fare_route_id = fare_row["route_id"]
+    seat_price    = fare_row["seat_price"]
+
+    # Check route match
+    if route_id != fare_route_id:
+        return jsonify({"error": "fare_route_mismatch"}), 400
+
+    # (Optional) Nếu bạn vẫn chỉ dùng số 1..capacity nhưng lưu string,
+    # có thể check như này:
+    invalid_seats = []
+    for s in seat_codes:
+        if s.isdigit():
+            num = int(s)
+            if num < 1 or num > capacity:
+                invalid_seats.append(s)
+        else:
+            # Nếu bạn cho phép mã kiểu "A01", bỏ check này hoặc custom thêm
+            pass
+
+    if invalid_seats:
+        return jsonify({
+            "error": "invalid_seat_code",
+            "invalid_seats": invalid_seats
+        }), 400
+
+    if taken_rows:
+        taken = [r["seat_code"] for r in taken_rows]
+        return jsonify({
+            "error": "seat_already_taken",
+            "taken_seats": taken
+        }), 400
+
+    # Hai request cùng chọn một ghế vẫn bị chặn bởi uq_ticket_trip_seat khi insert
     conn = db_connection()
-    cursor = conn.cursor(dictionary=True)
     try:
         conn.start_transaction()
 
-        # 2. Lấy thông tin trip + bus
-        cursor.execute("""
-            SELECT t.trip_id, t.route_id, b.capacity
-            FROM trip t
-            JOIN bus b ON t.bus_id = b.bus_id
-            WHERE t.trip_id = %s
-        """, (trip_id,))
-        trip_row = cursor.fetchone()
-        if not trip_row:
-            return jsonify({"error": "trip_not_found"}), 404
-
-        route_id = trip_row["route_id"]
-        capacity = trip_row["capacity"]
-
-        # 3. Lấy thông tin fare
-        cursor.execute("""
-            SELECT route_id, seat_price
-            FROM fare
-            WHERE fare_id = %s
-        """, (fare_id,))
-        fare_row = cursor.fetchone()
-        if not fare_row:
-            return jsonify({"error": "fare_not_found"}), 404
-
-        fare_route_id = fare_row["route_id"]
-        seat_price    = fare_row["seat_price"]
-
-        # Check route match
-        if route_id != fare_route_id:
-            return jsonify({"error": "fare_route_mismatch"}), 400
-
-        # (Optional) Nếu bạn vẫn chỉ dùng số 1..capacity nhưng lưu string,
-        # có thể check như này:
-        invalid_seats = []
-        for s in seat_codes:
-            if s.isdigit():
-                num = int(s)
-                if num < 1 or num > capacity:
-                    invalid_seats.append(s)
-            else:
-                # Nếu bạn cho phép mã kiểu "A01", bỏ check này hoặc custom thêm
-                pass
-
-        if invalid_seats:
-            return jsonify({
-                "error": "invalid_seat_code",
-                "invalid_seats": invalid_seats
-            }), 400
-
-        # 4. Kiểm tra trùng ghế với ticket đang Issued/Used
-        format_strings = ",".join(["%s"] * len(seat_codes))
-        cursor.execute(f"""
-            SELECT seat_code
-            FROM ticket
-            WHERE trip_id = %s
-              AND seat_code IN ({format_strings})
-              AND ticket_status IN ('Issued', 'Used')
-        """, (trip_id, *seat_codes))
-        taken_rows = cursor.fetchall()
-        if taken_rows:
-            taken = [r["seat_code"] for r in taken_rows]
-            return jsonify({
-                "error": "seat_already_taken",
-                "taken_seats": taken
-            }), 400
-
         # 5. Tạo booking (total_amount tạm = 0, sẽ cập nhật sau)
-        cursor.execute("""
-            INSERT INTO booking (currency, total_amount, account_id, operator_id)
-            VALUES (%s, 0, %s, %s)
-        """, (currency, account_id, operator_id))
-        booking_id = cursor.lastrowid
+        booking_id = queries.insert(conn, queries.INSERT_BOOKING, (currency, account_id, operator_id))
 
         # 6. Tạo tickets
         ticket_ids = []
         for s in seat_codes:
-            cursor.execute("""
-                INSERT INTO ticket (
-                    trip_id,
-                    account_id,
-                    booking_id,
-                    fare_id,
-                    qr_code_link,
-                    ticket_status,
-                    seat_price,
-                    seat_code
-                )
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
+            ticket_ids.append(queries.insert(conn, queries.INSERT_TICKET, (
                 trip_id,
                 account_id,
                 booking_id,
@@ -407,31 +464,22 @@ def create_booking_with_multiple_tickets():
                 "Issued",
                 seat_price,
                 s                  # seat_code là VARCHAR
-            ))
-            ticket_ids.append(cursor.lastrowid)
+            )))
 
         # Fetch serial numbers for the newly created tickets
         ticket_serials = []
         if ticket_ids:
-            placeholders = ",".join(["%s"] * len(ticket_ids))
-            cursor.execute(f"""
-                SELECT ticket_id, serial_number
-                FROM ticket
-                WHERE ticket_id IN ({placeholders})
-            """, tuple(ticket_ids))
+            serials = queries.TICKET_SERIALS.format(ids=queries.placeholders(len(ticket_ids)))
             ticket_serials = [
                 {"ticket_id": row["ticket_id"], "serial_number": row["serial_number"]}
-                for row in cursor.fetchall()
+                for row in queries.fetchall(conn, serials, ticket_ids)
             ]
 
         # 7. Cập nhật total_amount sử dụng fn_calculate_booking_total
-        cursor.execute("""
-            UPDATE booking
-            SET total_amount = fn_calculate_booking_total(%s)
-            WHERE booking_id = %s
-        """, (booking_id, booking_id))
+        queries.execute(conn, queries.UPDATE_BOOKING_TOTAL, (booking_id, booking_id))
 
         conn.commit()
+        events.publish(events.BOOKINGS_CHANGED, trip_ids=[trip_id])
 
         return jsonify({
             "booking_id": booking_id,
@@ -446,5 +494,4 @@ def create_booking_with_multiple_tickets():
         print("Error in create_booking_with_multiple_tickets:", e)
         return jsonify({"error": "internal_server_error", "details": str(e)}), 500
     finally:
-        cursor.close()
         conn.close()
@@ -1,11 +1,14 @@
 """Ticket routes for Page 4 - Ticket Lookup"""
 
 from flask import Blueprint, request, jsonify
+from utils import queries
 from utils.database import db_connection
+from utils.replicas import read_only
 
 ticket_bp = Blueprint('ticket', __name__, url_prefix='/api/tickets')
 
 @ticket_bp.route('/lookup', methods=['POST'])
+@read_only
 def lookup_ticket():
     """
     Tra cứu thông tin vé thông qua serial number và số điện thoại
@@ -24,42 +27,7 @@ def lookup_ticket():
         
 
         conn = db_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        # Query ticket information with all related data
-        query = """
-            SELECT
-                t.ticket_id,
-                t.serial_number,
-                t.seat_code,
-                t.seat_price,
-                t.ticket_status,
-                t.qr_code_link,
-                tr.trip_id,
-                tr.service_date,
-                tr.trip_status,
-                rt.route_id,
-                rt.distance,
-                rt.default_duration_time,
-                b.plate_number,
-                b.vehicle_type,
-                b.capacity,
-                a.phone,
-                a.email,
-                s1.station_name as departure_station,
-                s1.city as departure_city,
-                s1.province as departure_province
-            FROM ticket t
-            INNER JOIN trip tr ON t.trip_id = tr.trip_id
-            INNER JOIN routetrip rt ON tr.route_id = rt.route_id
-            INNER JOIN bus b ON tr.bus_id = b.bus_id
-            INNER JOIN account a ON t.account_id = a.account_id
-            INNER JOIN station s1 ON rt.station_id = s1.station_id
-            WHERE t.serial_number = %s AND a.phone = %s
-        """
-
-        cursor.execute(query, (serial_number, phone))
-        rows = cursor.fetchall()
+        rows = queries.fetchall(conn, queries.TICKET_LOOKUP, (serial_number, phone))
 
         if not rows:
             return jsonify({
@@ -117,5 +85,5 @@ def lookup_ticket():
             'error': str(e)
         }), 500
     finally:
-        cursor.close()
-        conn.close()
\ No newline at end of file
+        if 'conn' in locals():
+            conn.close()
\ No newline at end of file
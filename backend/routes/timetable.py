@@ -0,0 +1,311 @@
+"""Admin endpoints for recurring timetables (templates, exceptions, expansion)."""
+
+from datetime import date, datetime
+
+from flask import Blueprint, jsonify, request
+
+from services import timetable
+from utils.database import db_connection
+from utils.jwt_helper import token_required
+
+timetable_bp = Blueprint("timetable", __name__)
+
+VEHICLE_TYPES = {"Sleeper", "Seater", "Limousine"}
+MAX_MATERIALIZE_DAYS = 90
+MAX_PREVIEW_DAYS = 62
+
+
+@timetable_bp.before_request
+def require_admin_auth():
+    if request.method == "OPTIONS":
+        return None
+    check = token_required({"ADMIN"})
+    return check(lambda: None)()
+
+
+def _parse_clock(value):
+    return datetime.strptime(str(value).strip()[:5], "%H:%M").time()
+
+
+def _parse_date(value):
+    return date.fromisoformat(str(value)) if value not in (None, "") else None
+
+
+def _template_json(row):
+    return {
+        "template_id": row["template_id"],
+        "route_id": row["route_id"],
+        "departure_time": timetable.as_time(row["departure_time"]).strftime("%H:%M"),
+        "weekdays": timetable.weekdays_of(row["weekday_mask"]),
+        "valid_from": row["valid_from"].isoformat() if row["valid_from"] else None,
+        "valid_to": row["valid_to"].isoformat() if row["valid_to"] else None,
+        "vehicle_type": row["vehicle_type"],
+        "active_flag": row["active_flag"],
+    }
+
+
+def _template_fields(data, partial=False):
+    """Validate template input; returns (fields, error)."""
+    fields = {}
+    try:
+        if "route_id" in data or not partial:
+            fields["route_id"] = int(data["route_id"])
+        if "departure_time" in data or not partial:
+            fields["departure_time"] = _parse_clock(data["departure_time"])
+        if "weekdays" in data:
+            fields["weekday_mask"] = timetable.weekday_mask(data["weekdays"] or [])
+            if not fields["weekday_mask"]:
+                return None, "weekdays must not be empty"
+        elif not partial:
+            fields["weekday_mask"] = timetable.ALL_WEEKDAYS
+        for name in ("valid_from", "valid_to"):
+            if name in data:
+                fields[name] = _parse_date(data[name])
+    except KeyError as exc:
+        return None, f"missing field: {exc.args[0]}"
+    except (TypeError, ValueError) as exc:
+        return None, str(exc)
+    if "vehicle_type" in data:
+        if data["vehicle_type"] not in VEHICLE_TYPES | {None}:
+            return None, f"vehicle_type must be one of {sorted(VEHICLE_TYPES)}"
+        fields["vehicle_type"] = data["vehicle_type"]
+    if "active_flag" in data:
+        if data["active_flag"] not in ("Active", "Inactive"):
+            return None, "active_flag must be Active or Inactive"
+        fields["active_flag"] = data["active_flag"]
+    if fields.get("valid_from") and fields.get("valid_to") and fields["valid_to"] < fields["valid_from"]:
+        return None, "valid_to must not be before valid_from"
+    return fields, None
+
+
+@timetable_bp.route("/templates", methods=["GET"])
+def list_templates():
+    route_id = request.args.get("route_id", type=int)
+    conn = db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        sql = "SELECT * FROM timetable_template"
+        params = ()
+        if route_id is not None:
+            sql += " WHERE route_id = %s"
+            params = (route_id,)
+        cursor.execute(sql + " ORDER BY route_id, departure_time", params)
+        return jsonify({"data": [_template_json(row) for row in cursor.fetchall()]}), 200
+    except Exception as exc:
+        return jsonify({"error": "db_error", "message": str(exc)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+
+@timetable_bp.route("/templates", methods=["POST"])
+def create_template():
+    fields, error = _template_fields(request.get_json(silent=True) or {})
+    if error:
+        return jsonify({"error": "invalid_template", "message": error}), 400
+
+    columns = ", ".join(fields)
+    placeholders = ", ".join(["%s"] * len(fields))
+    conn = db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("SELECT 1 FROM routetrip WHERE route_id = %s", (fields["route_id"],))
+        if cursor.fetchone() is None:
+            return jsonify({"error": "route_not_found"}), 404
+        cursor.execute(
+            f"INSERT INTO timetable_template ({columns}) VALUES ({placeholders})",
+            tuple(fields.values()),
+        )
+        template_id = cursor.lastrowid
+        conn.commit()
+        cursor.execute("SELECT * FROM timetable_template WHERE template_id = %s", (template_id,))
+        return jsonify({"status": "created", "template": _template_json(cursor.fetchone())}), 201
+    except Exception as exc:
+        conn.rollback()
+        if "Duplicate entry" in str(exc):
+            return jsonify({"error": "template_exists"}), 409
+        return jsonify({"error": "db_error", "message": str(exc)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+
+@timetable_bp.route("/templates/<int:template_id>", methods=["PATCH"])
+def update_template(template_id):
+    fields, error = _template_fields(request.get_json(silent=True) or {}, partial=True)
+    if error:
+        return jsonify({"error": "invalid_template", "message": error}), 400
+    if not fields:
+        return jsonify({"error": "no_valid_fields"}), 400
+
+    set_clause = ", ".join(f"{name} = %s" for name in fields)
+    conn = db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("SELECT 1 FROM timetable_template WHERE template_id = %s", (template_id,))
+        if cursor.fetchone() is None:
+            return jsonify({"error": "template_not_found"}), 404
+        cursor.execute(
+            f"UPDATE timetable_template SET {set_clause} WHERE template_id = %s",
+            (*fields.values(), template_id),
+        )
+        conn.commit()
+        cursor.execute("SELECT * FROM timetable_template WHERE template_id = %s", (template_id,))
+        return jsonify({"status": "updated", "template": _template_json(cursor.fetchone())}), 200
+    except Exception as exc:
+        conn.rollback()
+        return jsonify({"error": "db_error", "message": str(exc)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+
+@timetable_bp.route("/templates/<int:template_id>", methods=["DELETE"])
+def delete_template(template_id):
+    conn = db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM timetable_template WHERE template_id = %s", (template_id,))
+        if cursor.rowcount == 0:
+            return jsonify({"error": "template_not_found"}), 404
+        conn.commit()
+        return jsonify({"status": "deleted", "template_id": template_id}), 200
+    except Exception as exc:
+        conn.rollback()
+        return jsonify({"error": "db_error", "message": str(exc)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+
+@timetable_bp.route("/exceptions", methods=["GET"])
+def list_exceptions():
+    try:
+        start = _parse_date(request.args.get("from")) or date.today()
+        end = _parse_date(request.args.get("to")) or date.max
+    except ValueError:
+        return jsonify({"error": "from/to must follow YYYY-MM-DD"}), 400
+    conn = db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            """
+            SELECT exception_id, route_id, exception_date, action,
+                   departure_time, vehicle_type, note
+            FROM timetable_exception
+            WHERE exception_date BETWEEN %s AND %s
+            ORDER BY exception_date, route_id
+            """,
+            (start, end),
+        )
+        rows = cursor.fetchall()
+        for row in rows:
+            row["exception_date"] = row["exception_date"].isoformat()
+            departure = timetable.as_time(row["departure_time"])
+            row["departure_time"] = departure.strftime("%H:%M") if departure else None
+        return jsonify({"data": rows}), 200
+    except Exception as exc:
+        return jsonify({"error": "db_error", "message": str(exc)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+
+@timetable_bp.route("/exceptions", methods=["POST"])
+def create_exception():
+    data = request.get_json(silent=True) or {}
+    action = data.get("action")
+    if action not in ("Cancel", "Add"):
+        return jsonify({"error": "action must be Cancel or Add"}), 400
+    try:
+        exception_date = _parse_date(data.get("exception_date"))
+        departure_time = _parse_clock(data["departure_time"]) if data.get("departure_time") else None
+        route_id = int(data["route_id"]) if data.get("route_id") is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "exception_date must follow YYYY-MM-DD and departure_time HH:MM"}), 400
+    if exception_date is None:
+        return jsonify({"error": "exception_date is required"}), 400
+    if action == "Add" and (departure_time is None or route_id is None):
+        return jsonify({"error": "Add needs route_id and departure_time"}), 400
+    vehicle_type = data.get("vehicle_type")
+    if vehicle_type not in VEHICLE_TYPES | {None}:
+        return jsonify({"error": f"vehicle_type must be one of {sorted(VEHICLE_TYPES)}"}), 400
+
+    conn = db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            """
+            INSERT INTO timetable_exception
+                (route_id, exception_date, action, departure_time, vehicle_type, note)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            """,
+            (route_id, exception_date, action, departure_time, vehicle_type, data.get("note")),
+        )
+        exception_id = cursor.lastrowid
+        conn.commit()
+        return jsonify({"status": "created", "exception_id": exception_id}), 201
+    except Exception as exc:
+        conn.rollback()
+        return jsonify({"error": "db_error", "message": str(exc)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+
+@timetable_bp.route("/exceptions/<int:exception_id>", methods=["DELETE"])
+def delete_exception(exception_id):
+    conn = db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM timetable_exception WHERE exception_id = %s", (exception_id,))
+        if cursor.rowcount == 0:
+            return jsonify({"error": "exception_not_found"}), 404
+        conn.commit()
+        return jsonify({"status": "deleted", "exception_id": exception_id}), 200
+    except Exception as exc:
+        conn.rollback()
+        return jsonify({"error": "db_error", "message": str(exc)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+
+@timetable_bp.route("/preview", methods=["GET"])
+def preview_timetable():
+    """Departures a route's timetable would produce, without creating trips."""
+    route_id = request.args.get("route_id", type=int)
+    days = request.args.get("days", default=14, type=int)
+    if route_id is None:
+        return jsonify({"error": "route_id is required"}), 400
+    if not 1 <= days <= MAX_PREVIEW_DAYS:
+        return jsonify({"error": f"days must be between 1 and {MAX_PREVIEW_DAYS}"}), 400
+    try:
+        start = _parse_date(request.args.get("from")) or date.today()
+    except ValueError:
+        return jsonify({"error": "from must follow YYYY-MM-DD"}), 400
+    try:
+        return jsonify({"data": timetable.preview(route_id, start, days)}), 200
+    except Exception as exc:
+        return jsonify({"error": "db_error", "message": str(exc)}), 500
+
+
+@timetable_bp.route("/materialize", methods=["POST"])
+def materialize_timetable():
+    """Generate trips for route-days of the horizon that were not generated yet."""
+    data = request.get_json(silent=True) or {}
+    try:
+        days = int(data.get("days", 7))
+        start = _parse_date(data.get("from"))
+    except (TypeError, ValueError):
+        return jsonify({"error": "days must be a number and from YYYY-MM-DD"}), 400
+    if not 0 <= days <= MAX_MATERIALIZE_DAYS:
+        return jsonify({"error": f"days must be between 0 and {MAX_MATERIALIZE_DAYS}"}), 400
+    try:
+        stats = timetable.materialize(days_ahead=days, start=start)
+    except Exception as exc:
+        return jsonify({"error": "db_error", "message": str(exc)}), 500
+    return jsonify({"status": "ok", **stats}), 200
+
+
+__all__ = ["timetable_bp"]
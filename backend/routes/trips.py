@@ -1,24 +1,24 @@
-from datetime import date, datetime, time as dt_time, timedelta
+from datetime import datetime, time as dt_time, timedelta
+from typing import List, NamedTuple, Optional
 
 from flask import Blueprint, request, jsonify
 
+from utils import queries
 from utils.database import db_connection
+from utils.serialization import (
+    SQL_DATETIME_FORMAT,
+    RowEncoder,
+    datetime_text,
+    db_rendering_requested,
+    json_rows_response,
+    or_zero,
+)
+from utils.versioning import conditional_get
+from services import events
 
 trips_bp = Blueprint("trips", __name__)
 
 
-def _format_datetime_value(raw_value):
-    """Convert date/datetime objects to consistent strings for JSON responses."""
-    if raw_value is None:
-        return None
-    if isinstance(raw_value, datetime):
-        return raw_value.strftime("%Y-%m-%d %H:%M:%S")
-    if isinstance(raw_value, date):
-        combined = datetime.combine(raw_value, datetime.min.time())
-        return combined.strftime("%Y-%m-%d %H:%M:%S")
-    return str(raw_value)
-
-
 def _extract_duration_parts(duration_value):
     """Return (hours, minutes) regardless of TIME/timedelta representation."""
     if duration_value is None:
@@ -48,94 +48,132 @@ def _format_duration_label(duration_value):
     return f"{hours}h {minutes}m"
 
 
+_trip_list_encoder = RowEncoder({
+    "trip_id": "trip_id",
+    "service_date": ("service_date", datetime_text),
+    "arrival_datetime": ("arrival_datetime", datetime_text),
+    "trip_status": "trip_status",
+    "bus_id": "bus_id",
+    "route_id": "route_id",
+    "bus_plate": "bus_plate",
+    "bus_type": "bus_type",
+    "bus_capacity": "bus_capacity",
+    "distance": ("distance", lambda value: float(value) if value else None),
+    "operator_id": "operator_id",
+    "operator_name": "operator_name",
+    "departure_city": "departure_city",
+    "departure_station": "departure_station",
+    "arrival_city": "arrival_city",
+    "arrival_station": "arrival_station",
+    "available_seats": ("available_seats", or_zero),
+    "route_name": lambda row: f"{row['departure_city']} -> {row['arrival_city']}",
+    "duration": ("default_duration_time", _format_duration_label),
+}, name="trips.get_trips")
+
+
+_TRIP_LIST_COLUMNS = """
+    SELECT 
+        t.trip_id,
+        t.service_date,
+        t.arrival_datetime,
+        t.trip_status,
+        t.bus_id,
+        t.route_id,
+        b.plate_number AS bus_plate,
+        b.vehicle_type AS bus_type,
+        b.capacity AS bus_capacity,
+        rt.distance,
+        rt.default_duration_time,
+        rt.operator_id,
+        o.brand_name AS operator_name,
+        ds.city AS departure_city,
+        ds.station_name AS departure_station,
+        das.city AS arrival_city,
+        das.station_name AS arrival_station,
+        fn_get_available_seats(t.trip_id) AS available_seats
+"""
+
+# Same document as _trip_list_encoder, built by MySQL. The two %s are
+# SQL_DATETIME_FORMAT; the duration CASE mirrors _format_duration_label.
+_TRIP_LIST_JSON = """
+    SELECT JSON_OBJECT(
+        'trip_id', t.trip_id,
+        'service_date', DATE_FORMAT(t.service_date, %s),
+        'arrival_datetime', DATE_FORMAT(t.arrival_datetime, %s),
+        'trip_status', t.trip_status,
+        'bus_id', t.bus_id,
+        'route_id', t.route_id,
+        'bus_plate', b.plate_number,
+        'bus_type', b.vehicle_type,
+        'bus_capacity', b.capacity,
+        'distance', CAST(NULLIF(rt.distance, 0) AS DOUBLE),
+        'operator_id', rt.operator_id,
+        'operator_name', o.brand_name,
+        'departure_city', ds.city,
+        'departure_station', ds.station_name,
+        'arrival_city', das.city,
+        'arrival_station', das.station_name,
+        'available_seats', COALESCE(fn_get_available_seats(t.trip_id), 0),
+        'route_name', CONCAT(ds.city, ' -> ', das.city),
+        'duration', CASE
+            WHEN rt.default_duration_time IS NULL THEN 'N/A'
+            WHEN MINUTE(rt.default_duration_time) = 0
+                THEN CONCAT(HOUR(rt.default_duration_time), 'h')
+            ELSE CONCAT(HOUR(rt.default_duration_time), 'h ',
+                        MINUTE(rt.default_duration_time), 'm')
+        END
+    )
+"""
+
+_TRIP_LIST_FROM = """
+    FROM trip t
+    INNER JOIN bus b ON t.bus_id = b.bus_id
+    INNER JOIN routetrip rt ON t.route_id = rt.route_id
+    INNER JOIN operator o ON rt.operator_id = o.operator_id
+    INNER JOIN station ds ON rt.station_id = ds.station_id
+    INNER JOIN station das ON rt.arrival_station = das.station_id
+"""
+
+
+def _trip_list_filters(filter_date, filter_status):
+    """Return the WHERE/ORDER BY tail shared by both trip listing paths."""
+    conditions = []
+    params = []
+    
+    if filter_date:
+        conditions.append("DATE(t.service_date) = %s")
+        params.append(filter_date)
+    
+    if filter_status and filter_status != "all":
+        conditions.append("t.trip_status = %s")
+        params.append(filter_status)
+    
+    query = ""
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    
+    query += " ORDER BY t.service_date DESC"
+    return query, params
+
+
 @trips_bp.route("", methods=["GET"])
 def get_trips():
     """Get all trips with route, bus, and operator information"""
+    # Get optional filters
+    filter_date = request.args.get("date")
+    filter_status = request.args.get("status")
+    filters, params = _trip_list_filters(filter_date, filter_status)
+
+    if db_rendering_requested():
+        return _get_trips_rendered(filters, params)
+
     conn = db_connection()
     cursor = conn.cursor(dictionary=True)
     try:
-        # Get optional filters
-        filter_date = request.args.get("date")
-        filter_status = request.args.get("status")
-        
-        query = """
-            SELECT 
-                t.trip_id,
-                t.service_date,
-                t.arrival_datetime,
-                t.trip_status,
-                t.bus_id,
-                t.route_id,
-                b.plate_number AS bus_plate,
-                b.vehicle_type AS bus_type,
-                b.capacity AS bus_capacity,
-                rt.distance,
-                rt.default_duration_time,
-                rt.operator_id,
-                o.brand_name AS operator_name,
-                ds.city AS departure_city,
-                ds.station_name AS departure_station,
-                das.city AS arrival_city,
-                das.station_name AS arrival_station,
-                fn_get_available_seats(t.trip_id) AS available_seats
-            FROM trip t
-            INNER JOIN bus b ON t.bus_id = b.bus_id
-            INNER JOIN routetrip rt ON t.route_id = rt.route_id
-            INNER JOIN operator o ON rt.operator_id = o.operator_id
-            INNER JOIN station ds ON rt.station_id = ds.station_id
-            INNER JOIN station das ON rt.arrival_station = das.station_id
-        """
-        
-        conditions = []
-        params = []
-        
-        if filter_date:
-            conditions.append("DATE(t.service_date) = %s")
-            params.append(filter_date)
-        
-        if filter_status and filter_status != "all":
-            conditions.append("t.trip_status = %s")
-            params.append(filter_status)
-        
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
-        
-        query += " ORDER BY t.service_date DESC"
-        
-        cursor.execute(query, params)
+        cursor.execute(_TRIP_LIST_COLUMNS + _TRIP_LIST_FROM + filters, params)
         trips = cursor.fetchall()
         
-        # Format data for frontend
-        formatted_trips = []
-        for trip in trips:
-            service_date_str = _format_datetime_value(trip["service_date"])
-            arrival_str = _format_datetime_value(trip["arrival_datetime"])
-            formatted_trip = {
-                "trip_id": trip["trip_id"],
-                "service_date": service_date_str,
-                "arrival_datetime": arrival_str,
-                "trip_status": trip["trip_status"],
-                "bus_id": trip["bus_id"],
-                "route_id": trip["route_id"],
-                "bus_plate": trip["bus_plate"],
-                "bus_type": trip["bus_type"],
-                "bus_capacity": trip["bus_capacity"],
-                "distance": float(trip["distance"]) if trip["distance"] else None,
-                "operator_id": trip["operator_id"],
-                "operator_name": trip["operator_name"],
-                "departure_city": trip["departure_city"],
-                "departure_station": trip["departure_station"],
-                "arrival_city": trip["arrival_city"],
-                "arrival_station": trip["arrival_station"],
-                "available_seats": trip["available_seats"] if trip["available_seats"] is not None else 0,
-                "route_name": f"{trip['departure_city']} -> {trip['arrival_city']}"
-            }
-            
-            formatted_trip["duration"] = _format_duration_label(trip.get("default_duration_time"))
-            
-            formatted_trips.append(formatted_trip)
-        
-        return jsonify({"data": formatted_trips}), 200
+        return jsonify({"data": _trip_list_encoder(trips)}), 200
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -144,6 +182,22 @@ def get_trips():
         conn.close()
 
 
+def _get_trips_rendered(filters, params):
+    """Trip listing with every row formatted by MySQL, streamed without decoding."""
+    conn = db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            _TRIP_LIST_JSON + _TRIP_LIST_FROM + filters,
+            [SQL_DATETIME_FORMAT, SQL_DATETIME_FORMAT] + params,
+        )
+    except Exception as e:
+        cursor.close()
+        conn.close()
+        return jsonify({"error": str(e)}), 500
+    return json_rows_response(conn, cursor)
+
+
 @trips_bp.route("", methods=["POST"])
 def create_trip():
     """Create a new trip using sp_schedule_trip stored procedure"""
@@ -173,16 +227,14 @@ def create_trip():
     cursor = conn.cursor()
     try:
         # Check if bus exists and is active
-        cursor.execute("SELECT bus_id, bus_active_flag FROM bus WHERE bus_id = %s", (bus_id,))
-        bus = cursor.fetchone()
+        bus = queries.fetchone(conn, queries.BUS_STATE, (bus_id,))
         if not bus:
             return jsonify({"error": "Bus not found"}), 404
-        if bus[1] != "Active":
-            return jsonify({"error": f"Bus is not active. Current status: {bus[1]}"}), 400
+        if bus["bus_active_flag"] != "Active":
+            return jsonify({"error": f"Bus is not active. Current status: {bus['bus_active_flag']}"}), 400
         
         # Check if route exists
-        cursor.execute("SELECT route_id FROM routetrip WHERE route_id = %s", (route_id,))
-        if cursor.fetchone() is None:
+        if queries.fetchone(conn, queries.ROUTE_EXISTS, (route_id,)) is None:
             return jsonify({"error": "Route not found"}), 404
         
         # Call stored procedure to schedule trip
@@ -197,6 +249,7 @@ def create_trip():
         trip_id = result[0] if result else None
         
         conn.commit()
+        events.publish(events.TRIPS_CHANGED, dates=events.service_dates(service_date_obj), trip_ids=[trip_id])
         
         return jsonify({
             "message": "Trip scheduled successfully",
@@ -236,12 +289,11 @@ def update_trip(trip_id):
     cursor = conn.cursor()
     try:
         # Check if trip exists
-        cursor.execute("SELECT trip_id, trip_status FROM trip WHERE trip_id = %s", (trip_id,))
-        trip = cursor.fetchone()
+        trip = queries.fetchone(conn, queries.TRIP_STATE, (trip_id,))
         if not trip:
             return jsonify({"error": "Trip not found"}), 404
         
-        current_status = trip[1]
+        current_status = trip["trip_status"]
         
         # Prevent updating completed trips
         if current_status in ["Arrived", "Cancelled"] and "trip_status" not in update_fields:
@@ -260,6 +312,11 @@ def update_trip(trip_id):
         update_query = f"UPDATE trip SET {', '.join(set_clauses)} WHERE trip_id = %s"
         cursor.execute(update_query, values)
         conn.commit()
+        events.publish(
+            events.TRIPS_CHANGED,
+            dates=events.service_dates(trip["service_date"], update_fields.get("service_date")),
+            trip_ids=[trip_id],
+        )
         
         return jsonify({"message": "Trip updated successfully"}), 200
         
@@ -279,31 +336,21 @@ def update_trip(trip_id):
 def delete_trip(trip_id):
     """Cancel a trip (sets status to Cancelled rather than deleting)"""
     conn = db_connection()
-    cursor = conn.cursor()
     try:
         # Check if trip exists
-        cursor.execute("SELECT trip_id, trip_status FROM trip WHERE trip_id = %s", (trip_id,))
-        trip = cursor.fetchone()
+        trip = queries.fetchone(conn, queries.TRIP_STATE, (trip_id,))
         if not trip:
             return jsonify({"error": "Trip not found"}), 404
         
-        current_status = trip[1]
+        current_status = trip["trip_status"]
         
         # Check if trip can be cancelled
         if current_status in ["Arrived", "Cancelled"]:
             return jsonify({"error": f"Cannot cancel trip with status: {current_status}"}), 400
         
         # Check if there are confirmed tickets
-        cursor.execute(
-            """
-            SELECT COUNT(*) as ticket_count 
-            FROM ticket 
-            WHERE trip_id = %s AND ticket_status = 'Issued'
-        """,
-            (trip_id,),
-        )
-        result = cursor.fetchone()
-        ticket_count = result[0] if result else 0
+        result = queries.fetchone(conn, queries.TRIP_ISSUED_TICKETS, (trip_id,))
+        ticket_count = result["ticket_count"] if result else 0
         
         if ticket_count > 0:
             return jsonify({
@@ -312,8 +359,9 @@ def delete_trip(trip_id):
             }), 409
         
         # Update status to Cancelled instead of deleting
-        cursor.execute("UPDATE trip SET trip_status = 'Cancelled' WHERE trip_id = %s", (trip_id,))
+        queries.execute(conn, queries.CANCEL_TRIP, (trip_id,))
         conn.commit()
+        events.publish(events.TRIPS_CHANGED, dates=events.service_dates(trip["service_date"]), trip_ids=[trip_id])
         
         return jsonify({"message": "Trip cancelled successfully"}), 200
         
@@ -321,121 +369,92 @@ def delete_trip(trip_id):
         conn.rollback()
         return jsonify({"error": str(e)}), 500
     finally:
-        cursor.close()
         conn.close()
 
 
+class SeatMap(NamedTuple):
+    capacity: Optional[int]
+    booked_seats: List[str]
+    # Issued/Used tickets, with or without a seat code
+    booked: int
+
+    @property
+    def available(self) -> Optional[int]:
+        """What fn_get_available_seats returns: capacity minus booked tickets (None without a bus)."""
+        return None if self.capacity is None else self.capacity - self.booked
+
+
+def seat_map(rows):
+    """`SeatMap` from `queries.TRIP_SEAT_MAP` rows, None for an unknown trip."""
+    if not rows:
+        return None
+    return SeatMap(
+        capacity=rows[0]["capacity"],
+        booked_seats=[row["seat_code"] for row in rows if row["seat_code"] is not None],
+        booked=sum(row["ticket_id"] is not None for row in rows),
+    )
+
+
 @trips_bp.route("/<int:trip_id>/booked-seats", methods=["GET"])
 def get_booked_seats(trip_id):
     """Get booked seats for a trip - simple endpoint for seat selector"""
     conn = db_connection()
-    cursor = conn.cursor(dictionary=True)
     try:
-        # Check if trip exists
-        cursor.execute("SELECT trip_id FROM trip WHERE trip_id = %s", (trip_id,))
-        if cursor.rowcount == 0:
+        seats = seat_map(queries.fetchall(conn, queries.TRIP_SEAT_MAP, (trip_id,)))
+        if seats is None:
             return jsonify({"error": "Trip not found"}), 404
         
-        # Get booked seats
-        cursor.execute(
-            """
-            SELECT seat_code 
-            FROM ticket 
-            WHERE trip_id = %s AND ticket_status IN ('Issued', 'Used')
-            ORDER BY seat_code
-        """,
-            (trip_id,),
-        )
-        booked_seats = [row["seat_code"] for row in cursor.fetchall()]
-        
         return jsonify({
             "trip_id": trip_id,
-            "booked_seats": booked_seats
+            "booked_seats": seats.booked_seats
         }), 200
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
-        cursor.close()
         conn.close()
 
 
+def _seat_summary(trip_id, total_capacity, available_seats, booked_seats):
+    """Seat map document of `get_trip_seats` (also served by asgi.py)."""
+    return {
+        "trip_id": trip_id,
+        "total_capacity": total_capacity,
+        "available_seats": available_seats,
+        "booked_seats": booked_seats,
+        "occupancy_rate": round(((total_capacity - available_seats) / total_capacity * 100), 2) if total_capacity > 0 else 0
+    }
+
+
 @trips_bp.route("/<int:trip_id>/seats", methods=["GET"])
 def get_trip_seats(trip_id):
     """Get available seats for a trip"""
     conn = db_connection()
-    cursor = conn.cursor(dictionary=True)
     try:
-        # Check if trip exists
-        cursor.execute("SELECT trip_id FROM trip WHERE trip_id = %s", (trip_id,))
-        if cursor.rowcount == 0:
+        # Capacity and booked seats in one read; availability follows from them
+        seats = seat_map(queries.fetchall(conn, queries.TRIP_SEAT_MAP, (trip_id,)))
+        if seats is None:
             return jsonify({"error": "Trip not found"}), 404
         
-        # Get available seats using function
-        cursor.execute("SELECT fn_get_available_seats(%s) AS available_seats", (trip_id,))
-        result = cursor.fetchone()
-        available_seats = result["available_seats"] if result else 0
-        
-        # Get bus capacity
-        cursor.execute("""
-            SELECT b.capacity 
-            FROM trip t 
-            INNER JOIN bus b ON t.bus_id = b.bus_id 
-            WHERE t.trip_id = %s
-        """, (trip_id,))
-        capacity_result = cursor.fetchone()
-        total_capacity = capacity_result["capacity"] if capacity_result else 0
-        
-        # Get booked seats
-        cursor.execute(
-            """
-            SELECT seat_code 
-            FROM ticket 
-            WHERE trip_id = %s AND ticket_status IN ('Issued', 'Used')
-            ORDER BY seat_code
-        """,
-            (trip_id,),
-        )
-        booked_seats = [row["seat_code"] for row in cursor.fetchall()]
-        
-        return jsonify({
-            "trip_id": trip_id,
-            "total_capacity": total_capacity,
-            "available_seats": available_seats,
-            "booked_seats": booked_seats,
-            "occupancy_rate": round(((total_capacity - available_seats) / total_capacity * 100), 2) if total_capacity > 0 else 0
-        }), 200
+        return jsonify(_seat_summary(trip_id, seats.capacity or 0, seats.available, seats.booked_seats)), 200
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
-        cursor.close()
         conn.close()
 
 
 @trips_bp.route("/buses/active", methods=["GET"])
+@conditional_get("bus")
 def get_active_buses():
     """Get all active buses - public endpoint for trip scheduling"""
     conn = db_connection()
-    cursor = conn.cursor(dictionary=True)
     try:
-        cursor.execute("""
-            SELECT 
-                bus_id,
-                plate_number,
-                bus_active_flag,
-                capacity,
-                vehicle_type
-            FROM bus
-            WHERE bus_active_flag = 'Active'
-            ORDER BY vehicle_type, plate_number
-        """)
-        buses = cursor.fetchall()
+        buses = queries.fetchall(conn, queries.ACTIVE_BUSES)
         return jsonify(buses), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
-        cursor.close()
         conn.close()
 
 
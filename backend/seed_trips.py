@@ -1,16 +1,19 @@
+import argparse
+import json
+import os
+import tempfile
 import time
-from datetime import datetime, timedelta
-import random
 import logging
-from apscheduler.schedulers.background import BackgroundScheduler
-from utils.database import db_connection
+import threading
+from utils.database import db_connection, load_env
+from services import fare_calendar, occupancy, revenue, timetable
 
 # Setup basic logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 def delete_old_trips():
-    """Delete trips that are older than 7 days based on arrival_datetime"""
+    """Delete trips that are older than 7 days based on arrival_datetime; False when it failed"""
     try:
         cnx = db_connection()
         cursor = cnx.cursor()
@@ -21,108 +24,213 @@ def delete_old_trips():
             WHERE arrival_datetime < DATE_SUB(NOW(), INTERVAL 7 DAY)
         """
         cursor.execute(delete_query)
+        deleted_count = cursor.rowcount
+        # Past generation markers are never consulted again
+        cursor.execute("""
+            DELETE FROM timetable_materialization
+            WHERE service_date < DATE_SUB(CURDATE(), INTERVAL 7 DAY)
+        """)
         cnx.commit()
         
-        deleted_count = cursor.rowcount
         logger.info(f"Deleted {deleted_count} old trips.")
         
         cursor.close()
         cnx.close()
     except Exception as e:
         logger.error(f"Error deleting old trips: {e}")
+        return False
+    return True
 
 
 def generate_upcoming_trips(days_ahead=3):
     """
-    Generate trips for upcoming days (e.g., today to today + days_ahead).
-    Makes sure trips aren't duplicated.
+    Generate trips for upcoming days (e.g., today to today + days_ahead)
+    from the route timetables (services/timetable.py).
+    Only route-days that were not generated before are touched, and
+    route-days that already have trips are left as they are.
+    Returns False when it failed.
     """
     try:
-        cnx = db_connection()
-        cursor = cnx.cursor(dictionary=True)
-        
-        # 1. Get all routes
-        cursor.execute("SELECT route_id FROM routetrip")
-        routes = cursor.fetchall()
-        
-        # 2. Get all active buses
-        cursor.execute("SELECT bus_id FROM bus WHERE bus_active_flag = 'Active'")
-        active_buses = cursor.fetchall()
-        
-        if not routes or not active_buses:
-            logger.warning("No routes or active buses found. Cannot generate trips.")
-            return
-
-        today = datetime.now().date()
-        trips_created = 0
-
-        # Departure hours distributions
-        departure_hours = ["07:00:00", "13:30:00", "20:00:00"]
-        
-        for day_offset in range(0, days_ahead + 1):
-            target_date = today + timedelta(days=day_offset)
-            
-            for route in routes:
-                route_id = route['route_id']
-                
-                # Check if trips already exist for this route on this target_date
-                check_query = """
-                    SELECT COUNT(*) as count 
-                    FROM trip 
-                    WHERE route_id = %s AND DATE(service_date) = %s
-                """
-                cursor.execute(check_query, (route_id, target_date))
-                count = cursor.fetchone()['count']
-                
-                # If trips already scheduled for this route on this date, skip
-                if count > 0:
-                    continue
-                
-                # Create a few trips across the day
-                for time_str in departure_hours:
-                    # Randomly select an active bus
-                    bus_id = random.choice(active_buses)['bus_id']
-                    
-                    service_datetime_str = f"{target_date} {time_str}"
-                    
-                    insert_query = """
-                        INSERT INTO trip (trip_status, service_date, bus_id, route_id) 
-                        VALUES ('Scheduled', %s, %s, %s)
-                    """
-                    cursor.execute(insert_query, (service_datetime_str, bus_id, route_id))
-                    trips_created += 1
-                
-        cnx.commit()
-        logger.info(f"Generated {trips_created} new trips for the next {days_ahead} days.")
-        
-        cursor.close()
-        cnx.close()
+        stats = timetable.materialize(days_ahead=days_ahead)
+        logger.info(
+            f"Generated {stats['created']} new trips for the next {days_ahead} days "
+            f"({stats['slots']} new route-days, {stats['existing']} already had trips, "
+            f"{stats['failed']} departures without a free bus)."
+        )
     except Exception as e:
         logger.error(f"Error generating trips: {e}")
+        return False
+    return True
 
 def run_jobs():
+    """Run every maintenance step, even after one fails; False when any failed"""
     logger.info("Starting automated trip maintenance job...")
-    delete_old_trips()
+    ok = delete_old_trips()
     # Ensure flights are populated for the next 7 days continuously
-    generate_upcoming_trips(days_ahead=7)
+    ok = generate_upcoming_trips(days_ahead=7) and ok
+    # Rebuild the calendar summary so writes missed by event listeners
+    # (other workers, direct SQL) do not linger
+    try:
+        fare_calendar.refresh_window(days_ahead=60)
+    except Exception as e:
+        logger.error(f"Error refreshing fare calendar: {e}")
+        ok = False
+    try:
+        revenue.refresh_window()
+    except Exception as e:
+        logger.error(f"Error refreshing revenue facts: {e}")
+        ok = False
     logger.info("Finished automated trip maintenance job.")
+    return ok
+
+def snapshot_occupancy():
+    """Record seats sold of trips that have departed since the last run; False when it failed"""
+    try:
+        count = occupancy.take_snapshots()
+        if count:
+            logger.info(f"Recorded occupancy of {count} departed trips.")
+    except Exception as e:
+        logger.error(f"Error taking occupancy snapshots: {e}")
+        return False
+    return True
+
+
+# Last run of each job, shared with the web workers' health probe (utils/health.py)
+def _state_file():
+    return os.getenv("SCHEDULER_STATE_FILE") or os.path.join(tempfile.gettempdir(), "vietbus-scheduler.json")
+
+
+# Seconds between runs of each job; the health probe flags one not run for twice as long
+JOB_INTERVALS = {"daily_trip_job": 24 * 60 * 60, "occupancy_snapshot_job": 10 * 60}
+_state_lock = threading.Lock()
+
+
+def scheduler_state():
+    """``{"started_at", "pid", "jobs": {job_id: {"finished_at", "seconds", "ok"}}}`` or None."""
+    try:
+        with open(_state_file(), encoding="utf-8") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def _update_state(change):
+    with _state_lock:
+        state = scheduler_state() or {"jobs": {}}
+        change(state)
+        # Readers in other processes must never see a half-written file
+        partial = f"{_state_file()}.{os.getpid()}"
+        try:
+            with open(partial, "w", encoding="utf-8") as handle:
+                json.dump(state, handle)
+            os.replace(partial, _state_file())
+        except OSError as e:
+            logger.error(f"Error writing scheduler state: {e}")
+
+
+def _tracked(job_id, func):
+    """Run ``func`` and record the run; it failed when it raised or returned False."""
+    def run():
+        started = time.time()
+        try:
+            ok = func() is not False
+            if not ok:
+                logger.error(f"Job {job_id} failed")
+        except Exception as e:
+            ok = False
+            logger.error(f"Job {job_id} failed: {e}")
+        finished = time.time()
+        _update_state(lambda state: state["jobs"].update(
+            {job_id: {"finished_at": finished, "seconds": round(finished - started, 3), "ok": ok}}
+        ))
+    return run
+
+
+def _mark_started():
+    _update_state(lambda state: state.update(started_at=time.time(), pid=os.getpid()))
+
+
+# pid that started the scheduler / queued the deferred start; forks start over
+_scheduler_pid = None
+_deferred_pid = None
+_scheduler_lock = threading.Lock()
+
+
+def _add_jobs(scheduler):
+    # Add daily job at 00:00 AM
+    scheduler.add_job(func=_tracked("daily_trip_job", run_jobs), trigger="cron", hour=0, minute=0, id="daily_trip_job", replace_existing=True)
+    # Occupancy snapshots close to each departure
+    scheduler.add_job(func=_tracked("occupancy_snapshot_job", snapshot_occupancy), trigger="interval", minutes=10, id="occupancy_snapshot_job", replace_existing=True)
+
 
 def init_scheduler(app=None):
     """
     Initialize the APScheduler inside the Flask app.
     Runs on a regular schedule at 00:00 every day.
+    Starts at most one scheduler per process.
     """
-    # Create the scheduler
-    scheduler = BackgroundScheduler(daemon=True)
-    
-    # Add daily job at 00:00 AM
-    scheduler.add_job(func=run_jobs, trigger="cron", hour=0, minute=0, id="daily_trip_job", replace_existing=True)
-    
-    # Start the scheduler
-    scheduler.start()
+    global _scheduler_pid
+    with _scheduler_lock:
+        if _scheduler_pid == os.getpid():
+            return
+        # Imported here: APScheduler is not needed until the jobs start
+        from apscheduler.schedulers.background import BackgroundScheduler
+
+        scheduler = BackgroundScheduler(daemon=True)
+        _add_jobs(scheduler)
+        scheduler.start()
+        _scheduler_pid = os.getpid()
+    _mark_started()
     logger.info("APScheduler initialized to run daily at 00:00.")
 
+
+def start_scheduler(app, mode=None):
+    """
+    Start the jobs as ``SCHEDULER_MODE`` says:
+
+    - ``deferred`` (default): on a background thread once the app has
+      served its first request, so start-up does not wait for it,
+    - ``inline``: right now, while the app is being set up,
+    - ``off``: not in this process; run ``python seed_trips.py --serve``
+      as a separate process instead (the default under gunicorn, whose
+      preloaded master must not start threads before it forks workers).
+    """
+    mode = mode or os.getenv("SCHEDULER_MODE", "deferred")
+    if mode == "inline":
+        init_scheduler(app)
+    elif mode == "deferred":
+        @app.after_request
+        def _start_scheduler(response):
+            global _deferred_pid
+            if _deferred_pid != os.getpid():
+                _deferred_pid = os.getpid()
+                threading.Thread(target=init_scheduler, args=(app,), name="scheduler-start", daemon=True).start()
+            return response
+    elif mode != "off":
+        raise ValueError(f"SCHEDULER_MODE must be deferred, inline or off, not {mode!r}")
+
+
+def serve():
+    """Run the jobs in the foreground, for a process of their own (SCHEDULER_MODE=off elsewhere)."""
+    from apscheduler.schedulers.blocking import BlockingScheduler
+
+    scheduler = BlockingScheduler()
+    _add_jobs(scheduler)
+    logger.info("Scheduler process started; jobs run daily at 00:00 and every 10 minutes.")
+    _mark_started()
+    try:
+        scheduler.start()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+
+
 if __name__ == "__main__":
-    # If run standalone as a script
-    print("Running trip seed script manually.")
-    run_jobs()
+    load_env()
+    parser = argparse.ArgumentParser(description="Trip maintenance jobs")
+    parser.add_argument("--serve", action="store_true", help="keep running the scheduled jobs")
+    if parser.parse_args().serve:
+        serve()
+    else:
+        # If run standalone as a script
+        print("Running trip seed script manually.")
+        run_jobs()
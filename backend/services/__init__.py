@@ -0,0 +1 @@
+"""Domain services used by the route blueprints (in-memory engines, derived data)."""
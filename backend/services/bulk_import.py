@@ -0,0 +1,528 @@
+"""Streaming CSV/NDJSON import of stations, buses, routes and fares.
+
+The input is read incrementally (`iter_records`), so memory does not grow
+with the file. Each record is cleaned with the same rules as the single-record
+admin endpoints, then handled in batches of ``batch_size``:
+
+- foreign keys (operator, station, route) are checked with one
+  ``SELECT ... IN`` per referenced table,
+- unique columns (``station_name``, ``plate_number``) are checked with one
+  ``IN`` query against the table plus a set of the values seen earlier in the
+  file,
+- accepted rows are written with one multi-row ``INSERT``.
+
+Every rejected line lands in the report with its line number and a reason.
+By default each batch commits on its own. ``atomic`` keeps the whole file in
+one transaction and writes nothing if any line is rejected. ``dry_run``
+validates only. Admin endpoints live in `routes.imports`; the same pipeline
+runs from the command line::
+
+    python -m services.bulk_import stations stations.csv --errors errors.ndjson
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.database import db_connection, load_env
+from utils.serialization import dumps_bytes, loads_bytes
+from utils.versioning import bump_table_versions
+
+FORMATS = ("csv", "ndjson")
+ACTIVE_FLAGS = ("Active", "Inactive", "Maintenance")
+VEHICLE_TYPES = ("Sleeper", "Seater", "Limousine")
+SEAT_CLASSES = ("VIP", "Standard", "Economy")
+MAX_BUS_CAPACITY = 60
+
+# (line number, record, parse error code)
+Record = Tuple[int, Optional[dict], Optional[str]]
+
+
+class RowError(ValueError):
+    def __init__(self, code: str, field: Optional[str] = None) -> None:
+        super().__init__(code)
+        self.code = code
+        self.field = field
+
+
+# -- parsing -----------------------------------------------------------------
+
+def detect_format(filename: Optional[str] = None, content_type: Optional[str] = None) -> Optional[str]:
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    content_type = (content_type or "").lower()
+    if "csv" in content_type:
+        return "csv"
+    if "ndjson" in content_type or "jsonl" in content_type:
+        return "ndjson"
+    return None
+
+
+def iter_records(stream, fmt: str) -> Iterator[Record]:
+    """Yield ``(line, record, error)`` from a binary ``stream`` without reading it whole."""
+    if fmt == "csv":
+        text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+        reader = csv.reader(text)
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = [name.strip().lower() for name in header]
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            if len(row) != len(columns):
+                yield reader.line_num, None, "column_count_mismatch"
+                continue
+            yield reader.line_num, dict(zip(columns, row)), None
+    elif fmt == "ndjson":
+        for line_no, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                record = loads_bytes(line)
+            except ValueError:
+                yield line_no, None, "invalid_json"
+                continue
+            if not isinstance(record, dict):
+                yield line_no, None, "not_an_object"
+                continue
+            yield line_no, {str(key).lower(): value for key, value in record.items()}, None
+    else:
+        raise ValueError(f"format must be one of {FORMATS}")
+
+
+# -- field cleaning ----------------------------------------------------------
+
+def _value(record: dict, name: str, required: bool = True):
+    value = record.get(name)
+    if isinstance(value, str):
+        value = value.strip()
+    if value in (None, ""):
+        if required:
+            raise RowError("missing_field", name)
+        return None
+    return value
+
+
+def _text(record, name, required=True):
+    value = _value(record, name, required)
+    return None if value is None else str(value)
+
+
+def _int(record, name, required=True):
+    value = _value(record, name, required)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise RowError("invalid_integer", name) from None
+
+
+def _float(record, name, required=True, default=None):
+    value = _value(record, name, required)
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise RowError("invalid_number", name) from None
+
+
+def _choice(record, name, allowed, default=None):
+    value = _text(record, name, required=default is None) or default
+    if value not in allowed:
+        raise RowError("invalid_choice", name)
+    return value
+
+
+def _date(record, name):
+    value = _text(record, name)
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise RowError("invalid_date", name) from None
+
+
+def _clock(record, name):
+    value = _text(record, name)
+    if len(value) == 5:
+        value += ":00"
+    try:
+        datetime.strptime(value, "%H:%M:%S")
+    except ValueError:
+        raise RowError("invalid_time", name) from None
+    return value
+
+
+def clean_station(record: dict) -> dict:
+    return {
+        "city": _text(record, "city"),
+        "active_flag": _choice(record, "active_flag", ACTIVE_FLAGS, default="Active"),
+        "station_name": _text(record, "station_name"),
+        "latitude": _float(record, "latitude"),
+        "longtitude": _float(record, "longtitude"),
+        "province": _text(record, "province"),
+        "address_station": _text(record, "address_station"),
+        "operator_id": _text(record, "operator_id"),
+    }
+
+
+def clean_bus(record: dict) -> dict:
+    capacity = _int(record, "capacity")
+    if not 1 <= capacity <= MAX_BUS_CAPACITY:
+        raise RowError("capacity_out_of_range", "capacity")
+    return {
+        "plate_number": _text(record, "plate_number"),
+        "bus_active_flag": _choice(record, "bus_active_flag", ACTIVE_FLAGS, default="Active"),
+        "capacity": capacity,
+        "vehicle_type": _choice(record, "vehicle_type", VEHICLE_TYPES),
+    }
+
+
+def clean_route(record: dict) -> dict:
+    return {
+        "default_duration_time": _clock(record, "default_duration_time"),
+        "distance": _int(record, "distance"),
+        "station_id": _int(record, "station_id"),
+        "arrival_station": _int(record, "arrival_station", required=False),
+        "operator_id": _text(record, "operator_id"),
+    }
+
+
+def clean_fare(record: dict) -> dict:
+    values = {
+        "currency": _text(record, "currency"),
+        "discount": _float(record, "discount", required=False, default=0.0),
+        "valid_from": _date(record, "valid_from"),
+        "valid_to": _date(record, "valid_to"),
+        "taxes": _float(record, "taxes", required=False, default=0.0),
+        "route_id": _int(record, "route_id"),
+        "surcharges": _float(record, "surcharges", required=False, default=0.0),
+        "base_fare": _float(record, "base_fare"),
+        "seat_price": _float(record, "seat_price"),
+        "seat_class": _choice(record, "seat_class", SEAT_CLASSES),
+    }
+    if values["valid_to"] < values["valid_from"]:
+        raise RowError("invalid_date_range", "valid_to")
+    return values
+
+
+@dataclass(frozen=True)
+class EntitySpec:
+    table: str
+    clean: Callable[[dict], dict]
+    # (field, referenced table, referenced key)
+    references: Tuple[Tuple[str, str, str], ...] = ()
+    # Column that must not exist yet nor repeat within the file
+    unique: Optional[str] = None
+    version_tables: Tuple[str, ...] = ()
+
+
+SPECS: Dict[str, EntitySpec] = {
+    "stations": EntitySpec(
+        "station", clean_station,
+        references=(("operator_id", "operator", "operator_id"),),
+        unique="station_name",
+        version_tables=("station",),
+    ),
+    "buses": EntitySpec(
+        "bus", clean_bus,
+        unique="plate_number",
+        version_tables=("bus",),
+    ),
+    "routes": EntitySpec(
+        "routetrip", clean_route,
+        references=(
+            ("station_id", "station", "station_id"),
+            ("arrival_station", "station", "station_id"),
+            ("operator_id", "operator", "operator_id"),
+        ),
+        version_tables=("routetrip",),
+    ),
+    "fares": EntitySpec(
+        "fare", clean_fare,
+        references=(("route_id", "routetrip", "route_id"),),
+        version_tables=("fare",),
+    ),
+}
+
+
+# -- pipeline ----------------------------------------------------------------
+
+@dataclass
+class ImportReport:
+    kind: str
+    dry_run: bool = False
+    atomic: bool = False
+    lines: int = 0
+    inserted: int = 0
+    rejected: int = 0
+    committed: bool = False
+    errors: List[dict] = field(default_factory=list)
+    max_errors: int = 1000
+    error_sink: Optional[Callable[[dict], None]] = None
+    elapsed_ms: float = 0.0
+
+    def add_error(self, line: int, code: str, field: Optional[str] = None) -> None:
+        self.rejected += 1
+        error = {"line": line, "error": code}
+        if field:
+            error["field"] = field
+        if self.error_sink is not None:
+            self.error_sink(error)
+        if len(self.errors) < self.max_errors:
+            self.errors.append(error)
+
+    def to_json(self) -> dict:
+        seconds = self.elapsed_ms / 1000
+        return {
+            "kind": self.kind,
+            "dry_run": self.dry_run,
+            "atomic": self.atomic,
+            "lines": self.lines,
+            "inserted": self.inserted,
+            "rejected": self.rejected,
+            "committed": self.committed,
+            "elapsed_ms": round(self.elapsed_ms, 1),
+            "rows_per_second": round(self.lines / seconds) if seconds else None,
+            # Lookup errors are recorded when their batch flushes, after parse errors
+            "errors": sorted(self.errors, key=lambda error: error["line"]),
+            "errors_truncated": self.rejected > len(self.errors),
+        }
+
+
+def _existing(cursor, table: str, column: str, values: Iterable) -> set:
+    values = sorted({value for value in values if value is not None}, key=str)
+    if not values:
+        return set()
+    placeholders = ", ".join(["%s"] * len(values))
+    cursor.execute(f"SELECT {column} FROM {table} WHERE {column} IN ({placeholders})", values)
+    found = {row[0] for row in cursor.fetchall()}
+    if values and isinstance(values[0], str):
+        # Match the case-insensitive collation of the unique/key columns
+        return {str(value).casefold() for value in found}
+    return found
+
+
+def _key(value):
+    return value.casefold() if isinstance(value, str) else value
+
+
+class _Importer:
+    def __init__(self, spec: EntitySpec, report: ImportReport, cursor, conn) -> None:
+        self.spec = spec
+        self.report = report
+        self.cursor = cursor
+        self.conn = conn
+        self.seen = set()
+
+    def validate(self, batch: List[Tuple[int, dict]]) -> List[Tuple[int, dict]]:
+        spec, cursor = self.spec, self.cursor
+        lookups = {}
+        for _, table, column in spec.references:
+            if (table, column) not in lookups:
+                related = [f for f, t, c in spec.references if (t, c) == (table, column)]
+                lookups[(table, column)] = _existing(
+                    cursor, table, column, (values[f] for _, values in batch for f in related)
+                )
+        taken = set()
+        if spec.unique:
+            taken = _existing(cursor, spec.table, spec.unique, (values[spec.unique] for _, values in batch))
+
+        accepted = []
+        for line, values in batch:
+            missing = next(
+                (name for name, table, column in spec.references
+                 if values[name] is not None and _key(values[name]) not in lookups[(table, column)]),
+                None,
+            )
+            if missing:
+                self.report.add_error(line, f"{missing}_not_found", missing)
+                continue
+            if spec.unique:
+                key = _key(values[spec.unique])
+                if key in taken:
+                    self.report.add_error(line, "already_exists", spec.unique)
+                    continue
+                if key in self.seen:
+                    self.report.add_error(line, "duplicate_in_file", spec.unique)
+                    continue
+                self.seen.add(key)
+            accepted.append((line, values))
+        return accepted
+
+    def insert(self, rows: List[Tuple[int, dict]]) -> None:
+        columns = list(rows[0][1])
+        row_sql = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        params = [values[column] for _, values in rows for column in columns]
+        self.cursor.execute(
+            f"INSERT INTO {self.spec.table} ({', '.join(columns)}) VALUES "
+            + ", ".join([row_sql] * len(rows)),
+            params,
+        )
+
+    def insert_rows_one_by_one(self, rows: List[Tuple[int, dict]]) -> int:
+        """After a failed batch: find the offending lines, keep the rest."""
+        inserted = 0
+        for line, values in rows:
+            try:
+                self.insert([(line, values)])
+                self.conn.commit()
+                inserted += 1
+            except Exception as exc:
+                self.conn.rollback()
+                self.report.add_error(line, f"db_error: {exc}")
+        return inserted
+
+    def flush(self, batch: List[Tuple[int, dict]]) -> None:
+        report = self.report
+        accepted = self.validate(batch)
+        if report.dry_run or not accepted:
+            return
+        if report.atomic:
+            if report.rejected:
+                return  # nothing will be committed anyway
+            self.insert(accepted)
+            report.inserted += len(accepted)
+            return
+        try:
+            self.insert(accepted)
+            bump_table_versions(self.cursor, *self.spec.version_tables)
+            self.conn.commit()
+            report.inserted += len(accepted)
+        except Exception:
+            self.conn.rollback()
+            inserted = self.insert_rows_one_by_one(accepted)
+            if inserted:
+                bump_table_versions(self.cursor, *self.spec.version_tables)
+                self.conn.commit()
+            report.inserted += inserted
+        report.committed = report.committed or report.inserted > 0
+        self.conn.start_transaction()
+
+
+def import_records(
+    kind: str,
+    records: Iterable[Record],
+    *,
+    batch_size: int = 1000,
+    atomic: bool = False,
+    dry_run: bool = False,
+    max_errors: int = 1000,
+    error_sink: Optional[Callable[[dict], None]] = None,
+) -> ImportReport:
+    """Validate and insert ``records`` of ``kind`` (stations, buses, routes, fares)."""
+    spec = SPECS[kind]
+    report = ImportReport(kind, dry_run=dry_run, atomic=atomic, max_errors=max_errors,
+                          error_sink=error_sink)
+    started = time.perf_counter()
+    conn = db_connection()
+    cursor = conn.cursor()
+    importer = _Importer(spec, report, cursor, conn)
+    try:
+        conn.start_transaction()
+        batch = []
+        for line, record, error in records:
+            report.lines += 1
+            if error:
+                report.add_error(line, error)
+                continue
+            try:
+                batch.append((line, spec.clean(record)))
+            except RowError as exc:
+                report.add_error(line, exc.code, exc.field)
+                continue
+            if len(batch) >= batch_size:
+                importer.flush(batch)
+                batch = []
+        if batch:
+            importer.flush(batch)
+
+        if atomic and not dry_run and report.inserted and not report.rejected:
+            bump_table_versions(cursor, *spec.version_tables)
+            conn.commit()
+            report.committed = True
+        else:
+            conn.rollback()
+            if atomic:
+                report.inserted = 0
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+        report.elapsed_ms = (time.perf_counter() - started) * 1000
+    return report
+
+
+def import_stream(kind: str, stream, fmt: str, **options) -> ImportReport:
+    return import_records(kind, iter_records(stream, fmt), **options)
+
+
+def main() -> None:
+    load_env()
+    parser = argparse.ArgumentParser(description="Bulk import stations, buses, routes or fares")
+    parser.add_argument("kind", choices=sorted(SPECS))
+    parser.add_argument("path", help="CSV or NDJSON file ('-' for stdin)")
+    parser.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--atomic", action="store_true", help="all lines or nothing")
+    parser.add_argument("--dry-run", action="store_true", help="validate only")
+    parser.add_argument("--errors", help="write every rejected line to this NDJSON file")
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format(args.path)
+    if fmt is None:
+        parser.error("cannot tell the format from the file name; pass --format")
+
+    sink = open(args.errors, "wb") if args.errors else None
+    stream = sys.stdin.buffer if args.path == "-" else open(args.path, "rb")
+    try:
+        report = import_stream(
+            args.kind, stream, fmt,
+            batch_size=args.batch_size,
+            atomic=args.atomic,
+            dry_run=args.dry_run,
+            max_errors=0 if sink else 20,
+            error_sink=(lambda error: sink.write(dumps_bytes(error) + b"\n")) if sink else None,
+        )
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+        if sink:
+            sink.close()
+    summary = report.to_json()
+    errors = summary.pop("errors")
+    print(dumps_bytes(summary).decode())
+    for error in errors:
+        print(f"  line {error['line']}: {error['error']}" + (f" ({error['field']})" if "field" in error else ""))
+    if report.rejected and args.errors:
+        print(f"  all {report.rejected} rejected lines: {os.path.abspath(args.errors)}")
+
+
+__all__ = [
+    "FORMATS",
+    "ImportReport",
+    "RowError",
+    "SPECS",
+    "detect_format",
+    "import_records",
+    "import_stream",
+    "iter_records",
+]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""In-process change notifications for data derived from the trip tables.
+
+Write paths publish after they commit; engines that keep derived state
+(timetables, summaries) subscribe and refresh only what changed::
+
+    conn.commit()
+    events.publish(events.TRIPS_CHANGED, dates=[service_date])
+
+Listeners run synchronously in the publishing thread and must not raise;
+failures are logged and never affect the response of the write endpoint.
+Notifications only reach the current process, so subscribers must also
+refresh on their own schedule to pick up writes made by other workers.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Trips were created, rescheduled, cancelled or deleted.
+# Payload: dates (service dates touched; None when unknown), trip_ids
+TRIPS_CHANGED = "trips_changed"
+# Tickets were sold, refunded or cancelled. Payload: trip_ids
+BOOKINGS_CHANGED = "bookings_changed"
+
+Listener = Callable[..., None]
+
+_listeners: Dict[str, List[Listener]] = defaultdict(list)
+_lock = threading.Lock()
+
+
+def subscribe(topic: str, listener: Optional[Listener] = None):
+    """Register ``listener`` for ``topic``; usable as a decorator."""
+    def register(func: Listener) -> Listener:
+        with _lock:
+            if func not in _listeners[topic]:
+                _listeners[topic].append(func)
+        return func
+
+    if listener is not None:
+        return register(listener)
+    return register
+
+
+def unsubscribe(topic: str, listener: Listener) -> None:
+    with _lock:
+        if listener in _listeners[topic]:
+            _listeners[topic].remove(listener)
+
+
+def publish(topic: str, **payload: Any) -> None:
+    """Call every listener of ``topic`` with ``payload`` as keyword arguments."""
+    for listener in list(_listeners.get(topic, ())):
+        try:
+            listener(**payload)
+        except Exception:
+            logger.exception("listener %r failed for %s", listener, topic)
+
+
+def service_dates(*values: Any) -> Optional[Set[date]]:
+    """Normalize datetimes/dates/``YYYY-MM-DD...`` strings to a set of dates.
+
+    Returns None when any value cannot be interpreted, meaning "unknown" to
+    listeners (which then refresh everything instead of guessing).
+    """
+    dates: Set[date] = set()
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, datetime):
+            dates.add(value.date())
+        elif isinstance(value, date):
+            dates.add(value)
+        else:
+            try:
+                dates.add(date.fromisoformat(str(value).strip()[:10]))
+            except ValueError:
+                return None
+    return dates
+
+
+__all__ = [
+    "BOOKINGS_CHANGED",
+    "TRIPS_CHANGED",
+    "publish",
+    "service_dates",
+    "subscribe",
+    "unsubscribe",
+]
@@ -0,0 +1,520 @@
+"""Bulk export of tickets, bookings and trips to CSV, Parquet or Arrow files.
+
+Rows are read from an unbuffered cursor with ``fetchmany(chunk_size)`` and
+written chunk by chunk, so memory stays at about one chunk whatever the size
+of the date range. Each dataset is selected by trip ``service_date``:
+
+- ``tickets``: one row per ticket travelling in the range,
+- ``bookings``: bookings with at least one ticket in the range (ticket count
+  and first departure computed over those tickets),
+- ``trips``: one row per trip with its bus, route and seats sold.
+
+Formats and their compression options:
+
+- ``csv``: ``none``, ``gzip``, ``zstd`` (needs ``zstandard``),
+- ``parquet``: ``none``, ``snappy``, ``gzip``, ``zstd`` (one row group per chunk),
+- ``arrow`` (Arrow IPC file, readable by pandas/polars/DuckDB): ``none``,
+  ``lz4``, ``zstd``.
+
+Parquet and Arrow need ``pyarrow``, which is optional.
+
+Admin endpoints (`routes.exports`) run exports as background jobs. Every job
+is described by a JSON manifest next to its output file in the export
+directory, so any worker on the host can report its status or serve the
+download. A job runs in the process that queued it; its manifest records that
+pid and a heartbeat refreshed while chunks are written. A queued or running
+job whose process has exited (a crash, or gunicorn recycling the worker) or
+whose heartbeat stopped is marked failed when jobs are listed, read or
+purged, and its partial file is deleted. The same export runs from the command line::
+
+    python -m services.export tickets --from 2026-01-01 --to 2026-03-31 \\
+        --format parquet --compression zstd -o tickets-q1.parquet
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import re
+import socket
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from utils.database import db_connection, load_env
+
+try:  # optional columnar formats
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet as pyarrow_parquet
+except ImportError:  # pragma: no cover - depends on environment
+    pyarrow = None
+    pyarrow_parquet = None
+
+try:  # optional zstd for CSV
+    import zstandard
+except ImportError:  # pragma: no cover - depends on environment
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIONS = {
+    "csv": ("none", "gzip", "zstd"),
+    "parquet": ("none", "snappy", "gzip", "zstd"),
+    "arrow": ("none", "lz4", "zstd"),
+}
+DEFAULT_COMPRESSION = {"csv": "gzip", "parquet": "snappy", "arrow": "lz4"}
+EXTENSIONS = {"csv": "csv", "parquet": "parquet", "arrow": "arrow"}
+CSV_SUFFIXES = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+MIMETYPES = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet",
+             "arrow": "application/vnd.apache.arrow.file"}
+CSV_GZIP_LEVEL = 6
+CSV_ZSTD_LEVEL = 3
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+_JOB_ID = re.compile(r"[0-9a-f]{32}")
+# A running job saves its manifest at least this often; one silent for
+# HEARTBEAT_STALE seconds is taken for dead
+HEARTBEAT_INTERVAL = 30
+HEARTBEAT_STALE = 300
+
+Chunk = Sequence[tuple]
+
+
+class ExportError(ValueError):
+    """Invalid export request (unknown dataset/format, missing optional package)."""
+
+
+@dataclass(frozen=True)
+class Dataset:
+    sql: str
+    # (column, type) with type one of int, float, str, datetime
+    columns: Tuple[Tuple[str, str], ...]
+
+    @property
+    def names(self) -> List[str]:
+        return [name for name, _ in self.columns]
+
+
+DATASETS = {
+    "tickets": Dataset(
+        """
+        SELECT tk.ticket_id, tk.booking_id, tk.trip_id, tk.account_id, tk.fare_id,
+               tk.ticket_status, tk.seat_code, tk.serial_number, tk.seat_price,
+               f.seat_class, f.currency, t.service_date, t.route_id, r.operator_id
+        FROM trip t
+        JOIN ticket tk ON tk.trip_id = t.trip_id
+        JOIN routetrip r ON r.route_id = t.route_id
+        LEFT JOIN fare f ON f.fare_id = tk.fare_id
+        WHERE t.service_date >= %s AND t.service_date < %s
+        """,
+        (
+            ("ticket_id", "int"), ("booking_id", "int"), ("trip_id", "int"),
+            ("account_id", "int"), ("fare_id", "int"), ("ticket_status", "str"),
+            ("seat_code", "str"), ("serial_number", "int"), ("seat_price", "int"),
+            ("seat_class", "str"), ("currency", "str"), ("service_date", "datetime"),
+            ("route_id", "int"), ("operator_id", "str"),
+        ),
+    ),
+    "bookings": Dataset(
+        """
+        SELECT b.booking_id, b.account_id, b.operator_id, b.booking_status,
+               b.currency, b.total_amount, COUNT(*) AS ticket_count,
+               MIN(t.service_date) AS first_departure
+        FROM trip t
+        JOIN ticket tk ON tk.trip_id = t.trip_id
+        JOIN booking b ON b.booking_id = tk.booking_id
+        WHERE t.service_date >= %s AND t.service_date < %s
+        GROUP BY b.booking_id
+        """,
+        (
+            ("booking_id", "int"), ("account_id", "int"), ("operator_id", "str"),
+            ("booking_status", "str"), ("currency", "str"), ("total_amount", "int"),
+            ("ticket_count", "int"), ("first_departure", "datetime"),
+        ),
+    ),
+    "trips": Dataset(
+        """
+        SELECT t.trip_id, t.route_id, t.bus_id, t.trip_status, t.service_date,
+               t.arrival_datetime, r.operator_id, r.station_id AS departure_station_id,
+               r.arrival_station AS arrival_station_id, b.plate_number, b.vehicle_type,
+               b.capacity,
+               CAST(COALESCE(SUM(tk.ticket_status IN ('Issued', 'Used')), 0) AS SIGNED) AS seats_sold
+        FROM trip t
+        JOIN routetrip r ON r.route_id = t.route_id
+        LEFT JOIN bus b ON b.bus_id = t.bus_id
+        LEFT JOIN ticket tk ON tk.trip_id = t.trip_id
+        WHERE t.service_date >= %s AND t.service_date < %s
+        GROUP BY t.trip_id
+        """,
+        (
+            ("trip_id", "int"), ("route_id", "int"), ("bus_id", "int"),
+            ("trip_status", "str"), ("service_date", "datetime"),
+            ("arrival_datetime", "datetime"), ("operator_id", "str"),
+            ("departure_station_id", "int"), ("arrival_station_id", "int"),
+            ("plate_number", "str"), ("vehicle_type", "str"), ("capacity", "int"),
+            ("seats_sold", "int"),
+        ),
+    ),
+}
+
+
+def resolve(dataset: str, fmt: str, compression: Optional[str] = None) -> str:
+    """Check the options and return the compression to use."""
+    if dataset not in DATASETS:
+        raise ExportError(f"dataset must be one of {sorted(DATASETS)}")
+    if fmt not in COMPRESSIONS:
+        raise ExportError(f"format must be one of {sorted(COMPRESSIONS)}")
+    compression = compression or DEFAULT_COMPRESSION[fmt]
+    if compression not in COMPRESSIONS[fmt]:
+        raise ExportError(f"{fmt} compression must be one of {list(COMPRESSIONS[fmt])}")
+    if fmt != "csv" and pyarrow is None:
+        raise ExportError(f"{fmt} export needs pyarrow (pip install pyarrow)")
+    if fmt == "csv" and compression == "zstd" and zstandard is None:
+        raise ExportError("zstd CSV export needs zstandard (pip install zstandard)")
+    return compression
+
+
+def file_extension(fmt: str, compression: str) -> str:
+    suffix = CSV_SUFFIXES[compression] if fmt == "csv" else ""
+    return EXTENSIONS[fmt] + suffix
+
+
+# -- reading -----------------------------------------------------------------
+
+def fetch_chunks(dataset: str, start: date, end: date, chunk_size: int = 10000) -> Iterator[List[tuple]]:
+    """Rows of ``dataset`` for service dates ``start``..``end`` (inclusive), chunk by chunk."""
+    spec = DATASETS[dataset]
+    conn = db_connection()
+    # Unbuffered: the server streams the result, the client holds one chunk
+    cursor = conn.cursor(buffered=False)
+    try:
+        cursor.execute(spec.sql, (start, end + timedelta(days=1)))
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        try:
+            cursor.close()
+        except Exception:  # unread rows left by an aborted export
+            pass
+        conn.close()
+
+
+# -- writing -----------------------------------------------------------------
+
+class _CsvWriter:
+    def __init__(self, path: str, dataset: Dataset, compression: str) -> None:
+        if compression == "gzip":
+            self._raw = None
+            binary = gzip.open(path, "wb", compresslevel=CSV_GZIP_LEVEL)
+        elif compression == "zstd":
+            self._raw = open(path, "wb")
+            binary = zstandard.ZstdCompressor(level=CSV_ZSTD_LEVEL).stream_writer(self._raw)
+        else:
+            self._raw = None
+            binary = open(path, "wb")
+        self._text = io.TextIOWrapper(binary, encoding="utf-8", newline="")
+        self._csv = csv.writer(self._text)
+        self._csv.writerow(dataset.names)
+
+    def write(self, rows: Chunk) -> None:
+        self._csv.writerows(rows)
+
+    def close(self) -> None:
+        self._text.close()
+        if self._raw is not None:
+            self._raw.close()
+
+
+def _arrow_type(kind: str):
+    return {
+        "int": pyarrow.int64(),
+        "float": pyarrow.float64(),
+        "str": pyarrow.string(),
+        "datetime": pyarrow.timestamp("s"),
+    }[kind]
+
+
+class _ArrowWriter:
+    """Parquet (one row group per chunk) or Arrow IPC file (one record batch per chunk)."""
+
+    def __init__(self, path: str, dataset: Dataset, fmt: str, compression: str) -> None:
+        self._schema = pyarrow.schema([(name, _arrow_type(kind)) for name, kind in dataset.columns])
+        codec = None if compression == "none" else compression
+        if fmt == "parquet":
+            self._writer = pyarrow_parquet.ParquetWriter(path, self._schema, compression=codec or "none")
+            self._parquet = True
+        else:
+            options = pyarrow.ipc.IpcWriteOptions(compression=codec)
+            self._writer = pyarrow.ipc.new_file(path, self._schema, options=options)
+            self._parquet = False
+
+    def write(self, rows: Chunk) -> None:
+        columns = list(zip(*rows))
+        batch = pyarrow.record_batch(
+            [pyarrow.array(values, type=field.type) for values, field in zip(columns, self._schema)],
+            schema=self._schema,
+        )
+        if self._parquet:
+            self._writer.write_table(pyarrow.Table.from_batches([batch]))
+        else:
+            self._writer.write_batch(batch)
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+def write_chunks(path: str, dataset: str, fmt: str, chunks: Iterable[Chunk],
+                 compression: Optional[str] = None,
+                 progress: Optional[Callable[[int], None]] = None) -> dict:
+    """Write ``chunks`` of ``dataset`` rows to ``path``; returns size and throughput.
+
+    ``progress`` is called with the rows written so far after each chunk.
+    """
+    compression = resolve(dataset, fmt, compression)
+    spec = DATASETS[dataset]
+    started = time.perf_counter()
+    writer = _CsvWriter(path, spec, compression) if fmt == "csv" else _ArrowWriter(path, spec, fmt, compression)
+    rows = batches = 0
+    try:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            writer.write(chunk)
+            rows += len(chunk)
+            batches += 1
+            if progress is not None:
+                progress(rows)
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - started
+    return {
+        "dataset": dataset,
+        "format": fmt,
+        "compression": compression,
+        "rows": rows,
+        "chunks": batches,
+        "bytes": os.path.getsize(path),
+        "elapsed_ms": round(elapsed * 1000, 1),
+        "rows_per_second": round(rows / elapsed) if elapsed else None,
+    }
+
+
+def export_to_file(dataset: str, fmt: str, path: str, start: date, end: date, *,
+                   compression: Optional[str] = None, chunk_size: int = 10000,
+                   progress: Optional[Callable[[int], None]] = None) -> dict:
+    resolve(dataset, fmt, compression)
+    chunks = fetch_chunks(dataset, start, end, chunk_size)
+    return write_chunks(path, dataset, fmt, chunks, compression, progress)
+
+
+# -- background jobs ---------------------------------------------------------
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="export")
+_HOST = socket.gethostname()
+# Jobs queued or running on this process's executor
+_active = set()
+
+
+def _manifest_path(directory: str, job_id: str) -> str:
+    return os.path.join(directory, f"{job_id}.json")
+
+
+def _save(directory: str, job: dict) -> None:
+    path = _manifest_path(directory, job["job_id"])
+    with open(path + ".tmp", "w", encoding="utf-8") as handle:
+        json.dump(job, handle)
+    os.replace(path + ".tmp", path)
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _orphaned(job: dict) -> bool:
+    """A queued or running job that no process will finish."""
+    if job["status"] not in (QUEUED, RUNNING):
+        return False
+    if job.get("host") == _HOST:
+        if job.get("pid") == os.getpid():
+            return job["job_id"] not in _active
+        if not _pid_alive(job.get("pid")):
+            return True
+    # Another host, or a live pid that may have been reused
+    return job["status"] == RUNNING and time.time() - job.get("heartbeat_at", 0) > HEARTBEAT_STALE
+
+
+def _fail_orphan(directory: str, job: dict) -> dict:
+    try:
+        os.remove(job_file(directory, job))
+    except FileNotFoundError:
+        pass
+    job.update(status=FAILED, error="the export process exited before the job finished",
+               finished_at=time.time())
+    _save(directory, job)
+    logger.warning("export %s orphaned by pid %s; marked failed", job["job_id"], job.get("pid"))
+    return job
+
+
+def get_job(directory: str, job_id: str) -> Optional[dict]:
+    if not _JOB_ID.fullmatch(job_id or ""):
+        return None
+    try:
+        with open(_manifest_path(directory, job_id), encoding="utf-8") as handle:
+            job = json.load(handle)
+    except (OSError, ValueError):
+        return None
+    return _fail_orphan(directory, job) if _orphaned(job) else job
+
+
+def job_file(directory: str, job: dict) -> str:
+    return os.path.join(directory, f"{job['job_id']}.{file_extension(job['format'], job['compression'])}")
+
+
+def list_jobs(directory: str) -> List[dict]:
+    if not os.path.isdir(directory):
+        return []
+    jobs = [get_job(directory, name[:-5]) for name in os.listdir(directory) if name.endswith(".json")]
+    return sorted((job for job in jobs if job), key=lambda job: job["created_at"], reverse=True)
+
+
+def delete_job(directory: str, job_id: str) -> bool:
+    job = get_job(directory, job_id)
+    if job is None:
+        return False
+    for path in (job_file(directory, job), _manifest_path(directory, job_id)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    return True
+
+
+def purge_jobs(directory: str, max_age_seconds: float) -> int:
+    """Delete finished jobs (and their files) older than ``max_age_seconds``.
+
+    Orphaned jobs count as finished: `list_jobs` marks them failed first.
+    """
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    for job in list_jobs(directory):
+        if job["created_at"] < cutoff and job["status"] in (DONE, FAILED):
+            removed += delete_job(directory, job["job_id"])
+    return removed
+
+
+def _run_job(directory: str, job: dict, chunk_size: int) -> None:
+    now = time.time()
+    job.update(status=RUNNING, started_at=now, heartbeat_at=now)
+    _save(directory, job)
+
+    def heartbeat(rows: int) -> None:
+        now = time.time()
+        if now - job["heartbeat_at"] >= HEARTBEAT_INTERVAL:
+            job.update(heartbeat_at=now, rows=rows)
+            _save(directory, job)
+
+    try:
+        stats = export_to_file(
+            job["dataset"], job["format"], job_file(directory, job),
+            date.fromisoformat(job["from"]), date.fromisoformat(job["to"]),
+            compression=job["compression"], chunk_size=chunk_size, progress=heartbeat,
+        )
+        job.update(status=DONE, stats=stats)
+    except Exception as exc:
+        logger.exception("export %s failed", job["job_id"])
+        job.update(status=FAILED, error=str(exc))
+    job["finished_at"] = time.time()
+    try:
+        _save(directory, job)
+    finally:
+        # Only once the final status is on disk, or a reader could fail it
+        _active.discard(job["job_id"])
+
+
+def start_job(directory: str, dataset: str, fmt: str, start: date, end: date, *,
+              compression: Optional[str] = None, chunk_size: int = 10000) -> dict:
+    """Queue an export on the background thread and return its manifest."""
+    compression = resolve(dataset, fmt, compression)
+    os.makedirs(directory, exist_ok=True)
+    job = {
+        "job_id": uuid.uuid4().hex,
+        "status": QUEUED,
+        "dataset": dataset,
+        "format": fmt,
+        "compression": compression,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "filename": f"{dataset}_{start.isoformat()}_{end.isoformat()}.{file_extension(fmt, compression)}",
+        "created_at": time.time(),
+        "host": _HOST,
+        "pid": os.getpid(),
+    }
+    _active.add(job["job_id"])
+    _save(directory, job)
+    _executor.submit(_run_job, directory, dict(job), chunk_size)
+    return job
+
+
+def main() -> None:
+    load_env()
+    parser = argparse.ArgumentParser(description="Export tickets, bookings or trips to CSV/Parquet/Arrow")
+    parser.add_argument("dataset", choices=sorted(DATASETS))
+    parser.add_argument("--from", dest="start", required=True, type=date.fromisoformat)
+    parser.add_argument("--to", dest="end", required=True, type=date.fromisoformat, help="inclusive")
+    parser.add_argument("--format", choices=sorted(COMPRESSIONS), default="csv")
+    parser.add_argument("--compression", help="default: gzip for csv, snappy for parquet, lz4 for arrow")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("-o", "--output", help="default: <dataset>_<from>_<to>.<ext>")
+    args = parser.parse_args()
+
+    try:
+        compression = resolve(args.dataset, args.format, args.compression)
+    except ExportError as exc:
+        parser.error(str(exc))
+    output = args.output or (
+        f"{args.dataset}_{args.start.isoformat()}_{args.end.isoformat()}"
+        f".{file_extension(args.format, compression)}"
+    )
+    stats = export_to_file(args.dataset, args.format, output, args.start, args.end,
+                           compression=compression, chunk_size=args.chunk_size)
+    print(json.dumps({"output": os.path.abspath(output), **stats}))
+
+
+__all__ = [
+    "COMPRESSIONS",
+    "DATASETS",
+    "ExportError",
+    "delete_job",
+    "export_to_file",
+    "fetch_chunks",
+    "get_job",
+    "job_file",
+    "list_jobs",
+    "purge_jobs",
+    "resolve",
+    "start_job",
+    "write_chunks",
+]
+
+
+if __name__ == "__main__":
+    main()
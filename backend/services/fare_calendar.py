@@ -0,0 +1,229 @@
+"""Per-route, per-day trip summary behind the flexible-date fare calendar.
+
+``daily_route_summary`` holds one row per (route, service date) with the
+number of scheduled trips, the seats still available on them and the price
+`schedule.list_trips` would show (latest fare of the route). The calendar
+endpoint aggregates a date range from it in a single indexed query instead
+of running `list_trips` once per day.
+
+Rows are refreshed incrementally from `services.events`:
+
+- ``TRIPS_CHANGED`` recomputes every route on the touched service dates,
+- ``BOOKINGS_CHANGED`` recomputes only the (route, date) slots of the trips.
+
+Refreshes run on a single background thread so write endpoints do not wait
+for them. `refresh_window` rebuilds a whole range; the nightly trip job calls
+it to repair drift, and it can be run by hand::
+
+    python -m services.fare_calendar --days 60
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Iterable, List, Optional, Set, Tuple
+
+from services import events
+from utils.database import db_connection, load_env
+
+logger = logging.getLogger(__name__)
+
+Slot = Tuple[int, date]
+
+_SUMMARY_SELECT = """
+    SELECT
+        t.route_id,
+        DATE(t.service_date) AS service_date,
+        COUNT(*) AS trip_count,
+        SUM(COALESCE(fn_get_available_seats(t.trip_id), 0)) AS available_seats,
+        (
+            SELECT f.seat_price
+            FROM fare f
+            WHERE f.route_id = t.route_id
+            ORDER BY f.valid_from DESC
+            LIMIT 1
+        ) AS min_price
+    FROM trip t
+    WHERE t.trip_status = 'Scheduled'
+"""
+
+_SUMMARY_UPSERT = """
+    INSERT INTO daily_route_summary (route_id, service_date, trip_count, available_seats, min_price)
+    {select}
+    GROUP BY t.route_id, DATE(t.service_date)
+    ON DUPLICATE KEY UPDATE
+        trip_count = VALUES(trip_count),
+        available_seats = VALUES(available_seats),
+        min_price = VALUES(min_price),
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fare-calendar")
+
+
+def refresh_dates(dates: Iterable[date]) -> None:
+    """Recompute every route's summary for ``dates``."""
+    dates = sorted(set(dates))
+    if not dates:
+        return
+    placeholders = ", ".join(["%s"] * len(dates))
+    conn = db_connection()
+    cursor = conn.cursor()
+    try:
+        conn.start_transaction()
+        cursor.execute(
+            f"DELETE FROM daily_route_summary WHERE service_date IN ({placeholders})", dates
+        )
+        # The sargable range lets idx_trip_service_date narrow the scan
+        select = _SUMMARY_SELECT + f" AND DATE(t.service_date) IN ({placeholders})"
+        select += " AND t.service_date >= %s AND t.service_date < %s"
+        cursor.execute(
+            _SUMMARY_UPSERT.format(select=select),
+            (*dates, dates[0], dates[-1] + timedelta(days=1)),
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def refresh_slots(slots: Iterable[Slot]) -> None:
+    """Recompute the summary rows of individual (route_id, service_date) slots."""
+    slots = sorted(set(slots))
+    if not slots:
+        return
+    pairs = ", ".join(["(%s, %s)"] * len(slots))
+    params = [value for slot in slots for value in slot]
+    conn = db_connection()
+    cursor = conn.cursor()
+    try:
+        conn.start_transaction()
+        cursor.execute(
+            f"DELETE FROM daily_route_summary WHERE (route_id, service_date) IN ({pairs})", params
+        )
+        select = _SUMMARY_SELECT + f" AND (t.route_id, DATE(t.service_date)) IN ({pairs})"
+        select += " AND t.service_date >= %s AND t.service_date < %s"
+        cursor.execute(
+            _SUMMARY_UPSERT.format(select=select),
+            (*params, slots[0][1], max(day for _, day in slots) + timedelta(days=1)),
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def refresh_window(days_ahead: int = 60, start: Optional[date] = None) -> None:
+    """Rebuild ``start`` (default today) through ``start + days_ahead``."""
+    start = start or date.today()
+    refresh_dates(start + timedelta(days=offset) for offset in range(days_ahead + 1))
+
+
+def slots_for_trips(trip_ids: Iterable[int]) -> List[Slot]:
+    trip_ids = sorted({int(trip_id) for trip_id in trip_ids if trip_id is not None})
+    if not trip_ids:
+        return []
+    placeholders = ", ".join(["%s"] * len(trip_ids))
+    conn = db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"SELECT DISTINCT route_id, DATE(service_date) FROM trip WHERE trip_id IN ({placeholders})",
+            trip_ids,
+        )
+        return [(route_id, service_date) for route_id, service_date in cursor.fetchall()]
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _run(job, *args) -> None:
+    try:
+        job(*args)
+    except Exception:
+        logger.exception("fare calendar refresh failed")
+
+
+@events.subscribe(events.TRIPS_CHANGED)
+def _on_trips_changed(dates: Optional[Set[date]] = None, **_payload) -> None:
+    if dates is None:
+        _executor.submit(_run, refresh_window)
+    else:
+        _executor.submit(_run, refresh_dates, dates)
+
+
+@events.subscribe(events.BOOKINGS_CHANGED)
+def _on_bookings_changed(trip_ids: Iterable[int] = (), **_payload) -> None:
+    _executor.submit(_run, lambda: refresh_slots(slots_for_trips(trip_ids)))
+
+
+def calendar(station_id: int, destination_id: int, start: date, end: date) -> List[dict]:
+    """Per-day min price, trip count and available seats for a station pair."""
+    conn = db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            """
+            SELECT
+                s.service_date,
+                MIN(s.min_price) AS min_price,
+                SUM(s.trip_count) AS trip_count,
+                SUM(s.available_seats) AS available_seats
+            FROM daily_route_summary s
+            JOIN routetrip rt ON rt.route_id = s.route_id
+            WHERE rt.station_id = %s
+              AND rt.arrival_station = %s
+              AND s.service_date BETWEEN %s AND %s
+              AND s.trip_count > 0
+            GROUP BY s.service_date
+            """,
+            (station_id, destination_id, start, end),
+        )
+        rows = {row["service_date"]: row for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+        conn.close()
+
+    days = []
+    for offset in range((end - start).days + 1):
+        day = start + timedelta(days=offset)
+        row = rows.get(day)
+        days.append({
+            "date": day.isoformat(),
+            "min_price": int(row["min_price"]) if row and row["min_price"] is not None else None,
+            "trip_count": int(row["trip_count"]) if row else 0,
+            "available_seats": int(row["available_seats"]) if row else 0,
+        })
+    return days
+
+
+def main() -> None:
+    load_env()
+    parser = argparse.ArgumentParser(description="Rebuild daily_route_summary")
+    parser.add_argument("--days", type=int, default=60, help="days ahead of --start to rebuild")
+    parser.add_argument("--start", type=date.fromisoformat, help="first date (default today)")
+    args = parser.parse_args()
+    refresh_window(args.days, args.start)
+    print(f"daily_route_summary rebuilt for {args.days + 1} days")
+
+
+__all__ = [
+    "calendar",
+    "refresh_dates",
+    "refresh_slots",
+    "refresh_window",
+    "slots_for_trips",
+]
+
+
+if __name__ == "__main__":
+    main()
+
@@ -0,0 +1,372 @@
+"""Multi-leg journey search over scheduled trips (connection scan).
+
+Every scheduled trip is one elementary connection: it leaves its route's
+departure station at ``service_date`` and reaches the arrival station at
+``arrival_datetime``. Connections are kept per service date in parallel
+``array`` columns sorted by departure time, so a query over a date window is
+a linear scan of a few contiguous arrays with no per-query SQL.
+
+`JourneyPlanner.search` runs a round-based connection scan: round ``k``
+extends the arrival labels of round ``k - 1`` by one trip, honouring a
+minimum connection time at the transfer station. The destination label after
+each round gives the Pareto set of (transfers, arrival) — the fewest-transfer
+journey first, the earliest-arrival journey last.
+
+Day partitions load lazily in one query per missing range, are dropped when
+`services.events.TRIPS_CHANGED` names their date, and expire after
+``JOURNEY_TIMETABLE_TTL`` seconds to pick up writes from other workers.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from flask import current_app, has_app_context
+
+from services import events
+from utils.database import db_connection
+
+EPOCH = datetime(2000, 1, 1)
+_INF = 1 << 62
+
+
+def to_minutes(value: datetime) -> int:
+    return int((value - EPOCH).total_seconds() // 60)
+
+
+def from_minutes(value: int) -> datetime:
+    return EPOCH + timedelta(minutes=value)
+
+
+class DayTimetable:
+    """Connections departing on one service date, sorted by departure."""
+
+    __slots__ = ("day", "departure", "arrival", "from_stop", "to_stop", "trip_id", "route_id")
+
+    def __init__(self, day: date) -> None:
+        self.day = day
+        self.departure = array("q")
+        self.arrival = array("q")
+        self.from_stop = array("i")
+        self.to_stop = array("i")
+        self.trip_id = array("i")
+        self.route_id = array("i")
+
+    def __len__(self) -> int:
+        return len(self.departure)
+
+
+@dataclass
+class Leg:
+    trip_id: int
+    route_id: int
+    from_station_id: int
+    to_station_id: int
+    departure: datetime
+    arrival: datetime
+
+
+@dataclass
+class Journey:
+    legs: List[Leg] = field(default_factory=list)
+
+    @property
+    def departure(self) -> datetime:
+        return self.legs[0].departure
+
+    @property
+    def arrival(self) -> datetime:
+        return self.legs[-1].arrival
+
+    @property
+    def transfers(self) -> int:
+        return len(self.legs) - 1
+
+    def key(self) -> Tuple[int, ...]:
+        return tuple(leg.trip_id for leg in self.legs)
+
+
+class JourneyPlanner:
+    """Process-wide timetable cache plus the connection-scan search."""
+
+    def __init__(self, ttl: float = 300.0) -> None:
+        self.ttl = ttl
+        self._days: Dict[date, DayTimetable] = {}
+        self._stop_index: Dict[int, int] = {}
+        self._stop_ids: List[int] = []
+        self.stations: Dict[int, dict] = {}
+        # time.monotonic() of the last reset; None when never built or invalidated
+        self._built_at: Optional[float] = None
+        self._generation = 0
+        self._offline = False
+        self._lock = threading.Lock()
+        events.subscribe(events.TRIPS_CHANGED, self.on_trips_changed)
+
+    # -- cache maintenance -------------------------------------------------
+
+    def on_trips_changed(self, dates=None, **_payload) -> None:
+        """Drop the partitions of ``dates`` (all of them when unknown)."""
+        self._generation += 1
+        if dates is None:
+            self._built_at = None
+            return
+        days = dict(self._days)
+        for day in dates:
+            days.pop(day, None)
+        self._days = days
+
+    def invalidate(self) -> None:
+        self.on_trips_changed(dates=None)
+
+    def preload(self, first: date, days: int) -> None:
+        """Load ``days`` day partitions from ``first`` (start-up warm-up)."""
+        if days > 0:
+            self._partitions(first, first + timedelta(days=days - 1))
+
+    def _stop(self, station_id: int) -> int:
+        index = self._stop_index.get(station_id)
+        if index is None:
+            index = len(self._stop_ids)
+            self._stop_ids.append(station_id)
+            self._stop_index[station_id] = index
+        return index
+
+    def _expired(self, ttl: float) -> bool:
+        built_at = self._built_at
+        return built_at is None or time.monotonic() - built_at > ttl
+
+    def _partitions(self, first: date, last: date) -> List[DayTimetable]:
+        """Return day partitions ``first..last``, loading any that are missing."""
+        ttl = self.ttl
+        if self._offline:
+            ttl = float("inf")
+        elif has_app_context():
+            ttl = float(current_app.config.get("JOURNEY_TIMETABLE_TTL", ttl))
+        if self._expired(ttl):
+            with self._lock:
+                if self._expired(ttl):
+                    self._reset()
+
+        wanted = [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+        days = self._days
+        if self._offline:
+            return [days.get(day) or DayTimetable(day) for day in wanted]
+        missing = [day for day in wanted if day not in days]
+        if missing:
+            with self._lock:
+                days = self._days
+                missing = [day for day in wanted if day not in days]
+                if missing:
+                    days = self._load(missing[0], missing[-1], set(missing))
+        return [days[day] for day in wanted]
+
+    def _reset(self) -> None:
+        generation = self._generation
+        conn = db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT station_id, station_name, city FROM station")
+            stations = {
+                station_id: {"station_id": station_id, "station_name": name, "city": city}
+                for station_id, name, city in cursor.fetchall()
+            }
+        finally:
+            cursor.close()
+            conn.close()
+        self.stations = stations
+        self._days = {}
+        if generation == self._generation:
+            self._built_at = time.monotonic()
+
+    def _load(self, first: date, last: date, missing: set) -> Dict[date, DayTimetable]:
+        generation = self._generation
+        conn = db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                """
+                SELECT t.service_date, t.arrival_datetime, rt.station_id,
+                       rt.arrival_station, t.trip_id, t.route_id
+                FROM trip t
+                JOIN routetrip rt ON t.route_id = rt.route_id
+                WHERE t.service_date >= %s AND t.service_date < %s
+                  AND t.trip_status = 'Scheduled'
+                  AND t.arrival_datetime IS NOT NULL
+                  AND rt.station_id IS NOT NULL
+                  AND rt.arrival_station IS NOT NULL
+                ORDER BY t.service_date, t.trip_id
+                """,
+                (first, last + timedelta(days=1)),
+            )
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+
+        loaded = self._build_days(rows, missing)
+        days = dict(self._days)
+        days.update(loaded)
+        if generation == self._generation:
+            # Keep the loaded days unless a change notification raced the query
+            horizon = date.today() - timedelta(days=1)
+            self._days = {day: table for day, table in days.items() if day >= horizon}
+        return days
+
+    def _build_days(self, rows, days) -> Dict[date, DayTimetable]:
+        """Index ``(departure, arrival, from, to, trip_id, route_id)`` rows sorted by departure."""
+        loaded = {day: DayTimetable(day) for day in days}
+        stop = self._stop
+        for departure, arrival, from_station, to_station, trip_id, route_id in rows:
+            table = loaded.get(departure.date())
+            if table is None or arrival <= departure:
+                continue
+            table.departure.append(to_minutes(departure))
+            table.arrival.append(to_minutes(arrival))
+            table.from_stop.append(stop(from_station))
+            table.to_stop.append(stop(to_station))
+            table.trip_id.append(trip_id)
+            table.route_id.append(route_id)
+        return loaded
+
+    def load_rows(self, rows, stations: Dict[int, dict] = None) -> None:
+        """Replace the timetable with pre-fetched rows (offline use and benchmarks)."""
+        rows = sorted(rows, key=lambda row: row[0])
+        with self._lock:
+            self._days = self._build_days(rows, {row[0].date() for row in rows})
+            if stations is not None:
+                self.stations = stations
+            self._built_at = time.monotonic()
+            self._offline = True
+
+    # -- search ------------------------------------------------------------
+
+    def search(
+        self,
+        origin_id: int,
+        destination_id: int,
+        depart_after: datetime,
+        *,
+        max_legs: int = 3,
+        min_connection: int = 30,
+        horizon_hours: int = 36,
+        limit: int = 5,
+    ) -> List[Journey]:
+        """Return up to ``limit`` Pareto-optimal journeys leaving on ``depart_after``'s date.
+
+        Alternatives are found by repeating the scan just after the first
+        departure of the journeys already found.
+        """
+        last_departure = datetime.combine(depart_after.date(), datetime.max.time())
+        horizon = depart_after + timedelta(hours=horizon_hours)
+        parts = self._partitions(depart_after.date(), horizon.date())
+
+        origin = self._stop_index.get(origin_id)
+        target = self._stop_index.get(destination_id)
+        if origin is None or target is None or origin == target:
+            return []
+
+        journeys: List[Journey] = []
+        seen = set()
+        start = to_minutes(depart_after)
+        first_leg_end = to_minutes(last_departure)
+        horizon_end = to_minutes(horizon)
+        while len(journeys) < limit and start <= first_leg_end:
+            found = self._scan(parts, origin, target, start, first_leg_end, horizon_end,
+                               max_legs, min_connection)
+            if not found:
+                break
+            for journey in found:
+                if journey.key() not in seen:
+                    seen.add(journey.key())
+                    journeys.append(journey)
+            start = min(to_minutes(journey.departure) for journey in found) + 1
+        journeys.sort(key=lambda journey: (journey.departure, journey.transfers, journey.arrival))
+        return journeys[:limit]
+
+    def _scan(self, parts, origin, target, start, first_leg_end, horizon_end, max_legs, min_connection):
+        best = {origin: start}        # earliest arrival per stop with any number of legs so far
+        marked = {origin: start}      # stops improved in the previous round
+        rounds = []
+        results = []
+        for _ in range(max_legs):
+            parents = {}
+            improved = {}
+            earliest_ready = min(marked.values())
+            cutoff = min(best.get(target, _INF), horizon_end)
+            for part in parts:
+                departures = part.departure
+                if not departures or departures[-1] < earliest_ready:
+                    continue
+                arrivals, from_stops, to_stops = part.arrival, part.from_stop, part.to_stop
+                count = len(departures)
+                i = bisect_left(departures, earliest_ready)
+                while i < count:
+                    departure = departures[i]
+                    if departure >= cutoff:
+                        break
+                    ready = marked.get(from_stops[i])
+                    if ready is not None:
+                        if from_stops[i] == origin:
+                            usable = ready <= departure <= first_leg_end
+                        else:
+                            usable = departure >= ready + min_connection
+                        if usable:
+                            to_stop = to_stops[i]
+                            arrival = arrivals[i]
+                            if to_stop != origin and arrival < best.get(to_stop, _INF) \
+                                    and arrival < improved.get(to_stop, _INF) and arrival <= horizon_end:
+                                improved[to_stop] = arrival
+                                parents[to_stop] = (part, i)
+                                if to_stop == target:
+                                    cutoff = arrival
+                    i += 1
+                else:
+                    continue
+                break
+            if not parents:
+                break
+            rounds.append(parents)
+            best.update(improved)
+            if target in improved:
+                # One more leg only counts when it arrives strictly earlier
+                results.append(self._journey(rounds, target))
+            marked = {stop: arrival for stop, arrival in improved.items() if stop != target}
+            if not marked:
+                break
+        # Fewest transfers first, earliest arrival last
+        return results
+
+    def _journey(self, rounds, target) -> Journey:
+        legs = []
+        stop = target
+        for parents in reversed(rounds):
+            part, i = parents[stop]
+            legs.append(Leg(
+                trip_id=part.trip_id[i],
+                route_id=part.route_id[i],
+                from_station_id=self._stop_ids[part.from_stop[i]],
+                to_station_id=self._stop_ids[part.to_stop[i]],
+                departure=from_minutes(part.departure[i]),
+                arrival=from_minutes(part.arrival[i]),
+            ))
+            stop = part.from_stop[i]
+        legs.reverse()
+        return Journey(legs)
+
+    def stats(self) -> dict:
+        return {
+            "days": {day.isoformat(): len(table) for day, table in sorted(self._days.items())},
+            "stations": len(self._stop_ids),
+            "age_seconds": None if self._built_at is None else round(time.monotonic() - self._built_at, 1),
+        }
+
+
+planner = JourneyPlanner()
+
+
+__all__ = ["EPOCH", "DayTimetable", "Journey", "JourneyPlanner", "Leg", "planner"]
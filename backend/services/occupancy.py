@@ -0,0 +1,378 @@
+"""Load factor by route, hour, weekday, vehicle type and month.
+
+``trip_occupancy_snapshot`` keeps one row per trip with its capacity and the
+seats sold when it departed. `take_snapshots` adds the trips that have left
+since the last run (the scheduler calls it every few minutes), so the table
+grows incrementally and outlives the trips `seed_trips.py` purges.
+
+`OccupancyCube` keeps the snapshots in memory as monthly partitions of
+``array`` columns. Every dimension is stored as a small integer code. A
+rollup then:
+
+1. filters the rows of the requested months with boolean masks,
+2. packs the group-by codes of each row into one integer key,
+3. sums trips, seats sold and capacity per key.
+
+With NumPy installed these steps are vectorized (``np.unique`` +
+``np.bincount``). Without it the same steps run as a Python loop with the
+same results. Months that can still receive snapshots are reloaded after
+``OCCUPANCY_CACHE_TTL`` seconds. Older months are loaded once.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from array import array
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from flask import current_app, has_app_context
+
+from utils.database import db_connection
+
+_numpy = False  # not looked up yet
+
+
+def numpy_module():
+    """NumPy for the vectorized rollups, or None when it is not installed.
+
+    Imported on first use rather than with this module: it is the largest
+    import of the app and only the admin dashboards need it.
+    """
+    global _numpy
+    if _numpy is False:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover - depends on environment
+            numpy = None
+        _numpy = numpy
+    return _numpy
+
+
+# seed_trips.py purges trips a week after arrival; catch up on anything newer
+SNAPSHOT_LOOKBACK_DAYS = 7
+
+DIMENSIONS = ("route", "operator", "vehicle_type", "hour", "weekday", "month", "date")
+
+# (route_id, operator_id, service_date, vehicle_type, capacity, seats_sold)
+SnapshotRow = Tuple[int, str, datetime, Optional[str], int, int]
+
+
+def take_snapshots(now: Optional[datetime] = None, lookback_days: int = SNAPSHOT_LOOKBACK_DAYS) -> int:
+    """Snapshot trips that departed in the last ``lookback_days`` and have no snapshot yet."""
+    now = now or datetime.now()
+    conn = db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            """
+            INSERT INTO trip_occupancy_snapshot
+                (trip_id, route_id, operator_id, service_date, vehicle_type, capacity, seats_sold)
+            SELECT
+                t.trip_id,
+                t.route_id,
+                COALESCE(r.operator_id, ''),
+                t.service_date,
+                b.vehicle_type,
+                COALESCE(b.capacity, 0),
+                (
+                    SELECT COUNT(*)
+                    FROM ticket tk
+                    WHERE tk.trip_id = t.trip_id
+                      AND tk.ticket_status IN ('Issued', 'Used')
+                )
+            FROM trip t
+            JOIN routetrip r ON r.route_id = t.route_id
+            LEFT JOIN bus b ON b.bus_id = t.bus_id
+            WHERE t.service_date >= %s AND t.service_date <= %s
+              AND t.trip_status <> 'Cancelled'
+              AND NOT EXISTS (
+                  SELECT 1 FROM trip_occupancy_snapshot s WHERE s.trip_id = t.trip_id
+              )
+            """,
+            (now - timedelta(days=lookback_days), now),
+        )
+        inserted = cursor.rowcount
+        conn.commit()
+        return inserted
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _next_month(month: date) -> date:
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+class _Codes:
+    """Append-only label <-> code mapping of one dimension."""
+
+    __slots__ = ("labels", "index")
+
+    def __init__(self) -> None:
+        self.labels: List = []
+        self.index: Dict = {}
+
+    def code(self, label) -> int:
+        code = self.index.get(label)
+        if code is None:
+            code = len(self.labels)
+            self.labels.append(label)
+            self.index[label] = code
+        return code
+
+
+class MonthPartition:
+    """Snapshots of one month as parallel code columns."""
+
+    __slots__ = ("month", "loaded_at", "day", "columns", "seats_sold", "capacity")
+
+    def __init__(self, month: date) -> None:
+        self.month = month
+        self.loaded_at = time.monotonic()
+        self.day = array("i")  # date ordinal
+        self.columns = {name: array("i") for name in DIMENSIONS}
+        self.seats_sold = array("i")
+        self.capacity = array("i")
+
+    def __len__(self) -> int:
+        return len(self.day)
+
+
+class OccupancyCube:
+    """Process-wide snapshot cache plus group-by rollups."""
+
+    def __init__(self, ttl: float = 60.0) -> None:
+        self.ttl = ttl
+        self._codes = {name: _Codes() for name in DIMENSIONS}
+        self._months: Dict[date, MonthPartition] = {}
+        self._lock = threading.Lock()
+
+    # -- loading -----------------------------------------------------------
+
+    def build(self, month: date, rows: Iterable[SnapshotRow]) -> MonthPartition:
+        """Encode ``rows`` into a partition and cache it as ``month``."""
+        partition = MonthPartition(month)
+        codes = self._codes
+        route, operator, vehicle = codes["route"], codes["operator"], codes["vehicle_type"]
+        hour, weekday, month_codes, day_codes = codes["hour"], codes["weekday"], codes["month"], codes["date"]
+        columns = partition.columns
+        for route_id, operator_id, departure, vehicle_type, capacity, seats_sold in rows:
+            day = departure.date()
+            partition.day.append(day.toordinal())
+            columns["route"].append(route.code(route_id))
+            columns["operator"].append(operator.code(operator_id))
+            columns["vehicle_type"].append(vehicle.code(vehicle_type or "Unknown"))
+            columns["hour"].append(hour.code(departure.hour))
+            columns["weekday"].append(weekday.code(departure.isoweekday()))
+            columns["month"].append(month_codes.code(day.strftime("%Y-%m")))
+            columns["date"].append(day_codes.code(day.isoformat()))
+            partition.capacity.append(capacity or 0)
+            partition.seats_sold.append(seats_sold or 0)
+        self._months[month] = partition
+        return partition
+
+    def _fetch(self, month: date) -> List[SnapshotRow]:
+        conn = db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                """
+                SELECT route_id, operator_id, service_date, vehicle_type, capacity, seats_sold
+                FROM trip_occupancy_snapshot
+                WHERE service_date >= %s AND service_date < %s
+                """,
+                (month, _next_month(month)),
+            )
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+
+    def _fresh(self, partition: Optional[MonthPartition], ttl: float) -> bool:
+        if partition is None:
+            return False
+        # Months that ended before the snapshot lookback cannot change any more
+        closed = _next_month(partition.month) <= date.today() - timedelta(days=SNAPSHOT_LOOKBACK_DAYS + 1)
+        return closed or time.monotonic() - partition.loaded_at < ttl
+
+    def partitions(self, first: date, last: date) -> List[MonthPartition]:
+        ttl = self.ttl
+        if has_app_context():
+            ttl = float(current_app.config.get("OCCUPANCY_CACHE_TTL", ttl))
+        wanted = []
+        month = _month_start(first)
+        while month <= last:
+            wanted.append(month)
+            month = _next_month(month)
+        result = []
+        for month in wanted:
+            partition = self._months.get(month)
+            if not self._fresh(partition, ttl):
+                with self._lock:
+                    partition = self._months.get(month)
+                    if not self._fresh(partition, ttl):
+                        partition = self.build(month, self._fetch(month))
+            result.append(partition)
+        return result
+
+    def invalidate(self) -> None:
+        self._months = {}
+
+    # -- rollups -----------------------------------------------------------
+
+    def _filter_codes(self, filters: Dict[str, object]) -> Optional[Dict[str, int]]:
+        """Map filter labels to codes; None when a label never occurs."""
+        wanted = {}
+        for name, label in filters.items():
+            if label is None:
+                continue
+            code = self._codes[name].index.get(label)
+            if code is None:
+                return None
+            wanted[name] = code
+        return wanted
+
+    def rollup(
+        self,
+        start: date,
+        end: date,
+        group_by: Sequence[str] = ("route",),
+        filters: Optional[Dict[str, object]] = None,
+        *,
+        limit: int = 10000,
+        engine: Optional[str] = None,
+    ) -> dict:
+        """Trips, seats sold, capacity and load factor of ``start``..``end`` per group.
+
+        ``filters`` maps dimensions to one label each (route id, operator id,
+        vehicle type, hour, ISO weekday, ``YYYY-MM``, ``YYYY-MM-DD``).
+        ``engine`` forces ``numpy`` or ``python``.
+        """
+        unknown = [name for name in list(group_by) + list(filters or {}) if name not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"unknown dimension {unknown}; allowed: {list(DIMENSIONS)}")
+        numpy = numpy_module()
+        engine = engine or ("numpy" if numpy is not None else "python")
+        if engine == "numpy" and numpy is None:
+            raise ValueError("numpy is not installed")
+
+        partitions = [p for p in self.partitions(start, end) if len(p)]
+        wanted = self._filter_codes(filters or {})
+        radices = [max(len(self._codes[name].labels), 1) for name in group_by]
+        if engine == "numpy" and math.prod(radices) >= 1 << 62:
+            engine = "python"  # packed keys would overflow int64
+        if wanted is None or not partitions:
+            groups = {}
+        elif engine == "numpy":
+            groups = self._rollup_numpy(partitions, start, end, group_by, wanted, radices)
+        else:
+            groups = self._rollup_python(partitions, start, end, group_by, wanted, radices)
+
+        rows = []
+        totals = [0, 0, 0]
+        for key, sums in groups.items():
+            labels = {}
+            for name, radix in zip(reversed(group_by), reversed(radices)):
+                key, code = divmod(key, radix)
+                labels[name] = self._codes[name].labels[code]
+            row = {name: labels[name] for name in group_by}
+            row.update(_measures(sums))
+            rows.append(row)
+            totals = [total + value for total, value in zip(totals, sums)]
+        rows.sort(key=lambda row: tuple(_sort_key(row[name]) for name in group_by))
+        return {
+            "data": rows[:limit],
+            "totals": _measures(totals),
+            "truncated": len(rows) > limit,
+            "engine": engine,
+        }
+
+    @staticmethod
+    def _rollup_python(partitions, start, end, group_by, wanted, radices):
+        first, last = start.toordinal(), end.toordinal()
+        groups: Dict[int, List[int]] = {}
+        for partition in partitions:
+            key_columns = [partition.columns[name] for name in group_by]
+            filter_columns = [(partition.columns[name], code) for name, code in wanted.items()]
+            for i, day in enumerate(partition.day):
+                if day < first or day > last:
+                    continue
+                if any(column[i] != code for column, code in filter_columns):
+                    continue
+                key = 0
+                for column, radix in zip(key_columns, radices):
+                    key = key * radix + column[i]
+                sums = groups.get(key)
+                if sums is None:
+                    sums = groups[key] = [0, 0, 0]
+                sums[0] += 1
+                sums[1] += partition.seats_sold[i]
+                sums[2] += partition.capacity[i]
+        return groups
+
+    @staticmethod
+    def _rollup_numpy(partitions, start, end, group_by, wanted, radices):
+        numpy = numpy_module()
+
+        def column(values):
+            return numpy.concatenate([numpy.frombuffer(values(p), dtype=numpy.int32) for p in partitions])
+
+        day = column(lambda p: p.day)
+        mask = (day >= start.toordinal()) & (day <= end.toordinal())
+        for name, code in wanted.items():
+            mask &= column(lambda p: p.columns[name]) == code
+        keys = numpy.zeros(int(mask.sum()), dtype=numpy.int64)
+        for name, radix in zip(group_by, radices):
+            keys = keys * radix + column(lambda p: p.columns[name])[mask]
+        unique, inverse = numpy.unique(keys, return_inverse=True)
+        trips = numpy.bincount(inverse, minlength=len(unique))
+        sold = numpy.bincount(inverse, weights=column(lambda p: p.seats_sold)[mask], minlength=len(unique))
+        capacity = numpy.bincount(inverse, weights=column(lambda p: p.capacity)[mask], minlength=len(unique))
+        return {
+            int(key): [int(t), int(s), int(c)]
+            for key, t, s, c in zip(unique.tolist(), trips.tolist(), sold.tolist(), capacity.tolist())
+        }
+
+    def stats(self) -> dict:
+        return {
+            "months": len(self._months),
+            "rows": sum(len(partition) for partition in self._months.values()),
+            "engine": "numpy" if numpy_module() is not None else "python",
+        }
+
+
+def _measures(sums: Sequence[int]) -> dict:
+    trips, sold, capacity = sums
+    return {
+        "trips": trips,
+        "seats_sold": sold,
+        "capacity": capacity,
+        "load_factor": round(sold / capacity, 4) if capacity else None,
+    }
+
+
+def _sort_key(value):
+    # Labels of one dimension share a type except for missing operators/vehicles
+    return (value is None, str(value) if not isinstance(value, int) else f"{value:012d}")
+
+
+occupancy_cube = OccupancyCube()
+
+
+__all__ = [
+    "DIMENSIONS",
+    "MonthPartition",
+    "OccupancyCube",
+    "numpy_module",
+    "occupancy_cube",
+    "take_snapshots",
+]
@@ -0,0 +1,273 @@
+"""Revenue read model: ``revenue_daily_fact`` and its rollups.
+
+One fact row per (service date, operator, route, seat class) holds the
+tickets sold and their gross (seat price of Issued/Used tickets) plus the
+refunded tickets and amount. Rollups over operators, routes and date ranges
+sum these rows through the primary key or the (operator, date) / (route,
+date) indexes instead of joining booking, ticket and trip at query time.
+
+Rows are recomputed from the ticket tables, the same way as
+`services.fare_calendar`:
+
+- ``BOOKINGS_CHANGED`` recomputes the (route, date) slots of the trips,
+- ``TRIPS_CHANGED`` recomputes the touched service dates (the open window
+  when unknown),
+- the nightly job (`seed_trips.py`) rebuilds the open window to pick up
+  writes from other workers or direct SQL.
+
+Days older than ``OPEN_DAYS`` are closed: `seed_trips.py` purges their trips
+and tickets, so refreshes never touch them and their facts are kept as they
+are. Load history once with::
+
+    python -m services.revenue --from 2024-01-01 --to 2026-12-31 --include-closed
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Iterable, List, Optional, Sequence, Set
+
+from services import events
+from services.fare_calendar import Slot, slots_for_trips
+from utils.database import db_connection, load_env
+
+logger = logging.getLogger(__name__)
+
+# seed_trips.py deletes trips that arrived more than 7 days ago
+OPEN_DAYS = 6
+DAYS_AHEAD = 90
+
+DIMENSIONS = {
+    "date": "service_date",
+    "month": "LEFT(service_date, 7)",
+    "year": "YEAR(service_date)",
+    "operator": "operator_id",
+    "route": "route_id",
+    "seat_class": "seat_class",
+}
+
+_FACT_INSERT = """
+    INSERT INTO revenue_daily_fact
+        (service_date, operator_id, route_id, seat_class,
+         tickets, gross, refunded_tickets, refunds)
+    SELECT
+        DATE(t.service_date),
+        COALESCE(r.operator_id, ''),
+        t.route_id,
+        COALESCE(f.seat_class, 'Unknown'),
+        SUM(tk.ticket_status IN ('Issued', 'Used')),
+        COALESCE(SUM(CASE WHEN tk.ticket_status IN ('Issued', 'Used') THEN tk.seat_price END), 0),
+        SUM(tk.ticket_status = 'Refunded'),
+        COALESCE(SUM(CASE WHEN tk.ticket_status = 'Refunded' THEN tk.seat_price END), 0)
+    FROM trip t
+    JOIN routetrip r ON r.route_id = t.route_id
+    JOIN ticket tk ON tk.trip_id = t.trip_id
+    LEFT JOIN fare f ON f.fare_id = tk.fare_id
+    WHERE t.service_date >= %s AND t.service_date < %s {condition}
+    GROUP BY DATE(t.service_date), COALESCE(r.operator_id, ''), t.route_id, COALESCE(f.seat_class, 'Unknown')
+    HAVING SUM(tk.ticket_status IN ('Issued', 'Used', 'Refunded')) > 0
+"""
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="revenue")
+
+
+def first_open_day(today: Optional[date] = None) -> date:
+    return (today or date.today()) - timedelta(days=OPEN_DAYS)
+
+
+def _replace(delete_sql: str, delete_params: Sequence, condition: str,
+             condition_params: Sequence, start: date, end: date) -> None:
+    conn = db_connection()
+    cursor = conn.cursor()
+    try:
+        conn.start_transaction()
+        cursor.execute(delete_sql, delete_params)
+        cursor.execute(
+            _FACT_INSERT.format(condition=condition),
+            (start, end + timedelta(days=1), *condition_params),
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def refresh_range(start: date, end: date, include_closed: bool = False) -> None:
+    """Recompute every fact row of ``start``..``end`` (closed days skipped unless asked)."""
+    if not include_closed:
+        start = max(start, first_open_day())
+    if start > end:
+        return
+    _replace(
+        "DELETE FROM revenue_daily_fact WHERE service_date BETWEEN %s AND %s", (start, end),
+        "", (), start, end,
+    )
+
+
+def refresh_dates(dates: Iterable[date]) -> None:
+    """Recompute the fact rows of ``dates``; closed days are left alone."""
+    dates = sorted(day for day in set(dates) if day >= first_open_day())
+    if not dates:
+        return
+    placeholders = ", ".join(["%s"] * len(dates))
+    _replace(
+        f"DELETE FROM revenue_daily_fact WHERE service_date IN ({placeholders})", dates,
+        f"AND DATE(t.service_date) IN ({placeholders})", dates,
+        dates[0], dates[-1],
+    )
+
+
+def refresh_slots(slots: Iterable[Slot]) -> None:
+    """Recompute the fact rows of individual (route_id, service_date) slots."""
+    slots = sorted(slot for slot in set(slots) if slot[1] >= first_open_day())
+    if not slots:
+        return
+    pairs = ", ".join(["(%s, %s)"] * len(slots))
+    params = [value for slot in slots for value in slot]
+    _replace(
+        f"DELETE FROM revenue_daily_fact WHERE (route_id, service_date) IN ({pairs})", params,
+        f"AND (t.route_id, DATE(t.service_date)) IN ({pairs})", params,
+        min(day for _, day in slots), max(day for _, day in slots),
+    )
+
+
+def refresh_window(days_ahead: int = DAYS_AHEAD) -> None:
+    """Rebuild the open days and ``days_ahead`` days of future departures."""
+    today = date.today()
+    refresh_range(first_open_day(today), today + timedelta(days=days_ahead))
+
+
+def backfill(start: date, end: date, include_closed: bool = False) -> int:
+    """Rebuild ``start``..``end`` one month per transaction; returns the months done."""
+    months = 0
+    while start <= end:
+        month_end = min(end, (start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1))
+        refresh_range(start, month_end, include_closed=include_closed)
+        months += 1
+        start = month_end + timedelta(days=1)
+    return months
+
+
+def _run(job, *args) -> None:
+    try:
+        job(*args)
+    except Exception:
+        logger.exception("revenue fact refresh failed")
+
+
+@events.subscribe(events.TRIPS_CHANGED)
+def _on_trips_changed(dates: Optional[Set[date]] = None, **_payload) -> None:
+    if dates is None:
+        _executor.submit(_run, refresh_window)
+    else:
+        _executor.submit(_run, refresh_dates, dates)
+
+
+@events.subscribe(events.BOOKINGS_CHANGED)
+def _on_bookings_changed(trip_ids: Iterable[int] = (), **_payload) -> None:
+    _executor.submit(_run, lambda: refresh_slots(slots_for_trips(trip_ids)))
+
+
+def rollup(
+    start: date,
+    end: date,
+    group_by: Sequence[str] = ("operator",),
+    *,
+    operator_id: Optional[str] = None,
+    route_id: Optional[int] = None,
+    seat_class: Optional[str] = None,
+    limit: int = 10000,
+) -> dict:
+    """Sum facts of ``start``..``end`` grouped by ``group_by`` (keys of `DIMENSIONS`).
+
+    Returns ``{"data": [...], "totals": {...}, "truncated": bool}``; with an
+    empty ``group_by`` only the totals are computed.
+    """
+    unknown = [name for name in group_by if name not in DIMENSIONS]
+    if unknown:
+        raise ValueError(f"unknown group_by {unknown}; allowed: {sorted(DIMENSIONS)}")
+
+    where = "service_date BETWEEN %s AND %s"
+    params: List = [start, end]
+    for column, value in (("operator_id", operator_id), ("route_id", route_id), ("seat_class", seat_class)):
+        if value is not None:
+            where += f" AND {column} = %s"
+            params.append(value)
+
+    measures = """
+        SUM(tickets) AS tickets,
+        SUM(gross) AS gross,
+        SUM(refunded_tickets) AS refunded_tickets,
+        SUM(refunds) AS refunds
+    """
+    conn = db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        rows = []
+        if group_by:
+            dims = ", ".join(f"{DIMENSIONS[name]} AS {name}" for name in group_by)
+            keys = ", ".join(group_by)
+            cursor.execute(
+                f"SELECT {dims}, {measures} FROM revenue_daily_fact WHERE {where} "
+                f"GROUP BY {keys} ORDER BY {keys} LIMIT %s",
+                (*params, limit + 1),
+            )
+            rows = cursor.fetchall()
+        cursor.execute(f"SELECT {measures} FROM revenue_daily_fact WHERE {where}", params)
+        totals = cursor.fetchone()
+    finally:
+        cursor.close()
+        conn.close()
+
+    def as_json(row):
+        out = {}
+        for key, value in row.items():
+            if key in ("tickets", "gross", "refunded_tickets", "refunds"):
+                out[key] = int(value or 0)
+            elif isinstance(value, date):
+                out[key] = value.isoformat()
+            else:
+                out[key] = value
+        return out
+
+    return {
+        "data": [as_json(row) for row in rows[:limit]],
+        "totals": as_json(totals),
+        "truncated": len(rows) > limit,
+    }
+
+
+def main() -> None:
+    load_env()
+    parser = argparse.ArgumentParser(description="Rebuild revenue_daily_fact")
+    parser.add_argument("--from", dest="start", type=date.fromisoformat, help="default: first open day")
+    parser.add_argument("--to", dest="end", type=date.fromisoformat, help=f"default: today + {DAYS_AHEAD} days")
+    parser.add_argument("--include-closed", action="store_true",
+                        help="also rebuild closed days (initial load; their purged tickets are lost)")
+    args = parser.parse_args()
+    start = args.start or first_open_day()
+    end = args.end or date.today() + timedelta(days=DAYS_AHEAD)
+    months = backfill(start, end, include_closed=args.include_closed)
+    print(f"revenue_daily_fact rebuilt for {start} .. {end} ({months} months)")
+
+
+__all__ = [
+    "DIMENSIONS",
+    "OPEN_DAYS",
+    "backfill",
+    "first_open_day",
+    "refresh_dates",
+    "refresh_range",
+    "refresh_slots",
+    "refresh_window",
+    "rollup",
+]
+
+
+if __name__ == "__main__":
+    main()
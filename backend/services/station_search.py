@@ -0,0 +1,304 @@
+"""In-memory station search: autocomplete and city expansion.
+
+Stations are indexed on ``city``, ``station_name`` and ``province`` after
+Vietnamese-aware normalization (`normalize`): diacritics are stripped, ``đ``
+becomes ``d`` and everything is lower-cased, so ``"da lat"``, ``"Đà Lạt"``
+and ``"DALAT"`` land on the same keys. Each field is matched three ways,
+best first:
+
+- exact (the whole field equals the query),
+- prefix (the field from one of its words onwards, or its initials, starts
+  with the query; spaces are ignored),
+- fuzzy (share of the query's trigrams found in the field, which tolerates
+  typos and missing spaces).
+
+`StationIndex.search` ranks stations by the best field match, weighted city >
+station name > province. `StationIndex.city_station_ids` expands a city name to
+every active station in it, which lets `schedule.list_trips` search by city.
+
+The index is rebuilt from one ``SELECT`` whenever the ``station`` row of
+``table_version`` moves (admin station writes bump it, see
+`utils.versioning`), so it follows admin edits without any per-query SQL.
+"""
+from __future__ import annotations
+
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from dataclasses import dataclass, field, replace
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from flask import current_app, has_app_context
+
+from utils.database import db_connection, route_to
+from utils.versioning import table_versions
+
+# Field weights; a station's score is its best weighted field match
+FIELD_WEIGHTS = {"city": 3.0, "station_name": 2.0, "province": 1.0}
+EXACT, PREFIX = 1.0, 0.8
+# Minimum share of the query's trigrams a field must contain to match fuzzily
+FUZZY_THRESHOLD = 0.6
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text: Optional[str]) -> str:
+    """Lower-case, strip Vietnamese diacritics and collapse punctuation to spaces."""
+    if not text:
+        return ""
+    text = str(text).replace("đ", "d").replace("Đ", "D")
+    text = unicodedata.normalize("NFD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigrams of every word of ``text``, padded so word starts weigh more."""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def prefix_keys(text: str) -> Set[str]:
+    """Keys a prefix query is looked up in.
+
+    The text from each word onwards with spaces removed (``"mien dong"``
+    matches ``"ben xe mien dong"``, and ``"miendong"`` too) plus the initials
+    of multi-word names (``"hcm"`` for ``"ho chi minh"``).
+    """
+    words = text.split()
+    keys = {"".join(words[i:]) for i in range(len(words))}
+    if len(words) > 1:
+        keys.add("".join(word[0] for word in words))
+    return keys
+
+
+@dataclass
+class StationEntry:
+    station_id: int
+    city: str
+    station_name: str
+    province: str
+    keys: Dict[str, str]
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    """One build of the index; replaced whole, never changed in place."""
+
+    entries: Tuple[StationEntry, ...] = ()
+    prefixes: Tuple[Tuple[str, int, str], ...] = ()
+    trigrams: Dict[str, FrozenSet[Tuple[int, str]]] = field(default_factory=dict)
+    cities: Dict[str, Tuple[int, ...]] = field(default_factory=dict)
+    version: Optional[int] = None
+    # time.monotonic() of the build; None when never built or invalidated
+    built_at: Optional[float] = None
+
+
+class StationIndex:
+    """Prefix and trigram index over the active stations.
+
+    A rebuild swaps in a new `_Snapshot` with one assignment and each query
+    reads ``self._snapshot`` once, so a search running during a rebuild sees
+    either the old or the new index, never a mix of both.
+    """
+
+    def __init__(self, ttl: float = 30.0) -> None:
+        self.ttl = ttl
+        self._snapshot = _Snapshot()
+        self._lock = threading.Lock()
+
+    # -- maintenance -------------------------------------------------------
+
+    def invalidate(self) -> None:
+        self._snapshot = replace(self._snapshot, version=None, built_at=None)
+
+    def _current_version(self) -> Optional[int]:
+        ttl = 2.0
+        if has_app_context():
+            ttl = float(current_app.config.get("TABLE_VERSION_TTL", ttl))
+        versions = table_versions.get(("station",), ttl)
+        return None if versions is None else versions["station"][0]
+
+    def _stale(self, version: Optional[int]) -> bool:
+        snapshot = self._snapshot
+        if snapshot.built_at is None:
+            return True
+        if version is not None:
+            return version != snapshot.version
+        return time.monotonic() - snapshot.built_at >= self.ttl
+
+    def ensure_fresh(self) -> None:
+        """Rebuild when the station version changed (or, without versions, after ``ttl``).
+
+        The index is shared by every request of the process, so its version
+        and rows always come from the primary, also inside ``read_only``
+        views routed to a replica that may lag.
+        """
+        with route_to("primary"):
+            version = self._current_version()
+            if not self._stale(version):
+                return
+            with self._lock:
+                if self._stale(version):
+                    self.load(self._fetch(), version)
+
+    def _fetch(self) -> List[dict]:
+        conn = db_connection()
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(
+                """
+                SELECT station_id, city, station_name, province
+                FROM station
+                WHERE active_flag = 'Active'
+                """
+            )
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+
+    def load(self, rows, version: Optional[int] = None) -> None:
+        """Replace the index with ``rows`` (dicts with id, city, name, province)."""
+        entries = []
+        prefixes = []
+        grams: Dict[str, Set[Tuple[int, str]]] = defaultdict(set)
+        cities: Dict[str, List[int]] = defaultdict(list)
+        for row in rows:
+            entry = StationEntry(
+                station_id=int(row["station_id"]),
+                city=row.get("city") or "",
+                station_name=row.get("station_name") or "",
+                province=row.get("province") or "",
+                keys={},
+            )
+            position = len(entries)
+            for name in FIELD_WEIGHTS:
+                key = normalize(getattr(entry, name))
+                if not key:
+                    continue
+                entry.keys[name] = key
+                prefixes.extend((prefix, position, name) for prefix in prefix_keys(key))
+                for gram in trigrams(key):
+                    grams[gram].add((position, name))
+            if "city" in entry.keys:
+                cities[entry.keys["city"]].append(entry.station_id)
+            entries.append(entry)
+        prefixes.sort()
+        self._snapshot = _Snapshot(
+            entries=tuple(entries),
+            prefixes=tuple(prefixes),
+            trigrams={gram: frozenset(hits) for gram, hits in grams.items()},
+            cities={city: tuple(ids) for city, ids in cities.items()},
+            version=version,
+            built_at=time.monotonic(),
+        )
+
+    # -- queries -----------------------------------------------------------
+
+    @staticmethod
+    def _field_scores(snapshot: _Snapshot, query: str) -> Dict[Tuple[int, str], float]:
+        scores: Dict[Tuple[int, str], float] = {}
+        compact = query.replace(" ", "")
+        prefixes = snapshot.prefixes
+
+        i = bisect_left(prefixes, (compact,))
+        while i < len(prefixes) and prefixes[i][0].startswith(compact):
+            _, position, name = prefixes[i]
+            exact = snapshot.entries[position].keys[name].replace(" ", "") == compact
+            scores[(position, name)] = max(scores.get((position, name), 0.0), EXACT if exact else PREFIX)
+            i += 1
+
+        if len(compact) < 3:
+            return scores
+        wanted = trigrams(query)
+        overlap: Dict[Tuple[int, str], int] = defaultdict(int)
+        for gram in wanted:
+            for hit in snapshot.trigrams.get(gram, ()):
+                overlap[hit] += 1
+        for hit, shared in overlap.items():
+            similarity = shared / len(wanted)
+            if similarity >= FUZZY_THRESHOLD:
+                # Fuzzy matches always rank below prefix matches of the same field
+                scores[hit] = max(scores.get(hit, 0.0), similarity * PREFIX * 0.9)
+        return scores
+
+    def search(self, text: str, limit: int = 10) -> List[dict]:
+        """Stations matching ``text``, best first."""
+        return self._search(self._snapshot, text, limit)
+
+    def _search(self, snapshot: _Snapshot, text: str, limit: int) -> List[dict]:
+        query = normalize(text)
+        if not query:
+            return []
+        entries = snapshot.entries
+        best: Dict[int, Tuple[float, str]] = {}
+        for (position, name), score in self._field_scores(snapshot, query).items():
+            weighted = score * FIELD_WEIGHTS[name]
+            if weighted > best.get(position, (0.0, ""))[0]:
+                best[position] = (weighted, name)
+        ranked = sorted(
+            best.items(),
+            key=lambda item: (-item[1][0], entries[item[0]].keys.get("city", ""),
+                              entries[item[0]].keys.get("station_name", "")),
+        )
+        results = []
+        for position, (score, name) in ranked[:limit]:
+            entry = entries[position]
+            results.append({
+                "station_id": entry.station_id,
+                "city": entry.city,
+                "station_name": entry.station_name,
+                "province": entry.province,
+                "matched": name,
+                "score": round(score, 3),
+            })
+        return results
+
+    def cities(self, text: str, limit: int = 5) -> List[dict]:
+        """Cities whose name matches ``text``, each with its station ids."""
+        query = normalize(text)
+        if not query:
+            return []
+        snapshot = self._snapshot
+        seen = {}
+        for match in self._search(snapshot, text, len(snapshot.entries)):
+            if match["matched"] != "city":
+                continue
+            key = normalize(match["city"])
+            if key not in seen:
+                seen[key] = {"city": match["city"], "station_ids": list(snapshot.cities.get(key, ()))}
+            if len(seen) >= limit:
+                break
+        return list(seen.values())
+
+    def city_station_ids(self, city: str) -> List[int]:
+        """Every active station in ``city`` (diacritic/case-insensitive exact match)."""
+        return list(self._snapshot.cities.get(normalize(city), ()))
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "stations": len(snapshot.entries),
+            "cities": len(snapshot.cities),
+            "trigrams": len(snapshot.trigrams),
+            "version": snapshot.version,
+        }
+
+
+station_index = StationIndex()
+
+
+__all__ = [
+    "StationIndex",
+    "normalize",
+    "prefix_keys",
+    "station_index",
+    "trigrams",
+]
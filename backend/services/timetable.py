@@ -0,0 +1,350 @@
+"""Recurring timetables and their expansion into trips.
+
+A route's timetable is a set of ``timetable_template`` rows (one departure
+time on some weekdays, optionally bounded in time and preferring a vehicle
+type) adjusted per date by ``timetable_exception`` rows (holiday
+cancellations, extra departures). Routes without any template keep the
+historical ``DEFAULT_DEPARTURES``.
+
+`materialize` turns the timetable into trips for a rolling horizon. Every
+(route, date) it has handled is recorded in ``timetable_materialization``, so
+each run only works on pairs that are not recorded yet. Night after night that
+is one new day per route, not routes x horizon. Pairs that already have trips
+(created by hand or before templates existed) are recorded without adding
+any. Inserts go through `services.trip_scheduling.schedule_trips`, which
+rejects buses that are already on the road; rejected departures are retried
+with the next bus of the preferred type.
+
+Template edits apply to dates not materialized yet.
+"""
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from services import events
+from services.trip_scheduling import schedule_trips
+from utils.database import db_connection
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEPARTURES = (time(7, 0), time(13, 30), time(20, 0))
+ALL_WEEKDAYS = 0b1111111
+# Passes over bus-conflict rejections, each trying the next candidate bus
+MAX_BUS_ATTEMPTS = 3
+
+Slot = Tuple[int, date]
+
+
+def weekday_mask(weekdays: Iterable[int]) -> int:
+    """Bit mask of ISO weekdays (1 = Monday ... 7 = Sunday)."""
+    mask = 0
+    for day in weekdays:
+        day = int(day)
+        if not 1 <= day <= 7:
+            raise ValueError("weekdays must be ISO day numbers 1 (Mon) to 7 (Sun)")
+        mask |= 1 << (day - 1)
+    return mask
+
+
+def weekdays_of(mask: int) -> List[int]:
+    return [day for day in range(1, 8) if mask & (1 << (day - 1))]
+
+
+def as_time(value) -> Optional[time]:
+    """MySQL TIME columns come back as timedelta."""
+    if value is None or isinstance(value, time):
+        return value
+    if isinstance(value, timedelta):
+        return (datetime.min + value).time()
+    return datetime.strptime(str(value)[:5], "%H:%M").time()
+
+
+@dataclass
+class Template:
+    template_id: int
+    route_id: int
+    departure_time: time
+    weekday_mask: int = ALL_WEEKDAYS
+    valid_from: Optional[date] = None
+    valid_to: Optional[date] = None
+    vehicle_type: Optional[str] = None
+    active: bool = True
+
+    def runs_on(self, day: date) -> bool:
+        return (
+            self.active
+            and bool(self.weekday_mask & (1 << (day.isoweekday() - 1)))
+            and (self.valid_from is None or day >= self.valid_from)
+            and (self.valid_to is None or day <= self.valid_to)
+        )
+
+
+@dataclass
+class TimetableException:
+    exception_id: int
+    route_id: Optional[int]
+    exception_date: date
+    action: str
+    departure_time: Optional[time] = None
+    vehicle_type: Optional[str] = None
+
+
+class Timetable:
+    """Templates and exceptions for a date range, answering per-day departures."""
+
+    def __init__(self, templates: Iterable[Template], exceptions: Iterable[TimetableException]) -> None:
+        self.templates: Dict[int, List[Template]] = defaultdict(list)
+        for template in templates:
+            self.templates[template.route_id].append(template)
+        self.exceptions: Dict[date, List[TimetableException]] = defaultdict(list)
+        # Network-wide exceptions first so route-specific ones can override them
+        for exception in sorted(exceptions, key=lambda item: item.route_id is not None):
+            self.exceptions[exception.exception_date].append(exception)
+
+    def departures(self, route_id: int, day: date) -> List[Tuple[time, Optional[str]]]:
+        """Sorted ``(departure_time, preferred vehicle_type)`` for ``route_id`` on ``day``."""
+        templates = self.templates.get(route_id)
+        if templates is None:
+            planned = {departure: None for departure in DEFAULT_DEPARTURES}
+        else:
+            planned = {t.departure_time: t.vehicle_type for t in templates if t.runs_on(day)}
+        for exception in self.exceptions.get(day, ()):
+            if exception.route_id not in (None, route_id):
+                continue
+            if exception.action == "Cancel":
+                if exception.departure_time is None:
+                    planned.clear()
+                else:
+                    planned.pop(exception.departure_time, None)
+            elif exception.departure_time is not None:
+                planned[exception.departure_time] = exception.vehicle_type
+        return sorted(planned.items())
+
+
+def load_timetable(cursor, route_ids: List[int], start: date, end: date) -> Timetable:
+    templates = []
+    if route_ids:
+        placeholders = ", ".join(["%s"] * len(route_ids))
+        cursor.execute(
+            f"""
+            SELECT template_id, route_id, departure_time, weekday_mask,
+                   valid_from, valid_to, vehicle_type, active_flag
+            FROM timetable_template
+            WHERE route_id IN ({placeholders})
+            """,
+            route_ids,
+        )
+        templates = [
+            Template(row[0], row[1], as_time(row[2]), row[3], row[4], row[5], row[6], row[7] == "Active")
+            for row in cursor.fetchall()
+        ]
+    cursor.execute(
+        """
+        SELECT exception_id, route_id, exception_date, action, departure_time, vehicle_type
+        FROM timetable_exception
+        WHERE exception_date BETWEEN %s AND %s
+        """,
+        (start, end),
+    )
+    exceptions = [
+        TimetableException(row[0], row[1], row[2], row[3], as_time(row[4]), row[5])
+        for row in cursor.fetchall()
+    ]
+    return Timetable(templates, exceptions)
+
+
+class BusRotation:
+    """Hands out active buses round-robin, per preferred vehicle type."""
+
+    def __init__(self, buses: Iterable[Tuple[int, Optional[str]]]) -> None:
+        self.all = [bus_id for bus_id, _ in buses]
+        self.by_type: Dict[str, List[int]] = defaultdict(list)
+        for bus_id, vehicle_type in buses:
+            self.by_type[vehicle_type].append(bus_id)
+        self._next: Dict[Optional[str], int] = defaultdict(int)
+
+    def pool(self, vehicle_type: Optional[str]) -> List[int]:
+        return (self.by_type.get(vehicle_type) if vehicle_type else None) or self.all
+
+    def take(self, vehicle_type: Optional[str]) -> int:
+        pool = self.pool(vehicle_type)
+        position = self._next[vehicle_type]
+        self._next[vehicle_type] = position + 1
+        return pool[position % len(pool)]
+
+
+def _missing_slots(cursor, route_ids: List[int], start: date, end: date) -> List[Slot]:
+    cursor.execute(
+        """
+        SELECT route_id, service_date
+        FROM timetable_materialization
+        WHERE service_date BETWEEN %s AND %s
+        """,
+        (start, end),
+    )
+    done = {(route_id, day) for route_id, day in cursor.fetchall()}
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    return [(route_id, day) for day in days for route_id in route_ids if (route_id, day) not in done]
+
+
+def _existing_trip_counts(cursor, slots: List[Slot]) -> Dict[Slot, int]:
+    route_ids = sorted({route_id for route_id, _ in slots})
+    placeholders = ", ".join(["%s"] * len(route_ids))
+    first = min(day for _, day in slots)
+    last = max(day for _, day in slots)
+    cursor.execute(
+        f"""
+        SELECT route_id, DATE(service_date), COUNT(*)
+        FROM trip
+        WHERE service_date >= %s AND service_date < %s
+          AND route_id IN ({placeholders})
+        GROUP BY route_id, DATE(service_date)
+        """,
+        (first, last + timedelta(days=1), *route_ids),
+    )
+    return {(route_id, day): count for route_id, day, count in cursor.fetchall()}
+
+
+def _schedule(cursor, rows: List[dict], rotation: BusRotation, chunk_size: int):
+    """Insert ``rows``, moving bus-conflict rejections to the next candidate bus."""
+    created, failed = [], []
+    for attempt in range(MAX_BUS_ATTEMPTS):
+        result = schedule_trips(cursor, rows, atomic=False, chunk_size=chunk_size)
+        created.extend((rows[outcome.index], outcome.trip_id) for outcome in result.created)
+        retry = []
+        for outcome in result.rejected:
+            row = rows[outcome.index]
+            if outcome.error == "bus_conflict" and attempt + 1 < MAX_BUS_ATTEMPTS:
+                retry.append({**row, "bus_id": rotation.take(row["vehicle_type"])})
+            else:
+                failed.append((row, outcome.error))
+        if not retry:
+            break
+        rows = retry
+    return created, failed
+
+
+def _record(cursor, counts: Dict[Slot, int], chunk_size: int) -> None:
+    items = sorted(counts.items())
+    for offset in range(0, len(items), chunk_size):
+        chunk = items[offset:offset + chunk_size]
+        values = ", ".join(["(%s, %s, %s)"] * len(chunk))
+        params = [value for (route_id, day), count in chunk for value in (route_id, day, count)]
+        cursor.execute(
+            f"""
+            INSERT INTO timetable_materialization (route_id, service_date, trip_count)
+            VALUES {values}
+            ON DUPLICATE KEY UPDATE trip_count = VALUES(trip_count)
+            """,
+            params,
+        )
+
+
+def materialize(days_ahead: int = 7, start: Optional[date] = None, chunk_size: int = 1000) -> dict:
+    """Generate trips for ``start`` (default today) .. ``start + days_ahead`` where missing."""
+    start = start or date.today()
+    end = start + timedelta(days=days_ahead)
+    stats = {"slots": 0, "existing": 0, "created": 0, "failed": 0}
+
+    conn = db_connection()
+    cursor = conn.cursor()
+    try:
+        conn.start_transaction()
+        cursor.execute("SELECT route_id FROM routetrip ORDER BY route_id")
+        route_ids = [row[0] for row in cursor.fetchall()]
+        slots = _missing_slots(cursor, route_ids, start, end)
+        stats["slots"] = len(slots)
+        if not slots:
+            conn.rollback()
+            return stats
+
+        cursor.execute(
+            "SELECT bus_id, vehicle_type FROM bus WHERE bus_active_flag = 'Active' ORDER BY bus_id"
+        )
+        rotation = BusRotation(cursor.fetchall())
+        if not rotation.all:
+            logger.warning("No active buses; leaving %d route-days unmaterialized.", len(slots))
+            conn.rollback()
+            return stats
+
+        existing = _existing_trip_counts(cursor, slots)
+        pending = [slot for slot in slots if slot not in existing]
+        stats["existing"] = len(slots) - len(pending)
+        timetable = load_timetable(cursor, sorted({route_id for route_id, _ in pending}), start, end)
+
+        rows = []
+        for route_id, day in pending:
+            for departure, vehicle_type in timetable.departures(route_id, day):
+                rows.append({
+                    "service_date": datetime.combine(day, departure),
+                    "bus_id": rotation.take(vehicle_type),
+                    "route_id": route_id,
+                    "vehicle_type": vehicle_type,
+                })
+        created, failed = _schedule(cursor, rows, rotation, chunk_size) if rows else ([], [])
+        for row, error in failed:
+            logger.warning("Could not schedule route %s at %s: %s", row["route_id"], row["service_date"], error)
+
+        counts: Dict[Slot, int] = dict(existing)
+        counts.update({slot: 0 for slot in pending})
+        for row, _trip_id in created:
+            counts[(row["route_id"], row["service_date"].date())] += 1
+        _record(cursor, counts, chunk_size)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+    stats["created"] = len(created)
+    stats["failed"] = len(failed)
+    if created:
+        events.publish(
+            events.TRIPS_CHANGED,
+            dates={row["service_date"].date() for row, _ in created},
+            trip_ids=[trip_id for _, trip_id in created],
+        )
+    return stats
+
+
+def preview(route_id: int, start: date, days: int) -> List[dict]:
+    """Departures the timetable would generate, without touching trips."""
+    end = start + timedelta(days=days - 1)
+    conn = db_connection()
+    cursor = conn.cursor()
+    try:
+        timetable = load_timetable(cursor, [route_id], start, end)
+    finally:
+        cursor.close()
+        conn.close()
+    result = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        result.append({
+            "date": day.isoformat(),
+            "departures": [
+                {"departure_time": departure.strftime("%H:%M"), "vehicle_type": vehicle_type}
+                for departure, vehicle_type in timetable.departures(route_id, day)
+            ],
+        })
+    return result
+
+
+__all__ = [
+    "DEFAULT_DEPARTURES",
+    "Template",
+    "Timetable",
+    "TimetableException",
+    "as_time",
+    "load_timetable",
+    "materialize",
+    "preview",
+    "weekday_mask",
+    "weekdays_of",
+]
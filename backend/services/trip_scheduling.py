@@ -0,0 +1,353 @@
+"""Bulk trip scheduling: validate thousands of trips in a few set-based queries.
+
+`schedule_trips` takes ``{"service_date", "bus_id", "route_id"}`` rows (or the
+rows `expand_recurrence` produces from a rule) and, on the caller's cursor:
+
+1. parses every row in Python,
+2. loads the referenced buses and routes with one ``IN`` query each,
+3. loads the trips those buses already run in the affected time span with one
+   range query and rejects rows whose bus would be on two trips at once
+   (against existing trips and against earlier rows of the same batch),
+4. inserts the accepted rows with multi-row ``INSERT`` statements of
+   ``chunk_size`` rows.
+
+It reports one outcome per input row. The caller owns the transaction:
+commit to keep the trips, roll back to discard them (``dry_run`` stops after
+validation). Arrival times are still filled in by the ``trip`` insert trigger.
+"""
+from __future__ import annotations
+
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+CREATED = "created"
+VALID = "valid"
+REJECTED = "rejected"
+SKIPPED = "skipped"
+
+_DATETIME_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M")
+
+
+class BulkScheduleError(ValueError):
+    """The request as a whole cannot be processed (bad rule, too many rows)."""
+
+
+def parse_service_date(value) -> datetime:
+    """Accept ``YYYY-MM-DD HH:MM[:SS]`` or ISO 8601 (as `POST /api/trips` does)."""
+    if isinstance(value, datetime):
+        return value
+    text = str(value).strip()
+    if "T" in text:
+        return datetime.fromisoformat(text.replace("Z", ""))
+    for fmt in _DATETIME_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"invalid service_date: {value!r}")
+
+
+def _parse_day(value, name: str) -> date:
+    try:
+        return date.fromisoformat(str(value))
+    except ValueError:
+        raise BulkScheduleError(f"{name} must follow YYYY-MM-DD") from None
+
+
+def expand_recurrence(rule: dict, max_rows: int) -> List[dict]:
+    """Rows for every departure of a recurrence ``rule``.
+
+    ``{"route_id", "bus_ids" | "bus_id", "start_date", "end_date", "times",
+    "weekdays" (ISO 1=Mon..7=Sun, default all), "except_dates"}``. Buses are
+    assigned round-robin over each day's departures.
+    """
+    route_id = rule.get("route_id")
+    bus_ids = rule.get("bus_ids") or ([rule["bus_id"]] if rule.get("bus_id") else [])
+    times = rule.get("times") or []
+    if not route_id or not bus_ids or not times:
+        raise BulkScheduleError("recurrence needs route_id, bus_ids (or bus_id) and times")
+    start = _parse_day(rule.get("start_date"), "start_date")
+    end = _parse_day(rule.get("end_date"), "end_date")
+    if end < start:
+        raise BulkScheduleError("end_date must not be before start_date")
+    try:
+        clock = sorted(datetime.strptime(str(value), "%H:%M").time() for value in times)
+    except ValueError:
+        raise BulkScheduleError("times must follow HH:MM") from None
+    weekdays = set(rule.get("weekdays") or range(1, 8))
+    if not weekdays <= set(range(1, 8)):
+        raise BulkScheduleError("weekdays must be ISO day numbers 1 (Mon) to 7 (Sun)")
+    skipped = {_parse_day(value, "except_dates") for value in rule.get("except_dates") or []}
+
+    days = (end - start).days + 1
+    if days * len(clock) > max_rows * 7:
+        # Cheap upper bound before expanding a runaway rule
+        raise BulkScheduleError(f"recurrence expands to more than {max_rows} trips")
+    rows = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        if day.isoweekday() not in weekdays or day in skipped:
+            continue
+        for slot, departure in enumerate(clock):
+            rows.append({
+                "service_date": datetime.combine(day, departure),
+                "bus_id": bus_ids[slot % len(bus_ids)],
+                "route_id": route_id,
+            })
+        if len(rows) > max_rows:
+            raise BulkScheduleError(f"recurrence expands to more than {max_rows} trips")
+    return rows
+
+
+@dataclass
+class Outcome:
+    index: int
+    status: str
+    service_date: Optional[datetime] = None
+    bus_id: Optional[int] = None
+    route_id: Optional[int] = None
+    trip_id: Optional[int] = None
+    error: Optional[str] = None
+    detail: Optional[dict] = None
+
+    def to_json(self) -> dict:
+        result = {"index": self.index, "status": self.status}
+        if self.trip_id is not None:
+            result["trip_id"] = self.trip_id
+        if self.error:
+            result["error"] = self.error
+            if self.detail:
+                result.update(self.detail)
+        return result
+
+
+@dataclass
+class BulkResult:
+    outcomes: List[Outcome]
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def rejected(self) -> List[Outcome]:
+        return [outcome for outcome in self.outcomes if outcome.status == REJECTED]
+
+    @property
+    def created(self) -> List[Outcome]:
+        return [outcome for outcome in self.outcomes if outcome.status == CREATED]
+
+    def service_dates(self) -> set:
+        return {outcome.service_date.date() for outcome in self.created}
+
+    def summary(self) -> dict:
+        counts = defaultdict(int)
+        for outcome in self.outcomes:
+            counts[outcome.status] += 1
+        return {"total": len(self.outcomes), **counts}
+
+
+def _parse_rows(rows: Iterable[dict]) -> List[Outcome]:
+    outcomes = []
+    for index, row in enumerate(rows):
+        outcome = Outcome(index=index, status=VALID)
+        outcomes.append(outcome)
+        if not isinstance(row, dict):
+            outcome.status, outcome.error = REJECTED, "invalid_row"
+            continue
+        missing = [name for name in ("service_date", "bus_id", "route_id") if not row.get(name)]
+        if missing:
+            outcome.status, outcome.error = REJECTED, "missing_fields"
+            outcome.detail = {"fields": missing}
+            continue
+        try:
+            outcome.service_date = parse_service_date(row["service_date"])
+            outcome.bus_id = int(row["bus_id"])
+            outcome.route_id = int(row["route_id"])
+        except (TypeError, ValueError):
+            outcome.status, outcome.error = REJECTED, "invalid_value"
+    return outcomes
+
+
+def _lookup(cursor, sql: str, ids: List[int]) -> Dict[int, tuple]:
+    if not ids:
+        return {}
+    placeholders = ", ".join(["%s"] * len(ids))
+    cursor.execute(sql.format(placeholders=placeholders), ids)
+    return {row[0]: row[1:] for row in cursor.fetchall()}
+
+
+def _check_references(cursor, outcomes: List[Outcome]) -> Dict[int, timedelta]:
+    """Reject rows with unknown/inactive buses or unknown routes; return route durations."""
+    valid = [outcome for outcome in outcomes if outcome.status == VALID]
+    buses = _lookup(
+        cursor,
+        "SELECT bus_id, bus_active_flag FROM bus WHERE bus_id IN ({placeholders})",
+        sorted({outcome.bus_id for outcome in valid}),
+    )
+    routes = _lookup(
+        cursor,
+        "SELECT route_id, default_duration_time FROM routetrip WHERE route_id IN ({placeholders})",
+        sorted({outcome.route_id for outcome in valid}),
+    )
+    for outcome in valid:
+        bus = buses.get(outcome.bus_id)
+        if bus is None:
+            outcome.status, outcome.error = REJECTED, "bus_not_found"
+        elif bus[0] != "Active":
+            outcome.status, outcome.error = REJECTED, "bus_inactive"
+            outcome.detail = {"bus_active_flag": bus[0]}
+        elif outcome.route_id not in routes:
+            outcome.status, outcome.error = REJECTED, "route_not_found"
+    return {route_id: row[0] or timedelta(0) for route_id, row in routes.items()}
+
+
+def _check_bus_conflicts(cursor, outcomes: List[Outcome], durations: Dict[int, timedelta]) -> None:
+    """Reject rows whose bus is already on another trip at that time.
+
+    A trip occupies its bus from ``service_date`` to its arrival; earlier
+    rows of the batch win over later ones.
+    """
+    valid = [outcome for outcome in outcomes if outcome.status == VALID]
+    if not valid:
+        return
+    longest = max(durations.values(), default=timedelta(0))
+    first = min(outcome.service_date for outcome in valid)
+    last = max(outcome.service_date + durations[outcome.route_id] for outcome in valid)
+    bus_ids = sorted({outcome.bus_id for outcome in valid})
+    placeholders = ", ".join(["%s"] * len(bus_ids))
+    cursor.execute(
+        f"""
+        SELECT t.trip_id, t.bus_id, t.service_date,
+               COALESCE(t.arrival_datetime, t.service_date)
+        FROM trip t
+        WHERE t.bus_id IN ({placeholders})
+          AND t.trip_status <> 'Cancelled'
+          AND t.service_date >= %s AND t.service_date <= %s
+        """,
+        (*bus_ids, first - max(longest, timedelta(days=1)), last),
+    )
+
+    # (start, end, rank, item): existing trips sort before batch rows starting
+    # at the same instant, batch rows keep their input order
+    busy = defaultdict(list)
+    for trip_id, bus_id, start, end in cursor.fetchall():
+        busy[bus_id].append((start, max(end, start), 0, trip_id))
+    for outcome in valid:
+        start = outcome.service_date
+        busy[outcome.bus_id].append((start, start + durations[outcome.route_id], 1, outcome))
+
+    for intervals in busy.values():
+        intervals.sort(key=lambda iv: (iv[0], iv[2], iv[3].index if iv[2] else 0))
+        holder = None
+        for interval in intervals:
+            start, end, rank, item = interval
+            if holder is not None and (start < holder[1] or start == holder[0]):
+                if rank == 1:
+                    item.status, item.error = REJECTED, "bus_conflict"
+                    item.detail = (
+                        {"conflicting_trip_id": holder[3]} if holder[2] == 0
+                        else {"conflicting_index": holder[3].index}
+                    )
+                    continue
+            if holder is None or end > holder[1]:
+                holder = interval
+
+
+def _read_back_ids(cursor, chunk: List[Outcome], first_id: int) -> Dict[tuple, int]:
+    """``{(bus_id, service_date): trip_id}`` of the rows just inserted from ``first_id`` on.
+
+    A bus never starts two accepted trips at the same instant, so the pair
+    identifies each row of the chunk.
+    """
+    keys = ", ".join(["(%s, %s)"] * len(chunk))
+    params = [first_id]
+    for outcome in chunk:
+        params.extend((outcome.bus_id, outcome.service_date))
+    cursor.execute(
+        f"""
+        SELECT bus_id, service_date, trip_id
+        FROM trip
+        WHERE trip_id >= %s AND (bus_id, service_date) IN ({keys})
+        ORDER BY trip_id
+        """,
+        params,
+    )
+    ids: Dict[tuple, int] = {}
+    for bus_id, service_date, trip_id in cursor.fetchall():
+        ids.setdefault((bus_id, service_date), trip_id)
+    return ids
+
+
+def _insert(cursor, outcomes: List[Outcome], chunk_size: int) -> None:
+    # Ids of a multi-row insert are consecutive only with a step of 1; group
+    # replication and multi-primary setups raise auto_increment_increment
+    cursor.execute("SELECT @@auto_increment_increment")
+    row = cursor.fetchone()
+    consecutive = row is None or int(row[0]) == 1
+    for offset in range(0, len(outcomes), chunk_size):
+        chunk = outcomes[offset:offset + chunk_size]
+        values = ", ".join(["('Scheduled', %s, %s, %s)"] * len(chunk))
+        params = []
+        for outcome in chunk:
+            params.extend((outcome.service_date, outcome.bus_id, outcome.route_id))
+        cursor.execute(
+            f"INSERT INTO trip (trip_status, service_date, bus_id, route_id) VALUES {values}",
+            params,
+        )
+        # lastrowid is the id of the chunk's first row
+        first_id = cursor.lastrowid
+        ids = _read_back_ids(cursor, chunk, first_id) if first_id and not consecutive else None
+        for position, outcome in enumerate(chunk):
+            outcome.status = CREATED
+            if not first_id:
+                outcome.trip_id = None
+            elif ids is None:
+                outcome.trip_id = first_id + position
+            else:
+                outcome.trip_id = ids.get((outcome.bus_id, outcome.service_date))
+
+
+def schedule_trips(
+    cursor,
+    rows: Iterable[dict],
+    *,
+    atomic: bool = True,
+    dry_run: bool = False,
+    chunk_size: int = 1000,
+) -> BulkResult:
+    """Validate ``rows`` and insert the valid ones on ``cursor``'s transaction.
+
+    With ``atomic`` any rejected row leaves the rest unwritten (``skipped``);
+    otherwise valid rows are inserted and only the bad ones are rejected.
+    """
+    started = time.perf_counter()
+    outcomes = _parse_rows(rows)
+    durations = _check_references(cursor, outcomes)
+    _check_bus_conflicts(cursor, outcomes, durations)
+    validated = time.perf_counter()
+
+    accepted = [outcome for outcome in outcomes if outcome.status == VALID]
+    if atomic and len(accepted) != len(outcomes):
+        for outcome in accepted:
+            outcome.status = SKIPPED
+        accepted = []
+    if not dry_run and accepted:
+        _insert(cursor, accepted, chunk_size)
+    finished = time.perf_counter()
+
+    return BulkResult(outcomes, {
+        "validate": round((validated - started) * 1000, 1),
+        "insert": round((finished - validated) * 1000, 1),
+        "total": round((finished - started) * 1000, 1),
+    })
+
+
+__all__ = [
+    "BulkResult",
+    "BulkScheduleError",
+    "Outcome",
+    "expand_recurrence",
+    "parse_service_date",
+    "schedule_trips",
+]
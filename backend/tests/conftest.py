@@ -0,0 +1,140 @@
+"""Shared fixtures: the Flask app on an in-memory stand-in for mysql-connector.
+
+`FakeMySQL` answers each statement through ``responder(sql, params)`` (no
+rows by default; ``host`` tells the server it runs on) and records what ran
+(``prepared`` lists statements run on prepared cursors), so tests exercise the
+real pool, query registry and views without a server.
+"""
+from __future__ import annotations
+
+import os
+import sys
+
+import mysql.connector
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from factory import DefaultConfig, create_app  # noqa: E402
+from utils import database, health  # noqa: E402
+from utils.health import HealthProbe  # noqa: E402
+
+
+class FakeCursor:
+    def __init__(self, db, dictionary=False, host=None, prepared=False):
+        self.db = db
+        self.host = host
+        self.dictionary = dictionary
+        self.prepared = prepared
+        self.rows = []
+        self.rowcount = 0
+        self.lastrowid = None
+        self.closed = False
+
+    def execute(self, sql, params=None):
+        self.db.statements.append((sql, params))
+        if self.prepared:
+            self.db.prepared.append(sql)
+        self.db.host = self.host
+        rows = self.db.responder(sql, params) or []
+        self.rows = [row if self.dictionary else tuple(row.values()) if isinstance(row, dict) else row
+                     for row in rows]
+        self.rowcount = len(self.rows)
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchmany(self, size=1):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    unread_result = False
+    in_transaction = False
+
+    def __init__(self, db, host=None):
+        self.db = db
+        self.host = host
+
+    def cursor(self, dictionary=False, prepared=False, **_options):
+        return FakeCursor(self.db, dictionary, self.host, prepared)
+
+    def ping(self, reconnect=False):
+        pass
+
+    def commit(self):
+        self.db.commits += 1
+
+    def rollback(self):
+        pass
+
+    def start_transaction(self, **_options):
+        pass
+
+    def consume_results(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeMySQL:
+    def __init__(self):
+        self.statements = []
+        self.prepared = []
+        self.commits = 0
+        self.connections = 0
+        self.host = None
+        self.responder = lambda sql, params: []
+
+    def connect(self, **config):
+        self.connections += 1
+        return FakeConnection(self, config.get("host"))
+
+
+class TestConfig(DefaultConfig):
+    TESTING = True
+    WARMUP_ENABLED = False
+    COMPRESS_MIN_SIZE = 0
+    JWT_SECRET = "test-secret-long-enough-for-hs256"
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = FakeMySQL()
+    monkeypatch.setattr(mysql.connector, "connect", db.connect)
+    monkeypatch.setenv("DB_HOST", "localhost")
+    monkeypatch.setenv("DB_POOL_SIZE", "2")
+    monkeypatch.delenv("DB_REPLICA_HOST", raising=False)
+    # Probe threads would take pool connections behind the tests' backs
+    monkeypatch.setattr(HealthProbe, "start", lambda self: None)
+    monkeypatch.setattr(health, "_probes", {})
+    monkeypatch.setattr(database, "_pools", {})
+    return db
+
+
+@pytest.fixture
+def app(fake_db):
+    return create_app(TestConfig)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_headers(app):
+    from utils.jwt_helper import generate_token
+
+    with app.app_context():
+        token = generate_token({"role": "ADMIN", "account_id": 1}, expires_in=600)
+    return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,78 @@
+"""Ticket-state writes must tell the derived summaries (revenue, fare calendar)."""
+import pytest
+
+from services import events, fare_calendar, revenue
+
+TICKET = {
+    "ticket_id": 5, "trip_id": 42, "account_id": 1, "booking_id": 7, "fare_id": 1,
+    "qr_code_link": None, "ticket_status": "Refunded", "seat_price": 100000,
+    "seat_code": "A1", "serial_number": 123,
+}
+
+
+@pytest.fixture
+def refreshed(monkeypatch):
+    """Trip ids each summary was asked to refresh (run inline, no database)."""
+    calls = {"revenue": [], "fare_calendar": []}
+    for name, module in (("revenue", revenue), ("fare_calendar", fare_calendar)):
+        monkeypatch.setattr(module, "slots_for_trips", lambda trip_ids, name=name: calls[name].extend(trip_ids) or [])
+        monkeypatch.setattr(module, "refresh_slots", lambda slots: None)
+        monkeypatch.setattr(module._executor, "submit", lambda fn, *args: fn(*args))
+    return calls
+
+
+@pytest.fixture
+def published(monkeypatch):
+    seen = []
+    listener = lambda **payload: seen.append(payload)  # noqa: E731
+    events.subscribe(events.BOOKINGS_CHANGED, listener)
+    yield seen
+    events.unsubscribe(events.BOOKINGS_CHANGED, listener)
+
+
+def test_refund_refreshes_revenue_and_calendar(client, fake_db, admin_headers, refreshed):
+    fake_db.responder = lambda sql, params: [TICKET] if "FROM ticket" in sql else []
+    response = client.post("/api/admin/tickets/5/refund", headers=admin_headers)
+    assert response.status_code == 200
+    assert fake_db.commits == 1
+    assert refreshed == {"revenue": [42], "fare_calendar": [42]}
+
+
+def test_failed_refund_publishes_nothing(client, fake_db, admin_headers, published):
+    def responder(sql, params):
+        if sql.startswith("CALL"):
+            raise RuntimeError("ticket already refunded")
+        return []
+
+    fake_db.responder = responder
+    response = client.post("/api/admin/tickets/5/refund", headers=admin_headers)
+    assert response.status_code == 400
+    assert published == []
+
+
+def test_ticket_patch_refreshes_its_trip(client, fake_db, admin_headers, refreshed):
+    fake_db.responder = lambda sql, params: [(42,)] if sql.startswith("SELECT trip_id") else []
+    response = client.patch("/api/admin/tickets/5", json={"ticket_status": "Cancelled"}, headers=admin_headers)
+    assert response.status_code == 200
+    assert refreshed["revenue"] == [42]
+
+
+def test_booking_status_patch_refreshes_its_trips(client, fake_db, admin_headers, refreshed):
+    def responder(sql, params):
+        if "FROM booking" in sql:
+            return [{"booking_id": 7}]
+        if "FROM ticket" in sql:
+            return [{"trip_id": 42}, {"trip_id": 43}]
+        return []
+
+    fake_db.responder = responder
+    response = client.patch("/api/admin/bookings/7", json={"booking_status": "Cancelled"}, headers=admin_headers)
+    assert response.status_code == 200
+    assert refreshed == {"revenue": [42, 43], "fare_calendar": [42, 43]}
+
+
+def test_booking_note_patch_publishes_nothing(client, fake_db, admin_headers, published):
+    fake_db.responder = lambda sql, params: [{"booking_id": 7}] if "FROM booking" in sql else []
+    response = client.patch("/api/admin/bookings/7", json={"admin_note": "called back"}, headers=admin_headers)
+    assert response.status_code == 200
+    assert published == []
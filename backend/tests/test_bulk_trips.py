@@ -0,0 +1,67 @@
+"""Bulk trip scheduling (admin endpoint, services/trip_scheduling.py)."""
+from datetime import datetime
+
+from services.trip_scheduling import VALID, Outcome, _insert
+
+
+def test_public_bulk_route_is_gone(client, fake_db):
+    response = client.post("/api/trips/bulk", json={"trips": [{"service_date": "2030-01-01 07:00", "bus_id": 1, "route_id": 1}]})
+    assert response.status_code in (404, 405)
+    assert fake_db.statements == []
+
+
+def test_admin_bulk_route_needs_a_token(client, fake_db):
+    response = client.post("/api/admin/trips/bulk", json={"trips": []})
+    assert response.status_code == 401
+    assert fake_db.statements == []
+
+
+def test_admin_bulk_route_validates_with_a_token(client, fake_db, admin_headers):
+    response = client.post("/api/admin/trips/bulk", json={"trips": []}, headers=admin_headers)
+    assert response.status_code == 400
+
+
+class _TripCursor:
+    """Inserts trips with ids ``first, first + step, ...`` like MySQL does."""
+
+    def __init__(self, step, first=101):
+        self.step = step
+        self.next_id = first
+        self.trips = []
+        self.rows = []
+        self.lastrowid = None
+
+    def execute(self, sql, params=()):
+        if "auto_increment_increment" in sql:
+            self.rows = [(self.step,)]
+        elif sql.startswith("INSERT INTO trip"):
+            self.lastrowid = self.next_id
+            for i in range(0, len(params), 3):
+                self.trips.append((params[i + 1], params[i], self.next_id))
+                self.next_id += self.step
+        elif "FROM trip" in sql:
+            wanted = {(params[i], params[i + 1]) for i in range(1, len(params), 2)}
+            self.rows = [trip for trip in self.trips if trip[2] >= params[0] and trip[:2] in wanted]
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return list(self.rows)
+
+
+def _outcomes(count):
+    return [Outcome(index=i, status=VALID, service_date=datetime(2030, 1, 1, 7 + i), bus_id=4, route_id=2)
+            for i in range(count)]
+
+
+def test_trip_ids_with_a_step_of_one():
+    outcomes = _outcomes(3)
+    _insert(_TripCursor(step=1), outcomes, chunk_size=2)
+    assert [outcome.trip_id for outcome in outcomes] == [101, 102, 103]
+
+
+def test_trip_ids_with_a_larger_auto_increment_step():
+    outcomes = _outcomes(3)
+    _insert(_TripCursor(step=3), outcomes, chunk_size=2)
+    assert [outcome.trip_id for outcome in outcomes] == [101, 104, 107]
@@ -0,0 +1,78 @@
+"""Export jobs left behind by a worker that exited (services/export.py)."""
+import json
+import os
+import subprocess
+import sys
+import time
+
+from services import export
+
+
+def _orphan(directory, **fields):
+    job = {
+        "job_id": "ab" * 16,
+        "status": export.RUNNING,
+        "dataset": "tickets",
+        "format": "csv",
+        "compression": "none",
+        "from": "2026-01-01",
+        "to": "2026-01-31",
+        "filename": "tickets_2026-01-01_2026-01-31.csv",
+        "created_at": time.time() - 60,
+        "started_at": time.time() - 60,
+        "heartbeat_at": time.time() - 10,
+        "host": export._HOST,
+        "pid": os.getpid(),
+    }
+    job.update(fields)
+    export._save(str(directory), job)
+    with open(export.job_file(str(directory), job), "w") as handle:
+        handle.write("ticket_id,price\n1,")
+    return job
+
+
+def _dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_job_of_an_exited_worker_is_failed(tmp_path):
+    job = _orphan(tmp_path, pid=_dead_pid())
+
+    [listed] = export.list_jobs(str(tmp_path))
+
+    assert listed["status"] == export.FAILED
+    assert "exited" in listed["error"]
+    assert not os.path.exists(export.job_file(str(tmp_path), job))
+    with open(tmp_path / f"{job['job_id']}.json") as handle:
+        assert json.load(handle)["status"] == export.FAILED
+
+
+def test_job_this_process_no_longer_runs_is_failed(tmp_path):
+    job = _orphan(tmp_path, status=export.QUEUED)
+
+    assert export.get_job(str(tmp_path), job["job_id"])["status"] == export.FAILED
+
+
+def test_job_with_a_stale_heartbeat_is_failed(tmp_path):
+    _orphan(tmp_path, host="other-host", heartbeat_at=time.time() - export.HEARTBEAT_STALE - 1)
+
+    [listed] = export.list_jobs(str(tmp_path))
+
+    assert listed["status"] == export.FAILED
+
+
+def test_live_job_is_left_alone(tmp_path, monkeypatch):
+    job = _orphan(tmp_path)
+    monkeypatch.setattr(export, "_active", {job["job_id"]})
+
+    assert export.get_job(str(tmp_path), job["job_id"])["status"] == export.RUNNING
+    assert os.path.exists(export.job_file(str(tmp_path), job))
+
+
+def test_purge_removes_expired_orphans(tmp_path):
+    job = _orphan(tmp_path, pid=_dead_pid(), created_at=time.time() - 7200)
+
+    assert export.purge_jobs(str(tmp_path), 3600) == 1
+    assert not os.path.exists(tmp_path / f"{job['job_id']}.json")
@@ -0,0 +1,51 @@
+"""Scheduler runs as seen by /readyz (seed_trips.py, utils/health.py)."""
+import pytest
+
+import seed_trips
+from services import occupancy
+from utils.health import start_probe
+
+
+@pytest.fixture
+def state_file(monkeypatch, tmp_path):
+    monkeypatch.setenv("SCHEDULER_STATE_FILE", str(tmp_path / "scheduler.json"))
+    seed_trips._mark_started()
+
+
+def _readyz(app, client):
+    client.get("/livez")  # finishes this process's (disabled) warm-up
+    start_probe(app).run_once()
+    return client.get("/readyz")
+
+
+def test_failed_job_degrades_readyz(app, client, fake_db, state_file, monkeypatch):
+    def fail():
+        raise RuntimeError("snapshot table missing")
+
+    monkeypatch.setattr(occupancy, "take_snapshots", fail)
+    seed_trips._tracked("occupancy_snapshot_job", seed_trips.snapshot_occupancy)()
+
+    assert seed_trips.scheduler_state()["jobs"]["occupancy_snapshot_job"]["ok"] is False
+    response = _readyz(app, client)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["status"] == "degraded"
+    assert "scheduler: last occupancy_snapshot_job run failed" in body["degraded"]
+
+
+def test_daily_job_fails_when_one_step_fails(fake_db, state_file, monkeypatch):
+    def fail(**_):
+        raise RuntimeError("summary table locked")
+
+    monkeypatch.setattr(seed_trips.timetable, "materialize", lambda days_ahead: {"created": 0, "slots": 0, "existing": 0, "failed": 0})
+    monkeypatch.setattr(seed_trips.fare_calendar, "refresh_window", fail)
+    monkeypatch.setattr(seed_trips.revenue, "refresh_window", lambda: None)
+    seed_trips._tracked("daily_trip_job", seed_trips.run_jobs)()
+    assert seed_trips.scheduler_state()["jobs"]["daily_trip_job"]["ok"] is False
+
+
+def test_successful_job_keeps_readyz_ready(app, client, fake_db, state_file, monkeypatch):
+    monkeypatch.setattr(occupancy, "take_snapshots", lambda: 0)
+    seed_trips._tracked("occupancy_snapshot_job", seed_trips.snapshot_occupancy)()
+    body = _readyz(app, client).get_json()
+    assert body["status"] == "ready", body
@@ -0,0 +1,34 @@
+"""Timetable cache of the journey planner (services/journey_planner.py)."""
+from datetime import date
+
+import pytest
+
+from services import events, journey_planner
+from services.journey_planner import JourneyPlanner
+
+
+@pytest.fixture
+def planner(app, fake_db, monkeypatch):
+    # A host booted a few seconds ago, less than JOURNEY_TIMETABLE_TTL
+    monkeypatch.setattr(journey_planner.time, "monotonic", lambda: 12.0)
+    fake_db.responder = lambda sql, params: [(1, "Bến xe Giáp Bát", "Hà Nội")] if "FROM station" in sql else []
+    planner = JourneyPlanner()
+    yield planner
+    events.unsubscribe(events.TRIPS_CHANGED, planner.on_trips_changed)
+
+
+def test_first_use_loads_stations_on_a_fresh_host(app, planner):
+    assert planner.stats()["age_seconds"] is None
+    with app.app_context():
+        planner.preload(date(2030, 1, 1), 1)
+    assert planner.stations[1]["station_name"] == "Bến xe Giáp Bát"
+    assert planner.stats()["age_seconds"] == 0.0
+
+
+def test_invalidate_reloads_on_a_fresh_host(app, planner, fake_db):
+    with app.app_context():
+        planner.preload(date(2030, 1, 1), 1)
+        planner.invalidate()
+        fake_db.responder = lambda sql, params: [(2, "Bến xe Đà Lạt", "Đà Lạt")] if "FROM station" in sql else []
+        planner.preload(date(2030, 1, 1), 1)
+    assert list(planner.stations) == [2]
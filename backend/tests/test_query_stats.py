@@ -0,0 +1,32 @@
+"""Per-statement stats and audited execution of utils/queries.py."""
+from utils import queries
+from utils.database import db_connection
+from utils.query_audit import audit_queries
+
+
+def test_stats_served_without_profiling(client, admin_headers):
+    assert not client.application.config.get("PROFILING_ENABLED")
+
+    response = client.get("/api/admin/queries", headers=admin_headers)
+
+    assert response.status_code == 200
+    assert "data" in response.get_json()
+    assert client.get("/api/admin/queries").status_code == 401
+
+
+def test_audited_statements_stay_prepared(app, fake_db):
+    queries.reset_stats()
+    with app.app_context(), audit_queries() as log:
+        conn = db_connection()
+        try:
+            queries.fetchone(conn, queries.STATION_EXISTS, (7,))
+        finally:
+            conn.close()
+
+    cursor_sql, params = fake_db.statements[-1]
+    assert cursor_sql == queries.STATION_EXISTS.sql and params == (7,)
+    assert fake_db.prepared == [queries.STATION_EXISTS.sql]
+    [(sql, _, logged_params)] = log.statements
+    assert sql == queries.STATION_EXISTS.sql
+    assert logged_params == (7,)
+    assert queries.stats()["station.exists"]["calls"] == 1
@@ -0,0 +1,84 @@
+"""Read-your-writes without cookies (utils/replicas.py)."""
+import pytest
+
+from utils import replicas
+
+
+@pytest.fixture
+def replica(monkeypatch, fake_db):
+    """A replica that is never behind, and a ``replica_sticky`` table kept in a dict."""
+    monkeypatch.setenv("DB_REPLICA_HOST", "replica")
+    monkeypatch.setattr(replicas.replica_monitor(), "usable", lambda: True)
+    replicas.sticky_accounts.clear()
+    table = {}
+
+    def responder(sql, params):
+        if "INSERT INTO replica_sticky" in sql:
+            table[params[0]] = params[1]
+        elif "FROM replica_sticky" in sql:
+            return [(table[params[0]] * 1_000_000,)] if params[0] in table else []
+        elif "FROM ticket" in sql:
+            return [(42,)]
+        return []
+
+    fake_db.responder = responder
+    yield table
+    replicas.sticky_accounts.clear()
+
+
+@pytest.fixture
+def cookieless(app):
+    # A cross-origin frontend that sends no credentials
+    return app.test_client(use_cookies=False)
+
+
+def test_reads_go_to_the_replica(cookieless, replica, admin_headers):
+    response = cookieless.get("/api/profile/1/tickets", headers=admin_headers)
+    assert response.headers["X-DB-Route"] == "replica"
+
+
+def test_read_after_write_stays_on_primary_without_cookie(cookieless, replica, admin_headers):
+    write = cookieless.patch("/api/admin/tickets/5", json={"ticket_status": "Used"}, headers=admin_headers)
+    assert write.status_code == 200
+    assert replica == {1: 10}
+
+    # Served by another worker: only the table knows
+    replicas.sticky_accounts.clear()
+    response = cookieless.get("/api/profile/1/tickets", headers=admin_headers)
+    assert response.headers["X-DB-Route"] == "primary"
+
+    anonymous = cookieless.get("/api/profile/1/tickets")
+    assert anonymous.headers["X-DB-Route"] == "replica"
+
+
+def test_expired_mark_reads_the_replica(cookieless, replica, admin_headers):
+    replica[1] = 0
+    response = cookieless.get("/api/profile/1/tickets", headers=admin_headers)
+    assert response.headers["X-DB-Route"] == "replica"
+
+
+def test_replica_routed_city_search_leaves_primary_versions_alone(app, cookieless, replica, fake_db):
+    from services.station_search import station_index
+    from utils import versioning
+
+    def responder(sql, params):
+        if "FROM table_version" in sql:
+            # The replica has not seen the latest station write yet
+            return [("station", 1 if fake_db.host == "replica" else 2, None)]
+        if "FROM station" in sql:
+            return [{"station_id": 7, "city": "Đà Lạt", "station_name": "Bến xe Đà Lạt", "province": "Lâm Đồng"}]
+        return []
+
+    fake_db.responder = responder
+    versioning._expire_all()
+    station_index.invalidate()
+    try:
+        response = cookieless.get("/api/schedule/trips?city=da lat&date=2030-01-01")
+        assert response.headers["X-DB-Route"] == "replica"
+        with app.app_context():
+            assert versioning.table_versions.get(("station",), 3600)["station"][0] == 2
+        assert station_index.stats()["version"] == 2
+        assert station_index.city_station_ids("Da Lat") == [7]
+    finally:
+        versioning._expire_all()
+        station_index.invalidate()
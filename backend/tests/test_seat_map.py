@@ -0,0 +1,34 @@
+"""Seat map of a trip (queries.TRIP_SEAT_MAP, routes/trips.py)."""
+
+
+def _seat_map(*rows):
+    return lambda sql, params: [dict(zip(("capacity", "ticket_id", "seat_code"), row)) for row in rows] \
+        if "FROM trip t" in sql else []
+
+
+def test_tickets_without_seat_code_count_as_booked(client, fake_db):
+    fake_db.responder = _seat_map((40, 1, "A1"), (40, 2, None), (40, 3, "A3"))
+    body = client.get("/api/trips/7/seats").get_json()
+    assert body["total_capacity"] == 40
+    assert body["available_seats"] == 37
+    assert body["booked_seats"] == ["A1", "A3"]
+
+
+def test_trip_without_tickets(client, fake_db):
+    fake_db.responder = _seat_map((40, None, None))
+    body = client.get("/api/trips/7/seats").get_json()
+    assert body["available_seats"] == 40
+    assert body["booked_seats"] == []
+
+
+def test_trip_without_bus_is_not_a_404(client, fake_db):
+    fake_db.responder = _seat_map((None, None, None))
+    response = client.get("/api/trips/7/seats")
+    assert response.status_code == 200
+    assert response.get_json()["total_capacity"] == 0
+    assert client.get("/api/trips/7/booked-seats").get_json()["booked_seats"] == []
+
+
+def test_unknown_trip_is_a_404(client, fake_db):
+    assert client.get("/api/trips/7/seats").status_code == 404
+    assert "LEFT JOIN bus" in fake_db.statements[-1][0]
@@ -0,0 +1,23 @@
+"""Reading backend/.env is up to the entrypoints (utils.database.load_env)."""
+import importlib
+
+import dotenv
+
+from utils import database
+
+
+def test_importing_database_reads_no_env_file(monkeypatch):
+    calls = []
+    monkeypatch.setattr(dotenv, "load_dotenv", lambda *args, **kwargs: calls.append(args))
+    importlib.reload(database)
+    assert calls == []
+
+
+def test_load_env_keeps_variables_already_set(monkeypatch, tmp_path):
+    (tmp_path / ".env").write_text("DB_HOST=from-file\nDB_NAME=vietbus_file\n", encoding="utf-8")
+    monkeypatch.setattr(database, "BACKEND_DIR", str(tmp_path))
+    monkeypatch.setenv("DB_HOST", "from-environment")
+    monkeypatch.delenv("DB_NAME", raising=False)
+    database.load_env()
+    assert database.os.environ["DB_HOST"] == "from-environment"
+    assert database.os.environ.pop("DB_NAME") == "vietbus_file"
@@ -0,0 +1,32 @@
+"""Station index (services/station_search.py)."""
+from services.station_search import StationIndex
+
+STATIONS = [
+    {"station_id": 1, "city": "Hà Nội", "station_name": "Bến xe Giáp Bát", "province": "Hà Nội"},
+    {"station_id": 2, "city": "Đà Lạt", "station_name": "Bến xe Liên tỉnh Đà Lạt", "province": "Lâm Đồng"},
+    {"station_id": 3, "city": "Đà Nẵng", "station_name": "Bến xe Trung tâm Đà Nẵng", "province": "Đà Nẵng"},
+]
+
+
+def test_search_ignores_diacritics():
+    index = StationIndex()
+    index.load(STATIONS, version=1)
+    assert [match["station_id"] for match in index.search("da lat")] == [2]
+    assert index.city_station_ids("DA NANG") == [3]
+
+
+def test_rebuild_during_a_search_does_not_mix_indexes(monkeypatch):
+    index = StationIndex()
+    index.load(STATIONS, version=1)
+    field_scores = StationIndex._field_scores
+
+    def rebuild_midway(snapshot, query):
+        scores = field_scores(snapshot, query)
+        # Da Nang deactivated while this query runs: the new index is shorter
+        index.load(STATIONS[:1], version=2)
+        return scores
+
+    monkeypatch.setattr(StationIndex, "_field_scores", staticmethod(rebuild_midway))
+    matches = index.search("da nang")
+    assert [match["station_id"] for match in matches] == [3]
+    assert index.stats()["stations"] == 1
@@ -0,0 +1,46 @@
+"""Streamed listings must hand their pooled connection back however the body ends."""
+from werkzeug.test import EnvironBuilder
+
+import routes.schedule
+from utils.database import db_connection, get_pool
+
+TRIPS = "/api/schedule/trips?station_id=1&date=2030-01-01&render=db"
+
+
+def _json_rows(sql, params):
+    if "JSON_OBJECT" in sql:
+        return [('{"trip_id":%d}' % i,) for i in range(3)]
+    return []
+
+
+def test_unread_compressed_stream_returns_connection(app, fake_db, monkeypatch):
+    fake_db.responder = _json_rows
+    # Keep the connections referenced (as a traceback or a server would), so
+    # garbage collection cannot be what hands them back
+    opened = []
+    monkeypatch.setattr(routes.schedule, "db_connection", lambda: opened.append(db_connection()) or opened[-1])
+    pool = get_pool()
+    before = pool.stats()
+    headers = {}
+
+    def start_response(status, response_headers, exc_info=None):
+        headers.update(response_headers)
+
+    # Call the app the way a WSGI server does, then drop the body without
+    # iterating it (client gone): the body generator never starts
+    environ = EnvironBuilder(path=TRIPS, headers={"Accept-Encoding": "gzip"}).get_environ()
+    body = app(environ, start_response)
+    assert headers["Content-Encoding"] == "gzip"
+    assert pool.stats()["in_use"] == before["in_use"] + 1
+    body.close()
+
+    after = pool.stats()
+    assert after["in_use"] == before["in_use"]
+    assert after["idle"] == max(before["idle"], 1)
+
+
+def test_read_stream_returns_connection(client, fake_db):
+    fake_db.responder = _json_rows
+    response = client.get(TRIPS)
+    assert response.get_json() == {"data": [{"trip_id": 0}, {"trip_id": 1}, {"trip_id": 2}]}
+    assert get_pool().stats()["in_use"] == 0
@@ -0,0 +1,42 @@
+"""ETag/Last-Modified on reference data (utils/versioning.py)."""
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from utils import versioning
+
+# 2030-01-02 03:04:05 UTC, as UNIX_TIMESTAMP(updated_at) returns it
+UPDATED = Decimal("1893553445.250000")
+
+
+@pytest.fixture(autouse=True)
+def fresh_versions():
+    versioning._expire_all()
+    yield
+    versioning._expire_all()
+
+
+def _versions(sql, params):
+    if "FROM table_version" in sql:
+        return [("station", 3, UPDATED)]
+    return []
+
+
+def test_last_modified_is_the_utc_instant(client, fake_db):
+    fake_db.responder = _versions
+    response = client.get("/api/schedule/stations")
+    assert response.status_code == 200
+    assert response.headers["Last-Modified"] == "Wed, 02 Jan 2030 03:04:05 GMT"
+
+    cached = client.get("/api/schedule/stations", headers={"If-Modified-Since": "Wed, 02 Jan 2030 03:04:05 GMT"})
+    assert cached.status_code == 304
+    earlier = client.get("/api/schedule/stations", headers={"If-Modified-Since": "Wed, 02 Jan 2030 03:04:04 GMT"})
+    assert earlier.status_code == 200
+
+
+def test_versions_are_timezone_aware(app, fake_db):
+    fake_db.responder = _versions
+    with app.app_context():
+        versions = versioning.table_versions.get(("station",), 0)
+    assert versions["station"] == (3, datetime(2030, 1, 2, 3, 4, 5, 250000, tzinfo=timezone.utc))
@@ -0,0 +1,126 @@
+"""Async MySQL access for the ASGI read endpoints (`asgi.py`).
+
+Runs the statements of `utils.queries` on an aiomysql pool, one connection
+per call, so a handler can issue independent reads at the same time::
+
+    booking, tickets = await asyncio.gather(
+        fetchone(queries.BOOKING_DETAIL, (booking_id,)),
+        fetchall(queries.BOOKING_TICKETS, (booking_id,)),
+    )
+
+Connection settings are the ``DB_*`` / ``DB_REPLICA_*`` ones of
+`utils.database`; ``DB_ASYNC_POOL_SIZE`` (default ``DB_POOL_SIZE``) caps the
+connections per worker process and per target. Timings land in the same
+per-query stats as the sync path.
+
+aiomysql is optional: without it `available()` is false and `asgi.py`
+refuses to start; the Flask app is unaffected.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import ssl
+import time
+from typing import Dict, Optional, Sequence
+
+from utils import queries
+from utils.database import db_settings
+
+try:  # optional async driver
+    import aiomysql
+except ImportError:  # pragma: no cover - depends on environment
+    aiomysql = None
+
+_pools: Dict[str, "aiomysql.Pool"] = {}
+_pool_lock: Optional[asyncio.Lock] = None
+
+
+def available() -> bool:
+    return aiomysql is not None
+
+
+def _pool_options(target: str) -> dict:
+    config = db_settings(target)
+    options = {
+        "host": config["host"],
+        "port": int(config["port"] or 3306),
+        "user": config["user"],
+        "password": config["password"] or "",
+        "db": config["database"],
+        "minsize": 1,
+        "maxsize": int(os.getenv("DB_ASYNC_POOL_SIZE") or os.getenv("DB_POOL_SIZE") or 10),
+        "pool_recycle": int(float(os.getenv("DB_POOL_RECYCLE", "300"))),
+        # Every statement sees committed data; pooled sessions never sit on an old snapshot
+        "autocommit": True,
+        "cursorclass": aiomysql.DictCursor,
+    }
+    if "ssl_ca" in config:
+        context = ssl.create_default_context(cafile=config["ssl_ca"])
+        # Same checks as mysql-connector's ssl_verify_cert: the chain, not the host name
+        context.check_hostname = False
+        options["ssl"] = context
+    return options
+
+
+async def get_pool(target: str = "primary"):
+    """Pool for ``"primary"`` or ``"replica"``, created on first use in this event loop."""
+    global _pool_lock
+    pool = _pools.get(target)
+    if pool is not None:
+        return pool
+    if _pool_lock is None:
+        _pool_lock = asyncio.Lock()
+    async with _pool_lock:
+        pool = _pools.get(target)
+        if pool is None:
+            pool = _pools[target] = await aiomysql.create_pool(**_pool_options(target))
+    return pool
+
+
+async def close_pools() -> None:
+    """Close every pool (ASGI lifespan shutdown)."""
+    pools = list(_pools.values())
+    _pools.clear()
+    for pool in pools:
+        pool.close()
+    for pool in pools:
+        await pool.wait_closed()
+
+
+def pool_stats() -> Dict[str, dict]:
+    return {
+        target: {"size": pool.maxsize, "open": pool.size, "idle": pool.freesize}
+        for target, pool in _pools.items()
+    }
+
+
+async def _run(query: "queries.Query", params: Sequence, target: str, one: bool):
+    started = time.perf_counter()
+    rows = []
+    failed = True
+    try:
+        pool = await get_pool(target)
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(query.sql, tuple(params))
+                rows = await cursor.fetchall()
+        failed = False
+    finally:
+        queries.record(query.name, (time.perf_counter() - started) * 1000, len(rows), failed)
+    if one:
+        return rows[0] if rows else None
+    return list(rows)
+
+
+async def fetchall(query: "queries.Query", params: Sequence = (), target: str = "primary") -> list:
+    """Run ``query`` on its own pooled connection and return every row as a dict."""
+    return await _run(query, params, target, one=False)
+
+
+async def fetchone(query: "queries.Query", params: Sequence = (), target: str = "primary") -> Optional[dict]:
+    """Run ``query`` on its own pooled connection and return its first row, or None."""
+    return await _run(query, params, target, one=True)
+
+
+__all__ = ["available", "close_pools", "fetchall", "fetchone", "get_pool", "pool_stats"]
@@ -0,0 +1,245 @@
+"""Response compression negotiated per request from Accept-Encoding.
+
+Installed by `init_compression` as an ``after_request`` hook. For each
+response it picks the best encoding the client accepts (q-values honoured;
+brotli and zstd are offered only when ``brotli``/``zstandard`` are installed,
+gzip always) and compresses when:
+
+- the mimetype matches ``COMPRESS_MIMETYPES`` (JSON, text, CSV by default),
+- the body is at least ``COMPRESS_MIN_SIZE`` bytes (streamed bodies of an
+  eligible type are always compressed, chunk by chunk with a flush per chunk
+  so clients still receive data incrementally),
+- nothing upstream already encoded it and ``Cache-Control: no-transform`` is
+  not set.
+
+Responses carrying an ETag (see `utils.versioning`) get an encoding suffix on
+the tag and their compressed bodies are kept in a small LRU keyed by
+``(url, etag, encoding)``, so reference data is compressed once per version at a
+higher level instead of on every request.
+"""
+from __future__ import annotations
+
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from flask import Flask, request
+
+from utils.versioning import strip_encoding_suffix
+
+try:  # optional encoders
+    import brotli
+except ImportError:  # pragma: no cover - depends on environment
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depends on environment
+    zstandard = None
+
+DEFAULT_MIMETYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "text/",
+    "image/svg+xml",
+)
+
+# Levels for per-request compression (cheap) and for cached ETag'd bodies,
+# which are compressed once per version and can afford more CPU.
+DEFAULT_LEVELS = {"br": 4, "zstd": 3, "gzip": 6}
+DEFAULT_CACHE_LEVELS = {"br": 9, "zstd": 12, "gzip": 9}
+
+
+def _gzip(data: bytes, level: int) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _gzip_stream(chunks: Iterable[bytes], level: int) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def _brotli(data: bytes, level: int) -> bytes:
+    return brotli.compress(data, quality=level)
+
+
+def _brotli_stream(chunks: Iterable[bytes], level: int) -> Iterator[bytes]:
+    compressor = brotli.Compressor(quality=level)
+    for chunk in chunks:
+        out = compressor.process(chunk) + compressor.flush()
+        if out:
+            yield out
+    yield compressor.finish()
+
+
+def _zstd(data: bytes, level: int) -> bytes:
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+def _zstd_stream(chunks: Iterable[bytes], level: int) -> Iterator[bytes]:
+    compressor = zstandard.ZstdCompressor(level=level).compressobj()
+    for chunk in chunks:
+        out = compressor.compress(chunk) + compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+# encoding -> (one-shot, streaming); order is the server preference on ties
+ENCODERS: Dict[str, Tuple[Callable[[bytes, int], bytes], Callable[[Iterable[bytes], int], Iterator[bytes]]]] = {}
+if brotli is not None:
+    ENCODERS["br"] = (_brotli, _brotli_stream)
+if zstandard is not None:
+    ENCODERS["zstd"] = (_zstd, _zstd_stream)
+ENCODERS["gzip"] = (_gzip, _gzip_stream)
+
+
+class CompressedCache:
+    """Thread-safe LRU of compressed bodies keyed by ``(url, etag, encoding)``."""
+
+    def __init__(self, max_entries: int = 128, max_bytes: int = 32 * 1024 * 1024) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[Tuple[str, str, str], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key: Tuple[str, str, str], body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[key] = body
+            self.size += len(body)
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+def negotiate_encoding(available: Iterable[str] = None) -> Optional[str]:
+    """Best encoding for the current request, or None for identity."""
+    return request.accept_encodings.best_match(list(available or ENCODERS))
+
+
+def _is_compressible(mimetype: str, mimetypes: Tuple[str, ...]) -> bool:
+    return any(
+        mimetype.startswith(prefix) if prefix.endswith("/") else mimetype == prefix
+        for prefix in mimetypes
+    )
+
+
+def init_compression(app: Flask) -> None:
+    """Install the compression ``after_request`` hook (unless COMPRESS_ENABLED is off)."""
+    if not app.config.get("COMPRESS_ENABLED", True):
+        return
+
+    mimetypes = tuple(app.config.get("COMPRESS_MIMETYPES") or DEFAULT_MIMETYPES)
+    min_size = int(app.config.get("COMPRESS_MIN_SIZE", 1024))
+    levels = {**DEFAULT_LEVELS, **(app.config.get("COMPRESS_LEVELS") or {})}
+    cache_levels = {**DEFAULT_CACHE_LEVELS, **(app.config.get("COMPRESS_CACHE_LEVELS") or {})}
+    available = [
+        encoding for encoding in (app.config.get("COMPRESS_ENCODINGS") or ENCODERS)
+        if encoding in ENCODERS
+    ]
+    cache = CompressedCache(
+        int(app.config.get("COMPRESS_CACHE_ENTRIES", 128)),
+        int(app.config.get("COMPRESS_CACHE_MAX_BYTES", 32 * 1024 * 1024)),
+    )
+    app.extensions["compression_cache"] = cache
+
+    @app.after_request
+    def _compress_response(response):
+        if response.status_code == 304:
+            _echo_encoded_etag(response)
+            return response
+        if (
+            response.status_code < 200
+            or response.status_code == 204
+            or request.method == "HEAD"
+            or "Content-Encoding" in response.headers
+            or response.direct_passthrough
+            or not _is_compressible(response.mimetype or "", mimetypes)
+            or "no-transform" in response.headers.get("Cache-Control", "")
+        ):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        encoding = negotiate_encoding(available)
+        if encoding is None:
+            return response
+        compress, compress_stream = ENCODERS[encoding]
+
+        if response.is_streamed:
+            source = response.response
+            # Release callbacks registered on the response itself (the cursor
+            # and pooled connection of json_rows_response) run on close whether
+            # or not the body was read; a generator only runs its own cleanup
+            # when it has started, so it is closed as well but not relied on
+            if hasattr(source, "close"):
+                response.call_on_close(source.close)
+            response.response = compress_stream(response.iter_encoded(), levels[encoding])
+            response.headers.pop("Content-Length", None)
+            response.headers["Content-Encoding"] = encoding
+            return response
+
+        body = response.get_data()
+        if len(body) < min_size:
+            return response
+
+        etag, weak = response.get_etag()
+        if etag:
+            key = (request.full_path, etag, encoding)
+            compressed = cache.get(key)
+            if compressed is None:
+                compressed = compress(body, cache_levels[encoding])
+                cache.put(key, compressed)
+            response.set_etag(f"{etag}-{encoding}", weak)
+        else:
+            compressed = compress(body, levels[encoding])
+            if len(compressed) >= len(body):
+                return response
+
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+
+def _echo_encoded_etag(response) -> None:
+    """On 304, return the validator in the encoded form the client holds."""
+    etag, weak = response.get_etag()
+    if not etag or not request.if_none_match:
+        return
+    for candidate in request.if_none_match.as_set(include_weak=True):
+        if candidate != etag and strip_encoding_suffix(candidate) == etag:
+            response.set_etag(candidate, weak)
+            response.vary.add("Accept-Encoding")
+            return
+
+
+__all__ = [
+    "CompressedCache",
+    "ENCODERS",
+    "init_compression",
+    "negotiate_encoding",
+]
@@ -1,26 +1,319 @@
 from datetime import datetime, date
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
 import mysql.connector
+from mysql.connector.errors import Error as MySQLError, PoolError
 import os
-from dotenv import load_dotenv
+import threading
+import time
 
-load_dotenv()
+from utils.query_audit import wrap_connection
 
-def db_connection():
-    current_file_path = os.path.abspath(__file__) 
-    backend_dir = os.path.dirname(os.path.dirname(current_file_path)) 
-    ssl_cert_path = os.path.join(backend_dir, "ca.pem")
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_env():
+    """Read ``backend/.env`` into ``os.environ``; variables already set win.
+
+    Entrypoints (factory.py, gunicorn.conf.py, the command-line tools) call it
+    before reading settings; importing this module reads nothing.
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv(os.path.join(BACKEND_DIR, ".env"))
+
+
+def _db_config(prefix="DB"):
+    """Connector arguments from ``{prefix}_*``; replica settings fall back to the primary's."""
+    ssl_cert_path = os.path.join(BACKEND_DIR, "ca.pem")
+
+    def setting(name):
+        return os.getenv(f"{prefix}_{name}") or os.getenv(f"DB_{name}")
 
     db_config = {
-        "host": os.getenv("DB_HOST"),
-        "port": os.getenv("DB_PORT"),
-        "user": os.getenv("DB_USER"),
-        "password": os.getenv("DB_PASSWORD"),
-        "database": os.getenv("DB_NAME"),
+        "host": setting("HOST"),
+        "port": setting("PORT"),
+        "user": setting("USER"),
+        "password": setting("PASSWORD"),
+        "database": setting("NAME"),
     }
 
     # Chỉ dùng SSL nếu không phải localhost (hoặc dựa vào biến môi trường khác)
-    if os.getenv("DB_HOST") != "127.0.0.1" and os.getenv("DB_HOST") != "localhost":
+    if db_config["host"] != "127.0.0.1" and db_config["host"] != "localhost":
         db_config["ssl_ca"] = ssl_cert_path
         db_config["ssl_verify_cert"] = True
+    # Pure-Python protocol: cooperative under gevent (see gunicorn.conf.py)
+    if os.getenv("DB_USE_PURE") == "1":
+        db_config["use_pure"] = True
+    return db_config
+
+
+def db_settings(target="primary"):
+    """Connector arguments for ``"primary"`` or ``"replica"`` (used by the async pools)."""
+    return _db_config("DB_REPLICA" if target == "replica" else "DB")
+
+
+class PooledConnection:
+    """Checked-out pool connection; ``close()`` hands it back instead of disconnecting.
+
+    Everything else is delegated to the mysql-connector connection, so handlers
+    keep the ``conn = db_connection() ... conn.close()`` pattern unchanged.
+    """
+
+    def __init__(self, pool, slot):
+        self._pool = pool
+        self._slot = slot
+        self._connection = slot.connection
+
+    def prepared_cursor(self, sql):
+        """Server-side prepared (dictionary) cursor for ``sql``, kept with the pooled connection."""
+        return self._slot.prepared_cursor(sql)
+
+    def evict_prepared(self, sql):
+        self._slot.evict(sql)
+
+    def close(self):
+        if self._slot is not None:
+            slot, self._slot = self._slot, None
+            self._pool.release(slot)
+
+    def __del__(self):
+        # Handlers that return early without close() must not leak the slot
+        self.close()
+
+    def __getattr__(self, name):
+        if self._slot is None:
+            raise PoolError("connection was returned to the pool")
+        return getattr(self._connection, name)
+
+
+class _Slot:
+    """A pooled connection with its prepared statements (LRU, closed on eviction)."""
+
+    def __init__(self, connection, cache_size):
+        self.connection = connection
+        self.cache_size = cache_size
+        self.prepared = OrderedDict()
+        self.released_at = time.monotonic()
+
+    def prepared_cursor(self, sql):
+        cursor = self.prepared.get(sql)
+        if cursor is not None:
+            self.prepared.move_to_end(sql)
+            return cursor
+        cursor = self.connection.cursor(prepared=True, dictionary=True)
+        self.prepared[sql] = cursor
+        if len(self.prepared) > self.cache_size:
+            _, evicted = self.prepared.popitem(last=False)
+            self._close_cursor(evicted)
+        return cursor
+
+    def evict(self, sql):
+        cursor = self.prepared.pop(sql, None)
+        if cursor is not None:
+            self._close_cursor(cursor)
+
+    @staticmethod
+    def _close_cursor(cursor):
+        try:
+            cursor.close()
+        except MySQLError:
+            pass
+
+    def discard(self):
+        try:
+            self.connection.close()
+        except MySQLError:
+            pass
+
+
+class ConnectionPool:
+    """Bounded pool of MySQL connections created on demand.
+
+    Sessions are not reset on release (that would deallocate the prepared
+    statements); instead unread results are drained and any open transaction
+    is rolled back so the next request starts on a fresh snapshot. Idle
+    connections older than ``recycle`` seconds are pinged before reuse.
+    """
+
+    def __init__(self, size, timeout=10.0, recycle=300.0, prepared_cache_size=64, config=None):
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.prepared_cache_size = prepared_cache_size
+        self.config = config or _db_config()
+        self._idle = []
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self.created = 0
+        # Checked out / blocked in acquire() / gave up after ``timeout``
+        self.in_use = 0
+        self.waiting = 0
+        self.timeouts = 0
+
+    def acquire(self, timeout=None):
+        """Check out a connection, waiting up to ``timeout`` (default: the pool's) for a free slot."""
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            self.waiting += 1
+        acquired = self._slots.acquire(timeout=timeout)
+        with self._lock:
+            self.waiting -= 1
+            if acquired:
+                self.in_use += 1
+            else:
+                self.timeouts += 1
+        if not acquired:
+            raise PoolError(f"no database connection free within {timeout}s (DB_POOL_SIZE={self.size})")
+        try:
+            return PooledConnection(self, self._checkout())
+        except Exception:
+            self._release_slot()
+            raise
+
+    def _release_slot(self):
+        with self._lock:
+            self.in_use -= 1
+        self._slots.release()
+
+    def _checkout(self):
+        while True:
+            with self._lock:
+                slot = self._idle.pop() if self._idle else None
+            if slot is None:
+                connection = mysql.connector.connect(**self.config)
+                with self._lock:
+                    self.created += 1
+                return _Slot(connection, self.prepared_cache_size)
+            if time.monotonic() - slot.released_at < self.recycle:
+                return slot
+            try:
+                slot.connection.ping(reconnect=False)
+                return slot
+            except MySQLError:
+                slot.discard()
+
+    def release(self, slot):
+        try:
+            if slot.connection.unread_result:
+                slot.connection.consume_results()
+            if slot.connection.in_transaction:
+                slot.connection.rollback()
+        except MySQLError:
+            slot.discard()
+        else:
+            slot.released_at = time.monotonic()
+            with self._lock:
+                self._idle.append(slot)
+        finally:
+            self._release_slot()
+
+    def warm(self, count):
+        """Open connections until at least ``count`` (at most ``size``) are idle."""
+        held = []
+        try:
+            for _ in range(min(count, self.size)):
+                held.append(self.acquire())
+        finally:
+            for conn in held:
+                conn.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "created": self.created,
+                "idle": len(self._idle),
+                "in_use": self.in_use,
+                "waiting": self.waiting,
+                "timeouts": self.timeouts,
+            }
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for slot in idle:
+            slot.discard()
+
+
+_pools = {}
+_pool_lock = threading.Lock()
+
+# Set by utils.replicas.read_only for views that may be served by the replica
+_route = ContextVar("db_route", default="primary")
+
+
+def _shared_pool(name, prefix):
+    """Process-wide pool from ``{prefix}_POOL_*`` (DB_POOL_* as fallback); rebuilt after fork."""
+    size = int(os.getenv(f"{prefix}_POOL_SIZE") or os.getenv("DB_POOL_SIZE", "10"))
+    if size <= 0:
+        return None
+    key = (name, os.getpid())
+    pool = _pools.get(key)
+    if pool is None:
+        with _pool_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = ConnectionPool(
+                    size,
+                    timeout=float(os.getenv("DB_POOL_TIMEOUT", "10")),
+                    recycle=float(os.getenv("DB_POOL_RECYCLE", "300")),
+                    prepared_cache_size=int(os.getenv("DB_PREPARED_CACHE_SIZE", "64")),
+                    config=_db_config(prefix),
+                )
+    return pool
+
+
+def get_pool():
+    """Primary pool from DB_POOL_* settings (None when DB_POOL_SIZE=0)."""
+    return _shared_pool("primary", "DB")
+
+
+def replica_configured():
+    return bool(os.getenv("DB_REPLICA_HOST"))
+
+
+def get_replica_pool():
+    """Replica pool (DB_REPLICA_POOL_SIZE, default DB_POOL_SIZE), or None."""
+    if not replica_configured():
+        return None
+    return _shared_pool("replica", "DB_REPLICA")
+
+
+def replica_connection():
+    """Connection to the read replica, bypassing the routing decision."""
+    pool = get_replica_pool()
+    if pool is None:
+        return mysql.connector.connect(**_db_config("DB_REPLICA"))
+    return pool.acquire()
+
+
+@contextmanager
+def route_to(target):
+    """Send ``db_connection()`` calls in this block to ``"replica"`` or ``"primary"``."""
+    token = _route.set(target)
+    try:
+        yield
+    finally:
+        _route.reset(token)
+
+
+def current_route():
+    """Where ``db_connection()`` would connect right now: ``"replica"`` or ``"primary"``."""
+    return "replica" if _route.get() == "replica" and replica_configured() else "primary"
+
+
+def db_connection(**options):
+    """Connection from the pool; ``options`` (extra connector arguments) open a dedicated one.
 
-    return mysql.connector.connect(**db_config)
\ No newline at end of file
+    Inside ``route_to("replica")`` pooled connections come from the replica.
+    """
+    if not options and current_route() == "replica":
+        return wrap_connection(replica_connection())
+    pool = None if options else get_pool()
+    if pool is None:
+        db_config = _db_config()
+        db_config.update(options)
+        return wrap_connection(mysql.connector.connect(**db_config))
+    return wrap_connection(pool.acquire())
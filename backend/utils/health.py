@@ -0,0 +1,226 @@
+"""Liveness and readiness endpoints answered from memory.
+
+- ``GET /livez``: the process is up and its workers answer. No I/O, always 200.
+- ``GET /readyz`` (and ``/health``): whether this process should get traffic.
+
+Neither touches the database. A probe thread per process (started like the
+warm-up: gunicorn's ``post_worker_init`` or the first request) checks every
+``HEALTH_PROBE_INTERVAL`` seconds:
+
+- ``db``: ``SELECT 1`` on a pooled connection, waiting at most
+  ``HEALTH_PROBE_TIMEOUT`` seconds for one,
+- ``pool``: connections in use, requests waiting and acquire timeouts of the
+  primary (and replica) pool,
+- ``replica``: lag as seen by `utils.replicas.replica_monitor`,
+- ``scheduler``: the last run of each job, from the state file seed_trips.py
+  writes (the jobs usually run in another process).
+
+It serializes the answer once per run; ``/readyz`` only sends those bytes.
+
+============  ======  ======================================================
+status        code    when
+============  ======  ======================================================
+warming       503     the warm-up (utils/warmup.py) has not finished
+unavailable   503     the database is unreachable, or no probe finished in
+                      the last ``HEALTH_PROBE_MAX_AGE`` seconds
+degraded      200     serving, with the reasons in ``degraded``: pool at
+                      ``HEALTH_POOL_SATURATION`` or more of its size, requests
+                      waiting or timing out; replica lagging (reads go to
+                      the primary); a job late (twice its interval) or failed
+ready         200     none of the above
+============  ======  ======================================================
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from flask import Flask, Response, current_app, jsonify
+from mysql.connector.errors import PoolError
+
+from utils.database import db_connection, get_pool, get_replica_pool, replica_configured
+from utils.serialization import dumps_bytes
+from utils.warmup import warmup_status
+
+_started = time.time()
+
+
+class HealthProbe:
+    """Background checks of one process; the last result is kept ready to send."""
+
+    def __init__(self, app: Flask) -> None:
+        self.app = app
+        self.pid = os.getpid()
+        # (monotonic time, HTTP status, serialized body) of the last run
+        self.result: Optional[Tuple[float, int, bytes]] = None
+        self.runs = 0
+        self._timeouts: Dict[str, int] = {}
+
+    def start(self) -> None:
+        threading.Thread(target=self._loop, name="health-probe", daemon=True).start()
+
+    def _loop(self) -> None:
+        interval = self.app.config["HEALTH_PROBE_INTERVAL"]
+        while True:
+            started = time.monotonic()
+            self.run_once()
+            time.sleep(max(interval - (time.monotonic() - started), 0))
+
+    def run_once(self) -> None:
+        """One round of checks; keeps the result for ``/readyz``."""
+        with self.app.app_context():
+            try:
+                report = self.check()
+            except Exception as exc:  # keep probing; a stale result turns unavailable
+                current_app.logger.warning("health probe failed: %s", exc)
+            else:
+                status = 503 if report["status"] == "unavailable" else 200
+                self.result = (time.monotonic(), status, dumps_bytes(report) + b"\n")
+                self.runs += 1
+
+    # -- checks --------------------------------------------------------------
+
+    def check(self) -> dict:
+        config = self.app.config
+        degraded: List[str] = []
+        db = self._check_db(config["HEALTH_PROBE_TIMEOUT"])
+        if db["state"] == "busy":
+            degraded.append("db: no pooled connection free for the probe")
+
+        pools = {}
+        for name, pool in (("primary", get_pool()), ("replica", get_replica_pool())):
+            if pool is None:
+                continue
+            stats = pool.stats()
+            new_timeouts = stats["timeouts"] - self._timeouts.get(name, stats["timeouts"])
+            self._timeouts[name] = stats["timeouts"]
+            stats["saturation"] = round(stats["in_use"] / stats["size"], 2)
+            if stats["saturation"] >= config["HEALTH_POOL_SATURATION"] or stats["waiting"] or new_timeouts:
+                degraded.append(
+                    f"pool {name}: {stats['in_use']}/{stats['size']} in use, {stats['waiting']} waiting, "
+                    f"{new_timeouts} timed out since the last probe"
+                )
+            pools[name] = stats
+
+        replica = None
+        if replica_configured():
+            from utils.replicas import replica_monitor
+
+            monitor = replica_monitor()
+            monitor.usable()
+            replica = monitor.status()
+            if not replica["usable"]:
+                degraded.append(f"replica: lag {replica['lag_seconds']} s, reads served by the primary")
+
+        scheduler = self._check_scheduler(degraded)
+
+        if db["state"] == "down":
+            status = "unavailable"
+        else:
+            status = "degraded" if degraded else "ready"
+        return {
+            "status": status,
+            # /health answered this before
+            "db": "connected" if db["state"] != "down" else "unreachable",
+            "degraded": degraded,
+            "checked_at": datetime.now().isoformat(timespec="seconds"),
+            "pid": self.pid,
+            "checks": {"db": db, "pool": pools, "replica": replica, "scheduler": scheduler},
+        }
+
+    @staticmethod
+    def _check_db(timeout: float) -> dict:
+        started = time.monotonic()
+        try:
+            pool = get_pool()
+            # Reuse a pooled connection: probing must not churn connections
+            conn = pool.acquire(timeout=timeout) if pool is not None else db_connection()
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+                cursor.close()
+            finally:
+                conn.close()
+        except PoolError as exc:
+            return {"state": "busy", "error": str(exc)}
+        except Exception as exc:
+            return {"state": "down", "error": str(exc)}
+        return {"state": "up", "latency_ms": round((time.monotonic() - started) * 1000, 2)}
+
+    @staticmethod
+    def _check_scheduler(degraded: List[str]) -> dict:
+        from seed_trips import JOB_INTERVALS, scheduler_state
+
+        mode = os.getenv("SCHEDULER_MODE", "deferred")
+        state = scheduler_state()
+        if state is None:
+            # Not started yet, or running somewhere this host cannot see
+            return {"mode": mode, "state": "unknown"}
+        now = time.time()
+        jobs = {}
+        for job_id, interval in JOB_INTERVALS.items():
+            last = state.get("jobs", {}).get(job_id) or {}
+            since = max(last.get("finished_at") or 0, state.get("started_at") or 0)
+            late = now - since > 2 * interval
+            if late:
+                degraded.append(f"scheduler: {job_id} has not run for {round((now - since) / 3600, 1)} h")
+            elif last and not last["ok"]:
+                degraded.append(f"scheduler: last {job_id} run failed")
+            jobs[job_id] = dict(last, late=late)
+        return {"mode": mode, "state": "running", "pid": state.get("pid"), "jobs": jobs}
+
+
+_probes: Dict[int, HealthProbe] = {}
+_lock = threading.Lock()
+
+
+def start_probe(app: Flask) -> HealthProbe:
+    """This process's probe, started on first use (forked workers start their own)."""
+    pid = os.getpid()
+    probe = _probes.get(pid)
+    if probe is None:
+        with _lock:
+            probe = _probes.get(pid)
+            if probe is None:
+                probe = _probes[pid] = HealthProbe(app)
+                probe.start()
+    return probe
+
+
+def readiness(app: Flask):
+    """The ``/readyz`` answer: the probe's last result while it is fresh."""
+    warmup = warmup_status()
+    if warmup["state"] != "ready":
+        return jsonify({"status": "warming", "warmup": warmup}), 503
+    result = start_probe(app).result
+    max_age = app.config["HEALTH_PROBE_MAX_AGE"]
+    if result is None or time.monotonic() - result[0] > max_age:
+        return jsonify({"status": "unavailable", "degraded": [f"no health probe in the last {max_age} s"]}), 503
+    _, status, body = result
+    return Response(body, status=status, mimetype="application/json")
+
+
+def init_health(app: Flask) -> None:
+    """Register ``/livez``, ``/readyz`` and ``/health``; probes start with the first request."""
+
+    @app.before_request
+    def _start_probe():
+        start_probe(app)
+
+    @app.route("/livez", methods=["GET"])
+    def livez():
+        return jsonify({"status": "alive", "pid": os.getpid(), "uptime_seconds": round(time.time() - _started)})
+
+    @app.route("/readyz", methods=["GET"])
+    def readyz():
+        return readiness(app)
+
+    # Same answer as /readyz for probes configured before it existed
+    app.add_url_rule("/health", "health", readyz, methods=["GET"])
+
+
+__all__ = ["HealthProbe", "init_health", "readiness", "start_probe"]
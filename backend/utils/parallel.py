@@ -0,0 +1,92 @@
+"""Run the independent reads of one request at the same time.
+
+Each read gets its own connection from `utils.database.db_connection` and
+runs on a shared thread pool, except the first, which runs on the calling
+thread. The caller's context (replica routing, query audit scope) is copied
+into every read::
+
+    booking, tickets = parallel_reads(
+        (queries.fetchone, queries.BOOKING_DETAIL, (booking_id,)),
+        (queries.fetchall, queries.BOOKING_TICKETS, (booking_id,)),
+    )
+
+The request then waits for its slowest read instead of their sum. Call it
+without holding a connection yourself: reads take and return their own, and
+a caller sitting on one while waiting for more can starve the pool.
+
+Without a pool (``DB_POOL_SIZE=0``) the reads run one after another on a
+single connection, since a fresh connection per read costs more than it saves.
+``PARALLEL_QUERY_WORKERS`` (default 16) sizes the thread pool per process.
+"""
+from __future__ import annotations
+
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, List, Sequence, Tuple
+
+from utils.database import current_route, db_connection, get_pool, get_replica_pool
+
+Read = Tuple[Callable[..., Any], Any, Sequence]
+
+_executors = {}
+_executor_lock = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    # Worker threads do not survive fork; each process builds its own
+    pid = os.getpid()
+    executor = _executors.get(pid)
+    if executor is None:
+        with _executor_lock:
+            executor = _executors.get(pid)
+            if executor is None:
+                executor = _executors[pid] = ThreadPoolExecutor(
+                    max_workers=int(os.getenv("PARALLEL_QUERY_WORKERS", "16")),
+                    thread_name_prefix="db-read",
+                )
+    return executor
+
+
+def _pooled() -> bool:
+    pool = get_replica_pool() if current_route() == "replica" else get_pool()
+    return pool is not None
+
+
+def _read(fn, query, params):
+    conn = db_connection()
+    try:
+        return fn(conn, query, params)
+    finally:
+        conn.close()
+
+
+def parallel_reads(*reads: Read) -> List[Any]:
+    """Run ``(fn, query, params)`` reads concurrently and return their results in order.
+
+    ``fn`` is called as ``fn(conn, query, params)``, e.g. `queries.fetchall` or
+    `queries.fetchone`. The first error (in argument order) is raised once
+    every read has finished.
+    """
+    if len(reads) < 2 or not _pooled():
+        conn = db_connection()
+        try:
+            return [fn(conn, query, params) for fn, query, params in reads]
+        finally:
+            conn.close()
+
+    executor = _executor()
+    # A context can only be entered by one thread at a time: one copy per read
+    futures = [
+        executor.submit(contextvars.copy_context().run, _read, fn, query, params)
+        for fn, query, params in reads[1:]
+    ]
+    try:
+        first = _read(*reads[0])
+    finally:
+        wait(futures)
+    return [first] + [future.result() for future in futures]
+
+
+__all__ = ["parallel_reads"]
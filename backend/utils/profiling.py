@@ -0,0 +1,236 @@
+"""Opt-in profiling hooks for live workers.
+
+Three tools, all disabled unless ``PROFILING_ENABLED`` is set:
+
+- `SamplingProfiler`: samples the stacks of threads currently serving requests
+  for a time window and aggregates them per endpoint as collapsed stacks
+  (``endpoint;frame;frame count``), ready for flamegraph.pl / speedscope.
+- Single-request cProfile capture: a request carrying
+  ``X-Profile: <PROFILING_TOKEN>`` is profiled and the result is kept in a
+  small ring buffer; the response gets an ``X-Profile-Id`` header.
+- tracemalloc snapshots that can be diffed against each other over time.
+
+Only the current process is observed, so with several workers each one has to
+be profiled separately. When disabled no request hooks are installed.
+"""
+from __future__ import annotations
+
+import cProfile
+import hmac
+import io
+import itertools
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict, defaultdict, deque
+from typing import Dict, Optional
+
+from flask import Flask, g, request
+
+# thread ident -> endpoint, only maintained while a sampling session runs
+_thread_endpoints: Dict[int, str] = {}
+_sampling_sessions = 0
+_sampling_lock = threading.Lock()
+
+_captures: "deque[dict]" = deque(maxlen=20)
+_capture_ids = itertools.count(1)
+
+_snapshots: "OrderedDict[int, tuple]" = OrderedDict()
+_snapshot_ids = itertools.count(1)
+_MAX_SNAPSHOTS = 10
+
+
+class ProfilerBusy(RuntimeError):
+    """Raised when a sampling session is already running in this process."""
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Statistical profiler aggregating request-thread stacks per endpoint."""
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64) -> None:
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self.stacks: Dict[str, Counter] = defaultdict(Counter)
+
+    def run(self, seconds: float) -> "SamplingProfiler":
+        global _sampling_sessions
+        if not _sampling_lock.acquire(blocking=False):
+            raise ProfilerBusy("a sampling session is already running")
+        _sampling_sessions += 1
+        try:
+            own_ident = threading.get_ident()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                for ident, frame in sys._current_frames().items():
+                    if ident == own_ident:
+                        continue
+                    endpoint = _thread_endpoints.get(ident)
+                    if endpoint is None:
+                        continue  # idle worker thread
+                    self._add_sample(endpoint, frame)
+                self.samples += 1
+                time.sleep(self.interval)
+        finally:
+            _sampling_sessions -= 1
+            _sampling_lock.release()
+        return self
+
+    def _add_sample(self, endpoint: str, frame) -> None:
+        labels = []
+        while frame is not None and len(labels) < self.max_depth:
+            labels.append(_frame_label(frame))
+            frame = frame.f_back
+        labels.reverse()
+        self.stacks[endpoint][";".join(labels)] += 1
+
+    def collapsed(self) -> str:
+        """Return Brendan Gregg collapsed-stack text, one line per unique stack."""
+        lines = []
+        for endpoint, stacks in sorted(self.stacks.items()):
+            for stack, count in stacks.most_common():
+                lines.append(f"{endpoint};{stack} {count}")
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def summary(self) -> dict:
+        return {
+            "samples": self.samples,
+            "interval_ms": self.interval * 1000,
+            "endpoints": {
+                endpoint: {"hits": sum(stacks.values()), "unique_stacks": len(stacks)}
+                for endpoint, stacks in self.stacks.items()
+            },
+        }
+
+
+def list_captures() -> list:
+    return [
+        {k: capture[k] for k in ("id", "endpoint", "path", "elapsed_ms", "captured_at")}
+        for capture in _captures
+    ]
+
+
+def get_capture(capture_id: int) -> Optional[dict]:
+    for capture in _captures:
+        if capture["id"] == capture_id:
+            return capture
+    return None
+
+
+def take_memory_snapshot(frames: int = 25) -> dict:
+    """Start tracemalloc if needed and store a snapshot; returns its metadata."""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    snapshot_id = next(_snapshot_ids)
+    current, peak = tracemalloc.get_traced_memory()
+    _snapshots[snapshot_id] = (snapshot, time.time())
+    while len(_snapshots) > _MAX_SNAPSHOTS:
+        _snapshots.popitem(last=False)
+    return {"id": snapshot_id, "traced_bytes": current, "peak_bytes": peak}
+
+
+def list_memory_snapshots() -> list:
+    return [{"id": sid, "taken_at": taken_at} for sid, (_, taken_at) in _snapshots.items()]
+
+
+def diff_memory_snapshots(from_id: int, to_id: int, limit: int = 25, key: str = "lineno") -> Optional[list]:
+    """Return the top allocation differences between two stored snapshots."""
+    if from_id not in _snapshots or to_id not in _snapshots:
+        return None
+    old, _ = _snapshots[from_id]
+    new, _ = _snapshots[to_id]
+    stats = new.compare_to(old, key)
+    return [
+        {
+            "location": str(stat.traceback),
+            "size_diff": stat.size_diff,
+            "size": stat.size,
+            "count_diff": stat.count_diff,
+            "count": stat.count,
+        }
+        for stat in stats[:limit]
+    ]
+
+
+def stop_memory_tracing() -> None:
+    _snapshots.clear()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def init_profiling(app: Flask) -> None:
+    """Install request hooks backing the profiling endpoints (no-op when disabled)."""
+    if not app.config.get("PROFILING_ENABLED"):
+        return
+
+    global _captures
+    token = app.config.get("PROFILING_TOKEN") or ""
+    _captures = deque(_captures, maxlen=int(app.config.get("PROFILING_MAX_CAPTURES", 20)))
+
+    @app.before_request
+    def _profiling_before():
+        if _sampling_sessions:
+            _thread_endpoints[threading.get_ident()] = request.endpoint or request.path
+        header = request.headers.get("X-Profile")
+        if token and header and hmac.compare_digest(header, token):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                return None  # another profiler already active in this thread
+            g.request_profiler = profiler
+            g.request_profiler_started = time.perf_counter()
+        return None
+
+    @app.after_request
+    def _profiling_after(response):
+        profiler = g.pop("request_profiler", None)
+        if profiler is None:
+            return response
+        profiler.disable()
+        elapsed_ms = (time.perf_counter() - g.pop("request_profiler_started")) * 1000
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(60)
+        profiler.create_stats()
+        capture_id = next(_capture_ids)
+        _captures.append({
+            "id": capture_id,
+            "endpoint": request.endpoint,
+            "path": request.full_path,
+            "elapsed_ms": round(elapsed_ms, 3),
+            "captured_at": time.time(),
+            "report": report.getvalue(),
+            "pstats": marshal.dumps(profiler.stats),
+        })
+        response.headers["X-Profile-Id"] = str(capture_id)
+        return response
+
+    @app.teardown_request
+    def _profiling_teardown(_exc):
+        _thread_endpoints.pop(threading.get_ident(), None)
+
+
+__all__ = [
+    "ProfilerBusy",
+    "SamplingProfiler",
+    "diff_memory_snapshots",
+    "get_capture",
+    "init_profiling",
+    "list_captures",
+    "list_memory_snapshots",
+    "stop_memory_tracing",
+    "take_memory_snapshot",
+]
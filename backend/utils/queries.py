@@ -0,0 +1,607 @@
+"""Registry of the hot SQL statements, run as server-side prepared statements.
+
+Every statement the blueprints issue on a fixed text lives here as a named
+`Query`. Executing one through `fetchall` / `fetchone` / `execute` /
+`insert`:
+
+- prepares it once per pooled connection and reuses the statement handle on
+  later checkouts (see `utils.database.ConnectionPool`), so MySQL skips the
+  parse/optimize step and the row data travels in the binary protocol,
+- records calls, rows and latency per query name, served by
+  ``GET /api/admin/queries``.
+
+Statements whose shape depends on the request (IN lists, optional filters)
+keep ``{slot}`` markers and are filled in with `Query.format`; each distinct
+shape gets its own prepared statement but shares the name for the stats.
+
+Without a pool (``DB_POOL_SIZE=0``) the same statements run through a plain
+cursor. Audit scopes keep the prepared path and log each statement with its
+parameters (see `utils.query_audit`).
+"""
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from typing import Dict, Optional, Sequence
+
+from mysql.connector import errorcode
+from mysql.connector.errors import Error as MySQLError
+
+
+class Query:
+    """A named statement; the text is interned so equal variants share one handle."""
+
+    __slots__ = ("name", "sql")
+
+    def __init__(self, name: str, sql: str) -> None:
+        self.name = name
+        # Prepared cursors only re-prepare when handed a different string object
+        self.sql = sys.intern(sql)
+
+    def format(self, **parts: str) -> "Query":
+        """Fill the ``{slot}`` markers (IN lists, optional conditions)."""
+        return Query(self.name, self.sql.format(**parts))
+
+    def __repr__(self) -> str:
+        return f"Query({self.name!r})"
+
+
+def placeholders(count: int) -> str:
+    """``%s, %s, ...`` for an IN list of ``count`` values."""
+    return ", ".join(["%s"] * count)
+
+
+# -- execution ---------------------------------------------------------------
+
+_stats: Dict[str, Dict[str, float]] = {}
+_stats_lock = threading.Lock()
+
+
+def record(name: str, elapsed_ms: float, rows: int, failed: bool) -> None:
+    """Add one execution of ``name`` to the stats (also fed by `utils.async_database`)."""
+    with _stats_lock:
+        entry = _stats.get(name)
+        if entry is None:
+            entry = _stats[name] = {"calls": 0, "errors": 0, "rows": 0, "total_ms": 0.0, "max_ms": 0.0}
+        entry["calls"] += 1
+        entry["errors"] += failed
+        entry["rows"] += rows
+        entry["total_ms"] += elapsed_ms
+        entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+
+
+def _cursor(conn, sql):
+    """Return ``(cursor, shared)``; shared cursors belong to the pooled connection."""
+    prepared_cursor = getattr(conn, "prepared_cursor", None)
+    if prepared_cursor is None:
+        return conn.cursor(dictionary=True), False
+    return prepared_cursor(sql), True
+
+
+def _run(conn, query: Query, params: Sequence, consume):
+    started = time.perf_counter()
+    rows = 0
+    failed = True
+    cursor, shared = _cursor(conn, query.sql)
+    try:
+        try:
+            cursor.execute(query.sql, tuple(params))
+        except MySQLError as exc:
+            if not shared or exc.errno != errorcode.ER_UNKNOWN_STMT_HANDLER:
+                raise
+            # The server forgot the handle (e.g. max_prepared_stmt_count churn); prepare again
+            conn.evict_prepared(query.sql)
+            cursor = conn.prepared_cursor(query.sql)
+            cursor.execute(query.sql, tuple(params))
+        result, rows = consume(cursor)
+        failed = False
+        return result
+    finally:
+        if not shared:
+            cursor.close()
+        record(query.name, (time.perf_counter() - started) * 1000, rows, failed)
+
+
+def _all_rows(cursor):
+    rows = cursor.fetchall()
+    return rows, len(rows)
+
+
+def _first_row(cursor):
+    rows = cursor.fetchall()
+    return (rows[0] if rows else None), len(rows)
+
+
+def fetchall(conn, query: Query, params: Sequence = ()) -> list:
+    """Run ``query`` and return every row as a dict."""
+    return _run(conn, query, params, _all_rows)
+
+
+def fetchone(conn, query: Query, params: Sequence = ()) -> Optional[dict]:
+    """Run ``query`` and return its first row as a dict, or None."""
+    return _run(conn, query, params, _first_row)
+
+
+def execute(conn, query: Query, params: Sequence = ()) -> int:
+    """Run a write statement and return the affected row count."""
+    return _run(conn, query, params, lambda cursor: (cursor.rowcount, max(cursor.rowcount, 0)))
+
+
+def insert(conn, query: Query, params: Sequence = ()):
+    """Run an INSERT and return the generated id."""
+    return _run(conn, query, params, lambda cursor: (cursor.lastrowid, max(cursor.rowcount, 0)))
+
+
+def stats() -> Dict[str, dict]:
+    """Per-query counters since start (or the last `reset_stats`), slowest total first."""
+    with _stats_lock:
+        snapshot = {name: dict(entry) for name, entry in _stats.items()}
+    for entry in snapshot.values():
+        entry["avg_ms"] = round(entry["total_ms"] / entry["calls"], 3) if entry["calls"] else 0.0
+        entry["total_ms"] = round(entry["total_ms"], 3)
+        entry["max_ms"] = round(entry["max_ms"], 3)
+    return dict(sorted(snapshot.items(), key=lambda item: -item[1]["total_ms"]))
+
+
+def reset_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
+
+
+# -- shared lookups ------------------------------------------------------------
+
+STATION_EXISTS = Query("station.exists", "SELECT 1 FROM station WHERE station_id = %s")
+OPERATOR_EXISTS = Query("operator.exists", "SELECT 1 FROM operator WHERE operator_id = %s")
+ROUTE_EXISTS = Query("routetrip.exists", "SELECT 1 FROM routetrip WHERE route_id = %s")
+TRIP_EXISTS = Query("trip.exists", "SELECT 1 FROM trip WHERE trip_id = %s")
+BUS_EXISTS = Query("bus.exists", "SELECT 1 FROM bus WHERE bus_id = %s")
+FARE_EXISTS = Query("fare.exists", "SELECT 1 FROM fare WHERE fare_id = %s")
+BOOKING_EXISTS = Query("booking.exists", "SELECT 1 FROM booking WHERE booking_id = %s")
+
+TRIP_CAPACITY = Query("trip.capacity", """
+    SELECT t.trip_id, t.route_id, b.capacity
+    FROM trip t
+    JOIN bus b ON t.bus_id = b.bus_id
+    WHERE t.trip_id = %s
+""")
+
+# Capacity (NULL for a trip without a bus) plus one row per Issued/Used ticket
+# (ticket_id NULL when none; its seat_code may be NULL too): the whole seat
+# map, including what fn_get_available_seats derives, in one read.
+# Read it with routes.trips.seat_map.
+TRIP_SEAT_MAP = Query("trip.seat_map", """
+    SELECT b.capacity, tk.ticket_id, tk.seat_code
+    FROM trip t
+    LEFT JOIN bus b ON t.bus_id = b.bus_id
+    LEFT JOIN ticket tk ON tk.trip_id = t.trip_id AND tk.ticket_status IN ('Issued', 'Used')
+    WHERE t.trip_id = %s
+    ORDER BY tk.seat_code
+""")
+
+# -- schedule ------------------------------------------------------------------
+
+ACTIVE_STATIONS = Query("schedule.stations", """
+    SELECT station_id, city, station_name
+    FROM station
+    WHERE active_flag = 'Active'
+    ORDER BY city, station_name
+""")
+
+TRIP_SEARCH_FROM = """
+            FROM trip t
+            JOIN routetrip rt ON t.route_id = rt.route_id
+            JOIN station dep ON rt.station_id = dep.station_id
+            LEFT JOIN station arr ON rt.arrival_station = arr.station_id
+            JOIN bus b ON t.bus_id = b.bus_id
+            JOIN operator op ON rt.operator_id = op.operator_id
+            WHERE DATE(t.service_date) = %s
+              AND t.trip_status = 'Scheduled'
+            {filters}
+            ORDER BY t.service_date ASC
+"""
+
+# {filters} holds the departure/destination conditions of `_station_filter`
+TRIP_SEARCH = Query("schedule.search_trips", """
+            SELECT
+                t.trip_id,
+                t.service_date,
+                t.arrival_datetime,
+                rt.route_id,
+                rt.default_duration_time,
+                dep.station_id AS departure_station_id,
+                dep.station_name AS departure_name,
+                dep.city AS departure_city,
+                arr.station_name AS arrival_name,
+                arr.city AS arrival_city,
+                arr.station_id AS arrival_station_id,
+                b.vehicle_type,
+                op.brand_name,
+                COALESCE((
+                    SELECT seat_price
+                    FROM fare f
+                    WHERE f.route_id = rt.route_id
+                    ORDER BY f.valid_from DESC
+                    LIMIT 1
+                ), 0) AS seat_price,
+                fn_get_available_seats(t.trip_id) AS available_seats
+""" + TRIP_SEARCH_FROM)
+
+# Same document as schedule._trip_search_encoder, built by MySQL and streamed
+# by json_rows_response (plain cursor). The two leading %s are SQL_CLOCK_FORMAT;
+# price stays a string like Decimal does in jsonify.
+TRIP_SEARCH_JSON = Query("schedule.search_trips_rendered", """
+            SELECT JSON_OBJECT(
+                'trip_id', t.trip_id,
+                'station_id', CAST(dep.station_id AS CHAR),
+                'station_name', dep.station_name,
+                'route_name', IF(arr.city IS NULL OR arr.city = '',
+                                 dep.city, CONCAT(dep.city, ' -> ', arr.city)),
+                'time_start', COALESCE(DATE_FORMAT(t.service_date, %s), ''),
+                'time_end', COALESCE(DATE_FORMAT(t.arrival_datetime, %s), ''),
+                'duration', CASE
+                    WHEN rt.default_duration_time IS NULL THEN ''
+                    WHEN MINUTE(rt.default_duration_time) = 0
+                        THEN CONCAT(HOUR(rt.default_duration_time), 'h')
+                    WHEN HOUR(rt.default_duration_time) = 0
+                        THEN CONCAT(MINUTE(rt.default_duration_time), 'm')
+                    ELSE CONCAT(HOUR(rt.default_duration_time), 'h ',
+                                MINUTE(rt.default_duration_time), 'm')
+                END,
+                'vehicle_type', b.vehicle_type,
+                'brand_name', op.brand_name,
+                'price', CAST(COALESCE((
+                    SELECT seat_price
+                    FROM fare f
+                    WHERE f.route_id = rt.route_id
+                    ORDER BY f.valid_from DESC
+                    LIMIT 1
+                ), 0) AS CHAR),
+                'available_seats', COALESCE(fn_get_available_seats(t.trip_id), 0),
+                'arrival_station_id', CAST(arr.station_id AS CHAR),
+                'arrival_city', arr.city
+            )
+""" + TRIP_SEARCH_FROM)
+
+TRIP_DETAIL = Query("schedule.trip_detail", """
+    SELECT
+        t.trip_id,
+        t.service_date,
+        t.arrival_datetime,
+        t.trip_status,
+        rt.route_id,
+        rt.default_duration_time,
+        rt.distance,
+        dep.station_id AS departure_station_id,
+        dep.station_name AS departure_name,
+        dep.city AS departure_city,
+        dep.address_station AS departure_address,
+        arr.station_id AS arrival_station_id,
+        arr.station_name AS arrival_name,
+        arr.city AS arrival_city,
+        arr.address_station AS arrival_address,
+        b.bus_id,
+        b.plate_number,
+        b.capacity,
+        b.vehicle_type,
+        op.operator_id,
+        op.brand_name,
+        op.legal_name,
+        COALESCE((
+            SELECT seat_price
+            FROM fare f
+            WHERE f.route_id = rt.route_id
+            ORDER BY f.valid_from DESC
+            LIMIT 1
+        ), 0) AS seat_price,
+        (
+            SELECT fare_id
+            FROM fare f2
+            WHERE f2.route_id = rt.route_id
+            ORDER BY f2.valid_from DESC
+            LIMIT 1
+        ) AS fare_id,
+        fn_get_available_seats(t.trip_id) AS available_seats
+    FROM trip t
+    JOIN routetrip rt ON t.route_id = rt.route_id
+    JOIN station dep ON rt.station_id = dep.station_id
+    LEFT JOIN station arr ON rt.arrival_station = arr.station_id
+    JOIN bus b ON t.bus_id = b.bus_id
+    JOIN operator op ON rt.operator_id = op.operator_id
+    WHERE t.trip_id = %s
+""")
+
+# -- bookings and tickets ------------------------------------------------------
+
+FARE_PRICE = Query("booking.fare_price", "SELECT route_id, seat_price FROM fare WHERE fare_id = %s")
+
+TAKEN_SEATS = Query("booking.taken_seats", """
+    SELECT seat_code
+    FROM ticket
+    WHERE trip_id = %s
+      AND seat_code IN ({seats})
+      AND ticket_status IN ('Issued', 'Used')
+""")
+
+INSERT_BOOKING = Query("booking.insert", """
+    INSERT INTO booking (currency, total_amount, account_id, operator_id)
+    VALUES (%s, 0, %s, %s)
+""")
+
+INSERT_TICKET = Query("ticket.insert", """
+    INSERT INTO ticket (
+        trip_id, account_id, booking_id, fare_id,
+        qr_code_link, ticket_status, seat_price, seat_code
+    )
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+""")
+
+TICKET_SERIALS = Query("ticket.serials", """
+    SELECT ticket_id, serial_number
+    FROM ticket
+    WHERE ticket_id IN ({ids})
+""")
+
+UPDATE_BOOKING_TOTAL = Query("booking.update_total", """
+    UPDATE booking
+    SET total_amount = fn_calculate_booking_total(%s)
+    WHERE booking_id = %s
+""")
+
+BOOKING_SUMMARY = Query("booking.summary", """
+    SELECT
+        b.booking_id,
+        b.currency,
+        b.total_amount,
+        b.booking_status,
+        b.account_id,
+        b.operator_id,
+        COUNT(t.ticket_id) AS ticket_count
+    FROM booking b
+    LEFT JOIN ticket t ON b.booking_id = t.booking_id
+    WHERE b.booking_id = %s
+    GROUP BY b.booking_id
+""")
+
+BOOKING_DETAIL = Query("booking.detail", """
+    SELECT
+        b.booking_id,
+        b.currency,
+        b.total_amount,
+        b.booking_status,
+        b.account_id,
+        b.operator_id,
+        b.admin_note
+    FROM booking b
+    WHERE b.booking_id = %s
+""")
+
+BOOKING_TICKETS = Query("booking.tickets", """
+    SELECT
+        t.ticket_id,
+        t.serial_number,
+        t.seat_code,
+        t.seat_price,
+        t.ticket_status,
+        t.qr_code_link,
+        t.trip_id,
+        t.fare_id
+    FROM ticket t
+    WHERE t.booking_id = %s
+""")
+
+TICKET_LOOKUP = Query("ticket.lookup", """
+    SELECT
+        t.ticket_id,
+        t.serial_number,
+        t.seat_code,
+        t.seat_price,
+        t.ticket_status,
+        t.qr_code_link,
+        tr.trip_id,
+        tr.service_date,
+        tr.trip_status,
+        rt.route_id,
+        rt.distance,
+        rt.default_duration_time,
+        b.plate_number,
+        b.vehicle_type,
+        b.capacity,
+        a.phone,
+        a.email,
+        s1.station_name AS departure_station,
+        s1.city AS departure_city,
+        s1.province AS departure_province
+    FROM ticket t
+    INNER JOIN trip tr ON t.trip_id = tr.trip_id
+    INNER JOIN routetrip rt ON tr.route_id = rt.route_id
+    INNER JOIN bus b ON tr.bus_id = b.bus_id
+    INNER JOIN account a ON t.account_id = a.account_id
+    INNER JOIN station s1 ON rt.station_id = s1.station_id
+    WHERE t.serial_number = %s AND a.phone = %s
+""")
+
+TICKET_DETAIL = Query("ticket.detail", """
+    SELECT
+        tk.ticket_id,
+        tk.trip_id,
+        tk.account_id,
+        tk.booking_id,
+        tk.fare_id,
+        tk.qr_code_link,
+        tk.ticket_status,
+        tk.seat_price,
+        tk.seat_code,
+        tk.serial_number,
+        t.service_date,
+        t.arrival_datetime,
+        t.route_id,
+        t.bus_id
+    FROM ticket tk
+    JOIN trip t ON tk.trip_id = t.trip_id
+    WHERE tk.ticket_id = %s
+""")
+
+# -- accounts --------------------------------------------------------------------
+
+ACCOUNT_BY_EMAIL = Query("auth.account_by_email", "SELECT * FROM account WHERE email = %s")
+
+LOGIN_PASSENGER = Query("auth.passenger", """
+    SELECT ps.passenger_id AS id, p.person_name AS name
+    FROM passenger ps
+    JOIN person p ON ps.person_id = p.person_id
+    WHERE p.account_id = %s
+""")
+
+LOGIN_STAFF = Query("auth.staff", """
+    SELECT s.staff_id AS id, p.person_name AS name, s.operator_id
+    FROM staff s
+    JOIN person p ON s.person_id = p.person_id
+    WHERE p.account_id = %s
+""")
+
+LOGIN_ADMIN = Query("auth.admin", """
+    SELECT s.staff_id AS id, p.person_name AS name
+    FROM staff s
+    JOIN person p ON s.person_id = p.person_id
+    WHERE p.account_id = %s
+""")
+
+PROFILE = Query("profile.account", """
+    SELECT
+        a.account_id,
+        a.email,
+        a.phone,
+        a.stat AS account_status,
+        a.create_at AS account_created,
+        p.person_name AS name,
+        p.date_of_birth,
+        p.gov_id_num
+    FROM account a
+    LEFT JOIN person p ON a.account_id = p.account_id
+    WHERE a.account_id = %s
+""")
+
+PROFILE_TICKETS = Query("profile.tickets", """
+    SELECT
+        t.ticket_id,
+        t.booking_id,
+        t.trip_id,
+        t.seat_code,
+        t.serial_number,
+        t.seat_price,
+        t.ticket_status,
+        tr.service_date,
+        tr.arrival_datetime,
+        tr.trip_status,
+        b.vehicle_type,
+        b.plate_number,
+        bk.currency,
+        bk.booking_status,
+        o.brand_name AS operator_brand,
+        dep_station.city AS departure_city,
+        arr_station.city AS arrival_city,
+        DATE(bk.booking_id) AS booking_date
+    FROM ticket t
+    INNER JOIN trip tr ON t.trip_id = tr.trip_id
+    INNER JOIN booking bk ON t.booking_id = bk.booking_id
+    INNER JOIN bus b ON tr.bus_id = b.bus_id
+    INNER JOIN routetrip rt ON tr.route_id = rt.route_id
+    INNER JOIN station dep_station ON rt.station_id = dep_station.station_id
+    INNER JOIN station arr_station ON rt.arrival_station = arr_station.station_id
+    INNER JOIN operator o ON bk.operator_id = o.operator_id
+    WHERE t.account_id = %s
+    ORDER BY tr.service_date DESC
+""")
+
+PASSENGER_PERSON = Query("admin.passenger_person", "SELECT person_id FROM passenger WHERE passenger_id = %s")
+STAFF_PERSON = Query("admin.staff_person", "SELECT person_id FROM staff WHERE staff_id = %s")
+PERSON_ACCOUNT = Query("admin.person_account", "SELECT account_id FROM person WHERE person_id = %s")
+ACCOUNT_INFO = Query("admin.account_info", "SELECT email, phone, stat, create_at FROM account WHERE account_id = %s")
+UPDATE_ACCOUNT_STATUS = Query("admin.account_status", "UPDATE account SET stat = %s WHERE account_id = %s")
+
+# -- trips and routes ------------------------------------------------------------
+
+TRIP_STATE = Query("trips.state", "SELECT trip_id, trip_status, service_date FROM trip WHERE trip_id = %s")
+
+TRIP_ISSUED_TICKETS = Query("trips.issued_tickets", """
+    SELECT COUNT(*) AS ticket_count
+    FROM ticket
+    WHERE trip_id = %s AND ticket_status = 'Issued'
+""")
+
+CANCEL_TRIP = Query("trips.cancel", "UPDATE trip SET trip_status = 'Cancelled' WHERE trip_id = %s")
+
+BUS_STATE = Query("trips.bus_state", "SELECT bus_id, bus_active_flag FROM bus WHERE bus_id = %s")
+
+ACTIVE_BUSES = Query("trips.active_buses", """
+    SELECT
+        bus_id,
+        plate_number,
+        bus_active_flag,
+        capacity,
+        vehicle_type
+    FROM bus
+    WHERE bus_active_flag = 'Active'
+    ORDER BY vehicle_type, plate_number
+""")
+
+ROUTE_LIST = Query("routes.list", """
+    SELECT
+        rt.route_id,
+        rt.distance,
+        rt.default_duration_time,
+        rt.operator_id,
+        o.brand_name AS operator_name,
+        ds.station_id AS departure_station_id,
+        ds.city AS departure_city,
+        ds.station_name AS departure_station,
+        das.station_id AS arrival_station_id,
+        das.city AS arrival_city,
+        das.station_name AS arrival_station,
+        COALESCE(MIN(f.seat_price), 0) AS price
+    FROM routetrip rt
+    INNER JOIN operator o ON rt.operator_id = o.operator_id
+    INNER JOIN station ds ON rt.station_id = ds.station_id
+    INNER JOIN station das ON rt.arrival_station = das.station_id
+    LEFT JOIN fare f ON rt.route_id = f.route_id AND f.valid_to >= CURDATE()
+    GROUP BY rt.route_id, rt.distance, rt.default_duration_time, rt.operator_id,
+             o.brand_name, ds.station_id, ds.city, ds.station_name,
+             das.station_id, das.city, das.station_name
+    ORDER BY rt.route_id DESC
+""")
+
+ROUTE_STATIONS = Query("routes.stations", "SELECT station_id FROM station WHERE station_id IN (%s, %s)")
+
+ROUTE_DUPLICATE = Query("routes.duplicate", """
+    SELECT route_id FROM routetrip
+    WHERE station_id = %s AND arrival_station = %s AND operator_id = %s
+""")
+
+INSERT_ROUTE = Query("routes.insert", """
+    INSERT INTO routetrip (station_id, arrival_station, distance, default_duration_time, operator_id)
+    VALUES (%s, %s, %s, %s, %s)
+""")
+
+INSERT_FARE = Query("routes.insert_fare", """
+    INSERT INTO fare (currency, discount, valid_from, valid_to, taxes, route_id,
+                      surcharges, base_fare, seat_price, seat_class)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+""")
+
+UPDATE_ROUTE_PRICE = Query("routes.update_price", """
+    UPDATE fare
+    SET seat_price = %s, base_fare = %s
+    WHERE route_id = %s
+""")
+
+ROUTE_FARE_COUNT = Query("routes.fare_count", "SELECT COUNT(*) AS fare_count FROM fare WHERE route_id = %s")
+ROUTE_TRIP_COUNT = Query("routes.trip_count", "SELECT COUNT(*) AS trip_count FROM trip WHERE route_id = %s")
+DELETE_ROUTE = Query("routes.delete", "DELETE FROM routetrip WHERE route_id = %s")
+
+FARE_DETAIL = Query("admin.fare_detail", """
+    SELECT fare_id, currency, discount, valid_from, valid_to,
+           taxes, route_id, surcharges, base_fare, seat_price, seat_class
+    FROM fare
+    WHERE fare_id = %s
+""")
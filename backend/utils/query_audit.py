@@ -0,0 +1,251 @@
+"""Debug-mode query auditor for spotting N+1 patterns and query budget regressions.
+
+When enabled (``QUERY_AUDIT=1``), every connection handed out by
+`utils.database.db_connection` is wrapped so that each executed statement is
+recorded against the current request. Prepared cursors from the pool stay
+prepared, so the audited run takes the production path; they are logged as
+the statement text plus its parameters, plain cursors as the interpolated SQL.
+After the request the auditor:
+
+- adds ``X-Query-Count`` / ``X-Query-Time-Ms`` response headers,
+- logs statement shapes that were executed repeatedly (the N+1 signature),
+- compares the count with ``QUERY_BUDGETS[endpoint]`` and warns, or raises
+  `QueryBudgetExceeded` when ``QUERY_AUDIT_STRICT`` is set.
+
+Tests can assert budgets directly without enabling the app-wide hooks::
+
+    with query_budget(4):
+        client.get("/api/trips/1/seats")
+"""
+from __future__ import annotations
+
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from flask import Flask, g, request
+
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_RE = re.compile(r"%s|%\(\w+\)s|\?")
+_IN_LIST_RE = re.compile(r"\bin\s*\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Stack of active logs; every recorded statement is appended to all of them so
+# a test-level `query_budget` still sees statements issued inside a request.
+_active_logs: ContextVar[Tuple["QueryLog", ...]] = ContextVar("query_audit_logs", default=())
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a block or endpoint issues more statements than allowed."""
+
+
+def statement_shape(sql: str) -> str:
+    """Normalize a statement so calls differing only by literals compare equal."""
+    shape = _STRING_RE.sub("?", sql)
+    shape = _PLACEHOLDER_RE.sub("?", shape)
+    shape = _NUMBER_RE.sub("?", shape)
+    shape = _WHITESPACE_RE.sub(" ", shape).strip().lower()
+    return _IN_LIST_RE.sub("in (?+)", shape)
+
+
+class QueryLog:
+    """Statements recorded while an audit scope is active."""
+
+    def __init__(self, label: str = "") -> None:
+        self.label = label
+        # (sql, elapsed_ms, params); params is None when sql is already interpolated
+        self.statements: List[Tuple[str, float, Optional[tuple]]] = []
+        self.connections = 0
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def total_ms(self) -> float:
+        return sum(elapsed for _, elapsed, _ in self.statements)
+
+    def repeated_shapes(self, threshold: int = 2) -> Dict[str, int]:
+        """Return statement shapes executed at least ``threshold`` times."""
+        counts = Counter(statement_shape(sql) for sql, _, _ in self.statements)
+        return {shape: n for shape, n in counts.items() if n >= threshold}
+
+    def summary(self) -> dict:
+        return {
+            "label": self.label,
+            "queries": self.count,
+            "connections": self.connections,
+            "total_ms": round(self.total_ms, 3),
+            "repeated": self.repeated_shapes(),
+        }
+
+
+def _record(sql, elapsed_ms: float, params: Optional[tuple] = None) -> None:
+    if isinstance(sql, (bytes, bytearray)):
+        sql = sql.decode("utf-8", "replace")
+    for log in _active_logs.get():
+        log.statements.append((str(sql), elapsed_ms, params))
+
+
+class AuditedCursor:
+    """Cursor proxy that times and records every statement it runs."""
+
+    def __init__(self, cursor, prepared: bool = False) -> None:
+        self._cursor = cursor
+        self._prepared = prepared
+
+    def _timed(self, method, operation, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(operation, *args, **kwargs)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if self._prepared:
+                # Executed server-side: there is no interpolated text to log
+                params = args[0] if args else kwargs.get("params")
+                _record(operation, elapsed_ms, tuple(params) if params is not None else ())
+            else:
+                # Prefer the interpolated statement so plans can be reproduced later
+                _record(getattr(self._cursor, "statement", None) or operation, elapsed_ms)
+
+    def execute(self, operation, *args, **kwargs):
+        return self._timed(self._cursor.execute, operation, *args, **kwargs)
+
+    def executemany(self, operation, *args, **kwargs):
+        return self._timed(self._cursor.executemany, operation, *args, **kwargs)
+
+    def callproc(self, procname, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.callproc(procname, *args, **kwargs)
+        finally:
+            _record(f"CALL {procname}", (time.perf_counter() - started) * 1000)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class AuditedConnection:
+    """Connection proxy whose cursors are `AuditedCursor` instances."""
+
+    def __init__(self, connection) -> None:
+        self._connection = connection
+
+    def cursor(self, *args, **kwargs):
+        return AuditedCursor(self._connection.cursor(*args, **kwargs), prepared=kwargs.get("prepared", False))
+
+    def __getattr__(self, name):
+        attr = getattr(self._connection, name)
+        if name == "prepared_cursor":
+            # Shared handles of the pooled connection; wrap each checkout, not the cache
+            return lambda sql: AuditedCursor(attr(sql), prepared=True)
+        return attr
+
+
+def auditing() -> bool:
+    """True while an audit scope is active in the current context."""
+    return bool(_active_logs.get())
+
+
+def wrap_connection(connection):
+    """Wrap ``connection`` when an audit scope is active, otherwise return it as-is."""
+    logs = _active_logs.get()
+    if not logs:
+        return connection
+    for log in logs:
+        log.connections += 1
+    return AuditedConnection(connection)
+
+
+@contextmanager
+def audit_queries(label: str = ""):
+    """Record every statement executed inside the block into a `QueryLog`."""
+    log = QueryLog(label)
+    token = _active_logs.set(_active_logs.get() + (log,))
+    try:
+        yield log
+    finally:
+        _active_logs.reset(token)
+
+
+@contextmanager
+def query_budget(max_queries: int, label: str = ""):
+    """Fail with `QueryBudgetExceeded` if the block runs more than ``max_queries`` statements."""
+    with audit_queries(label) as log:
+        yield log
+    if log.count > max_queries:
+        raise QueryBudgetExceeded(_budget_message(log, max_queries))
+
+
+def _budget_message(log: QueryLog, max_queries: int) -> str:
+    lines = [f"{log.label or 'block'} ran {log.count} queries (budget {max_queries})"]
+    for shape, n in sorted(log.repeated_shapes().items(), key=lambda item: -item[1]):
+        lines.append(f"  x{n}: {shape[:200]}")
+    return "\n".join(lines)
+
+
+def init_query_audit(app: Flask) -> None:
+    """Install per-request auditing hooks when ``QUERY_AUDIT`` is enabled."""
+    if not app.config.get("QUERY_AUDIT"):
+        return
+
+    budgets = app.config.get("QUERY_BUDGETS") or {}
+    repeat_threshold = int(app.config.get("QUERY_AUDIT_REPEAT_THRESHOLD", 3))
+    strict = bool(app.config.get("QUERY_AUDIT_STRICT"))
+
+    @app.before_request
+    def _start_query_audit():
+        log = QueryLog(request.endpoint or request.path)
+        g.query_audit = log
+        g.query_audit_token = _active_logs.set(_active_logs.get() + (log,))
+
+    @app.after_request
+    def _report_query_audit(response):
+        log = g.get("query_audit")
+        if log is None:
+            return response
+        response.headers["X-Query-Count"] = str(log.count)
+        response.headers["X-Query-Time-Ms"] = f"{log.total_ms:.2f}"
+
+        repeated = log.repeated_shapes(repeat_threshold)
+        for shape, n in repeated.items():
+            app.logger.warning("possible N+1 in %s: %d x %s", log.label, n, shape[:200])
+
+        budget = budgets.get(request.endpoint)
+        if budget is not None and log.count > budget:
+            message = _budget_message(log, budget)
+            if strict:
+                raise QueryBudgetExceeded(message)
+            app.logger.warning(message)
+        return response
+
+    @app.teardown_request
+    def _stop_query_audit(_exc):
+        token = g.pop("query_audit_token", None)
+        if token is None:
+            return
+        try:
+            _active_logs.reset(token)
+        except ValueError:
+            # Teardown ran in a different context than before_request
+            log = g.get("query_audit")
+            _active_logs.set(tuple(l for l in _active_logs.get() if l is not log))
+
+
+__all__ = [
+    "QueryBudgetExceeded",
+    "QueryLog",
+    "audit_queries",
+    "auditing",
+    "init_query_audit",
+    "query_budget",
+    "statement_shape",
+    "wrap_connection",
+]
@@ -0,0 +1,262 @@
+"""Read/write splitting for endpoints that only read.
+
+Views decorated with `read_only` run their queries against the read replica
+(``DB_REPLICA_HOST`` and friends, see `utils.database`) unless
+
+- the client wrote something recently, so a passenger sees their booking
+  right away. A successful POST/PUT/PATCH/DELETE (outside `read_only` views,
+  e.g. the ticket lookup POST) with a Bearer token keeps reads of that token's
+  ``account_id`` on the primary for ``REPLICA_STICKY_SECONDS``. The mark is
+  kept server-side in the primary's ``replica_sticky`` table, so it holds in
+  every worker and for cross-origin clients that send no cookies. Each write
+  also sets a short-lived ``REPLICA_STICKY_COOKIE`` cookie for clients without
+  a token (same-site only), or
+- the replica is behind by more than ``DB_REPLICA_MAX_LAG`` seconds, or its lag
+  cannot be measured (replication stopped, no REPLICATION CLIENT privilege,
+  server down). Lag is sampled at most every ``DB_REPLICA_LAG_CHECK_INTERVAL``
+  seconds per process.
+
+Responses of decorated views carry ``X-DB-Route: replica|primary``.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from functools import wraps
+from typing import Dict, Optional
+
+import jwt
+from flask import Flask, current_app, g, request
+from mysql.connector.errors import Error as MySQLError
+
+from utils.database import db_connection, replica_configured, replica_connection, route_to
+from utils.jwt_helper import decode_token
+
+WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+
+
+class ReplicaMonitor:
+    """Cached replica lag; one thread refreshes it while the others read the last value."""
+
+    def __init__(self, max_lag: float, interval: float) -> None:
+        self.max_lag = max_lag
+        self.interval = interval
+        self.lag: Optional[float] = None
+        self.checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def usable(self) -> bool:
+        if time.monotonic() - self.checked_at >= self.interval and self._lock.acquire(blocking=False):
+            try:
+                self.lag = measure_lag()
+                self.checked_at = time.monotonic()
+            finally:
+                self._lock.release()
+        return self._within_limit()
+
+    def _within_limit(self) -> bool:
+        return self.lag is not None and self.lag <= self.max_lag
+
+    def status(self) -> dict:
+        return {"lag_seconds": self.lag, "max_lag_seconds": self.max_lag, "usable": self._within_limit()}
+
+
+def measure_lag() -> Optional[float]:
+    """Seconds the replica is behind its source, or None when unknown."""
+    try:
+        conn = replica_connection()
+    except MySQLError:
+        return None
+    try:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+                column = "Seconds_Behind_Source"
+            except MySQLError:
+                # MySQL < 8.0.22
+                cursor.execute("SHOW SLAVE STATUS")
+                column = "Seconds_Behind_Master"
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+    except MySQLError:
+        return None
+    finally:
+        conn.close()
+    if not row or row.get(column) is None:
+        return None
+    return float(row[column])
+
+
+_monitor: Optional[ReplicaMonitor] = None
+_monitor_lock = threading.Lock()
+
+
+def replica_monitor() -> ReplicaMonitor:
+    global _monitor
+    if _monitor is None:
+        with _monitor_lock:
+            if _monitor is None:
+                _monitor = ReplicaMonitor(
+                    max_lag=float(os.getenv("DB_REPLICA_MAX_LAG", "2")),
+                    interval=float(os.getenv("DB_REPLICA_LAG_CHECK_INTERVAL", "1")),
+                )
+    return _monitor
+
+
+_STICKY_MARK = """
+    INSERT INTO replica_sticky (account_id, sticky_until)
+    VALUES (%s, NOW(6) + INTERVAL %s SECOND)
+    ON DUPLICATE KEY UPDATE sticky_until = VALUES(sticky_until)
+"""
+# Microseconds left, measured on the server's clock (no app/DB clock skew)
+_STICKY_LEFT = """
+    SELECT TIMESTAMPDIFF(MICROSECOND, NOW(6), sticky_until)
+    FROM replica_sticky
+    WHERE account_id = %s
+"""
+
+
+class StickyAccounts:
+    """Accounts that wrote recently; shared by the workers through ``replica_sticky``.
+
+    A process remembers the accounts it found sticky until their time is up,
+    so only accounts not known to be sticky here cost a primary-key lookup.
+    """
+
+    def __init__(self) -> None:
+        # account_id -> time.monotonic() deadline
+        self._until: Dict[int, float] = {}
+
+    def mark(self, account_id: int, seconds: int) -> None:
+        self._until[account_id] = time.monotonic() + seconds
+        with route_to("primary"):
+            conn = db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(_STICKY_MARK, (account_id, seconds))
+            conn.commit()
+            cursor.close()
+        finally:
+            conn.close()
+
+    def sticky(self, account_id: int) -> bool:
+        deadline = self._until.get(account_id)
+        if deadline is not None:
+            if deadline > time.monotonic():
+                return True
+            self._until.pop(account_id, None)
+        try:
+            with route_to("primary"):
+                conn = db_connection()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(_STICKY_LEFT, (account_id,))
+                row = cursor.fetchone()
+                cursor.close()
+            finally:
+                conn.close()
+        except MySQLError:
+            # Unknown: the primary is always up to date
+            return True
+        if not row or row[0] is None or row[0] <= 0:
+            return False
+        self._until[account_id] = time.monotonic() + row[0] / 1e6
+        return True
+
+    def clear(self) -> None:
+        self._until.clear()
+
+
+sticky_accounts = StickyAccounts()
+
+
+def account_from_authorization(header: str) -> Optional[int]:
+    """``account_id`` of a valid ``Authorization: Bearer`` token, else None."""
+    if not header.startswith("Bearer "):
+        return None
+    try:
+        payload = decode_token(header.split(" ", 1)[1].strip())
+    except jwt.InvalidTokenError:
+        return None
+    account_id = payload.get("account_id")
+    return account_id if isinstance(account_id, int) else None
+
+
+def _request_account() -> Optional[int]:
+    user = g.get("current_user")
+    if user is not None:
+        account_id = user.get("account_id")
+        return account_id if isinstance(account_id, int) else None
+    return account_from_authorization(request.headers.get("Authorization", ""))
+
+
+def _replica_allowed() -> bool:
+    if not replica_configured():
+        return False
+    if request.cookies.get(current_app.config["REPLICA_STICKY_COOKIE"]):
+        return False
+    if not replica_monitor().usable():
+        return False
+    account_id = _request_account()
+    return account_id is None or not sticky_accounts.sticky(account_id)
+
+
+def read_only(view):
+    """Serve the view from the replica when it is safe to (see module docstring)."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        target = "replica" if _replica_allowed() else "primary"
+        g.db_route = target
+        with route_to(target):
+            return view(*args, **kwargs)
+
+    return wrapper
+
+
+def init_replica_routing(app: Flask) -> None:
+    """Stick writers to the primary and label routed responses."""
+
+    @app.after_request
+    def _replica_headers(response):
+        route = g.get("db_route")
+        if route is not None:
+            response.headers["X-DB-Route"] = route
+        sticky_seconds = app.config["REPLICA_STICKY_SECONDS"]
+        if (
+            replica_configured()
+            and sticky_seconds > 0
+            and request.method in WRITE_METHODS
+            and route is None
+            and response.status_code < 400
+        ):
+            account_id = _request_account()
+            if account_id is not None:
+                try:
+                    sticky_accounts.mark(account_id, sticky_seconds)
+                except MySQLError as exc:
+                    # This worker still remembers it; the others may read the replica
+                    app.logger.warning("replica_sticky not updated for account %s: %s", account_id, exc)
+            response.set_cookie(
+                app.config["REPLICA_STICKY_COOKIE"],
+                "1",
+                max_age=sticky_seconds,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+
+__all__ = [
+    "ReplicaMonitor",
+    "StickyAccounts",
+    "account_from_authorization",
+    "init_replica_routing",
+    "measure_lag",
+    "read_only",
+    "replica_monitor",
+    "sticky_accounts",
+]
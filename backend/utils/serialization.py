@@ -0,0 +1,290 @@
+"""Fast JSON serialization: app JSON provider and precompiled row encoders.
+
+`FastJSONProvider` replaces Flask's stdlib-based provider. It uses orjson when
+installed and falls back to `json`; both paths share the same `json_default`
+so the bytes clients see do not depend on which backend is present:
+
+- ``datetime``/``date``: HTTP date strings, exactly as Flask's default provider
+- ``time``/``timedelta``: ``HH:MM:SS`` (MySQL TIME columns come back as timedelta)
+- ``Decimal``: string, as Flask does, to avoid silent precision loss
+
+`RowEncoder` turns a field spec into a generated function that maps cursor
+rows to output dicts with one dict literal per row, instead of looking up
+helpers and building dicts field by field inside the handler loop.
+"""
+from __future__ import annotations
+
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Union
+
+from flask import Flask, Response, current_app, request
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+try:  # optional fast backend
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+
+_ORJSON_OPTIONS = 0
+if orjson is not None:
+    # Route datetimes through json_default so output matches the stdlib path
+    _ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+def format_timedelta(value: timedelta) -> str:
+    """Render a MySQL TIME value (timedelta) as ``[-]H:MM:SS``."""
+    total = int(value.total_seconds())
+    sign = "-" if total < 0 else ""
+    hours, remainder = divmod(abs(total), 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{sign}{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+def json_default(obj: Any) -> Any:
+    """Encode types the JSON backends do not handle natively."""
+    if isinstance(obj, date):  # includes datetime
+        return http_date(obj)
+    if isinstance(obj, timedelta):
+        return format_timedelta(obj)
+    if isinstance(obj, dt_time):
+        return obj.strftime("%H:%M:%S")
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if isinstance(obj, (bytes, bytearray)):
+        return obj.decode("utf-8", "replace")
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, "__html__"):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_bytes(obj: Any, sort_keys: bool = False) -> bytes:
+    """Serialize ``obj`` to compact UTF-8 JSON bytes with the fastest backend."""
+    if orjson is not None:
+        option = _ORJSON_OPTIONS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(obj, default=json_default, option=option)
+    return json.dumps(
+        obj, default=json_default, ensure_ascii=False, sort_keys=sort_keys, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def loads_bytes(data: Any) -> Any:
+    """Parse JSON from bytes or str with the fastest backend."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson when available."""
+
+    ensure_ascii = False
+    sort_keys = False
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if not kwargs:
+            return dumps_bytes(obj, self.sort_keys).decode("utf-8")
+        kwargs.setdefault("default", json_default)
+        kwargs.setdefault("ensure_ascii", self.ensure_ascii)
+        kwargs.setdefault("sort_keys", self.sort_keys)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any):
+        if args and kwargs:
+            raise TypeError("app.json.response() takes either args or kwargs, not both")
+        if not args and not kwargs:
+            obj = None
+        elif len(args) == 1:
+            obj = args[0]
+        else:
+            obj = args or kwargs
+
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            body = json.dumps(obj, default=json_default, ensure_ascii=False,
+                              sort_keys=self.sort_keys, indent=2) + "\n"
+        else:
+            body = dumps_bytes(obj, self.sort_keys) + b"\n"
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_json_provider(app: Flask) -> None:
+    """Install `FastJSONProvider` as ``app.json``, honouring JSON_SORT_KEYS."""
+    provider = FastJSONProvider(app)
+    provider.sort_keys = bool(app.config.get("JSON_SORT_KEYS", False))
+    app.json = provider
+
+
+# ---------------------------------------------------------------------------
+# Row encoders
+
+FieldSpec = Union[str, tuple, Callable[[Any], Any]]
+
+
+class RowEncoder:
+    """Precompiled mapping from cursor rows (dicts) to response dicts.
+
+    ``fields`` maps each output key, in output order, to one of:
+
+    - ``"column"``: copy ``row["column"]`` unchanged
+    - ``("column", convert)``: ``convert(row["column"])``
+    - ``callable``: ``callable(row)`` for values derived from several columns
+
+    The spec is compiled once into a list comprehension with a single dict
+    literal, which is what makes large listings cheap to encode.
+    """
+
+    def __init__(self, fields: Dict[str, FieldSpec], name: str = "rows") -> None:
+        self.fields = dict(fields)
+        namespace: Dict[str, Any] = {}
+        items = []
+        for index, (out_key, spec) in enumerate(self.fields.items()):
+            if isinstance(spec, str):
+                expr = f"row[{spec!r}]"
+            elif isinstance(spec, tuple) and len(spec) == 2 and callable(spec[1]):
+                namespace[f"_f{index}"] = spec[1]
+                expr = f"_f{index}(row[{spec[0]!r}])"
+            elif callable(spec):
+                namespace[f"_f{index}"] = spec
+                expr = f"_f{index}(row)"
+            else:
+                raise TypeError(f"invalid field spec for {out_key!r}: {spec!r}")
+            items.append(f"{out_key!r}: {expr}")
+        body = ", ".join(items)
+        source = (
+            f"def encode_row(row):\n    return {{{body}}}\n"
+            f"def encode_rows(rows):\n    return [{{{body}}} for row in rows]\n"
+        )
+        exec(compile(source, f"<row-encoder {name}>", "exec"), namespace)
+        self.encode_row: Callable[[Any], dict] = namespace["encode_row"]
+        self.encode_rows: Callable[[Iterable[Any]], List[dict]] = namespace["encode_rows"]
+
+    def __call__(self, rows: Iterable[Any]) -> List[dict]:
+        return self.encode_rows(rows)
+
+
+# Converters shared by the row encoders --------------------------------------
+
+def datetime_text(value: Any) -> Any:
+    """``YYYY-MM-DD HH:MM:SS`` for datetime/date, passthrough str/None."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat(" ", "seconds")
+    if isinstance(value, date):
+        return f"{value.isoformat()} 00:00:00"
+    return str(value)
+
+
+def datetime_iso(value: Any) -> str:
+    """``YYYY-MM-DDTHH:MM:SS`` or empty string when missing."""
+    if isinstance(value, datetime):
+        return value.isoformat("T", "seconds")
+    return value.isoformat() if value else ""
+
+
+def clock_hhmm(value: Any) -> str:
+    """``HH:MM`` of a datetime, empty string otherwise."""
+    if isinstance(value, datetime):
+        return f"{value.hour:02d}:{value.minute:02d}"
+    return ""
+
+
+def or_zero(value: Any) -> Any:
+    return value if value is not None else 0
+
+
+def id_text(value: Any) -> Any:
+    return str(value) if value is not None else None
+
+
+# ---------------------------------------------------------------------------
+# Database-rendered listings
+
+# MySQL DATE_FORMAT equivalents of the Python converters above; pass them as
+# query parameters so the literal % signs never meet client-side interpolation.
+SQL_DATETIME_FORMAT = "%Y-%m-%d %H:%i:%s"
+SQL_CLOCK_FORMAT = "%H:%i"
+
+
+def db_rendering_requested() -> bool:
+    """True when a listing should be rendered by MySQL (``?render=db`` or config)."""
+    render = request.args.get("render")
+    if render in ("db", "python"):
+        return render == "db"
+    return bool(current_app.config.get("SQL_RENDERED_LISTINGS"))
+
+
+def json_rows_response(conn, cursor, key: str = "data", batch_size: int = 500) -> Response:
+    """Stream a ``{"<key>": [...]}`` document from rows whose first column is JSON text.
+
+    The query is expected to select one ``JSON_OBJECT(...)`` per row; the
+    documents are joined as-is, never decoded. Takes ownership of ``conn`` and
+    ``cursor``: they are closed once the body has been sent, or when the
+    response is closed without it being read (client gone, HEAD request,
+    error after the view), so the pooled connection is always returned.
+    """
+    released = []
+
+    def release():
+        if not released:
+            released.append(True)
+            try:
+                cursor.close()
+            finally:
+                conn.close()
+
+    def generate():
+        try:
+            yield f'{{"{key}":['.encode("utf-8")
+            separator = ""
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                chunk = ",".join(
+                    row[0].decode("utf-8") if isinstance(row[0], (bytes, bytearray)) else row[0]
+                    for row in rows
+                )
+                yield (separator + chunk).encode("utf-8")
+                separator = ","
+            yield b"]}\n"
+        finally:
+            release()
+
+    response = current_app.response_class(generate(), mimetype="application/json")
+    # A generator that never started never runs its finally block
+    response.call_on_close(release)
+    return response
+
+
+__all__ = [
+    "FastJSONProvider",
+    "RowEncoder",
+    "SQL_CLOCK_FORMAT",
+    "SQL_DATETIME_FORMAT",
+    "clock_hhmm",
+    "datetime_iso",
+    "datetime_text",
+    "db_rendering_requested",
+    "dumps_bytes",
+    "format_timedelta",
+    "id_text",
+    "init_json_provider",
+    "json_default",
+    "json_rows_response",
+    "loads_bytes",
+    "or_zero",
+]
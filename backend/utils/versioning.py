@@ -0,0 +1,233 @@
+"""Per-table change counters backing ETag/Last-Modified on reference data.
+
+Write endpoints call `bump_table_versions` inside their transaction, which
+increments a row per table in ``table_version``. Read endpoints decorated
+with `conditional_get` derive a strong ETag from the versions of the tables
+they read, answer ``If-None-Match``/``If-Modified-Since`` with 304 and set
+``Cache-Control`` so browsers and CDNs can absorb repeat fetches::
+
+    @schedule_bp.route("/stations", methods=["GET"])
+    @conditional_get("station")
+    def list_stations(): ...
+
+Versions are cached per process and re-read at most every
+``TABLE_VERSION_TTL`` seconds, so a 304 normally costs no query at all. A
+write in this process expires the cache once it commits; writes served by
+other workers become visible within the TTL. Views routed to the read replica
+(`utils.replicas.read_only`) use a separate cache filled from the replica, so
+an ETag never claims a version the replica has not applied yet.
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from typing import Dict, Iterable, Optional, Tuple
+
+from flask import after_this_request, current_app, has_request_context, make_response, request
+
+from utils.database import current_route, db_connection
+
+# Content-coding suffixes the compression layer appends to ETags; a validator
+# sent back for any encoded variant still identifies the same representation.
+ETAG_ENCODING_SUFFIXES = ("-br", "-zstd", "-gzip")
+
+_MIDNIGHT_SAFETY = timedelta(seconds=1)
+
+
+class TableVersions:
+    """Process-local cache of ``table_version`` rows."""
+
+    def __init__(self) -> None:
+        self._versions: Dict[str, Tuple[int, Optional[datetime]]] = {}
+        self._loaded_at: Optional[float] = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def expire(self) -> None:
+        self._generation += 1
+        self._loaded_at = None
+
+    def get(self, tables: Iterable[str], ttl: float) -> Optional[Dict[str, Tuple[int, Optional[datetime]]]]:
+        """Return ``{table: (version, updated_at)}``, refreshing when older than ``ttl``.
+
+        Returns None when versions cannot be read (table missing, DB down), in
+        which case callers should serve the response without validators.
+        """
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > ttl:
+            with self._lock:
+                if self._loaded_at is None or time.monotonic() - self._loaded_at > ttl:
+                    if not self._refresh():
+                        return None
+        versions = self._versions
+        return {table: versions.get(table, (0, None)) for table in tables}
+
+    def _refresh(self) -> bool:
+        started = time.monotonic()
+        generation = self._generation
+        try:
+            conn = db_connection()
+            cursor = conn.cursor()
+            try:
+                # updated_at is a DATETIME written in the session time zone;
+                # UNIX_TIMESTAMP reads it in that zone, so the instant is right
+                # whatever the app host's zone is
+                cursor.execute("SELECT table_name, version, UNIX_TIMESTAMP(updated_at) FROM table_version")
+                rows = cursor.fetchall()
+            finally:
+                cursor.close()
+                conn.close()
+        except Exception as exc:
+            current_app.logger.warning("table versions unavailable: %s", exc)
+            return False
+        self._versions = {
+            name: (int(version), None if updated_at is None else datetime.fromtimestamp(float(updated_at), timezone.utc))
+            for name, version, updated_at in rows
+        }
+        if generation == self._generation:
+            # Not expired mid-read; otherwise serve these once and re-read next time
+            self._loaded_at = started
+        return True
+
+
+table_versions = TableVersions()
+replica_table_versions = TableVersions()
+
+
+def route_table_versions() -> TableVersions:
+    """Version cache matching the server the current request reads from."""
+    return replica_table_versions if current_route() == "replica" else table_versions
+
+
+def _expire_all() -> None:
+    table_versions.expire()
+    replica_table_versions.expire()
+
+
+def bump_table_versions(cursor, *tables: str) -> None:
+    """Increment the change counter of ``tables`` on the caller's transaction.
+
+    Call before ``conn.commit()`` so the bump commits (or rolls back) with the
+    write. The local cache is expired once the request finishes.
+    """
+    if not tables:
+        return
+    placeholders = ", ".join(["(%s, 1)"] * len(tables))
+    cursor.execute(
+        f"""
+        INSERT INTO table_version (table_name, version) VALUES {placeholders}
+        ON DUPLICATE KEY UPDATE version = version + 1, updated_at = CURRENT_TIMESTAMP(6)
+        """,
+        tables,
+    )
+    _expire_all()
+    if has_request_context():
+        @after_this_request
+        def _expire_after_commit(response):
+            _expire_all()
+            return response
+
+
+def strip_encoding_suffix(etag: str) -> str:
+    for suffix in ETAG_ENCODING_SUFFIXES:
+        if etag.endswith(suffix):
+            return etag[: -len(suffix)]
+    return etag
+
+
+def etag_matches(etag: str) -> bool:
+    """Weak comparison of ``etag`` (unquoted) against the request's If-None-Match."""
+    candidates = request.if_none_match
+    if not candidates:
+        return False
+    if candidates.star_tag:
+        return True
+    return any(strip_encoding_suffix(tag) == etag for tag in candidates.as_set(include_weak=True))
+
+
+def _next_midnight(now: datetime) -> datetime:
+    return (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def conditional_get(*tables: str, daily: bool = False, private: bool = False):
+    """Add ETag/Last-Modified/Cache-Control to a view reading only ``tables``.
+
+    ``daily`` marks responses that also depend on the current date (e.g. fares
+    filtered by ``CURDATE()``): the date goes into the ETag and ``max-age`` is
+    capped at midnight. ``private`` endpoints (admin) are not stored by shared
+    caches and are revalidated on every use.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            config = current_app.config
+            versions = route_table_versions().get(tables, float(config.get("TABLE_VERSION_TTL", 2.0)))
+            if versions is None:
+                return view(*args, **kwargs)
+
+            # Local wall clock (the day boundary of daily data), zone-aware
+            now = datetime.now().astimezone()
+            key = [config.get("ETAG_SALT", ""), request.endpoint]
+            key.extend(f"{table}:{versions[table][0]}" for table in tables)
+            if daily:
+                key.append(now.date().isoformat())
+            etag = hashlib.sha1("|".join(key).encode("utf-8")).hexdigest()[:20]
+
+            modified = [updated_at for _, updated_at in versions.values() if updated_at is not None]
+            if daily:
+                modified.append(now.replace(hour=0, minute=0, second=0, microsecond=0))
+            last_modified = max(modified).astimezone(timezone.utc).replace(microsecond=0) if modified else None
+
+            if private:
+                cache_control = "private, no-cache"
+            else:
+                max_age = int(config.get("REFERENCE_CACHE_MAX_AGE", 60))
+                if daily:
+                    max_age = min(max_age, int((_next_midnight(now) - now - _MIDNIGHT_SAFETY).total_seconds()))
+                cache_control = f"public, max-age={max(max_age, 0)}"
+                swr = int(config.get("REFERENCE_CACHE_SWR", 0))
+                if swr and not daily:
+                    cache_control += f", stale-while-revalidate={swr}"
+
+            if request.if_none_match:
+                not_modified = etag_matches(etag)
+            else:
+                since = request.if_modified_since
+                not_modified = bool(
+                    since and last_modified
+                    and last_modified <= since
+                )
+
+            if not_modified:
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.headers["Cache-Control"] = cache_control
+            return response
+
+        wrapper.versioned_tables = tables
+        return wrapper
+
+    return decorator
+
+
+__all__ = [
+    "ETAG_ENCODING_SUFFIXES",
+    "TableVersions",
+    "bump_table_versions",
+    "conditional_get",
+    "etag_matches",
+    "replica_table_versions",
+    "route_table_versions",
+    "strip_encoding_suffix",
+    "table_versions",
+]
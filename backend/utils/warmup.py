@@ -0,0 +1,126 @@
+"""Per-process warm-up before the instance reports ready on ``/readyz``.
+
+A fresh worker would otherwise pay for its first connections and cache loads
+inside the first user requests. The warm-up runs once per process, on a
+background thread:
+
+1. opens ``WARMUP_POOL_CONNECTIONS`` connections in the primary pool (and the
+   replica pool when one is configured),
+2. reads the ``table_version`` rows used for ETags,
+3. builds the station search index,
+4. loads ``WARMUP_PLANNER_DAYS`` days of the journey planner timetable.
+
+Until it has finished, ``/readyz`` (and ``/health``) answer 503
+``{"status": "warming"}``. A failed step is logged and recorded in the
+status but does not block readiness: that cache then loads on demand as
+before, and the health probe (utils/health.py) still reports a database
+that is down.
+
+It starts from gunicorn's ``post_worker_init`` hook (see gunicorn.conf.py),
+or else with the first request a process receives. It never runs in a
+preloading gunicorn master: pools and threads do not survive the fork into
+the workers. ``WARMUP_ENABLED=0`` reports ready right away.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from datetime import date
+from typing import Callable, List, Tuple
+
+from flask import Flask
+
+from utils.database import get_pool, get_replica_pool, replica_configured, route_to
+
+_state = {"pid": None, "state": "pending", "started_at": None, "seconds": None, "steps": {}, "errors": {}}
+_lock = threading.Lock()
+
+
+def _warm_pools(app: Flask) -> None:
+    count = app.config["WARMUP_POOL_CONNECTIONS"]
+    for pool in (get_pool(), get_replica_pool()):
+        if pool is not None:
+            pool.warm(count)
+
+
+def _warm_table_versions(app: Flask) -> None:
+    from utils.versioning import replica_table_versions, table_versions
+
+    # ttl=0: read the rows now whatever the cache holds
+    if table_versions.get((), 0) is None:
+        raise RuntimeError("table_version rows unavailable")
+    if replica_configured():
+        with route_to("replica"):
+            replica_table_versions.get((), 0)
+
+
+def _warm_station_index(app: Flask) -> None:
+    from services.station_search import station_index
+
+    station_index.ensure_fresh()
+
+
+def _warm_planner(app: Flask) -> None:
+    from services.journey_planner import planner
+
+    planner.preload(date.today(), app.config["WARMUP_PLANNER_DAYS"])
+
+
+STEPS: List[Tuple[str, Callable[[Flask], None]]] = [
+    ("pools", _warm_pools),
+    ("table_versions", _warm_table_versions),
+    ("station_index", _warm_station_index),
+    ("journey_planner", _warm_planner),
+]
+
+
+def _run(app: Flask) -> None:
+    started = time.monotonic()
+    with app.app_context():
+        for name, step in STEPS:
+            step_started = time.monotonic()
+            try:
+                step(app)
+            except Exception as exc:
+                app.logger.warning("warm-up step %s failed: %s", name, exc)
+                _state["errors"][name] = str(exc)
+            _state["steps"][name] = round((time.monotonic() - step_started) * 1000, 1)
+    _state["seconds"] = round(time.monotonic() - started, 3)
+    _state["state"] = "ready"
+    app.logger.info("warm-up of pid %s done in %.2fs", os.getpid(), _state["seconds"])
+
+
+def start_warmup(app: Flask) -> None:
+    """Start this process's warm-up unless it already started (no-op when disabled)."""
+    pid = os.getpid()
+    if _state["pid"] == pid:
+        return
+    with _lock:
+        if _state["pid"] == pid:
+            return
+        # Forked from a process that had started: its thread did not come along
+        _state.update(pid=pid, state="pending", started_at=None, seconds=None, steps={}, errors={})
+        if not app.config.get("WARMUP_ENABLED"):
+            _state["state"] = "ready"
+            return
+        _state.update(state="warming", started_at=time.time())
+        threading.Thread(target=_run, args=(app,), name="warmup", daemon=True).start()
+
+
+def warmup_status() -> dict:
+    """``state`` (pending, warming, ready), per-step milliseconds and errors of this process."""
+    if _state["pid"] != os.getpid():
+        return {"state": "pending", "pid": os.getpid()}
+    return {key: (dict(value) if isinstance(value, dict) else value) for key, value in _state.items()}
+
+
+def init_warmup(app: Flask) -> None:
+    """Warm up on the first request when no server hook started it earlier."""
+
+    @app.before_request
+    def _start_warmup():
+        start_warmup(app)
+
+
+__all__ = ["STEPS", "init_warmup", "start_warmup", "warmup_status"]
@@ -181,6 +181,119 @@ CREATE TABLE ticket (
     CONSTRAINT uq_ticket_trip_seat UNIQUE (trip_id, seat_code)
 );
 
+-- Change counters for reference tables; bumped by the backend write endpoints
+-- and used to build ETags (backend/utils/versioning.py)
+CREATE TABLE table_version (
+    table_name VARCHAR(64) PRIMARY KEY,
+    version BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    updated_at DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)
+);
+
+INSERT INTO table_version (table_name, version) VALUES
+    ('station', 1), ('operator', 1), ('routetrip', 1), ('bus', 1), ('fare', 1);
+
+-- Accounts that wrote in the last REPLICA_STICKY_SECONDS: their reads stay on
+-- the primary in every worker (backend/utils/replicas.py)
+CREATE TABLE replica_sticky (
+    account_id INT PRIMARY KEY,
+    sticky_until DATETIME(6) NOT NULL
+);
+
+-- One row per (route, service date) behind GET /api/schedule/calendar;
+-- maintained by services/fare_calendar.py
+CREATE TABLE daily_route_summary (
+    route_id INT NOT NULL,
+    service_date DATE NOT NULL,
+    trip_count INT NOT NULL DEFAULT 0,
+    available_seats INT NOT NULL DEFAULT 0,
+    min_price INT,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT daily_route_summary_pk PRIMARY KEY (route_id, service_date),
+    CONSTRAINT daily_route_summary_route_fk FOREIGN KEY (route_id) REFERENCES routetrip(route_id) ON DELETE CASCADE,
+    INDEX idx_daily_route_summary_date (service_date)
+);
+
+CREATE INDEX idx_trip_service_date ON trip (service_date);
+
+-- Recurring timetable (services/timetable.py). A template is one departure
+-- time of a route on the weekdays of weekday_mask (bit 0 = Monday ... bit 6 =
+-- Sunday), optionally bounded by valid_from/valid_to and preferring buses of
+-- vehicle_type.
+CREATE TABLE timetable_template (
+    template_id INT AUTO_INCREMENT,
+    route_id INT NOT NULL,
+    departure_time TIME NOT NULL,
+    weekday_mask TINYINT UNSIGNED NOT NULL DEFAULT 127,
+    valid_from DATE,
+    valid_to DATE,
+    vehicle_type VARCHAR(256) CHECK (vehicle_type IN ('Sleeper','Seater', 'Limousine')),
+    active_flag VARCHAR(256) NOT NULL DEFAULT 'Active' CHECK (active_flag IN ('Active', 'Inactive')),
+    CONSTRAINT timetable_template_pk PRIMARY KEY (template_id),
+    CONSTRAINT timetable_template_route_fk FOREIGN KEY (route_id) REFERENCES routetrip(route_id) ON DELETE CASCADE,
+    CONSTRAINT timetable_template_uq UNIQUE (route_id, departure_time, weekday_mask)
+);
+
+-- Holiday/one-off changes: 'Cancel' drops one departure (or the whole day when
+-- departure_time is NULL), 'Add' schedules an extra one. route_id NULL applies
+-- to every route.
+CREATE TABLE timetable_exception (
+    exception_id INT AUTO_INCREMENT,
+    route_id INT,
+    exception_date DATE NOT NULL,
+    action VARCHAR(10) NOT NULL CHECK (action IN ('Cancel', 'Add')),
+    departure_time TIME,
+    vehicle_type VARCHAR(256) CHECK (vehicle_type IN ('Sleeper','Seater', 'Limousine')),
+    note VARCHAR(256),
+    CONSTRAINT timetable_exception_pk PRIMARY KEY (exception_id),
+    CONSTRAINT timetable_exception_route_fk FOREIGN KEY (route_id) REFERENCES routetrip(route_id) ON DELETE CASCADE,
+    INDEX idx_timetable_exception_date (exception_date)
+);
+
+-- (route, date) pairs whose trips have been generated; expansion skips them
+CREATE TABLE timetable_materialization (
+    route_id INT NOT NULL,
+    service_date DATE NOT NULL,
+    trip_count INT NOT NULL DEFAULT 0,
+    materialized_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT timetable_materialization_pk PRIMARY KEY (route_id, service_date),
+    CONSTRAINT timetable_materialization_route_fk FOREIGN KEY (route_id) REFERENCES routetrip(route_id) ON DELETE CASCADE,
+    INDEX idx_timetable_materialization_date (service_date)
+);
+
+-- Revenue read model (services/revenue.py): one row per service date,
+-- operator, route and seat class. gross sums the seat price of Issued/Used
+-- tickets, refunds the seat price of Refunded ones. No foreign keys: rows
+-- outlive the trips and tickets purged by seed_trips.py.
+CREATE TABLE revenue_daily_fact (
+    service_date DATE NOT NULL,
+    operator_id VARCHAR(10) NOT NULL,
+    route_id INT NOT NULL,
+    seat_class VARCHAR(20) NOT NULL,
+    tickets INT NOT NULL DEFAULT 0,
+    gross BIGINT NOT NULL DEFAULT 0,
+    refunded_tickets INT NOT NULL DEFAULT 0,
+    refunds BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT revenue_daily_fact_pk PRIMARY KEY (service_date, operator_id, route_id, seat_class),
+    INDEX idx_revenue_operator_date (operator_id, service_date),
+    INDEX idx_revenue_route_date (route_id, service_date)
+);
+
+-- Seats sold per trip at departure (services/occupancy.py); like the revenue
+-- facts, rows are kept after seed_trips.py purges the trip
+CREATE TABLE trip_occupancy_snapshot (
+    trip_id INT NOT NULL,
+    route_id INT NOT NULL,
+    operator_id VARCHAR(10) NOT NULL,
+    service_date DATETIME NOT NULL,
+    vehicle_type VARCHAR(256),
+    capacity INT NOT NULL DEFAULT 0,
+    seats_sold INT NOT NULL DEFAULT 0,
+    snapshot_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT trip_occupancy_snapshot_pk PRIMARY KEY (trip_id),
+    INDEX idx_occupancy_service_date (service_date)
+);
+
 DELIMITER $$
 
 -- Function 1: Get Available Seats for a Trip
@@ -260,16 +373,16 @@ BEGIN
         SIGNAL SQLSTATE '45000' 
         SET MESSAGE_TEXT = 'Start date cannot be after end date.';
     ELSE
-        SELECT 
-            t.route_id,
-            SUM(b.total_amount) AS total_revenue
-        FROM booking AS b
-        JOIN ticket AS tk ON b.booking_id = tk.booking_id
-        JOIN trip AS t ON tk.trip_id = t.trip_id
+        -- Read from the daily fact table: one indexed range per operator,
+        -- ticket prices instead of booking totals repeated per ticket
+        SELECT
+            route_id,
+            SUM(gross) AS total_revenue
+        FROM revenue_daily_fact
         WHERE
-            b.operator_id = p_operator_id
-            AND DATE(t.service_date) BETWEEN p_start_date AND p_end_date
-        GROUP BY t.route_id
+            operator_id = p_operator_id
+            AND service_date BETWEEN p_start_date AND p_end_date
+        GROUP BY route_id
         HAVING total_revenue > 0;
     END IF;
 END$$
@@ -4,6 +4,7 @@ import Header from '../components/layout/Header';
 import Footer from '../components/layout/Footer';
 import { FiUser, FiMail, FiPhone, FiCalendar, FiCreditCard, FiFileText, FiClock } from 'react-icons/fi';
 import { apiUrl } from '../utils/api';
+import { getAuthHeaders } from '../utils/auth';
 
 const Profile = () => {
   const navigate = useNavigate();
@@ -27,7 +28,8 @@ const Profile = () => {
       const accountId = userData.accountId;
 
       // Fetch user profile data
-      fetch(apiUrl(`/api/profile/${accountId}`))
+      // The token keeps reads right after a booking on the primary database
+      fetch(apiUrl(`/api/profile/${accountId}`), { headers: getAuthHeaders() })
         .then(response => response.json())
         .then(data => {
           if (data.success) {
@@ -44,7 +46,7 @@ const Profile = () => {
         });
 
       // Fetch user tickets
-      fetch(apiUrl(`/api/profile/${accountId}/tickets`))
+      fetch(apiUrl(`/api/profile/${accountId}/tickets`), { headers: getAuthHeaders() })
         .then(response => response.json())
         .then(data => {
           if (data.success) {